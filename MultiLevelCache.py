@@ -212,12 +212,35 @@ class OptimizedDatabaseUtils:
 class MaterializedViewManager:
     def __init__(self):
         self.db = DatabaseUtils()
+        # Longest a view may go without a refresh (its rolling window moves on
+        # even when no rows change)
         self.refresh_intervals = {
             'project_stats_hourly': 3600,
             'user_activity_daily': 86400,
             'system_metrics_5min': 300
         }
+        # Source table of each view; writes to it mark the view dirty
+        self.view_sources = {
+            'project_stats_hourly': 'tasks',
+            'user_activity_daily': 'audit_logs'
+        }
+        # Unique indexes required by REFRESH ... CONCURRENTLY
+        self.view_unique_keys = {
+            'project_stats_hourly': ('project_id', 'time_bucket'),
+            'user_activity_daily': ('user_id', 'date')
+        }
+        # Write-path event types (see analytics_events) -> source table they touch
+        self.event_tables = {
+            'task_created': 'tasks',
+            'task_updated': 'tasks',
+            'task_deleted': 'tasks',
+            'user_activity': 'audit_logs'
+        }
+        self.min_refresh_gap = 60
         self.refresh_tasks = {}
+        self.dirty_events = {view_name: asyncio.Event() for view_name in self.refresh_intervals}
+        self.refresh_stats = {view_name: {"refreshes": 0, "concurrent": 0, "on_change": 0, "last_duration": 0.0}
+                              for view_name in self.refresh_intervals}
     
     async def create_materialized_views(self):
         """Create materialized views for analytics"""
@@ -250,33 +273,83 @@ class MaterializedViewManager:
         async with self.db.get_session() as session:
             for view_name, view_sql in views.items():
                 await session.execute(text(view_sql))
+                columns = self.view_unique_keys.get(view_name)
+                if columns:
+                    await session.execute(text(
+                        f"CREATE UNIQUE INDEX IF NOT EXISTS {view_name}_unique_idx "
+                        f"ON {view_name} ({', '.join(columns)})"
+                    ))
             await session.commit()
     
+    def mark_changed(self, table: str):
+        """Record a write to ``table``; views built from it refresh on their next turn"""
+        for view_name, source in self.view_sources.items():
+            if source == table and view_name in self.dirty_events:
+                self.dirty_events[view_name].set()
+    
+    def _on_analytics_events(self, events: List[Dict[str, Any]]):
+        for table in {self.event_tables.get(event.get("type")) for event in events} - {None}:
+            self.mark_changed(table)
+    
     async def refresh_materialized_views(self):
-        """Refresh materialized views on schedule"""
+        """Refresh materialized views on schedule and whenever the write path reports changes"""
+        analytics_events.subscribe(self._on_analytics_events)
         for view_name, interval in self.refresh_intervals.items():
             self.refresh_tasks[view_name] = asyncio.create_task(
                 self._refresh_view_periodically(view_name, interval)
             )
     
     async def _refresh_view_periodically(self, view_name: str, interval: int):
-        """Refresh a materialized view periodically"""
+        """Refresh a view when its source table changed, and at least every ``interval`` seconds"""
+        dirty = self.dirty_events[view_name]
+        stats = self.refresh_stats[view_name]
         while True:
+            # Cleared first: writes landing during the refresh trigger another one
+            dirty.clear()
+            await self.refresh_view(view_name)
+            try:
+                await asyncio.wait_for(dirty.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                continue
+            stats["on_change"] += 1
+            # Coalesce bursts of writes into at most one refresh per gap
+            await asyncio.sleep(self.min_refresh_gap)
+    
+    async def refresh_view(self, view_name: str) -> bool:
+        """Refresh one view without blocking readers (CONCURRENTLY), falling back to a plain refresh"""
+        stats = self.refresh_stats[view_name]
+        started = asyncio.get_running_loop().time()
+        concurrently = view_name in self.view_unique_keys
+        try:
             try:
                 async with self.db.get_session() as session:
-                    await session.execute(text(f"REFRESH MATERIALIZED VIEW {view_name}"))
+                    keyword = "CONCURRENTLY " if concurrently else ""
+                    await session.execute(text(f"REFRESH MATERIALIZED VIEW {keyword}{view_name}"))
                     await session.commit()
-                    logger.info(f"Refreshed materialized view: {view_name}")
             except Exception as e:
-                logger.error(f"Failed to refresh view {view_name}: {e}")
-            
-            await asyncio.sleep(interval)
+                if not concurrently:
+                    raise
+                # Missing unique index or an unpopulated view
+                logger.warning(f"Concurrent refresh of {view_name} failed ({e}), doing a full refresh")
+                concurrently = False
+                async with self.db.get_session() as session:
+                    await session.execute(text(f"REFRESH MATERIALIZED VIEW {view_name}"))
+                    await session.commit()
+        except Exception as e:
+            logger.error(f"Failed to refresh view {view_name}: {e}")
+            return False
+        
+        stats["refreshes"] += 1
+        stats["concurrent"] += int(concurrently)
+        stats["last_duration"] = asyncio.get_running_loop().time() - started
+        logger.info(f"Refreshed materialized view: {view_name}")
+        return True
     
     async def get_view_data(self, view_name: str, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Get data from materialized view"""
         async with self.db.get_session() as session:
             # Validate view_name against allowed list to prevent SQL injection
-            allowed_views = ['task_summary', 'agent_summary', 'performance_metrics']  # Add all valid view names
+            allowed_views = ['task_summary', 'agent_summary', 'performance_metrics', *self.refresh_intervals]
             if view_name not in allowed_views:
                 raise ValueError(f"Invalid view name: {view_name}")
             
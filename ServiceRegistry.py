@@ -127,7 +127,15 @@ class ProjectManagementService(MicroService):
             session.add(project)
             await session.commit()
             await session.refresh(project)
-            return project.to_dict()
+            project_dict = project.to_dict()
+        
+        analytics_events.publish({
+            "type": "project_created",
+            "project_id": project_dict["id"],
+            "status": project_dict.get("status") or "active",
+            "timestamp": project_dict.get("created_at")
+        })
+        return project_dict
     
     async def get_project(self, project_id: str, user_id: str) -> Dict[str, Any]:
         """Get project details"""
@@ -177,16 +185,32 @@ class TaskOrchestrationService(MicroService):
         }
         
         await self.task_queue.put(task)
+        analytics_events.publish({
+            "type": "task_created",
+            "task_id": task_id,
+            "project_id": task_data.get("project_id"),
+            "team_id": task_data.get("team_id"),
+            "user_id": task_data.get("assigned_to"),
+            "timestamp": task["created_at"]
+        })
         return task
     
     async def process_task(self, task: Dict[str, Any]):
         """Process a task"""
         # Task processing logic would go here
+        started = time.monotonic()
         await asyncio.sleep(random.uniform(0.1, 1.0))  # Simulate work
         
         # Update task status
         task["status"] = "completed"
         task["completed_at"] = datetime.utcnow().isoformat()
+        analytics_events.publish({
+            "type": "task_updated",
+            "task_id": task["id"],
+            "status": "completed",
+            "execution_time": time.monotonic() - started,
+            "timestamp": task["completed_at"]
+        })
 
 # File Management Service
 class FileManagementService(MicroService):
@@ -319,6 +343,7 @@ class AuditService(MicroService):
             session.add(audit_log)
             await session.commit()
         
+        analytics_events.publish({"type": "user_activity", "user_id": user_id, "timestamp": audit_log.timestamp})
         return event_id
     
     async def query_events(self, filters: Dict[str, Any] = None, 
@@ -0,0 +1,422 @@
+"""
+Append-Only Activity Journal
+============================
+Write-ahead buffer between ``AgentCodeOfConduct.log_activity`` and the database.
+
+Records are appended to numbered segment files (``<first seq>.seg``, one JSON
+line ``[seq, record]`` per record) by a single writer task. Appends made while
+a write + fsync is in progress are committed together in the next group, so one
+fsync covers many records (group commit) and the event loop never blocks on
+disk I/O.
+
+Durable records are drained to a sink (a bulk database insert) in batches.
+Recent records are kept in a bounded in-memory ring so the drain does not have
+to read them back; anything that no longer fits (e.g. during a database outage)
+is read from the segments instead, so memory stays bounded while the backlog
+lives on disk. The last drained sequence number is checkpointed and segments
+wholly below it are deleted. On startup a torn final line is truncated and
+everything after the checkpoint is drained again, so a crash can re-deliver a
+batch but never lose a committed record: the sink must be idempotent.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from itertools import islice
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_SUFFIX = ".seg"
+_CHECKPOINT_FILE = "checkpoint.json"
+
+if HAS_ORJSON:
+    def _encode_line(item: Any) -> bytes:
+        return orjson.dumps(item, default=str, option=orjson.OPT_APPEND_NEWLINE)
+
+    _decode_line = orjson.loads
+else:
+    _encoder = json.JSONEncoder(separators=(",", ":"), default=str)
+
+    def _encode_line(item: Any) -> bytes:
+        return _encoder.encode(item).encode() + b"\n"
+
+    _decode_line = json.loads
+
+
+class ActivityJournal:
+    """
+    Group-commit write-ahead journal with a bounded drain ring
+
+    Usage:
+        journal = ActivityJournal("data/activity_journal", sink=write_rows)
+        await journal.wait_writable()
+        seq = journal.append({"id": ..., ...})
+        await journal.commit(seq)          # durable on disk
+        asyncio.create_task(journal.run_drainer())
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sink: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        ring_capacity: int = 100000,
+        max_unwritten: int = 100000,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        drain_batch_size: int = 5000,
+        fsync: bool = True
+    ):
+        self.directory = directory
+        self.sink = sink
+        self.ring_capacity = ring_capacity
+        self.max_unwritten = max_unwritten
+        self.segment_max_bytes = segment_max_bytes
+        self.drain_batch_size = drain_batch_size
+        self.fsync = fsync
+
+        # Sequence numbers: appended >= durable >= drained
+        self.last_seq = 0
+        self.durable_seq = 0
+        self.drained_seq = 0
+        self.last_record: Optional[Dict[str, Any]] = None
+
+        self._unwritten: List[Tuple[int, Dict[str, Any]]] = []
+        self._ring: Deque[Tuple[int, Dict[str, Any]]] = deque()
+        self._commit_waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+        self._writer_task: Optional[asyncio.Task] = None
+        self._write_event: Optional[asyncio.Event] = None
+        self._drain_event: Optional[asyncio.Event] = None
+        self._drain_lock: Optional[asyncio.Lock] = None
+
+        # Segment state (touched only by the writer thread after recovery)
+        self._segment_fd: Optional[int] = None
+        self._segment_size = 0
+        self._read_cursor: Optional[Tuple[str, int, int]] = None  # (path, offset, next seq)
+
+        self.stats = {
+            "appended": 0,
+            "group_commits": 0,
+            "drained": 0,
+            "drain_batches": 0,
+            "disk_reads": 0,
+            "drain_failures": 0,
+            "ring_overflow": 0
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    # ------------------------------------------------------------------ recovery
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        """(first seq, path) of every segment, oldest first"""
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SEGMENT_SUFFIX):
+                try:
+                    first_seq = int(name[:-len(_SEGMENT_SUFFIX)])
+                except ValueError:
+                    continue
+                segments.append((first_seq, os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _recover(self):
+        """Load the checkpoint and find the last committed record"""
+        checkpoint_path = os.path.join(self.directory, _CHECKPOINT_FILE)
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                self.drained_seq = json.load(f)["drained_seq"]
+
+        segments = self._segments()
+        if segments:
+            first_seq, path = segments[-1]
+            good_offset = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        seq, record = _decode_line(line)
+                    except ValueError:
+                        break
+                    good_offset += len(line)
+                    self.last_seq, self.last_record = seq, record
+
+            # Drop a torn tail left by a crash mid-write
+            if good_offset < os.path.getsize(path):
+                logger.warning(f"Truncating torn activity journal tail in {path}")
+                with open(path, "r+b") as f:
+                    f.truncate(good_offset)
+
+            if not self.last_seq:
+                self.last_seq = first_seq - 1
+            self._segment_fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+            self._segment_size = good_offset
+
+        self.last_seq = max(self.last_seq, self.drained_seq)
+        self.durable_seq = self.last_seq
+        if self.last_seq > self.drained_seq:
+            logger.info(f"Activity journal recovered {self.last_seq - self.drained_seq} undrained records")
+
+    # ----------------------------------------------------------------- appending
+
+    def _ensure_tasks(self):
+        if self._writer_task is None or self._writer_task.done():
+            self._write_event = self._write_event or asyncio.Event()
+            self._drain_event = self._drain_event or asyncio.Event()
+            self._drain_lock = self._drain_lock or asyncio.Lock()
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def wait_writable(self):
+        """Backpressure: wait while a stalled disk has max_unwritten records queued"""
+        while len(self._unwritten) >= self.max_unwritten:
+            await self.commit(self.last_seq)
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Queue a JSON-serialisable record for the next group commit; returns its sequence number"""
+        self._ensure_tasks()
+        self.last_seq += 1
+        seq = self.last_seq
+        self._unwritten.append((seq, record))
+        self.last_record = record
+        if len(self._ring) < self.ring_capacity:
+            self._ring.append((seq, record))
+        else:
+            self.stats["ring_overflow"] += 1
+        self.stats["appended"] += 1
+
+        self._write_event.set()
+        if seq - self.drained_seq >= self.drain_batch_size:
+            self._drain_event.set()
+        return seq
+
+    async def commit(self, seq: Optional[int] = None):
+        """Wait until every record up to ``seq`` (default: all appended) is on disk"""
+        seq = self.last_seq if seq is None else seq
+        if seq <= self.durable_seq:
+            return
+        self._ensure_tasks()
+        waiter = asyncio.get_running_loop().create_future()
+        self._commit_waiters.append((seq, waiter))
+        await waiter
+
+    async def _writer_loop(self):
+        while True:
+            await self._write_event.wait()
+            self._write_event.clear()
+
+            while self._unwritten:
+                group, self._unwritten = self._unwritten, []
+                try:
+                    await asyncio.to_thread(self._write_group, group)
+                except Exception as e:
+                    logger.error(f"Activity journal write failed: {e}", exc_info=True)
+                    self._unwritten[:0] = group
+                    self._fail_waiters(e)
+                    await asyncio.sleep(0.5)
+                    continue
+
+                self.durable_seq = group[-1][0]
+                self.stats["group_commits"] += 1
+                while self._commit_waiters and self._commit_waiters[0][0] <= self.durable_seq:
+                    _, waiter = self._commit_waiters.popleft()
+                    if not waiter.done():
+                        waiter.set_result(None)
+
+    def _fail_waiters(self, error: Exception):
+        while self._commit_waiters:
+            _, waiter = self._commit_waiters.popleft()
+            if not waiter.done():
+                waiter.set_exception(error)
+
+    def _write_group(self, group: List[Tuple[int, Dict[str, Any]]]):
+        """Encode, append and fsync one commit group (runs in a worker thread)"""
+        data = b"".join(map(_encode_line, group))
+
+        if self._segment_fd is None or (
+            self._segment_size and self._segment_size + len(data) > self.segment_max_bytes
+        ):
+            self._rotate(group[0][0])
+
+        view = memoryview(data)
+        while view:
+            written = os.write(self._segment_fd, view)
+            view = view[written:]
+        if self.fsync:
+            os.fsync(self._segment_fd)
+        self._segment_size += len(data)
+
+    def _rotate(self, first_seq: int):
+        if self._segment_fd is not None:
+            os.close(self._segment_fd)
+        path = os.path.join(self.directory, f"{first_seq:020d}{_SEGMENT_SUFFIX}")
+        self._segment_fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o640)
+        self._segment_size = 0
+        if self.fsync:
+            # Make the new directory entry durable too
+            dir_fd = os.open(self.directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    # ------------------------------------------------------------------ draining
+
+    def request_drain(self):
+        """Wake the drainer now instead of at its next interval"""
+        self._ensure_tasks()
+        self._drain_event.set()
+
+    async def drain(self) -> int:
+        """Deliver every durable, undrained record to the sink; returns the count"""
+        self._ensure_tasks()
+        drained = 0
+        async with self._drain_lock:
+            while self.drained_seq < self.durable_seq:
+                batch = await self._next_batch()
+                if not batch:
+                    break
+
+                await self.sink([record for _, record in batch])
+
+                last = batch[-1][0]
+                while self._ring and self._ring[0][0] <= last:
+                    self._ring.popleft()
+                self.drained_seq = last
+                drained += len(batch)
+                self.stats["drained"] += len(batch)
+                self.stats["drain_batches"] += 1
+                await asyncio.to_thread(self._checkpoint, last)
+        return drained
+
+    async def _next_batch(self) -> List[Tuple[int, Dict[str, Any]]]:
+        next_seq = self.drained_seq + 1
+        upper = self.durable_seq
+
+        # Fast path: the next records are still in the ring
+        if self._ring and self._ring[0][0] == next_seq:
+            batch = []
+            for seq, record in islice(self._ring, self.drain_batch_size):
+                if seq != next_seq + len(batch) or seq > upper:
+                    break
+                batch.append((seq, record))
+            return batch
+
+        # Records that overflowed the ring (or predate a restart) come from disk
+        if self._ring:
+            upper = min(upper, self._ring[0][0] - 1)
+        if next_seq > upper:
+            return []
+        self.stats["disk_reads"] += 1
+        return await asyncio.to_thread(self._read_segments, next_seq, upper)
+
+    def _read_segments(self, start: int, upper: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Read records ``start``..``upper`` (at most one batch) back from the segments"""
+        limit = min(upper, start + self.drain_batch_size - 1)
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+
+        if self._read_cursor and self._read_cursor[2] == start and os.path.exists(self._read_cursor[0]):
+            positions = [(self._read_cursor[0], self._read_cursor[1])]
+            later = [path for first_seq, path in self._segments() if first_seq > start]
+            positions.extend((path, 0) for path in later)
+        else:
+            segments = self._segments()
+            positions = [
+                (path, 0) for index, (first_seq, path) in enumerate(segments)
+                if index + 1 == len(segments) or segments[index + 1][0] > start
+            ]
+
+        for path, offset in positions:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    offset += len(line)
+                    seq, record = _decode_line(line)
+                    if seq < start:
+                        continue
+                    batch.append((seq, record))
+                    if seq >= limit:
+                        self._read_cursor = (path, offset, seq + 1)
+                        return batch
+        return batch
+
+    def _checkpoint(self, drained_seq: int):
+        """Persist the drain position and delete fully drained segments"""
+        path = os.path.join(self.directory, _CHECKPOINT_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"drained_seq": drained_seq, "updated_at": time.time()}, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        # A segment is done once the next one starts at or below the drain point
+        segments = self._segments()
+        for (_, segment_path), (next_first_seq, _) in zip(segments, segments[1:]):
+            if next_first_seq - 1 <= drained_seq:
+                os.remove(segment_path)
+
+    async def run_drainer(self, interval: float = 1.0, max_backoff: float = 30.0):
+        """Drain continuously: every ``interval`` or as soon as a batch is ready"""
+        self._ensure_tasks()
+        backoff = interval
+        while True:
+            try:
+                await asyncio.wait_for(self._drain_event.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+            self._drain_event.clear()
+
+            try:
+                await self.drain()
+                backoff = interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The backlog stays on disk; retry with backoff
+                self.stats["drain_failures"] += 1
+                backoff = min(max_backoff, backoff * 2)
+                logger.error(f"Activity journal drain failed (retry in {backoff:.0f}s): {e}")
+
+    async def flush(self) -> int:
+        """Commit everything appended so far and drain it"""
+        await self.commit()
+        return await self.drain()
+
+    async def close(self):
+        """Commit pending records and stop the writer (undrained records stay on disk)"""
+        await self.commit()
+        if self._writer_task:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        if self._segment_fd is not None:
+            os.close(self._segment_fd)
+            self._segment_fd = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Sequence positions, backlog and commit/drain counters"""
+        commits = self.stats["group_commits"]
+        return {
+            **self.stats,
+            "last_seq": self.last_seq,
+            "durable_seq": self.durable_seq,
+            "drained_seq": self.drained_seq,
+            "backlog": self.last_seq - self.drained_seq,
+            "ring_size": len(self._ring),
+            "avg_group_size": self.stats["appended"] / commits if commits else 0.0,
+            "segments": len(self._segments())
+        }
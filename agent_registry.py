@@ -11,6 +11,11 @@ from dataclasses import dataclass, field, asdict
 from enum import Enum
 import structlog
 
+try:
+    from .capability_index import CapabilityIndex
+except ImportError:
+    from capability_index import CapabilityIndex
+
 logger = structlog.get_logger(__name__)
 
 
@@ -73,6 +78,21 @@ class AgentRecord:
     def is_available(self) -> bool:
         """Check if agent is available for work"""
         return self.is_healthy and self.current_load < self.max_load
+    
+    @property
+    def routing_rank(self) -> tuple:
+        """Routing order: least loaded first, then healthiest"""
+        return (self.current_load / self.max_load if self.max_load else 1.0, -self.health_score)
+    
+    @property
+    def accepts_work(self) -> bool:
+        """is_available without the heartbeat age, which changes with time alone"""
+        return (
+            self.status == AgentStatus.ACTIVE and
+            self.health_score >= 0.5 and
+            self.consecutive_failures < 3 and
+            self.current_load < self.max_load
+        )
 
 
 class AgentRegistry:
@@ -83,8 +103,8 @@ class AgentRegistry:
     - Agent registration and deregistration
     - Health tracking and monitoring
     - Version management
-    - Capability-based discovery
-    - Load-aware agent selection
+    - Capability-based discovery (bitset index, multi-capability queries)
+    - Load-aware agent selection (per-capability ranked heaps)
     - Automatic cleanup of dead agents
     """
     
@@ -103,6 +123,10 @@ class AgentRegistry:
         self._agents_by_type: Dict[str, Set[str]] = {}
         self._agents_by_capability: Dict[str, Set[str]] = {}
         
+        # Dense agent IDs, capability bitsets and per-capability heaps of
+        # available agents ranked by load and health
+        self._index = CapabilityIndex()
+        
         # Locks
         self._lock = asyncio.Lock()
         
@@ -183,6 +207,8 @@ class AgentRegistry:
                     self._agents_by_capability[capability] = set()
                 self._agents_by_capability[capability].add(agent_id)
             
+            self._index.add(agent_id, capabilities, record.routing_rank, record.accepts_work)
+            
             logger.info(
                 f"Agent registered",
                 agent_id=agent_id,
@@ -209,6 +235,7 @@ class AgentRegistry:
             
             # Remove from registry
             del self._agents[agent_id]
+            self._index.remove(agent_id)
             
             logger.info(f"Agent deregistered", agent_id=agent_id)
             return True
@@ -230,6 +257,7 @@ class AgentRegistry:
         record.last_heartbeat = time.time()
         record.status = AgentStatus.ACTIVE
         record.consecutive_failures = 0
+        self._reindex(record)
         
         logger.debug(f"Agent updated", agent_id=agent_id)
         return record
@@ -264,6 +292,7 @@ class AgentRegistry:
                 record.consecutive_failures = 0
                 logger.info(f"Agent recovered", agent_id=agent_id)
             
+            self._reindex(record)
             return True
     
     async def update_health(
@@ -293,6 +322,7 @@ class AgentRegistry:
                         new_status=status.value
                     )
             
+            self._reindex(record)
             return True
     
     async def record_failure(self, agent_id: str):
@@ -311,6 +341,8 @@ class AgentRegistry:
             elif record.consecutive_failures >= 2:
                 record.status = AgentStatus.DEGRADED
                 logger.warning(f"Agent degraded", agent_id=agent_id)
+            
+            self._reindex(record)
     
     # =========================================================================
     # DISCOVERY
@@ -340,14 +372,31 @@ class AgentRegistry:
         only_available: bool = True
     ) -> List[AgentRecord]:
         """Get all agents with a specific capability"""
-        agent_ids = self._agents_by_capability.get(capability, set())
-        agents = [self._agents[aid] for aid in agent_ids if aid in self._agents]
+        if only_available:
+            # Already in load order; only the heartbeat age is left to check
+            agents = (self._agents[aid] for aid in self._index.ranked(capability))
+            return [a for a in agents if a.is_available]
+        
+        agents = [self._agents[aid] for aid in self._index.agents_with([capability], eligible_only=False)]
+        
+        # Sort by load (least loaded first)
+        agents.sort(key=lambda a: a.routing_rank)
+        
+        return agents
+    
+    async def get_agents_with_capabilities(
+        self,
+        capabilities: List[str],
+        only_available: bool = True
+    ) -> List[AgentRecord]:
+        """Get agents offering every one of ``capabilities``, least loaded first"""
+        agent_ids = self._index.agents_with(capabilities, eligible_only=only_available)
+        agents = [self._agents[aid] for aid in agent_ids]
         
         if only_available:
             agents = [a for a in agents if a.is_available]
         
-        # Sort by load (least loaded first)
-        agents.sort(key=lambda a: (a.current_load / a.max_load, -a.health_score))
+        agents.sort(key=lambda a: a.routing_rank)
         
         return agents
     
@@ -369,36 +418,63 @@ class AgentRegistry:
         exclude_agents: Optional[Set[str]] = None
     ) -> Optional[AgentRecord]:
         """Find best available agent for a capability"""
-        agents = await self.get_agents_by_capability(capability, only_available=True)
+        return self.best_agent([capability], exclude_agents)
+    
+    def best_agent(
+        self,
+        capabilities: List[str],
+        exclude_agents: Optional[Set[str]] = None
+    ) -> Optional[AgentRecord]:
+        """
+        Least-loaded available agent offering every one of ``capabilities``.
+        Read off the top of the first capability's heap, so O(log n) unless
+        many top-ranked agents are excluded or have missed heartbeats.
+        """
+        if not capabilities:
+            return None
         
-        if exclude_agents:
-            agents = [a for a in agents if a.agent_id not in exclude_agents]
+        def accept(agent_id: str) -> bool:
+            return (not exclude_agents or agent_id not in exclude_agents) and self._agents[agent_id].is_available
         
-        return agents[0] if agents else None
+        agent_id = self._index.best(capabilities[0], capabilities[1:], accept)
+        return self._agents[agent_id] if agent_id else None
     
     # =========================================================================
     # LOAD MANAGEMENT
     # =========================================================================
     
+    # Load counters are per agent and updated without awaiting, so they are
+    # atomic on the event loop and do not take the registry-wide lock.
+    
     async def increment_load(self, agent_id: str) -> bool:
         """Increment agent load"""
-        async with self._lock:
-            if agent_id not in self._agents:
-                return False
-            
-            record = self._agents[agent_id]
-            record.current_load += 1
-            return True
+        record = self._agents.get(agent_id)
+        if record is None:
+            return False
+        
+        return self.set_load(agent_id, record.current_load + 1)
     
     async def decrement_load(self, agent_id: str) -> bool:
         """Decrement agent load"""
-        async with self._lock:
-            if agent_id not in self._agents:
-                return False
-            
-            record = self._agents[agent_id]
-            record.current_load = max(0, record.current_load - 1)
-            return True
+        record = self._agents.get(agent_id)
+        if record is None:
+            return False
+        
+        return self.set_load(agent_id, max(0, record.current_load - 1))
+    
+    def set_load(self, agent_id: str, load: int) -> bool:
+        """Set agent load and re-rank it (synchronous, for dispatchers)"""
+        record = self._agents.get(agent_id)
+        if record is None:
+            return False
+        
+        record.current_load = load
+        self._reindex(record)
+        return True
+    
+    def _reindex(self, record: AgentRecord):
+        """Reposition an agent in the capability heaps after a load/health change"""
+        self._index.update(record.agent_id, record.routing_rank, record.accepts_work)
     
     # =========================================================================
     # STATISTICS
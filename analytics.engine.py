@@ -16,6 +16,8 @@ from sklearn.metrics import silhouette_score
 import warnings
 warnings.filterwarnings('ignore')
 
+from analytics_serving import AnalyticsAggregates, VersionedResultCache, analytics_events
+
 logger = logging.getLogger(__name__)
 
 class AdvancedAnalyticsEngine:
@@ -409,40 +411,102 @@ class AdvancedAnalyticsEngine:
 class RealTimeAnalyticsDashboard:
     """Real-time analytics dashboard for business intelligence"""
     
-    def __init__(self):
+    def __init__(self, aggregates: Optional[AnalyticsAggregates] = None, max_age: float = 300, grace: float = 5):
         self.analytics_engine = AdvancedAnalyticsEngine()
         self.data_visualization = DataVisualization()
         self.cache = CacheManager()
+        # Overview, project and team metrics are maintained from task/project
+        # events; whole results are cached per timeframe until the data changes
+        # (recomputed at most every ``grace`` seconds while events keep coming)
+        self.aggregates = aggregates or AnalyticsAggregates()
+        self.results = VersionedResultCache(lambda: self.aggregates.version, max_age=max_age, grace=grace)
+        self._event_backlog: Optional[List[Dict[str, Any]]] = None
+        self._prune_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Subscribe to write-path events, bootstrap from the database and schedule pruning"""
+        # Events published while the snapshot loads are replayed on top of it
+        self._event_backlog = []
+        analytics_events.subscribe(self._on_events)
+        try:
+            await self.bootstrap_aggregates()
+        except Exception as e:
+            # Serve from database queries; incremental events are useless without a base
+            logger.error(f"Bootstrapping dashboard aggregates failed, using live queries: {e}")
+            analytics_events.unsubscribe(self._on_events)
+            self._event_backlog = None
+            return
+        backlog, self._event_backlog = self._event_backlog, None
+        self.apply_events(backlog)
+        self._prune_task = asyncio.create_task(self._prune_periodically())
+    
+    async def stop(self):
+        analytics_events.unsubscribe(self._on_events)
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+            await asyncio.gather(self._prune_task, return_exceptions=True)
+            self._prune_task = None
+    
+    def _on_events(self, events: List[Dict[str, Any]]):
+        if self._event_backlog is not None:
+            self._event_backlog.extend(events)
+        else:
+            self.apply_events(events)
+    
+    async def _prune_periodically(self):
+        """Expire buckets (and the tasks only they referenced) as they leave the retention window"""
+        while True:
+            await asyncio.sleep(self.aggregates.bucket_seconds)
+            dropped = self.aggregates.prune()
+            if dropped:
+                logger.info(f"Pruned {dropped} expired analytics buckets")
     
     async def get_dashboard_data(self, timeframe: str = "7d") -> Dict[str, Any]:
         """Get comprehensive dashboard data"""
-        cache_key = f"dashboard:{timeframe}"
-        cached_data = await self.cache.get(cache_key)
-        
-        if cached_data:
-            return cached_data
+        return await self.results.get_or_compute(
+            f"dashboard:{timeframe}", lambda: self._compute_dashboard_data(timeframe)
+        )
+    
+    def apply_events(self, events: List[Dict[str, Any]]) -> int:
+        """Feed task/project events (see AnalyticsAggregates) into the dashboard aggregates"""
+        return self.aggregates.apply_many(events)
+    
+    async def bootstrap_aggregates(self):
+        """Load the aggregates from the database once, before events take over"""
+        since = datetime.utcnow() - self.aggregates.retention
+        async with self.analytics_engine.db.get_session() as session:
+            tasks = await session.execute(select(TaskRecord).where(TaskRecord.created_at >= since))
+            projects = await session.execute(select(ProjectRecord))
+            self.aggregates.rebuild(
+                [task.to_dict() for task in tasks.scalars().all()],
+                [project.to_dict() for project in projects.scalars().all()]
+            )
+    
+    async def _compute_dashboard_data(self, timeframe: str) -> Dict[str, Any]:
+        """Calculate various dashboard metrics, independent sections concurrently"""
+        sections = {
+            "overview_metrics": self._get_overview_metrics(timeframe),
+            "project_analytics": self._get_project_analytics(timeframe),
+            "team_analytics": self._get_team_analytics(timeframe),
+            "financial_analytics": self._get_financial_analytics(timeframe),
+            "risk_analytics": self._get_risk_analytics(timeframe),
+            "trend_analysis": self._get_trend_analysis(timeframe),
+            "top_performers": self._get_top_performers(timeframe),
+            "alerts_and_insights": self._get_alerts_and_insights()
+        }
+        results = await asyncio.gather(*sections.values())
         
-        # Calculate various dashboard metrics
-        dashboard_data = {
+        return {
             "timestamp": datetime.utcnow().isoformat(),
             "timeframe": timeframe,
-            "overview_metrics": await self._get_overview_metrics(timeframe),
-            "project_analytics": await self._get_project_analytics(timeframe),
-            "team_analytics": await self._get_team_analytics(timeframe),
-            "financial_analytics": await self._get_financial_analytics(timeframe),
-            "risk_analytics": await self._get_risk_analytics(timeframe),
-            "trend_analysis": await self._get_trend_analysis(timeframe),
-            "top_performers": await self._get_top_performers(timeframe),
-            "alerts_and_insights": await self._get_alerts_and_insights()
+            **dict(zip(sections, results))
         }
-        
-        # Cache for 5 minutes for real-time dashboards
-        await self.cache.set(cache_key, dashboard_data, expire=300)
-        
-        return dashboard_data
     
     async def _get_overview_metrics(self, timeframe: str) -> Dict[str, Any]:
         """Get overview metrics for dashboard"""
+        if self.aggregates.bootstrapped:
+            return self.aggregates.overview(timeframe)
+        
         return {
             "total_projects": await self._count_projects(timeframe),
             "active_projects": await self._count_active_projects(),
@@ -456,6 +520,14 @@ class RealTimeAnalyticsDashboard:
     
     async def _get_project_analytics(self, timeframe: str) -> Dict[str, Any]:
         """Get project analytics"""
+        if self.aggregates.bootstrapped:
+            return {
+                **self.aggregates.project_analytics(timeframe),
+                "project_timeline_analysis": await self._analyze_project_timelines(timeframe),
+                "project_budget_analysis": await self._analyze_project_budgets(timeframe),
+                "project_risk_distribution": await self._get_project_risk_distribution()
+            }
+        
         return {
             "project_status_distribution": await self._get_project_status_distribution(),
             "project_completion_rates": await self._get_project_completion_rates(timeframe),
@@ -466,6 +538,14 @@ class RealTimeAnalyticsDashboard:
     
     async def _get_team_analytics(self, timeframe: str) -> Dict[str, Any]:
         """Get team analytics"""
+        if self.aggregates.bootstrapped:
+            return {
+                **self.aggregates.team_analytics(timeframe),
+                "team_capacity_utilization": await self._analyze_team_capacity(timeframe),
+                "team_skill_distribution": await self._analyze_team_skills(),
+                "team_collaboration_metrics": await self._analyze_team_collaboration(timeframe)
+            }
+        
         return {
             "team_performance_comparison": await self._compare_team_performance(timeframe),
             "team_capacity_utilization": await self._analyze_team_capacity(timeframe),
@@ -473,6 +553,19 @@ class RealTimeAnalyticsDashboard:
             "team_collaboration_metrics": await self._analyze_team_collaboration(timeframe)
         }
 
+_shared_dashboard: Optional[RealTimeAnalyticsDashboard] = None
+_shared_dashboard_lock = asyncio.Lock()
+
+async def get_shared_dashboard() -> RealTimeAnalyticsDashboard:
+    """Process-wide dashboard, started on first use so its aggregates and result cache persist across requests"""
+    global _shared_dashboard
+    async with _shared_dashboard_lock:
+        if _shared_dashboard is None:
+            dashboard = RealTimeAnalyticsDashboard()
+            await dashboard.start()
+            _shared_dashboard = dashboard
+    return _shared_dashboard
+
 # Predictive analytics for forecasting
 class PredictiveAnalytics:
     """Predictive analytics for forecasting and trend prediction"""
@@ -0,0 +1,553 @@
+"""
+Analytics Serving Layer
+=======================
+Keeps dashboard aggregates up to date from task and project events instead of
+recomputing them from the database on every request.
+
+- ``AnalyticsAggregates`` folds each event into hourly buckets as a delta
+  (a task completing adds one to its completion bucket, a task being reopened
+  takes it away again), so a timeframe query sums a few hundred small buckets
+  rather than scanning tasks. Every applied batch bumps ``version``.
+- ``VersionedResultCache`` caches computed results per key (e.g. per
+  timeframe) together with the data version they were computed from. A result
+  is served until the version moves on or it reaches ``max_age``; under a
+  steady stream of events ``grace`` bounds how often it is recomputed.
+  Concurrent requests for the same key and version share one computation.
+- ``analytics_events`` carries events from the write path (services creating
+  and updating tasks, projects and audit entries) to whoever subscribed, such
+  as the dashboard's aggregates and the materialized view refresher.
+
+    aggregates = AnalyticsAggregates()
+    aggregates.apply({"type": "task_created", "task_id": "t1", "project_id": "p1",
+                      "team_id": "core", "timestamp": datetime.utcnow()})
+    cache = VersionedResultCache(lambda: aggregates.version, max_age=300)
+    overview = await cache.get_or_compute("overview:7d", lambda: build_overview("7d"))
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPLETED = "completed"
+ACTIVE_PROJECT_STATUSES = frozenset({"active", "in_progress", "planning"})
+
+_TIMEFRAME = re.compile(r"^\s*(\d+)\s*([mhdw])\s*$")
+_TIMEFRAME_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_timeframe(timeframe: str) -> timedelta:
+    """``"30m"``, ``"24h"``, ``"7d"``, ``"4w"`` -> timedelta"""
+    match = _TIMEFRAME.match(timeframe)
+    if not match:
+        raise ValueError(f"Invalid timeframe: {timeframe!r}")
+    return timedelta(seconds=int(match.group(1)) * _TIMEFRAME_UNITS[match.group(2)])
+
+
+def _timestamp(value: Any) -> float:
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return float(value)
+
+
+# ============================================================================
+# INCREMENTAL AGGREGATES
+# ============================================================================
+
+@dataclass
+class _Bucket:
+    """Deltas that landed in one time bucket"""
+    tasks_created: int = 0
+    tasks_completed: int = 0
+    projects_created: int = 0
+    projects_completed: int = 0
+    execution_time_total: float = 0.0
+    execution_time_count: int = 0
+    # {project_id: [created, completed]}, {team_id: [created, completed]}
+    projects: Dict[str, List[int]] = field(default_factory=dict)
+    teams: Dict[str, List[int]] = field(default_factory=dict)
+    active_users: Set[str] = field(default_factory=set)
+
+
+@dataclass
+class _TaskState:
+    project_id: Optional[str]
+    team_id: Optional[str]
+    status: str
+    created_bucket: int
+    completed_bucket: Optional[int] = None
+    execution_time: Optional[float] = None
+
+
+@dataclass
+class _ProjectState:
+    status: str
+    created_bucket: int
+    completed_bucket: Optional[int] = None
+
+
+class AnalyticsAggregates:
+    """
+    Dashboard aggregates maintained from events
+
+    Event types (all take an optional ``timestamp``):
+        task_created    task_id, project_id, team_id, status, user_id
+        task_updated    task_id, status, user_id, execution_time
+        task_deleted    task_id
+        project_created project_id, status
+        project_updated project_id, status
+        project_deleted project_id
+        user_activity   user_id
+    """
+
+    def __init__(self, bucket_seconds: int = 3600, retention: timedelta = timedelta(days=90)):
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+        self.version = 0
+        self.bootstrapped = False
+
+        self._buckets: Dict[int, _Bucket] = {}
+        self._tasks: Dict[str, _TaskState] = {}
+        self._projects: Dict[str, _ProjectState] = {}
+        self._task_status: Dict[str, int] = {}
+        self._project_status: Dict[str, int] = {}
+        self._teams: Dict[str, int] = {}
+
+        self.stats = {"events": 0, "ignored": 0, "batches": 0}
+
+    def _bucket(self, index: int) -> _Bucket:
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            bucket = self._buckets[index] = _Bucket()
+        return bucket
+
+    def _index(self, event: Mapping[str, Any]) -> int:
+        return int(_timestamp(event.get("timestamp")) // self.bucket_seconds)
+
+    # =========================================================================
+    # EVENTS
+    # =========================================================================
+
+    def apply(self, event: Mapping[str, Any]) -> bool:
+        """Fold one event in; returns False for events that change nothing"""
+        changed = self._apply(event)
+        if changed:
+            self.version += 1
+        return changed
+
+    def apply_many(self, events: Iterable[Mapping[str, Any]]) -> int:
+        """Fold a batch of events in under a single version bump"""
+        applied = sum(1 for event in events if self._apply(event))
+        if applied:
+            self.version += 1
+        self.stats["batches"] += 1
+        return applied
+
+    def rebuild(self, tasks: Iterable[Mapping[str, Any]], projects: Iterable[Mapping[str, Any]]):
+        """Reset from a database snapshot (rows as produced by ``to_dict()``)"""
+        self._buckets.clear()
+        self._tasks.clear()
+        self._projects.clear()
+        self._task_status.clear()
+        self._project_status.clear()
+        self._teams.clear()
+
+        for project in projects:
+            status = project.get("status") or "active"
+            self._apply({"type": "project_created", "project_id": project["id"],
+                         "status": "active" if status == COMPLETED else status,
+                         "timestamp": project.get("created_at")})
+            if status == COMPLETED:
+                self._apply({"type": "project_updated", "project_id": project["id"], "status": COMPLETED,
+                             "timestamp": project.get("completed_at") or project.get("updated_at")})
+        for task in tasks:
+            self._apply({"type": "task_created", "task_id": task["id"], "project_id": task.get("project_id"),
+                         "team_id": task.get("team_id"), "status": "pending", "user_id": task.get("assigned_to"),
+                         "timestamp": task.get("created_at")})
+            if task.get("status") and task["status"] != "pending":
+                self._apply({"type": "task_updated", "task_id": task["id"], "status": task["status"],
+                             "execution_time": task.get("execution_time"),
+                             "timestamp": task.get("completed_at") or task.get("updated_at")})
+        self._prune(time.time())
+        self.bootstrapped = True
+        self.version += 1
+
+    def _apply(self, event: Mapping[str, Any]) -> bool:
+        handler = self._HANDLERS.get(event.get("type"))
+        if handler is None:
+            self.stats["ignored"] += 1
+            return False
+        self.stats["events"] += 1
+        return handler(self, event)
+
+    def _task_created(self, event: Mapping[str, Any]) -> bool:
+        task_id = event["task_id"]
+        if task_id in self._tasks:
+            return self._task_updated(event)
+        index = self._index(event)
+        task = self._tasks[task_id] = _TaskState(event.get("project_id"), event.get("team_id"),
+                                                 event.get("status", "pending"), index)
+        bucket = self._bucket(index)
+        bucket.tasks_created += 1
+        self._count_group(bucket, task, 0, 1)
+        self._count(self._task_status, task.status, 1)
+        if task.team_id:
+            self._count(self._teams, task.team_id, 1)
+        if event.get("user_id"):
+            bucket.active_users.add(event["user_id"])
+        if task.status == COMPLETED:
+            self._complete_task(task, index, event.get("execution_time"))
+        return True
+
+    def _task_updated(self, event: Mapping[str, Any]) -> bool:
+        task = self._tasks.get(event["task_id"])
+        if task is None:
+            self.stats["ignored"] += 1
+            return False
+        index = self._index(event)
+        if event.get("user_id"):
+            self._bucket(index).active_users.add(event["user_id"])
+        status = event.get("status", task.status)
+        if status == task.status:
+            return bool(event.get("user_id"))
+
+        self._count(self._task_status, task.status, -1)
+        self._count(self._task_status, status, 1)
+        if task.status == COMPLETED:
+            self._uncomplete_task(task)
+        task.status = status
+        if status == COMPLETED:
+            self._complete_task(task, index, event.get("execution_time"))
+        return True
+
+    def _task_deleted(self, event: Mapping[str, Any]) -> bool:
+        task = self._tasks.pop(event["task_id"], None)
+        if task is None:
+            return False
+        if task.status == COMPLETED:
+            self._uncomplete_task(task)
+        bucket = self._buckets.get(task.created_bucket)
+        if bucket is not None:
+            bucket.tasks_created -= 1
+            self._count_group(bucket, task, 0, -1)
+        self._count(self._task_status, task.status, -1)
+        if task.team_id:
+            self._count(self._teams, task.team_id, -1)
+        return True
+
+    def _complete_task(self, task: _TaskState, index: int, execution_time: Optional[float]):
+        bucket = self._bucket(index)
+        bucket.tasks_completed += 1
+        self._count_group(bucket, task, 1, 1)
+        task.completed_bucket = index
+        if execution_time is not None:
+            task.execution_time = float(execution_time)
+            bucket.execution_time_total += task.execution_time
+            bucket.execution_time_count += 1
+
+    def _uncomplete_task(self, task: _TaskState):
+        bucket = self._buckets.get(task.completed_bucket)
+        if bucket is not None:
+            bucket.tasks_completed -= 1
+            self._count_group(bucket, task, 1, -1)
+            if task.execution_time is not None:
+                bucket.execution_time_total -= task.execution_time
+                bucket.execution_time_count -= 1
+        task.completed_bucket = None
+        task.execution_time = None
+
+    def _project_created(self, event: Mapping[str, Any]) -> bool:
+        project_id = event["project_id"]
+        if project_id in self._projects:
+            return self._project_updated(event)
+        index = self._index(event)
+        project = self._projects[project_id] = _ProjectState(event.get("status", "active"), index)
+        self._bucket(index).projects_created += 1
+        self._count(self._project_status, project.status, 1)
+        if project.status == COMPLETED:
+            project.completed_bucket = index
+            self._bucket(index).projects_completed += 1
+        return True
+
+    def _project_updated(self, event: Mapping[str, Any]) -> bool:
+        project = self._projects.get(event["project_id"])
+        status = event.get("status")
+        if project is None or status is None or status == project.status:
+            return False
+        self._count(self._project_status, project.status, -1)
+        self._count(self._project_status, status, 1)
+        if project.status == COMPLETED and project.completed_bucket in self._buckets:
+            self._buckets[project.completed_bucket].projects_completed -= 1
+            project.completed_bucket = None
+        if status == COMPLETED:
+            project.completed_bucket = self._index(event)
+            self._bucket(project.completed_bucket).projects_completed += 1
+        project.status = status
+        return True
+
+    def _project_deleted(self, event: Mapping[str, Any]) -> bool:
+        project = self._projects.pop(event["project_id"], None)
+        if project is None:
+            return False
+        self._count(self._project_status, project.status, -1)
+        if project.created_bucket in self._buckets:
+            self._buckets[project.created_bucket].projects_created -= 1
+        if project.completed_bucket in self._buckets:
+            self._buckets[project.completed_bucket].projects_completed -= 1
+        return True
+
+    def _user_activity(self, event: Mapping[str, Any]) -> bool:
+        user_id = event.get("user_id")
+        if not user_id:
+            return False
+        users = self._bucket(self._index(event)).active_users
+        if user_id in users:
+            return False
+        users.add(user_id)
+        return True
+
+    _HANDLERS: Dict[str, Callable[["AnalyticsAggregates", Mapping[str, Any]], bool]] = {
+        "task_created": _task_created,
+        "task_updated": _task_updated,
+        "task_deleted": _task_deleted,
+        "project_created": _project_created,
+        "project_updated": _project_updated,
+        "project_deleted": _project_deleted,
+        "user_activity": _user_activity,
+    }
+
+    @staticmethod
+    def _count(counts: Dict[str, int], key: str, delta: int):
+        value = counts.get(key, 0) + delta
+        if value:
+            counts[key] = value
+        else:
+            counts.pop(key, None)
+
+    @staticmethod
+    def _count_group(bucket: _Bucket, task: _TaskState, slot: int, delta: int):
+        for groups, key in ((bucket.projects, task.project_id), (bucket.teams, task.team_id)):
+            if key:
+                counts = groups.setdefault(key, [0, 0])
+                counts[slot] += delta
+                if counts == [0, 0]:
+                    del groups[key]
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Drop buckets older than the retention window, and the tasks and
+        completed projects that only touched such buckets (as if rebuilt from
+        rows inside the window); returns how many buckets were dropped
+        """
+        expired = self._prune(now or time.time())
+        if expired:
+            self.version += 1
+        return expired
+
+    def _prune(self, now: float) -> int:
+        oldest = int((now - self.retention.total_seconds()) // self.bucket_seconds)
+        expired = [index for index in self._buckets if index < oldest]
+        for index in expired:
+            del self._buckets[index]
+
+        def outside(created: int, completed: Optional[int]) -> bool:
+            return created < oldest and (completed is None or completed < oldest)
+
+        for task_id in [task_id for task_id, task in self._tasks.items()
+                        if outside(task.created_bucket, task.completed_bucket)]:
+            task = self._tasks.pop(task_id)
+            self._count(self._task_status, task.status, -1)
+            if task.team_id:
+                self._count(self._teams, task.team_id, -1)
+        for project_id in [project_id for project_id, project in self._projects.items()
+                           if project.status == COMPLETED and outside(project.created_bucket, project.completed_bucket)]:
+            self._count(self._project_status, self._projects.pop(project_id).status, -1)
+        return len(expired)
+
+    # =========================================================================
+    # QUERIES
+    # =========================================================================
+
+    def _window(self, timeframe: str, now: Optional[float]) -> List[_Bucket]:
+        start = int(((now or time.time()) - parse_timeframe(timeframe).total_seconds()) // self.bucket_seconds)
+        return [bucket for index, bucket in self._buckets.items() if index >= start]
+
+    def overview(self, timeframe: str, now: Optional[float] = None) -> Dict[str, Any]:
+        """Same keys as the dashboard's overview metrics"""
+        window = self._window(timeframe, now)
+        tasks = sum(b.tasks_created for b in window)
+        completed = sum(b.tasks_completed for b in window)
+        timed = sum(b.execution_time_count for b in window)
+        return {
+            "total_projects": sum(b.projects_created for b in window),
+            "active_projects": sum(self._project_status.get(s, 0) for s in ACTIVE_PROJECT_STATUSES),
+            "completed_projects": sum(b.projects_completed for b in window),
+            "total_tasks": tasks,
+            "completed_tasks": completed,
+            "active_users": len(set().union(*(b.active_users for b in window))),
+            "total_teams": len(self._teams),
+            "overall_productivity": completed / tasks if tasks else 0.0,
+            "avg_execution_time": sum(b.execution_time_total for b in window) / timed if timed else 0.0
+        }
+
+    def _group_totals(self, window: List[_Bucket], attribute: str) -> Dict[str, List[int]]:
+        totals: Dict[str, List[int]] = {}
+        for bucket in window:
+            for key, (created, completed) in getattr(bucket, attribute).items():
+                total = totals.setdefault(key, [0, 0])
+                total[0] += created
+                total[1] += completed
+        return totals
+
+    def project_analytics(self, timeframe: str, now: Optional[float] = None) -> Dict[str, Any]:
+        totals = self._group_totals(self._window(timeframe, now), "projects")
+        return {
+            "project_status_distribution": dict(self._project_status),
+            "project_completion_rates": {
+                project_id: completed / created if created else 0.0
+                for project_id, (created, completed) in totals.items()
+            },
+            "task_status_distribution": dict(self._task_status)
+        }
+
+    def team_analytics(self, timeframe: str, now: Optional[float] = None) -> Dict[str, Any]:
+        totals = self._group_totals(self._window(timeframe, now), "teams")
+        return {
+            "team_performance_comparison": {
+                team_id: {
+                    "tasks": created,
+                    "completed_tasks": completed,
+                    "completion_rate": completed / created if created else 0.0
+                }
+                for team_id, (created, completed) in totals.items()
+            }
+        }
+
+
+# ============================================================================
+# RESULT CACHE
+# ============================================================================
+
+@dataclass
+class _CachedResult:
+    value: Any
+    version: Any
+    computed_at: float
+
+
+class VersionedResultCache:
+    """
+    Results keyed by request, valid while the data version they were computed
+    from is current (and, optionally, for at most ``max_age`` seconds). A
+    result younger than ``grace`` seconds is served even if the version has
+    moved on.
+    """
+
+    def __init__(self, version: Callable[[], Any], max_age: Optional[float] = None, grace: float = 0.0,
+                 max_entries: int = 256):
+        self._version = version
+        self.max_age = max_age
+        self.grace = grace
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _CachedResult]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, Any], asyncio.Task] = {}
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "stale": 0, "errors": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Cached value for ``key`` if it is still valid, without computing"""
+        entry = self._entries.get(key)
+        if entry is None or not self._fresh(entry):
+            return None
+        return entry.value
+
+    def _fresh(self, entry: _CachedResult) -> bool:
+        age = time.monotonic() - entry.computed_at
+        if entry.version != self._version():
+            return age < self.grace
+        return self.max_age is None or age <= self.max_age
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            if self._fresh(entry):
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry.value
+            self.stats["stale"] += 1
+
+        version = self._version()
+        task = self._inflight.get((key, version))
+        if task is None:
+            self.stats["misses"] += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[(key, version)] = task
+            task.add_done_callback(lambda done: self._store(key, version, done))
+        else:
+            self.stats["coalesced"] += 1
+        # Shielded: one caller giving up must not cancel the shared computation
+        return await asyncio.shield(task)
+
+    def _store(self, key: str, version: Any, task: asyncio.Task):
+        self._inflight.pop((key, version), None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.stats["errors"] += 1
+            logger.error(f"Computing {key} failed: {task.exception()}")
+            return
+        # Stored under the version it started from, so data that changed while
+        # computing makes the next request recompute
+        self._entries[key] = _CachedResult(task.result(), version, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, prefix: str = ""):
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+
+# ============================================================================
+# WRITE-PATH EVENTS
+# ============================================================================
+
+class AnalyticsEvents:
+    """Fan-out of AnalyticsAggregates-style events from the write path to subscribers"""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[List[Dict[str, Any]]], Any]] = []
+
+    def subscribe(self, callback: Callable[[List[Dict[str, Any]]], Any]):
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[List[Dict[str, Any]]], Any]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, *events: Dict[str, Any]):
+        """Deliver events synchronously; a failing subscriber never fails the write"""
+        if not events:
+            return
+        batch = list(events)
+        for callback in list(self._subscribers):
+            try:
+                callback(batch)
+            except Exception as e:
+                logger.error(f"Analytics event subscriber {callback!r} failed: {e}")
+
+
+analytics_events = AnalyticsEvents()
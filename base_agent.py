@@ -12,6 +12,8 @@ from enum import Enum
 from datetime import datetime
 from contextlib import asynccontextmanager
 
+from message_codec import MessageCodec
+
 # Optional dependencies - NATS messaging
 # Optional dependencies - gracefully handle missing packages
 try:
@@ -125,6 +127,10 @@ class AgentConfig:
     agent_type: str = "generic"
     capabilities: List[str] = field(default_factory=list)
     log_level: str = "INFO"
+    # Wire format for published messages: json (understood by every agent), msgpack or cbor
+    wire_format: str = "json"
+    wire_compression: Optional[str] = None
+    codec_dictionary_path: Optional[str] = None
 
 
 @dataclass
@@ -200,6 +206,11 @@ class BaseAgent:
         self.redis: Optional[Any] = None
         self.db_pool: Optional[Any] = None
         self.consul_client = None
+
+        # Message encoding; replies follow what the requester advertises
+        self.codec = MessageCodec.from_config(
+            config.wire_format, config.wire_compression, config.codec_dictionary_path
+        )
         
         # Observability
         self._setup_observability()
@@ -516,7 +527,8 @@ class BaseAgent:
         self._subscriptions.append(sub)
         self.logger.info("Subscribed to NATS subject", subject=subject, queue_group=queue_group)
 
-    async def _publish(self, subject: str, data: bytes, reply_to: Optional[str] = None):
+    async def _publish(self, subject: str, data: bytes, reply_to: Optional[str] = None,
+                       headers: Optional[Dict[str, str]] = None):
         """Publish a message to NATS"""
         if not HAS_NATS or not self.nc:
             self.logger.warning("NATS not available, cannot publish")
@@ -525,9 +537,26 @@ class BaseAgent:
         async with self._trace_span(f"message_published_{subject}") as span:
             span.set_attribute("subject", subject)
             span.set_attribute("agent_id", self.id)
-            await self.nc.publish(subject, data, reply=reply_to)
+            await self.nc.publish(subject, data, reply=reply_to, headers=headers or None)
             self.logger.debug("Published message", subject=subject)
 
+    async def _publish_message(self, subject: str, message: Any, reply_to: Optional[str] = None) -> int:
+        """Encode a message with the agent's codec and publish it; returns the encoded size"""
+        data, headers = self.codec.encode(message)
+        await self._publish(subject, data, reply_to=reply_to, headers=headers)
+        return len(data)
+
+    async def _reply(self, msg, message: Any):
+        """Reply in the best format the requester advertised (plain JSON for legacy agents)"""
+        if not msg.reply:
+            return
+        data, headers = self.codec.for_peer(msg.headers).encode(message)
+        await self._publish(msg.reply, data, headers=headers)
+
+    def _decode_message(self, msg) -> Any:
+        """Decode an incoming NATS message in whatever format its headers declare"""
+        return self.codec.decode(msg.data, msg.headers)
+
     async def _publish_to_stream(self, stream_name: str, data: Dict[str, Any]):
         """Publish data to a NATS JetStream stream."""
         if not HAS_NATS or not self.nc:
@@ -539,7 +568,8 @@ class BaseAgent:
             span.set_attribute("agent_id", self.id)
             try:
                 js = self.nc.jetstream()
-                await js.publish(stream_name, json.dumps(data).encode())
+                encoded, headers = self.codec.encode(data)
+                await js.publish(stream_name, encoded, headers=headers or None)
                 self.logger.debug("Published to stream", stream_name=stream_name)
             except Exception as e:
                 self.logger.error("Failed to publish to stream", stream_name=stream_name, error=str(e), traceback=traceback.format_exc())
@@ -556,8 +586,9 @@ class BaseAgent:
             span.set_attribute("subject", subject)
             span.set_attribute("agent_id", self.id)
             try:
-                response = await self.nc.request(subject, data, timeout=timeout)
-                decoded_response = json.loads(response.data.decode())
+                response = await self.nc.request(subject, data, timeout=timeout,
+                                                 headers=self.codec.accept_headers())
+                decoded_response = self._decode_message(response)
                 self.logger.debug("NATS request successful", subject=subject)
                 return decoded_response
             except Exception as e:
@@ -788,7 +819,7 @@ class BaseAgent:
     async def _handle_task_request(self, msg):
         async with self._trace_span("handle_task_request") as span:
             task_start_time = time.time()
-            request_data = json.loads(msg.data.decode())
+            request_data = self._decode_message(msg)
             request = TaskRequest(**request_data)
             
             span.set_attribute("task.id", request.task_id)
@@ -806,7 +837,7 @@ class BaseAgent:
                     success=False,
                     error=error_msg
                 )
-                await self._publish(msg.reply, json.dumps(asdict(response)).encode())
+                await self._reply(msg, asdict(response))
                 return
 
             self.active_tasks += 1
@@ -850,7 +881,7 @@ class BaseAgent:
                 if msg.reply:
                     # Ensure task_response.execution_time_ms is set before sending
                     task_response.execution_time_ms = response_time
-                    await self._publish(msg.reply, json.dumps(asdict(task_response)).encode())
+                    await self._reply(msg, asdict(task_response))
                 
                 # Publish task completion to a stream for Orchestrator/MetricsAgent
                 await self._publish_to_stream("task.completed", asdict(task_response))
@@ -0,0 +1,290 @@
+"""
+Capability Index
+================
+Routing index for agent registries with thousands of agents.
+
+Every agent gets a dense integer ID, and every capability keeps a bitset
+(a Python int) of the agents that offer it. A multi-capability query is an
+AND of those bitsets, plus an ``eligible`` bitset for agents that may take
+work right now, so it costs a few big-integer operations instead of a scan
+over every agent.
+
+Each capability also keeps an indexed heap of its eligible agents, ordered by
+a caller-supplied rank (lower is better, e.g. ``(load_ratio, -health)``).
+Changing an agent's rank or eligibility repositions it in O(log n), so the
+best agent is read off the top of the heap instead of sorting per request.
+
+    index = CapabilityIndex()
+    index.add("agent-1", ["code_review", "python"])
+    index.update("agent-1", rank=(0.2, -0.9), eligible=True)
+    index.best("code_review")                         # "agent-1"
+    index.agents_with(["code_review", "python"])      # ["agent-1"]
+"""
+
+import heapq
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T", bound=Hashable)
+
+
+class IndexedHeap(Generic[T]):
+    """Binary min-heap with a position map, so keys can change in O(log n)"""
+
+    def __init__(self):
+        self._heap: List[Tuple[Any, T]] = []
+        self._positions: Dict[T, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, item: T) -> bool:
+        return item in self._positions
+
+    def set(self, item: T, key: Any):
+        """Insert ``item`` or move it to its new ``key``"""
+        position = self._positions.get(item)
+        if position is None:
+            self._heap.append((key, item))
+            self._positions[item] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+        else:
+            old_key = self._heap[position][0]
+            self._heap[position] = (key, item)
+            if key < old_key:
+                self._sift_up(position)
+            else:
+                self._sift_down(position)
+
+    def remove(self, item: T) -> bool:
+        position = self._positions.pop(item, None)
+        if position is None:
+            return False
+        last = self._heap.pop()
+        if position < len(self._heap):
+            self._heap[position] = last
+            self._positions[last[1]] = position
+            self._sift_up(position)
+            self._sift_down(self._positions[last[1]])
+        return True
+
+    def peek(self) -> Optional[T]:
+        return self._heap[0][1] if self._heap else None
+
+    def ordered(self) -> Iterator[T]:
+        """Items from best to worst, lazily: taking k of them costs O(k log k)"""
+        if not self._heap:
+            return
+        frontier = [(self._heap[0][0], 0)]
+        while frontier:
+            _, position = heapq.heappop(frontier)
+            yield self._heap[position][1]
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, (self._heap[child][0], child))
+
+    def _sift_up(self, position: int):
+        heap, positions = self._heap, self._positions
+        entry = heap[position]
+        while position > 0:
+            parent = (position - 1) // 2
+            if not entry[0] < heap[parent][0]:
+                break
+            heap[position] = heap[parent]
+            positions[heap[position][1]] = position
+            position = parent
+        heap[position] = entry
+        positions[entry[1]] = position
+
+    def _sift_down(self, position: int):
+        heap, positions = self._heap, self._positions
+        size = len(heap)
+        entry = heap[position]
+        while True:
+            child = 2 * position + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if not heap[child][0] < entry[0]:
+                break
+            heap[position] = heap[child]
+            positions[heap[position][1]] = position
+            position = child
+        heap[position] = entry
+        positions[entry[1]] = position
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Positions of the set bits of ``mask``, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class CapabilityIndex:
+    """Dense agent IDs, capability bitsets and per-capability ranked heaps"""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: List[Optional[str]] = []
+        self._free_ids: List[int] = []
+
+        self._capabilities: Dict[str, Tuple[str, ...]] = {}
+        self._bitsets: Dict[str, int] = {}
+        self._heaps: Dict[str, IndexedHeap[int]] = {}
+        self._ranks: Dict[int, Any] = {}
+
+        self._all = 0
+        self._eligible = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._ids
+
+    # =========================================================================
+    # MAINTENANCE
+    # =========================================================================
+
+    def add(self, agent_id: str, capabilities: Iterable[str], rank: Any = 0.0, eligible: bool = False) -> int:
+        """Index an agent (or replace its capabilities); returns its dense ID"""
+        dense = self._ids.get(agent_id)
+        if dense is None:
+            dense = self._free_ids.pop() if self._free_ids else len(self._names)
+            if dense == len(self._names):
+                self._names.append(agent_id)
+            else:
+                self._names[dense] = agent_id
+            self._ids[agent_id] = dense
+            self._all |= 1 << dense
+        else:
+            self._unlink(agent_id, dense)
+
+        self._capabilities[agent_id] = tuple(dict.fromkeys(capabilities))
+        bit = 1 << dense
+        for capability in self._capabilities[agent_id]:
+            self._bitsets[capability] = self._bitsets.get(capability, 0) | bit
+        self._ranks[dense] = rank
+        self._set_eligible(agent_id, dense, eligible)
+        return dense
+
+    def remove(self, agent_id: str) -> bool:
+        dense = self._ids.pop(agent_id, None)
+        if dense is None:
+            return False
+        self._unlink(agent_id, dense)
+        del self._capabilities[agent_id]
+        del self._ranks[dense]
+        self._all &= ~(1 << dense)
+        self._names[dense] = None
+        self._free_ids.append(dense)
+        return True
+
+    def update(self, agent_id: str, rank: Any = None, eligible: Optional[bool] = None) -> bool:
+        """Change an agent's rank and/or eligibility; O(log n) per capability"""
+        dense = self._ids.get(agent_id)
+        if dense is None:
+            return False
+        if rank is not None:
+            self._ranks[dense] = rank
+        if eligible is None:
+            eligible = bool(self._eligible >> dense & 1)
+        self._set_eligible(agent_id, dense, eligible)
+        return True
+
+    def _set_eligible(self, agent_id: str, dense: int, eligible: bool):
+        bit = 1 << dense
+        if eligible:
+            self._eligible |= bit
+            rank = self._ranks[dense]
+            for capability in self._capabilities[agent_id]:
+                self._heaps.setdefault(capability, IndexedHeap()).set(dense, rank)
+        else:
+            self._eligible &= ~bit
+            for capability in self._capabilities[agent_id]:
+                heap = self._heaps.get(capability)
+                if heap is not None:
+                    heap.remove(dense)
+                    if not heap:
+                        del self._heaps[capability]
+
+    def _unlink(self, agent_id: str, dense: int):
+        bit = 1 << dense
+        self._eligible &= ~bit
+        for capability in self._capabilities.get(agent_id, ()):
+            remaining = self._bitsets.get(capability, 0) & ~bit
+            if remaining:
+                self._bitsets[capability] = remaining
+            else:
+                self._bitsets.pop(capability, None)
+            heap = self._heaps.get(capability)
+            if heap is not None:
+                heap.remove(dense)
+                if not heap:
+                    del self._heaps[capability]
+
+    # =========================================================================
+    # QUERIES
+    # =========================================================================
+
+    def mask(self, capabilities: Iterable[str] = (), eligible_only: bool = False) -> int:
+        """Bitset of agents offering every capability (all agents for none)"""
+        result = self._eligible if eligible_only else self._all
+        for capability in capabilities:
+            result &= self._bitsets.get(capability, 0)
+            if not result:
+                break
+        return result
+
+    def eligible_mask(self) -> int:
+        return self._eligible
+
+    def names(self, mask: int) -> List[str]:
+        """Agent IDs for a bitset"""
+        return [self._names[dense] for dense in _bits(mask)]
+
+    def agents_with(self, capabilities: Iterable[str], eligible_only: bool = True) -> List[str]:
+        """Agents offering every one of ``capabilities``"""
+        return self.names(self.mask(capabilities, eligible_only))
+
+    def capabilities(self, agent_id: str) -> Tuple[str, ...]:
+        return self._capabilities.get(agent_id, ())
+
+    def is_eligible(self, agent_id: str) -> bool:
+        dense = self._ids.get(agent_id)
+        return dense is not None and bool(self._eligible >> dense & 1)
+
+    def ranked(self, capability: str) -> Iterator[str]:
+        """Eligible agents for ``capability``, best rank first, produced lazily"""
+        heap = self._heaps.get(capability)
+        if heap is None:
+            return iter(())
+        return (self._names[dense] for dense in heap.ordered())
+
+    def best(
+        self,
+        capability: str,
+        also_requires: Iterable[str] = (),
+        accept: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
+        """
+        Best-ranked eligible agent for ``capability`` that also offers every
+        capability in ``also_requires`` and passes ``accept`` (if given)
+        """
+        heap = self._heaps.get(capability)
+        if heap is None:
+            return None
+        required = self.mask(also_requires)
+        if not required:
+            return None
+        top = heap.peek()
+        if top is None:
+            return None
+        if accept is None and required >> top & 1:
+            return self._names[top]
+        for dense in heap.ordered():
+            if required >> dense & 1 and (accept is None or accept(self._names[dense])):
+                return self._names[dense]
+        return None
@@ -1,12 +1,19 @@
 """
 Circuit Breaker Pattern
 Production-grade circuit breaker for preventing cascade failures
+
+Each breaker combines a time-bucketed failure / slow-call window with a
+bulkhead: an (optionally adaptive) concurrency limit and a bounded wait
+queue that sheds load once full.
 """
 
 import asyncio
+import math
 import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager
 from enum import Enum
-from typing import Callable, Any, Optional, Dict
+from typing import Callable, Any, Optional, Dict, List, Tuple
 from dataclasses import dataclass
 from collections import deque
 import structlog
@@ -30,6 +37,22 @@ class CircuitBreakerConfig:
     window_size: int = 100            # Rolling window size
     min_throughput: int = 10          # Minimum requests to calculate
     excluded_exceptions: tuple = ()   # Exceptions that don't count as failures
+    exclude_predicate: Optional[Callable[[Exception], bool]] = None  # Same, decided per exception
+    
+    # Sliding window (rates are computed over the last window_seconds)
+    window_seconds: float = 60.0
+    window_buckets: int = 12
+    failure_rate_threshold: float = 0.5
+    slow_call_duration_seconds: Optional[float] = None  # None disables slow-call tracking
+    slow_call_rate_threshold: float = 0.8
+    
+    # Bulkhead (concurrency_limit None means unlimited)
+    concurrency_limit: Optional[int] = None
+    limit_algorithm: str = "fixed"    # fixed, aimd or gradient
+    min_concurrency_limit: int = 1
+    max_concurrency_limit: int = 1000
+    max_queue_size: int = 0           # Callers allowed to wait for a slot
+    queue_timeout_seconds: float = 1.0
 
 
 class CircuitBreakerOpenError(Exception):
@@ -37,6 +60,183 @@ class CircuitBreakerOpenError(Exception):
     pass
 
 
+class BulkheadFullError(CircuitBreakerOpenError):
+    """Raised when the concurrency limit and wait queue are both full (load shed)"""
+    pass
+
+
+class SlidingWindow:
+    """Time-bucketed ring buffer of call outcomes"""
+    
+    def __init__(self, window_seconds: float = 60.0, buckets: int = 12):
+        self.buckets = max(1, buckets)
+        self.bucket_seconds = window_seconds / self.buckets
+        self._epochs = [-1] * self.buckets
+        self._calls = [0] * self.buckets
+        self._failures = [0] * self.buckets
+        self._slow = [0] * self.buckets
+    
+    def _index(self, now: float) -> int:
+        epoch = int(now / self.bucket_seconds)
+        index = epoch % self.buckets
+        if self._epochs[index] != epoch:
+            self._epochs[index] = epoch
+            self._calls[index] = self._failures[index] = self._slow[index] = 0
+        return index
+    
+    def record(self, failed: bool, slow: bool, now: Optional[float] = None):
+        index = self._index(time.monotonic() if now is None else now)
+        self._calls[index] += 1
+        self._failures[index] += failed
+        self._slow[index] += slow
+    
+    def totals(self, now: Optional[float] = None) -> Tuple[int, int, int]:
+        """(calls, failures, slow calls) over the window"""
+        oldest = int((time.monotonic() if now is None else now) / self.bucket_seconds) - self.buckets
+        calls = failures = slow = 0
+        for index, epoch in enumerate(self._epochs):
+            if epoch > oldest:
+                calls += self._calls[index]
+                failures += self._failures[index]
+                slow += self._slow[index]
+        return calls, failures, slow
+    
+    def clear(self):
+        self._epochs = [-1] * self.buckets
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds)"""
+    
+    BOUNDS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+    
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+    
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        self.counts[bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+    
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return float(self.BOUNDS_MS[index]) if index < len(self.BOUNDS_MS) else math.inf
+        return math.inf
+    
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in self.BOUNDS_MS] + ["le_inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "avg_ms": self.sum_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99)
+        }
+
+
+class FixedLimit:
+    """Static concurrency limit"""
+    
+    def __init__(self, limit: int):
+        self.limit = limit
+    
+    def on_sample(self, rtt: float, in_flight: int, dropped: bool) -> int:
+        return self.limit
+
+
+class AIMDLimit:
+    """
+    Additive increase / multiplicative decrease
+    Grows by one while the limit is being used and backs off on drops
+    (timeouts and slow calls), as in Netflix concurrency-limits.
+    """
+    
+    def __init__(self, initial: int, min_limit: int, max_limit: int, backoff_ratio: float = 0.9):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+    
+    def on_sample(self, rtt: float, in_flight: int, dropped: bool) -> int:
+        if dropped:
+            self.limit = max(self.min_limit, min(self.limit - 1, int(self.limit * self.backoff_ratio)))
+        elif in_flight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+        return self.limit
+
+
+class GradientLimit:
+    """
+    Latency-gradient limit (Gradient2 style)
+    Compares short-term RTT with a long-term baseline: the limit shrinks as
+    queueing inflates latency and grows by sqrt(limit) headroom otherwise.
+    """
+    
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 smoothing: float = 0.2, tolerance: float = 1.5,
+                 short_window: int = 10, long_window: int = 600):
+        self.estimate = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self.short_alpha = 2 / (short_window + 1)
+        self.long_alpha = 2 / (long_window + 1)
+        self.short_rtt: Optional[float] = None
+        self.long_rtt: Optional[float] = None
+    
+    @property
+    def limit(self) -> int:
+        return int(self.estimate)
+    
+    def on_sample(self, rtt: float, in_flight: int, dropped: bool) -> int:
+        rtt = max(rtt, 1e-6)
+        if self.short_rtt is None:
+            self.short_rtt = self.long_rtt = rtt
+        else:
+            self.short_rtt += (rtt - self.short_rtt) * self.short_alpha
+            self.long_rtt += (rtt - self.long_rtt) * self.long_alpha
+            # Let the baseline recover quickly once a latency spike is over
+            if self.long_rtt / self.short_rtt > 2:
+                self.long_rtt *= 0.95
+        
+        # Don't grow while the limit isn't being used
+        if not dropped and in_flight < self.estimate / 2:
+            return self.limit
+        
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        if dropped:
+            gradient = 0.5
+        target = self.estimate * gradient + math.sqrt(self.estimate)
+        self.estimate = self.estimate * (1 - self.smoothing) + target * self.smoothing
+        self.estimate = max(self.min_limit, min(self.max_limit, self.estimate))
+        return self.limit
+
+
+def _build_limiter(config: "CircuitBreakerConfig"):
+    if config.concurrency_limit is None:
+        return None
+    initial = max(config.min_concurrency_limit, min(config.max_concurrency_limit, config.concurrency_limit))
+    if config.limit_algorithm == "aimd":
+        return AIMDLimit(initial, config.min_concurrency_limit, config.max_concurrency_limit)
+    if config.limit_algorithm == "gradient":
+        return GradientLimit(initial, config.min_concurrency_limit, config.max_concurrency_limit)
+    if config.limit_algorithm == "fixed":
+        return FixedLimit(initial)
+    raise ValueError(f"Unknown limit algorithm: {config.limit_algorithm}")
+
+
 class CircuitBreaker:
     """
     Production-grade circuit breaker implementation
@@ -49,9 +249,17 @@ class CircuitBreaker:
     - OPEN: Failures detected, requests blocked
     - HALF_OPEN: Testing if service recovered
     
+    With a concurrency limit configured, calls beyond the limit wait in a
+    bounded queue; when the queue is full (or the wait times out) the call is
+    shed with BulkheadFullError instead of piling up on a slow dependency.
+    
     Usage:
         breaker = CircuitBreaker("external_api", CircuitBreakerConfig())
         result = await breaker.call(some_async_function, arg1, arg2)
+        
+        async with breaker.guard():
+            async for chunk in stream:
+                ...
     """
     
     def __init__(self, name: str, config: CircuitBreakerConfig):
@@ -64,13 +272,22 @@ class CircuitBreaker:
         self.last_success_time = 0
         self.last_state_change = time.time()
         
-        # Rolling window for failure rate calculation
+        # Recent call durations and the time-bucketed window for rate calculation
         self.call_history = deque(maxlen=config.window_size)
+        self.window = SlidingWindow(config.window_seconds, config.window_buckets)
+        self.latency = LatencyHistogram()
+        
+        # Bulkhead
+        self.limiter = _build_limiter(config)
+        self.in_flight = 0
+        self._waiters: deque = deque()
         
         # Metrics
         self.total_calls = 0
         self.total_failures = 0
         self.total_successes = 0
+        self.total_slow_calls = 0
+        self.total_shed = 0
         self.state_changes = 0
         self.times_opened = 0
         
@@ -96,30 +313,35 @@ class CircuitBreaker:
             CircuitBreakerOpenError: If circuit is open
             Original exception: If function fails
         """
+        async with self.guard():
+            return await func(*args, **kwargs)
+    
+    @asynccontextmanager
+    async def guard(self):
+        """
+        Run the enclosed block as one call through the breaker and bulkhead
+        
+        Raises:
+            CircuitBreakerOpenError: If circuit is open
+            BulkheadFullError: If no slot frees up in time
+        """
         self.total_calls += 1
         
         # Check if circuit is open
-        if self.state == CircuitState.OPEN:
-            if self._should_attempt_reset():
-                self._transition_to_half_open()
-            else:
-                raise CircuitBreakerOpenError(
-                    f"Circuit breaker '{self.name}' is OPEN - service unavailable"
-                )
+        if not self.allow_request():
+            raise CircuitBreakerOpenError(
+                f"Circuit breaker '{self.name}' is OPEN - service unavailable"
+            )
         
-        # Execute function
-        start_time = time.time()
+        await self._acquire_slot()
+        start_time = time.monotonic()
         try:
-            result = await func(*args, **kwargs)
-            execution_time = time.time() - start_time
-            await self._on_success(execution_time)
-            return result
-            
+            yield self
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = time.monotonic() - start_time
             
             # Check if this exception should be excluded
-            if isinstance(e, self.config.excluded_exceptions):
+            if self._is_excluded(e):
                 logger.debug(
                     "Exception excluded from circuit breaker",
                     name=self.name,
@@ -129,6 +351,88 @@ class CircuitBreaker:
             
             await self._on_failure(e, execution_time)
             raise
+        else:
+            await self._on_success(time.monotonic() - start_time)
+        finally:
+            self._release_slot()
+    
+    def allow_request(self) -> bool:
+        """Whether a call may proceed now (moves OPEN to HALF_OPEN once the timeout has passed)"""
+        if self.state == CircuitState.OPEN:
+            if not self._should_attempt_reset():
+                return False
+            self._transition_to_half_open()
+        return True
+    
+    def _is_excluded(self, error: Exception) -> bool:
+        if isinstance(error, self.config.excluded_exceptions):
+            return True
+        return bool(self.config.exclude_predicate and self.config.exclude_predicate(error))
+    
+    @property
+    def concurrency_limit(self) -> Optional[int]:
+        return self.limiter.limit if self.limiter else None
+    
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+    
+    async def _acquire_slot(self):
+        """Take a concurrency slot, waiting in the bounded queue if needed"""
+        limit = self.concurrency_limit
+        if limit is None or (self.in_flight < limit and not self._waiters):
+            self.in_flight += 1
+            return
+        
+        if len(self._waiters) >= self.config.max_queue_size:
+            self._shed("queue full")
+        
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.config.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return  # The slot was handed over as the timeout fired
+            self._shed("queue timeout")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+    
+    def _shed(self, reason: str):
+        self.total_shed += 1
+        raise BulkheadFullError(
+            f"Circuit breaker '{self.name}' shed call ({reason}): "
+            f"{self.in_flight} in flight, limit {self.concurrency_limit}"
+        )
+    
+    def _release_slot(self):
+        self.in_flight -= 1
+        self._wake_waiters()
+    
+    def _wake_waiters(self):
+        """Hand free slots to queued callers in FIFO order"""
+        limit = self.concurrency_limit
+        while self._waiters and (limit is None or self.in_flight < limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+    
+    def _is_slow(self, execution_time: float) -> bool:
+        threshold = self.config.slow_call_duration_seconds
+        return threshold is not None and execution_time >= threshold
+    
+    def _update_limit(self, execution_time: float, dropped: bool):
+        if self.limiter:
+            self.limiter.on_sample(execution_time, self.in_flight, dropped)
+            self._wake_waiters()
     
     async def call_with_fallback(
         self,
@@ -163,6 +467,11 @@ class CircuitBreaker:
         self.success_count += 1
         self.last_success_time = time.time()
         self.call_history.append((True, execution_time))
+        self.latency.observe(execution_time)
+        slow = self._is_slow(execution_time)
+        self.total_slow_calls += slow
+        self.window.record(failed=False, slow=slow)
+        self._update_limit(execution_time, dropped=slow)
         
         if self.state == CircuitState.HALF_OPEN:
             if self.success_count >= self.config.success_threshold:
@@ -171,6 +480,9 @@ class CircuitBreaker:
         # Reset failure count on success in closed state
         if self.state == CircuitState.CLOSED:
             self.failure_count = 0
+            # A high slow-call rate opens the circuit even without errors
+            if slow and self._should_open():
+                self._transition_to_open()
     
     async def _on_failure(self, error: Exception, execution_time: float):
         """Handle failed call"""
@@ -178,6 +490,12 @@ class CircuitBreaker:
         self.failure_count += 1
         self.last_failure_time = time.time()
         self.call_history.append((False, execution_time))
+        self.latency.observe(execution_time)
+        slow = self._is_slow(execution_time)
+        self.total_slow_calls += slow
+        self.window.record(failed=True, slow=slow)
+        # Timeouts and slow calls signal overload; other errors leave the limit alone
+        self._update_limit(execution_time, dropped=slow or isinstance(error, asyncio.TimeoutError))
         
         logger.warning(
             "Circuit breaker recorded failure",
@@ -198,28 +516,28 @@ class CircuitBreaker:
     
     def _should_open(self) -> bool:
         """Check if circuit should open"""
+        calls, failures, slow = self.window.totals()
+        
         # Need minimum throughput to make decision
-        if len(self.call_history) < self.config.min_throughput:
+        if calls < self.config.min_throughput:
             return False
         
         # Check failure count threshold
         if self.failure_count >= self.config.failure_threshold:
             return True
         
-        # Check failure rate in rolling window
-        failures_in_window = sum(1 for success, _ in self.call_history if not success)
-        failure_rate = failures_in_window / len(self.call_history)
-        
-        # Open if failure rate > 50% and we have minimum throughput
+        # Check failure and slow-call rates in the sliding window
+        if failures / calls >= self.config.failure_rate_threshold:
+            return True
         return (
-            failure_rate > 0.5 and
-            len(self.call_history) >= self.config.min_throughput
+            self.config.slow_call_duration_seconds is not None and
+            slow / calls >= self.config.slow_call_rate_threshold
         )
     
     def _should_attempt_reset(self) -> bool:
         """Check if we should attempt to close circuit"""
-        time_since_failure = time.time() - self.last_failure_time
-        return time_since_failure >= self.config.timeout_seconds
+        time_since_open = time.time() - self.last_state_change
+        return time_since_open >= self.config.timeout_seconds
     
     def _transition_to_open(self):
         """Transition to open state"""
@@ -264,6 +582,8 @@ class CircuitBreaker:
         self.failure_count = 0
         self.state_changes += 1
         self.last_state_change = time.time()
+        # Start the recovered circuit with a clean window
+        self.window.clear()
         
         logger.info(
             "Circuit breaker closing (recovered)",
@@ -281,6 +601,7 @@ class CircuitBreaker:
         # Calculate average execution times
         recent_successes = [t for success, t in self.call_history if success]
         recent_failures = [t for success, t in self.call_history if not success]
+        window_calls, window_failures, window_slow = self.window.totals()
         
         return {
             "name": self.name,
@@ -298,7 +619,23 @@ class CircuitBreaker:
             "last_state_change": self.last_state_change,
             "avg_success_time": sum(recent_successes) / len(recent_successes) if recent_successes else 0,
             "avg_failure_time": sum(recent_failures) / len(recent_failures) if recent_failures else 0,
-            "window_size": len(self.call_history)
+            "window_size": len(self.call_history),
+            "window_calls": window_calls,
+            "window_failure_rate": window_failures / window_calls if window_calls else 0.0,
+            "window_slow_call_rate": window_slow / window_calls if window_calls else 0.0,
+            "total_slow_calls": self.total_slow_calls,
+            **self.get_load_metrics()
+        }
+    
+    def get_load_metrics(self) -> Dict[str, Any]:
+        """In-flight calls, concurrency limit, queue and latency histogram"""
+        return {
+            "in_flight": self.in_flight,
+            "concurrency_limit": self.concurrency_limit,
+            "limit_algorithm": self.config.limit_algorithm if self.limiter else None,
+            "queued": self.queued,
+            "total_shed": self.total_shed,
+            "latency": self.latency.snapshot()
         }
     
     def reset(self):
@@ -308,6 +645,7 @@ class CircuitBreaker:
         self.failure_count = 0
         self.success_count = 0
         self.call_history.clear()
+        self.window.clear()
 
 
 class CircuitBreakerRegistry:
@@ -340,6 +678,13 @@ class CircuitBreakerRegistry:
         """Get circuit breaker by name"""
         return self.breakers.get(name)
     
+    def remove(self, name: str) -> Optional[CircuitBreaker]:
+        """Drop a circuit breaker (e.g. when its dependency is deregistered)"""
+        return self.breakers.pop(name, None)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.breakers
+    
     def get_all_metrics(self) -> Dict[str, Dict[str, Any]]:
         """Get metrics for all circuit breakers"""
         return {
@@ -347,12 +692,19 @@ class CircuitBreakerRegistry:
             for name, breaker in self.breakers.items()
         }
     
+    def get_load_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Per-dependency state, in-flight calls, limit and latency histogram"""
+        return {
+            name: {"state": breaker.state.value, **breaker.get_load_metrics()}
+            for name, breaker in self.breakers.items()
+        }
+    
     def reset_all(self):
         """Reset all circuit breakers (admin function)"""
         for breaker in self.breakers.values():
             breaker.reset()
     
-    def list_open_breakers(self) -> list[str]:
+    def list_open_breakers(self) -> List[str]:
         """Get list of open circuit breakers"""
         return [
             name for name, breaker in self.breakers.items()
@@ -21,9 +21,11 @@ import uuid
 
 from sqlalchemy import Column, String, DateTime, JSON, Text, Integer, Boolean, Index
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, desc, func
+from sqlalchemy import select, and_, desc, func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import declarative_base
 
+from activity_journal import ActivityJournal
 from config import settings
 from database.secure_database_manager import SecureDatabaseManager
 from monitoring.alert_manager import AlertManager, AlertCategory, AlertSeverity
@@ -203,6 +205,7 @@ class RiskAssessment:
     recommended_action: SystemAction
     requires_admin_review: bool
     requires_approval: bool
+    compliance_flags: List[str] = field(default_factory=list)
 
 
 class AgentCodeOfConduct:
@@ -221,14 +224,23 @@ class AgentCodeOfConduct:
     def __init__(
         self,
         db_manager: SecureDatabaseManager,
-        alert_manager: AlertManager
+        alert_manager: AlertManager,
+        journal_dir: Optional[str] = None
     ):
         self.db_manager = db_manager
         self.alert_manager = alert_manager
         
-        # In-memory buffer for high-frequency logging
-        self.log_buffer: deque = deque(maxlen=10000)
-        self.buffer_flush_interval = 30  # seconds
+        # Write-ahead journal for high-frequency logging: group-committed to
+        # local segment files, then bulk-drained to the database
+        self.journal = ActivityJournal(
+            journal_dir or getattr(settings, 'ACTIVITY_JOURNAL_DIR', 'data/activity_journal'),
+            sink=self._write_activity_batch
+        )
+        self.buffer_flush_interval = 1  # seconds between drains when below a full batch
+        
+        # Hash chain head, continued from the last journaled record
+        last_record = self.journal.last_record
+        self._chain_head = last_record['hash_signature'] if last_record else ''
         
         # Frozen entities tracking
         self.frozen_agents: Dict[str, Dict] = {}
@@ -342,40 +354,45 @@ class AgentCodeOfConduct:
             entry.risk_level = risk_assessment.risk_level
             
             # Check compliance flags
-            entry.compliance_flags.extend(self._check_compliance(entry))
+            entry.compliance_flags.extend(risk_assessment.compliance_flags)
             
             # Hash sensitive data
             input_hash = self._hash_data(entry.input_data) if entry.input_data else None
             output_hash = self._hash_data(entry.output_data) if entry.output_data else None
             
-            # Create log record
-            log_record = AgentActivityLog(
-                id=activity_id,
-                agent_id=entry.agent_id,
-                tenant_id=entry.tenant_id,
-                timestamp=datetime.utcnow(),
-                activity_type=entry.activity_type.value,
-                activity_category=self._categorize_activity(entry.activity_type),
-                description=entry.description,
-                context=entry.context,
-                user_id=entry.user_id,
-                session_id=entry.session_id,
-                input_data_hash=input_hash,
-                output_data_hash=output_hash,
-                knowledge_gained=entry.knowledge_gained,
-                risk_level=entry.risk_level.value,
-                compliance_flags=entry.compliance_flags,
-                requires_review=risk_assessment.requires_admin_review,
-                parent_activity_id=entry.parent_activity_id,
-                correlation_id=entry.correlation_id,
-                hash_signature=self._compute_hash(entry)
-            )
+            # Create log record (a plain row; the journal bulk-inserts it later)
+            log_record = {
+                'id': activity_id,
+                'agent_id': entry.agent_id,
+                'tenant_id': entry.tenant_id,
+                'timestamp': datetime.utcnow().isoformat(),
+                'activity_type': entry.activity_type.value,
+                'activity_category': self._categorize_activity(entry.activity_type),
+                'description': entry.description,
+                'context': entry.context,
+                'user_id': entry.user_id,
+                'session_id': entry.session_id,
+                'input_data_hash': input_hash,
+                'output_data_hash': output_hash,
+                'knowledge_gained': entry.knowledge_gained,
+                'risk_level': entry.risk_level.value,
+                'compliance_flags': entry.compliance_flags,
+                'requires_review': risk_assessment.requires_admin_review,
+                'reviewed_by': None,
+                'reviewed_at': None,
+                'parent_activity_id': entry.parent_activity_id,
+                'correlation_id': entry.correlation_id
+            }
             
-            # Buffer or immediate write
+            # Chain and journal the record without yielding in between, so the
+            # hash chain follows journal order; critical records wait for the
+            # fsync and are drained right away
+            await self.journal.wait_writable()
+            log_record['hash_signature'] = self._compute_hash(log_record)
+            seq = self.journal.append(log_record)
             if force_immediate or entry.risk_level in [RiskLevel.CRITICAL, RiskLevel.EMERGENCY]:
-                await self._write_log_immediate(log_record)
-            else:
-                self.log_buffer.append(log_record)
+                await self.journal.commit(seq)
+                self.journal.request_drain()
             
             # Update statistics
             self.stats['total_activities_logged'] += 1
@@ -389,7 +406,8 @@ class AgentCodeOfConduct:
             log_level = self._get_log_level(entry.risk_level)
             logger.log(
                 log_level,
-                f"[AGENT ACTIVITY] {entry.agent_id} - {entry.activity_type.value} - {entry.description}"
+                "[AGENT ACTIVITY] %s - %s - %s",
+                entry.agent_id, entry.activity_type.value, entry.description
             )
             
             return activity_id
@@ -423,7 +441,7 @@ class AgentCodeOfConduct:
                 risk_score += 0.1 * len(matched_keywords)
         
         # Check for compliance flags
-        compliance_flags = self._check_compliance(entry)
+        compliance_flags = self._check_compliance(entry, text_to_check)
         if compliance_flags:
             risk_factors.extend([f"Compliance: {flag}" for flag in compliance_flags])
             risk_score += 0.2 * len(compliance_flags)
@@ -483,7 +501,8 @@ class AgentCodeOfConduct:
             risk_factors=risk_factors,
             recommended_action=recommended_action,
             requires_admin_review=requires_review,
-            requires_approval=requires_approval
+            requires_approval=requires_approval,
+            compliance_flags=compliance_flags
         )
 
     def _risk_to_score(self, risk_level: RiskLevel) -> float:
@@ -497,18 +516,20 @@ class AgentCodeOfConduct:
             RiskLevel.EMERGENCY: 1.0
         }.get(risk_level, 0.0)
 
-    def _check_compliance(self, entry: ActivityLogEntry) -> List[str]:
-        """Check for compliance-related content"""
+    def _check_compliance(self, entry: ActivityLogEntry, base_text: Optional[str] = None) -> List[str]:
+        """Check for compliance-related content (base_text: lowered description and context, if already built)"""
         flags = []
         
         # Build text to check
-        text_parts = [entry.description, json.dumps(entry.context)]
+        if base_text is None:
+            base_text = f"{entry.description} {json.dumps(entry.context)}".lower()
+        text_parts = [base_text]
         if entry.input_data:
-            text_parts.append(str(entry.input_data))
+            text_parts.append(str(entry.input_data).lower())
         if entry.output_data:
-            text_parts.append(str(entry.output_data))
+            text_parts.append(str(entry.output_data).lower())
         
-        text_lower = " ".join(text_parts).lower()
+        text_lower = " ".join(text_parts)
         
         for compliance_type, keywords in self.compliance_keywords.items():
             for keyword in keywords:
@@ -1099,28 +1120,68 @@ class AgentCodeOfConduct:
             'system_frozen': self.system_frozen,
             'admin_notifications_pending': pending_notifs or 0,
             'activities_requiring_review': pending_reviews or 0,
-            'buffer_size': len(self.log_buffer)
+            'buffer_size': self.journal.last_seq - self.journal.drained_seq,
+            'journal': self.journal.get_stats()
         }
 
     async def flush_log_buffer(self):
-        """Flush buffered logs to database"""
-        if not self.log_buffer:
-            return
-        
+        """Commit journaled logs and drain them to the database"""
         try:
-            logs_to_write = list(self.log_buffer)
-            self.log_buffer.clear()
-            
-            async with self.db_manager.get_session() as session:
-                session.add_all(logs_to_write)
-                await session.commit()
-            
-            logger.debug(f"Flushed {len(logs_to_write)} logs to database")
-            
+            flushed = await self.journal.flush()
+            logger.debug(f"Flushed {flushed} logs to database")
         except Exception as e:
+            # Undrained logs stay in the journal and are retried
             logger.error(f"Failed to flush log buffer: {e}", exc_info=True)
-            # Re-add logs to buffer
-            self.log_buffer.extend(logs_to_write)
+
+    async def _write_activity_batch(self, records: List[Dict[str, Any]]):
+        """Bulk insert journaled activity rows (COPY on asyncpg, executemany otherwise)"""
+        rows = [
+            {**record, 'timestamp': datetime.fromisoformat(record['timestamp'])}
+            for record in records
+        ]
+        
+        async with self.db_manager.get_session() as session:
+            try:
+                if await self._copy_activity_rows(session, rows):
+                    await session.commit()
+                    return
+            except Exception as e:
+                # e.g. rows re-delivered after a crash; fall back to the idempotent insert
+                logger.warning(f"COPY of activity logs failed, using INSERT: {e}")
+                await session.rollback()
+            
+            connection = await session.connection()
+            if connection.dialect.name == 'postgresql':
+                statement = pg_insert(AgentActivityLog).on_conflict_do_nothing(index_elements=['id'])
+            else:
+                statement = insert(AgentActivityLog)
+            await session.execute(statement, rows)
+            await session.commit()
+
+    async def _copy_activity_rows(self, session: AsyncSession, rows: List[Dict[str, Any]]) -> bool:
+        """COPY rows through the raw asyncpg connection; False if the driver can't"""
+        connection = await session.connection()
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = getattr(raw_connection, 'driver_connection', None)
+        if not hasattr(driver_connection, 'copy_records_to_table'):
+            return False
+        
+        table = AgentActivityLog.__table__
+        columns = [column.name for column in table.columns]
+        json_columns = {column.name for column in table.columns if isinstance(column.type, JSON)}
+        await driver_connection.copy_records_to_table(
+            table.name,
+            columns=columns,
+            records=[
+                tuple(
+                    json.dumps(row.get(name)) if name in json_columns and row.get(name) is not None
+                    else row.get(name)
+                    for name in columns
+                )
+                for row in rows
+            ]
+        )
+        return True
 
     async def start_background_tasks(self):
         """Start background maintenance tasks"""
@@ -1138,15 +1199,11 @@ class AgentCodeOfConduct:
                 task.cancel()
 
     async def _periodic_buffer_flush(self):
-        """Periodically flush log buffer"""
-        while True:
-            try:
-                await asyncio.sleep(self.buffer_flush_interval)
-                await self.flush_log_buffer()
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Buffer flush error: {e}", exc_info=True)
+        """Drain the journal whenever a batch is ready (or every flush interval)"""
+        try:
+            await self.journal.run_drainer(interval=self.buffer_flush_interval)
+        except asyncio.CancelledError:
+            await self.journal.close()
 
     async def _periodic_cleanup(self):
         """Periodically clean up old data"""
@@ -1198,10 +1255,18 @@ class AgentCodeOfConduct:
         data_str = json.dumps(data) if isinstance(data, dict) else str(data)
         return hashlib.sha256(data_str.encode()).hexdigest()
 
-    def _compute_hash(self, entry: ActivityLogEntry) -> str:
-        """Compute hash signature for log entry"""
-        hash_input = f"{entry.agent_id}{entry.activity_type.value}{entry.description}{entry.timestamp if hasattr(entry, 'timestamp') else datetime.utcnow().isoformat()}"
-        return hashlib.sha256(hash_input.encode()).hexdigest()
+    def _compute_hash(self, log_record: Dict[str, Any]) -> str:
+        """
+        Compute hash signature for log entry
+        Chained to the previous record's signature, so each hash is one O(1)
+        step and any removed or altered record breaks the chain after it.
+        """
+        hash_input = (
+            f"{self._chain_head}|{log_record['id']}|{log_record['agent_id']}|"
+            f"{log_record['activity_type']}|{log_record['description']}|{log_record['timestamp']}"
+        )
+        self._chain_head = hashlib.sha256(hash_input.encode()).hexdigest()
+        return self._chain_head
 
     def _get_log_level(self, risk_level: RiskLevel) -> int:
         """Get Python logging level from risk level"""
@@ -1225,12 +1290,6 @@ class AgentCodeOfConduct:
             RiskLevel.EMERGENCY: AlertSeverity.EMERGENCY
         }.get(risk_level, AlertSeverity.INFO)
 
-    async def _write_log_immediate(self, log_record: AgentActivityLog):
-        """Write log immediately to database"""
-        async with self.db_manager.get_session() as session:
-            session.add(log_record)
-            await session.commit()
-
     async def health_check(self) -> str:
         """Health check for code of conduct system"""
         try:
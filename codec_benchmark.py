@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Message Codec Benchmark
+Encoded size and encode/decode throughput of representative agent messages
+(task requests, task responses, communication envelopes and the previous
+zlib + hex compressed payload) for every available wire format, with and
+without zstd and a dictionary trained on a separate sample of messages.
+"""
+
+import argparse
+import json
+import random
+import time
+import uuid
+import zlib
+from typing import Any, Callable, Dict, List
+
+from message_codec import (
+    HAS_ZSTD, ZLIB, ZSTD, MessageCodec, available_content_types, dictionary_id, serialize,
+    train_dictionary
+)
+
+_TASK_TYPES = ["analyze_code", "generate_tests", "review_pr", "optimize_query", "summarize_logs"]
+_AGENTS = [f"{name}_agent" for name in ("coding", "testing", "review", "metrics", "security", "communication")]
+
+
+def _task_request(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "task_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "task_type": rng.choice(_TASK_TYPES),
+        "payload": {
+            "project_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "files": [f"src/module_{rng.randint(0, 200)}.py" for _ in range(rng.randint(1, 6))],
+            "options": {"depth": rng.randint(1, 5), "strict": rng.random() < 0.5, "language": "python"}
+        },
+        "priority": rng.randint(1, 4)
+    }
+
+
+def _task_response(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "task_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "success": True,
+        "result": {
+            "issues": [
+                {"line": rng.randint(1, 800), "severity": rng.choice(["low", "medium", "high"]),
+                 "rule": f"R{rng.randint(100, 999)}", "message": "Variable shadows an outer scope name"}
+                for _ in range(rng.randint(2, 12))
+            ],
+            "metrics": {"complexity": rng.random() * 20, "coverage": rng.random(), "loc": rng.randint(10, 4000)}
+        },
+        "error": None,
+        "execution_time_ms": rng.random() * 500
+    }
+
+
+def _envelope(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "type": "direct",
+        "priority": rng.randint(1, 5),
+        "sender": rng.choice(_AGENTS),
+        "recipients": rng.sample(_AGENTS, 2),
+        "subject": "project.analysis.completed",
+        "payload": _task_response(rng),
+        "delivery_mode": "acknowledgment",
+        "ttl_seconds": 3600,
+        "retry_count": 0,
+        "max_retries": 3,
+        "created_at": time.time(),
+        "metadata": {"transformers": [], "filters": ["security_filter"], "trace_id": uuid.uuid4().hex},
+        "status": "pending",
+        "delivery_attempts": []
+    }
+
+
+_GENERATORS = {"task_request": _task_request, "task_response": _task_response, "envelope": _envelope}
+
+
+def _legacy_compressed_envelope(message: Dict[str, Any]) -> bytes:
+    """What CommunicationAgent sent before: zlib, hex-encoded, inside a JSON envelope"""
+    payload = json.dumps(message["payload"]).encode("utf-8")
+    wrapped = {**message, "payload": {
+        "_compressed": True, "_algorithm": "zlib", "_original_size": len(payload),
+        "_data": zlib.compress(payload, 6).hex()
+    }}
+    return json.dumps(wrapped).encode("utf-8")
+
+
+def _legacy_decode(data: bytes) -> Dict[str, Any]:
+    message = json.loads(data)
+    message["payload"] = json.loads(zlib.decompress(bytes.fromhex(message["payload"]["_data"])))
+    return message
+
+
+def _throughput(func: Callable[[Any], Any], items: List[Any], seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for item in items:
+            func(item)
+        count += len(items)
+    return count / (time.perf_counter() - start)
+
+
+def bench_codec(codec: MessageCodec, messages: List[Any], seconds: float) -> Dict[str, Any]:
+    encoded = [codec.encode(message) for message in messages]
+    return {
+        "avg_bytes": sum(len(data) for data, _ in encoded) / len(encoded),
+        "encode_per_second": _throughput(codec.encode, messages, seconds),
+        "decode_per_second": _throughput(lambda pair: codec.decode(*pair), encoded, seconds)
+    }
+
+
+def _codecs(dictionaries: Dict[str, bytes]) -> Dict[str, MessageCodec]:
+    codecs = {}
+    for content_type in available_content_types():
+        name = content_type.split("/")[1]
+        # Threshold 0: measure compression on every message, not only large ones
+        codecs[name] = MessageCodec(content_type)
+        codecs[f"{name}+zlib"] = MessageCodec(content_type, compression=ZLIB, compress_threshold=0)
+        if HAS_ZSTD:
+            codecs[f"{name}+zstd"] = MessageCodec(content_type, compression=ZSTD, compress_threshold=0)
+            dictionary = dictionaries[content_type]
+            codecs[f"{name}+zstd+dict"] = MessageCodec(
+                content_type, compression=ZSTD, compress_threshold=0,
+                dictionaries=[dictionary], dictionary_id=dictionary_id(dictionary)
+            )
+    return codecs
+
+
+def main():
+    """Run the message codec benchmark"""
+    parser = argparse.ArgumentParser(description="Agent message codec benchmark")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--training-messages", type=int, default=2000)
+    parser.add_argument("--dictionary-size", type=int, default=16 * 1024)
+    parser.add_argument("--seconds", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    training = [_GENERATORS[kind](rng) for _ in range(args.training_messages // len(_GENERATORS))
+                for kind in _GENERATORS]
+    dictionaries = {}
+    if HAS_ZSTD:
+        dictionaries = {
+            content_type: train_dictionary((serialize(m, content_type) for m in training), args.dictionary_size)
+            for content_type in available_content_types()
+        }
+    codecs = _codecs(dictionaries)
+
+    print("Starting message codec benchmark...")
+    results: Dict[str, Any] = {}
+    for kind, generate in _GENERATORS.items():
+        messages = [generate(rng) for _ in range(args.messages)]
+        results[kind] = {name: bench_codec(codec, messages, args.seconds) for name, codec in codecs.items()}
+        if kind == "envelope":
+            legacy = [_legacy_compressed_envelope(message) for message in messages]
+            results[kind]["legacy_zlib_hex"] = {
+                "avg_bytes": sum(map(len, legacy)) / len(legacy),
+                "encode_per_second": _throughput(_legacy_compressed_envelope, messages, args.seconds),
+                "decode_per_second": _throughput(_legacy_decode, legacy, args.seconds)
+            }
+
+        print(f"\n{kind}")
+        print(f"  {'codec':<20} {'bytes':>8} {'encode/s':>12} {'decode/s':>12}")
+        for name, stats in results[kind].items():
+            print(f"  {name:<20} {stats['avg_bytes']:>8.0f} "
+                  f"{stats['encode_per_second']:>12.0f} {stats['decode_per_second']:>12.0f}")
+
+    with open("codec_benchmark.json", "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ with comprehensive monitoring, caching, and security features.
 Features:
 - Multi-language support (Python, JavaScript, Bash)
 - Sandboxed execution with resource limits
+- Warm interpreter pool for low-latency execution
 - Code validation and sanitization
 - Result caching with Redis
 - Execution metrics and profiling
@@ -26,7 +27,6 @@ from typing import Dict, Any, Optional, List, Set
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from pathlib import Path
-import resource
 import signal as sig
 from contextlib import asynccontextmanager
 
@@ -35,6 +35,9 @@ from enhanced_base_agent import (
     BaseAgent, AgentConfig, TaskRequest, Priority,
     AgentState, run_agent
 )
+from sandbox_pool import (
+    WarmSandboxPool, SandboxPoolConfig, SandboxPoolSaturated, set_resource_limits
+)
 
 
 class CodeLanguage:
@@ -115,6 +118,7 @@ class CodeExecutionResult:
     output_truncated: bool = False
     error_message: Optional[str] = None
     cached: bool = False
+    warm: bool = False
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -126,7 +130,8 @@ class CodeExecutionResult:
             'memory_used_mb': self.memory_used_mb,
             'output_truncated': self.output_truncated,
             'error_message': self.error_message,
-            'cached': self.cached
+            'cached': self.cached,
+            'warm': self.warm
         }
 
 
@@ -142,6 +147,14 @@ class CodingAgentMetrics:
     cache_misses: int = 0
     avg_execution_time_ms: float = 0.0
     
+    # Cold (fresh process) vs warm (pooled worker) execution latency
+    cold_executions: int = 0
+    warm_executions: int = 0
+    avg_cold_execution_time_ms: float = 0.0
+    avg_warm_execution_time_ms: float = 0.0
+    pool_recycles: int = 0
+    pool_queue_rejections: int = 0
+    
     # Language-specific counters
     python_executions: int = 0
     javascript_executions: int = 0
@@ -158,6 +171,14 @@ class CodingAgentMetrics:
             'cache_hits': self.cache_hits,
             'cache_misses': self.cache_misses,
             'avg_execution_time_ms': self.avg_execution_time_ms,
+            'latency': {
+                'cold_executions': self.cold_executions,
+                'warm_executions': self.warm_executions,
+                'avg_cold_execution_time_ms': self.avg_cold_execution_time_ms,
+                'avg_warm_execution_time_ms': self.avg_warm_execution_time_ms,
+                'pool_recycles': self.pool_recycles,
+                'pool_queue_rejections': self.pool_queue_rejections
+            },
             'language_breakdown': {
                 'python': self.python_executions,
                 'javascript': self.javascript_executions,
@@ -258,9 +279,30 @@ class SecurityValidator:
 class CodeExecutor:
     """Execute code in isolated environment"""
     
-    def __init__(self, logger):
+    def __init__(self, logger, pool_config: Optional[SandboxPoolConfig] = None):
         self.logger = logger
         self.temp_dirs: Set[str] = set()
+        self.pool_config = pool_config or SandboxPoolConfig(enabled=False)
+        self.pool: Optional[WarmSandboxPool] = None
+        self._node_available: Optional[bool] = None
+    
+    async def start_pool(self):
+        """Start the warm sandbox pool if enabled"""
+        if not self.pool_config.enabled or self.pool:
+            return
+        pool = WarmSandboxPool(self.logger, self.pool_config)
+        try:
+            await pool.start()
+            self.pool = pool
+        except Exception as e:
+            self.logger.error(f"Failed to start warm sandbox pool, using cold execution: {e}")
+            await pool.shutdown()
+    
+    async def stop_pool(self):
+        """Stop the warm sandbox pool"""
+        if self.pool:
+            await self.pool.shutdown()
+            self.pool = None
     
     async def execute(self, request: CodeExecutionRequest) -> CodeExecutionResult:
         """Execute code with resource limits and isolation"""
@@ -283,6 +325,21 @@ class CodeExecutor:
                     error_message=f"Security issues: {', '.join(security_issues)}"
                 )
             
+            # Prefer a warm worker; fall back to a fresh process
+            if self.pool and self.pool.supports(request.language, request.stdin_data,
+                                                request.environment_vars, request.max_memory_mb,
+                                                request.code):
+                try:
+                    result = await self._execute_warm(request)
+                    result.execution_time_ms = (time.time() - start_time) * 1000
+                    return result
+                except SandboxPoolSaturated as e:
+                    return CodeExecutionResult(
+                        status=ExecutionStatus.RESOURCE_LIMIT,
+                        error_message=str(e),
+                        execution_time_ms=(time.time() - start_time) * 1000
+                    )
+            
             # Execute based on language
             if request.language == CodeLanguage.PYTHON:
                 result = await self._execute_python(request)
@@ -311,6 +368,46 @@ class CodeExecutor:
                 execution_time_ms=(time.time() - start_time) * 1000
             )
     
+    async def _execute_warm(self, request: CodeExecutionRequest) -> CodeExecutionResult:
+        """Execute code on a pooled worker interpreter"""
+        run = await self.pool.execute(
+            request.language,
+            request.code,
+            timeout_seconds=request.timeout_seconds,
+            max_memory_mb=request.max_memory_mb,
+            max_output_size=request.max_output_size,
+            stdin_data=request.stdin_data,
+            environment_vars=request.environment_vars
+        )
+        
+        if run.get("timed_out"):
+            return CodeExecutionResult(
+                status=ExecutionStatus.TIMEOUT,
+                error_message=f"Execution exceeded {request.timeout_seconds}s timeout",
+                warm=True
+            )
+        if run.get("worker_error"):
+            return CodeExecutionResult(
+                status=ExecutionStatus.ERROR,
+                error_message=f"Sandbox worker failed: {run['worker_error']}",
+                warm=True
+            )
+        
+        if run.get("signal") in (sig.SIGKILL, sig.SIGXCPU) or "MemoryError" in run.get("stderr", ""):
+            status = ExecutionStatus.RESOURCE_LIMIT
+        else:
+            status = ExecutionStatus.SUCCESS if run["exit_code"] == 0 else ExecutionStatus.ERROR
+        
+        return CodeExecutionResult(
+            status=status,
+            stdout=run["stdout"],
+            stderr=run["stderr"],
+            exit_code=run["exit_code"],
+            memory_used_mb=run.get("max_rss_kb", 0) / 1024,
+            output_truncated=run.get("truncated", False),
+            warm=True
+        )
+    
     async def _execute_python(self, request: CodeExecutionRequest) -> CodeExecutionResult:
         """Execute Python code"""
         # Create temporary file
@@ -383,17 +480,19 @@ class CodeExecutor:
     
     async def _execute_javascript(self, request: CodeExecutionRequest) -> CodeExecutionResult:
         """Execute JavaScript code using Node.js"""
-        # Check if node is available
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                'node', '--version',
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await proc.wait()
-            if proc.returncode != 0:
-                raise Exception("Node.js not available")
-        except Exception as e:
+        # Check if node is available (once per executor)
+        if self._node_available is None:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    'node', '--version',
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                await proc.wait()
+                self._node_available = proc.returncode == 0
+            except Exception:
+                self._node_available = False
+        if not self._node_available:
             return CodeExecutionResult(
                 status=ExecutionStatus.ERROR,
                 error_message="Node.js is not installed or not available"
@@ -534,20 +633,8 @@ class CodeExecutor:
         )
     
     def _set_resource_limits(self, max_memory_mb: int):
-        """Set resource limits for subprocess"""
-        try:
-            # Set memory limit
-            memory_bytes = max_memory_mb * 1024 * 1024
-            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
-            
-            # Set CPU time limit (soft limit)
-            resource.setrlimit(resource.RLIMIT_CPU, (60, 120))
-            
-            # Limit number of processes
-            resource.setrlimit(resource.RLIMIT_NPROC, (10, 10))
-        except Exception as e:
-            # Resource limits may not work on all platforms
-            pass
+        """Set resource limits for subprocess (shared with the warm pool)"""
+        set_resource_limits(max_memory_mb)
     
     def cleanup(self):
         """Cleanup temporary directories"""
@@ -567,8 +654,13 @@ class CodingAgent(BaseAgent):
     def __init__(self, config: AgentConfig):
         super().__init__(config)
         
+        # Warm interpreter pool
+        pool_settings = {'enabled': True, **config.config_data.get('sandbox_pool', {})}
+        pool_config = SandboxPoolConfig.from_dict(pool_settings)
+        pool_config.default_memory_mb = config.config_data.get('default_memory_mb', 512)
+        
         # Coding agent specific components
-        self.executor = CodeExecutor(self.logger)
+        self.executor = CodeExecutor(self.logger, pool_config)
         self.coding_metrics = CodingAgentMetrics()
         
         # Cache configuration
@@ -718,15 +810,40 @@ class CodingAgent(BaseAgent):
                 self.coding_metrics.sql_executions += 1
             
             # Update average execution time
+            alpha = 0.1
             if self.coding_metrics.total_executions == 1:
                 self.coding_metrics.avg_execution_time_ms = result.execution_time_ms
             else:
-                alpha = 0.1
                 self.coding_metrics.avg_execution_time_ms = (
                     alpha * result.execution_time_ms +
                     (1 - alpha) * self.coding_metrics.avg_execution_time_ms
                 )
             
+            # Track cold vs warm latency separately
+            if result.warm:
+                self.coding_metrics.warm_executions += 1
+                if self.coding_metrics.warm_executions == 1:
+                    self.coding_metrics.avg_warm_execution_time_ms = result.execution_time_ms
+                else:
+                    self.coding_metrics.avg_warm_execution_time_ms = (
+                        alpha * result.execution_time_ms +
+                        (1 - alpha) * self.coding_metrics.avg_warm_execution_time_ms
+                    )
+            elif result.status != ExecutionStatus.SECURITY_VIOLATION:
+                self.coding_metrics.cold_executions += 1
+                if self.coding_metrics.cold_executions == 1:
+                    self.coding_metrics.avg_cold_execution_time_ms = result.execution_time_ms
+                else:
+                    self.coding_metrics.avg_cold_execution_time_ms = (
+                        alpha * result.execution_time_ms +
+                        (1 - alpha) * self.coding_metrics.avg_cold_execution_time_ms
+                    )
+            
+            if self.executor.pool:
+                pool_stats = self.executor.pool.stats
+                self.coding_metrics.pool_recycles = pool_stats['recycles']
+                self.coding_metrics.pool_queue_rejections = pool_stats['queue_rejections']
+            
             # Cache successful results
             if self.enable_caching and self.redis and result.status == ExecutionStatus.SUCCESS:
                 cache_key = exec_request.get_cache_key()
@@ -988,6 +1105,8 @@ class CodingAgent(BaseAgent):
         """Get enhanced status with coding metrics"""
         base_status = await super().get_status()
         base_status['coding_metrics'] = self.coding_metrics.to_dict()
+        if self.executor.pool:
+            base_status['sandbox_pool'] = self.executor.pool.get_stats()
         return base_status
     
     async def get_health(self) -> Dict[str, Any]:
@@ -1012,11 +1131,19 @@ class CodingAgent(BaseAgent):
         
         return base_health
     
+    async def start(self) -> bool:
+        """Start the agent and warm the sandbox pool"""
+        started = await super().start()
+        if started:
+            await self.executor.start_pool()
+        return started
+    
     async def stop(self):
         """Enhanced cleanup for coding agent"""
         self.logger.info("Stopping CodingAgent and cleaning up resources")
         
-        # Cleanup executor resources
+        # Stop warm workers and cleanup executor resources
+        await self.executor.stop_pool()
         self.executor.cleanup()
         
         # Call parent stop
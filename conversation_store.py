@@ -0,0 +1,402 @@
+"""
+Conversation Store
+==================
+Tiered conversation memory for the LLM agent.
+
+- Token counts are tracked incrementally per message and per conversation
+- Context is packed to a token budget: summary first, then the most recent
+  turns that fit
+- A bounded LRU of resident conversations; idle ones are spilled to Redis
+  (or a local directory) in a compressed form and rehydrated on access
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional
+
+# Framing tokens added per chat message (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class MessageRole(Enum):
+    """Message roles in conversations"""
+    SYSTEM = "system"
+    USER = "user"
+    ASSISTANT = "assistant"
+
+
+@dataclass
+class ConversationMessage:
+    """Individual message in a conversation"""
+    role: MessageRole
+    content: str
+    timestamp: float = field(default_factory=time.time)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    token_count: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "role": self.role.value,
+            "content": self.content,
+            "timestamp": self.timestamp,
+            "metadata": self.metadata,
+            "token_count": self.token_count
+        }
+
+
+@dataclass
+class ConversationMemory:
+    """Conversation memory with automatic summarization"""
+    conversation_id: str
+    messages: List[ConversationMessage] = field(default_factory=list)
+    summary: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    total_tokens: int = 0  # Tokens of the messages currently held
+    summary_tokens: int = 0
+
+    def add_message(self, role: MessageRole, content: str, metadata: Optional[Dict] = None, token_count: int = 0):
+        """Add a message to conversation"""
+        msg = ConversationMessage(
+            role=role,
+            content=content,
+            metadata=metadata or {},
+            token_count=int(token_count)
+        )
+        self.messages.append(msg)
+        self.total_tokens += msg.token_count
+        self.updated_at = time.time()
+
+    def get_context_messages(self, max_messages: int = 10) -> List[Dict[str, str]]:
+        """Get recent messages formatted for LLM context"""
+        recent = self.messages[-max_messages:]
+        return [
+            {"role": msg.role.value, "content": msg.content}
+            for msg in recent
+        ]
+
+    def build_context(self, token_budget: int) -> List[Dict[str, str]]:
+        """
+        Summary plus the most recent messages that fit in ``token_budget``
+        The latest message is always included.
+        """
+        remaining = token_budget
+        prefix: List[Dict[str, str]] = []
+        if self.summary:
+            summary_cost = self.summary_tokens + MESSAGE_OVERHEAD_TOKENS
+            if summary_cost < remaining or not self.messages:
+                prefix.append({
+                    "role": MessageRole.SYSTEM.value,
+                    "content": f"Summary of the earlier conversation: {self.summary}"
+                })
+                remaining -= summary_cost
+
+        recent: List[Dict[str, str]] = []
+        for msg in reversed(self.messages):
+            cost = msg.token_count + MESSAGE_OVERHEAD_TOKENS
+            if recent and cost > remaining:
+                break
+            recent.append({"role": msg.role.value, "content": msg.content})
+            remaining -= cost
+        recent.reverse()
+        return prefix + recent
+
+    def get_token_count(self) -> int:
+        """Get total token count"""
+        return self.total_tokens
+
+    def apply_summary(self, summary: str, summary_tokens: int, summarized_count: int):
+        """Replace the first ``summarized_count`` messages with a summary"""
+        removed = self.messages[:summarized_count]
+        self.messages = self.messages[summarized_count:]
+        self.total_tokens -= sum(msg.token_count for msg in removed)
+        self.summary = summary
+        self.summary_tokens = int(summary_tokens)
+        self.updated_at = time.time()
+
+    def to_compact(self) -> str:
+        """Compressed serialized form used when the conversation is spilled"""
+        data = {
+            "id": self.conversation_id,
+            "s": self.summary,
+            "st": self.summary_tokens,
+            "c": self.created_at,
+            "u": self.updated_at,
+            "md": self.metadata,
+            "m": [
+                [msg.role.value, msg.content, msg.timestamp, msg.token_count, msg.metadata or None]
+                for msg in self.messages
+            ]
+        }
+        raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        return base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+
+    @classmethod
+    def from_compact(cls, blob: str) -> 'ConversationMemory':
+        data = json.loads(zlib.decompress(base64.b64decode(blob)))
+        messages = [
+            ConversationMessage(
+                role=MessageRole(role),
+                content=content,
+                timestamp=timestamp,
+                metadata=metadata or {},
+                token_count=token_count
+            )
+            for role, content, timestamp, token_count, metadata in data["m"]
+        ]
+        return cls(
+            conversation_id=data["id"],
+            messages=messages,
+            summary=data["s"],
+            created_at=data["c"],
+            updated_at=data["u"],
+            metadata=data["md"],
+            total_tokens=sum(msg.token_count for msg in messages),
+            summary_tokens=data["st"]
+        )
+
+
+class ConversationStore:
+    """
+    LRU of resident conversations backed by a spill tier
+    Redis is used when available, otherwise one file per conversation in
+    ``spill_dir``. Spilled conversations still referenced by an in-flight
+    request are resurrected rather than reloaded, so no turn is lost.
+    """
+
+    def __init__(
+        self,
+        max_resident: int = 10000,
+        redis_provider: Optional[Callable[[], Any]] = None,
+        spill_dir: Optional[str] = None,
+        ttl_seconds: int = 86400,
+        key_prefix: str = "llm:conversation:",
+        logger: Optional[logging.Logger] = None
+    ):
+        self.max_resident = max_resident
+        self.redis_provider = redis_provider
+        self.spill_dir = spill_dir
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._resident: "OrderedDict[str, ConversationMemory]" = OrderedDict()
+        self._detached: "weakref.WeakValueDictionary[str, ConversationMemory]" = weakref.WeakValueDictionary()
+        self._loading: Dict[str, asyncio.Future] = {}
+
+        self.stats = {
+            "hits": 0,
+            "rehydrated": 0,
+            "resurrected": 0,
+            "misses": 0,
+            "spilled": 0,
+            "spill_errors": 0,
+            "spilled_bytes": 0
+        }
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self._resident
+
+    def resident(self) -> List[ConversationMemory]:
+        return list(self._resident.values())
+
+    @property
+    def _redis(self) -> Any:
+        return self.redis_provider() if self.redis_provider else None
+
+    def _spill_path(self, conversation_id: str) -> str:
+        safe_id = base64.urlsafe_b64encode(conversation_id.encode("utf-8")).decode("ascii")
+        return os.path.join(self.spill_dir, f"{safe_id}.conv")
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+
+    async def get(self, conversation_id: str) -> Optional[ConversationMemory]:
+        """Resident conversation, or one rehydrated from the spill tier"""
+        conversation = self._resident.get(conversation_id)
+        if conversation is not None:
+            self._resident.move_to_end(conversation_id)
+            self.stats["hits"] += 1
+            return conversation
+
+        conversation = self._detached.get(conversation_id)
+        if conversation is not None:
+            self.stats["resurrected"] += 1
+        else:
+            # Concurrent requests for the same spilled conversation share one load
+            loading = self._loading.get(conversation_id)
+            if loading is None:
+                loading = asyncio.ensure_future(self._load(conversation_id))
+                self._loading[conversation_id] = loading
+                loading.add_done_callback(lambda _: self._loading.pop(conversation_id, None))
+            conversation = await asyncio.shield(loading)
+            if conversation is None:
+                self.stats["misses"] += 1
+                return None
+            if conversation_id in self._resident:
+                return self._resident[conversation_id]
+            self.stats["rehydrated"] += 1
+
+        await self._admit(conversation)
+        return conversation
+
+    async def get_or_create(self, conversation_id: str) -> ConversationMemory:
+        conversation = await self.get(conversation_id)
+        if conversation is None:
+            conversation = ConversationMemory(conversation_id=conversation_id)
+            await self._admit(conversation)
+        return conversation
+
+    async def touch(self, conversation: ConversationMemory):
+        """Mark a conversation as used after modifying it (re-admits it if it was spilled meanwhile)"""
+        if conversation.conversation_id in self._resident:
+            self._resident.move_to_end(conversation.conversation_id)
+        else:
+            await self._admit(conversation)
+
+    async def delete(self, conversation_id: str) -> bool:
+        found = self._resident.pop(conversation_id, None) is not None
+        self._detached.pop(conversation_id, None)
+        return await self._delete_spilled(conversation_id) or found
+
+    async def _admit(self, conversation: ConversationMemory):
+        self._resident[conversation.conversation_id] = conversation
+        self._resident.move_to_end(conversation.conversation_id)
+        while len(self._resident) > self.max_resident:
+            _, oldest = self._resident.popitem(last=False)
+            await self._spill(oldest)
+
+    # ------------------------------------------------------------------
+    # Spill tier
+    # ------------------------------------------------------------------
+
+    async def _spill(self, conversation: ConversationMemory):
+        """Write a conversation to the spill tier; it stays reachable while referenced"""
+        self._detached[conversation.conversation_id] = conversation
+        blob = conversation.to_compact()
+        try:
+            redis = self._redis
+            if redis is not None:
+                await redis.set(self.key_prefix + conversation.conversation_id, blob, ex=self.ttl_seconds)
+            elif self.spill_dir:
+                await asyncio.to_thread(self._write_file, conversation.conversation_id, blob)
+            else:
+                return  # No spill tier configured: eviction drops the conversation
+            self.stats["spilled"] += 1
+            self.stats["spilled_bytes"] += len(blob)
+        except Exception as e:
+            self.stats["spill_errors"] += 1
+            self.logger.error(f"Failed to spill conversation {conversation.conversation_id}: {e}")
+
+    def _write_file(self, conversation_id: str, blob: str):
+        path = self._spill_path(conversation_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+
+    def _read_file(self, conversation_id: str) -> Optional[str]:
+        try:
+            with open(self._spill_path(conversation_id)) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def _load(self, conversation_id: str) -> Optional[ConversationMemory]:
+        try:
+            redis = self._redis
+            if redis is not None:
+                blob = await redis.get(self.key_prefix + conversation_id)
+            elif self.spill_dir:
+                blob = await asyncio.to_thread(self._read_file, conversation_id)
+            else:
+                blob = None
+            if not blob:
+                return None
+            if isinstance(blob, bytes):
+                blob = blob.decode("ascii")
+            return ConversationMemory.from_compact(blob)
+        except Exception as e:
+            self.logger.error(f"Failed to rehydrate conversation {conversation_id}: {e}")
+            return None
+
+    async def _delete_spilled(self, conversation_id: str) -> bool:
+        try:
+            redis = self._redis
+            if redis is not None:
+                return bool(await redis.delete(self.key_prefix + conversation_id))
+            if self.spill_dir:
+                path = self._spill_path(conversation_id)
+                if os.path.exists(path):
+                    await asyncio.to_thread(os.remove, path)
+                    return True
+        except Exception as e:
+            self.logger.error(f"Failed to delete spilled conversation {conversation_id}: {e}")
+        return False
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    async def spill_idle(self, idle_seconds: float) -> int:
+        """Move conversations idle for longer than ``idle_seconds`` out of memory"""
+        cutoff = time.time() - idle_seconds
+        idle = [c for c in self._resident.values() if c.updated_at < cutoff]
+        for conversation in idle:
+            del self._resident[conversation.conversation_id]
+            await self._spill(conversation)
+        return len(idle)
+
+    async def expire(self, max_age_seconds: float) -> int:
+        """Drop conversations not updated within ``max_age_seconds`` (Redis expires them by TTL)"""
+        cutoff = time.time() - max_age_seconds
+        expired = [cid for cid, c in self._resident.items() if c.updated_at < cutoff]
+        for conversation_id in expired:
+            del self._resident[conversation_id]
+            await self._delete_spilled(conversation_id)
+
+        if self._redis is None and self.spill_dir:
+            expired.extend(await asyncio.to_thread(self._expire_files, cutoff))
+        return len(expired)
+
+    def _expire_files(self, cutoff: float) -> List[str]:
+        removed = []
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed.append(name)
+            except OSError:
+                pass
+        return removed
+
+    async def flush(self):
+        """Spill every resident conversation (used on shutdown)"""
+        for conversation in list(self._resident.values()):
+            await self._spill(conversation)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "resident": len(self._resident),
+            "max_resident": self.max_resident,
+            "backend": "redis" if self._redis is not None else ("disk" if self.spill_dir else "none")
+        }
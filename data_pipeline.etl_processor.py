@@ -577,7 +577,7 @@ async def get_analytics_dashboard(
     current_user: UserRecord = Depends(get_current_active_user)
 ):
     """Get analytics dashboard data"""
-    dashboard = RealTimeAnalyticsDashboard()
+    dashboard = await get_shared_dashboard()
     data = await dashboard.get_dashboard_data(timeframe)
     return data
 
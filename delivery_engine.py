@@ -0,0 +1,351 @@
+"""
+Priority Delivery Engine
+========================
+Per-recipient outbound message queues for the communication agent.
+
+Each recipient has a heap ordered by priority (highest first), then expiry
+(soonest first), then arrival. A recipient's queue is served by its own worker
+task, started the moment a message is enqueued or the recipient becomes
+available again, so recipients are served concurrently and nothing waits for a
+polling tick. Each worker keeps at most ``max_in_flight`` sends outstanding and
+is paced by a token bucket rather than fixed sleeps. Expired messages are
+dropped when they reach the head of the queue.
+
+The time every message spent queued is recorded in a latency histogram per
+priority. A low-frequency sweep restarts workers for recipients that became
+available without a notification (e.g. a circuit breaker closing).
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from circuit_breaker import LatencyHistogram
+
+
+class _PacingBucket:
+    """Token bucket refilled at ``rate`` tokens/s, holding at most ``burst``"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def delay(self) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _RecipientQueue:
+    """Heap, pacing and in-flight state for one recipient"""
+
+    def __init__(self, max_in_flight: int, rate: float, burst: float):
+        # Entries: [-priority, expires_at, seq, message, enqueued_at, future]
+        self.heap: List[list] = []
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.bucket = _PacingBucket(rate, burst)
+        self.in_flight = 0
+        self.worker: Optional[asyncio.Task] = None
+
+
+class DeliveryEngine:
+    """
+    Event-driven, priority-ordered delivery to many recipients
+
+    Usage:
+        engine = DeliveryEngine(send=send_to_agent, is_available=agent_is_active)
+        engine.start()
+        engine.enqueue("agent-a", message, priority=4, expires_at=time.time() + 60)
+        delivered = await engine.enqueue("agent-b", message, 2, expiry, wait=True)
+        engine.wake("agent-a")                 # e.g. presence changed to ACTIVE
+        await engine.stop()
+
+    ``send(recipient, message)`` performs the actual delivery and raises on
+    failure. Messages must have an ``id`` attribute.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, Any], Awaitable[None]],
+        is_available: Callable[[str], bool],
+        max_in_flight: int = 16,
+        rate_per_second: float = 500.0,
+        burst: float = 100.0,
+        max_queue_size: int = 10000,
+        sweep_interval: float = 1.0,
+        on_expired: Optional[Callable[[str, Any], None]] = None,
+        on_dropped: Optional[Callable[[str, Any], None]] = None,
+        priority_labels: Optional[Dict[int, str]] = None,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.send = send
+        self.is_available = is_available
+        self.max_in_flight = max_in_flight
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_queue_size = max_queue_size
+        self.sweep_interval = sweep_interval
+        self.on_expired = on_expired
+        self.on_dropped = on_dropped
+        self.priority_labels = priority_labels or {}
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._queues: Dict[str, _RecipientQueue] = {}
+        self._sequence = itertools.count()
+        self._queued = 0  # entries across all heaps, kept in step with every push and pop
+        self._sweeper: Optional[asyncio.Task] = None
+        self._sends: Set[asyncio.Task] = set()
+        self._closing = False
+
+        self.queue_wait: Dict[str, LatencyHistogram] = {}
+        self.stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "expired": 0,
+            "dropped": 0,
+            "max_total_queued": 0
+        }
+
+    # ------------------------------------------------------------------ queueing
+
+    def enqueue(
+        self,
+        recipient: str,
+        message: Any,
+        priority: int,
+        expires_at: float,
+        wait: bool = False
+    ) -> Optional[asyncio.Future]:
+        """
+        Queue a message and wake the recipient's worker. With ``wait=True``
+        returns a future that resolves to True once sent, or False if the send
+        failed, the message expired or it was dropped from a full queue.
+        """
+        queue = self._queues.get(recipient)
+        if queue is None:
+            queue = self._queues[recipient] = _RecipientQueue(self.max_in_flight, self.rate_per_second, self.burst)
+
+        future = asyncio.get_running_loop().create_future() if wait else None
+        entry = [-priority, expires_at, next(self._sequence), message, time.monotonic(), future]
+
+        if len(queue.heap) >= self.max_queue_size:
+            worst = max(queue.heap)
+            if entry >= worst:
+                self._drop(recipient, entry)
+                return future
+            queue.heap.remove(worst)
+            heapq.heapify(queue.heap)
+            self._queued -= 1
+            self._drop(recipient, worst)
+
+        heapq.heappush(queue.heap, entry)
+        self._queued += 1
+        self.stats["enqueued"] += 1
+        self.stats["max_total_queued"] = max(self.stats["max_total_queued"], self._queued)
+        self._start_worker(recipient, queue)
+        return future
+
+    def cancel(self, message_id: str) -> int:
+        """Remove a message from every queue; returns how many entries were removed"""
+        removed = 0
+        for queue in self._queues.values():
+            kept = [entry for entry in queue.heap if getattr(entry[3], "id", None) != message_id]
+            if len(kept) != len(queue.heap):
+                for entry in queue.heap:
+                    if getattr(entry[3], "id", None) == message_id:
+                        self._resolve(entry, False)
+                removed += len(queue.heap) - len(kept)
+                self._queued -= len(queue.heap) - len(kept)
+                heapq.heapify(kept)
+                queue.heap = kept
+        return removed
+
+    def purge_expired(self) -> int:
+        """Drop expired messages anywhere in the queues, not only at the head"""
+        now = time.time()
+        purged = 0
+        for recipient, queue in self._queues.items():
+            live = [entry for entry in queue.heap if entry[1] > now]
+            if len(live) != len(queue.heap):
+                for entry in queue.heap:
+                    if entry[1] <= now:
+                        self._expire(recipient, entry)
+                purged += len(queue.heap) - len(live)
+                self._queued -= len(queue.heap) - len(live)
+                heapq.heapify(live)
+                queue.heap = live
+        return purged
+
+    def wake(self, recipient: Optional[str] = None):
+        """Start serving a recipient (or every recipient) that has queued messages"""
+        targets = [recipient] if recipient is not None else list(self._queues)
+        for name in targets:
+            queue = self._queues.get(name)
+            if queue is not None:
+                self._start_worker(name, queue)
+
+    # ------------------------------------------------------------------ workers
+
+    def _start_worker(self, recipient: str, queue: _RecipientQueue):
+        if self._closing or queue.worker is not None or not queue.heap:
+            return
+        if not self.is_available(recipient):
+            return
+        queue.worker = asyncio.create_task(self._serve(recipient, queue))
+
+    async def _serve(self, recipient: str, queue: _RecipientQueue):
+        try:
+            while queue.heap and not self._closing and self.is_available(recipient):
+                await queue.slots.acquire()
+                try:
+                    delay = queue.bucket.delay()
+                    while delay > 0:
+                        await asyncio.sleep(delay)
+                        delay = queue.bucket.delay()
+                except asyncio.CancelledError:
+                    # The slot is only handed over once the send task exists
+                    queue.slots.release()
+                    raise
+
+                entry = self._pop_live(recipient, queue)
+                if entry is None or self._closing or not self.is_available(recipient):
+                    if entry is not None:
+                        heapq.heappush(queue.heap, entry)
+                        self._queued += 1
+                    queue.slots.release()
+                    break
+
+                queue.bucket.take()
+                self._observe_wait(entry)
+                queue.in_flight += 1
+                send = asyncio.create_task(self._send_one(recipient, queue, entry))
+                self._sends.add(send)
+                send.add_done_callback(self._sends.discard)
+        except Exception as e:
+            self.logger.error(f"Delivery worker for {recipient} failed: {e}")
+        finally:
+            queue.worker = None
+
+    def _pop_live(self, recipient: str, queue: _RecipientQueue) -> Optional[list]:
+        now = time.time()
+        while queue.heap:
+            entry = heapq.heappop(queue.heap)
+            self._queued -= 1
+            if entry[1] > now:
+                return entry
+            self._expire(recipient, entry)
+        return None
+
+    async def _send_one(self, recipient: str, queue: _RecipientQueue, entry: list):
+        try:
+            await self.send(recipient, entry[3])
+            self.stats["sent"] += 1
+            self._resolve(entry, True)
+        except asyncio.CancelledError:
+            self._resolve(entry, False)
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            self._resolve(entry, False)
+            self.logger.debug(f"Delivery to {recipient} failed: {e}")
+        finally:
+            queue.in_flight -= 1
+            queue.slots.release()
+
+    # ------------------------------------------------------------------ bookkeeping
+
+    def _resolve(self, entry: list, delivered: bool):
+        future = entry[5]
+        if future is not None and not future.done():
+            future.set_result(delivered)
+
+    def _expire(self, recipient: str, entry: list):
+        self.stats["expired"] += 1
+        self._resolve(entry, False)
+        if self.on_expired:
+            self.on_expired(recipient, entry[3])
+
+    def _drop(self, recipient: str, entry: list):
+        self.stats["dropped"] += 1
+        self._resolve(entry, False)
+        if self.on_dropped:
+            self.on_dropped(recipient, entry[3])
+
+    def _observe_wait(self, entry: list):
+        priority = -entry[0]
+        label = self.priority_labels.get(priority, str(priority))
+        histogram = self.queue_wait.get(label)
+        if histogram is None:
+            histogram = self.queue_wait[label] = LatencyHistogram()
+        histogram.observe(time.monotonic() - entry[4])
+
+    # ------------------------------------------------------------------ lifecycle
+
+    async def _sweep(self):
+        while not self._closing:
+            await asyncio.sleep(self.sweep_interval)
+            for recipient, queue in list(self._queues.items()):
+                if not queue.heap and queue.worker is None and queue.in_flight == 0:
+                    del self._queues[recipient]
+                else:
+                    self._start_worker(recipient, queue)
+
+    def start(self):
+        """Start the availability sweep"""
+        self._closing = False
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """
+        Stop workers; queued messages stay queued. Sends already in flight get
+        ``drain_timeout`` seconds to finish and are cancelled after that.
+        """
+        self._closing = True
+        tasks = [queue.worker for queue in self._queues.values() if queue.worker is not None]
+        if self._sweeper is not None:
+            tasks.append(self._sweeper)
+            self._sweeper = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        sends = list(self._sends)
+        if sends:
+            _, pending = await asyncio.wait(sends, timeout=drain_timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # ------------------------------------------------------------------ metrics
+
+    def queue_depth(self, recipient: str) -> int:
+        queue = self._queues.get(recipient)
+        return len(queue.heap) if queue else 0
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {recipient: len(queue.heap) for recipient, queue in self._queues.items() if queue.heap}
+
+    def total_queued(self) -> int:
+        return self._queued
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Counters, in-flight sends and queue-wait histograms per priority"""
+        return {
+            **self.stats,
+            "total_queued": self.total_queued(),
+            "in_flight": sum(queue.in_flight for queue in self._queues.values()),
+            "active_workers": sum(1 for queue in self._queues.values() if queue.worker is not None),
+            "queue_wait": {label: histogram.snapshot() for label, histogram in self.queue_wait.items()}
+        }
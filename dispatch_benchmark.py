@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Task Dispatch Benchmark
+Per-task dispatch overhead of TaskOrchestrator with many simulated agents:
+the pull-based dispatcher (agents take queued tasks as their slots free up)
+against the previous path, where polling workers ran AgentDiscovery and the
+registry's locked load counters for every task. Task execution is a no-op,
+so the numbers are pure routing and bookkeeping cost.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, List
+
+import structlog
+
+from agent_discovery import AgentDiscovery, DiscoveryRequest, DiscoveryStrategy
+from agent_registry import AgentRegistry
+from task_dispatcher import TaskDispatcher
+from task_orchestrator import TaskOrchestrator, TaskPriority, TaskRequest
+
+
+class _NoopOrchestrator(TaskOrchestrator):
+    async def _execute_on_agent(self, agent: Any, request: TaskRequest) -> Any:
+        return None
+
+
+async def _registry(agents: int, capabilities: List[str], max_load: int, rng: random.Random) -> AgentRegistry:
+    registry = AgentRegistry()
+    for n in range(agents):
+        await registry.register_agent(
+            agent_id=f"agent-{n}", agent_name=f"agent-{n}", agent_type="worker",
+            capabilities=rng.sample(capabilities, rng.randint(1, 3)), version="1.0",
+            host="localhost", port=9000 + n, max_load=max_load
+        )
+    return registry
+
+
+def _requests(tasks: int, capabilities: List[str], rng: random.Random) -> List[TaskRequest]:
+    priorities = list(TaskPriority)
+    return [
+        TaskRequest(task_id=f"task-{n}", capability=rng.choice(capabilities), priority=rng.choice(priorities))
+        for n in range(tasks)
+    ]
+
+
+async def bench_orchestrator(agents: int, tasks: int, capabilities: List[str], max_load: int,
+                             seed: int) -> Dict[str, Any]:
+    """submit_batch ``tasks`` no-op tasks and wait until every one has completed"""
+    rng = random.Random(seed)
+    registry = await _registry(agents, capabilities, max_load, rng)
+    orchestrator = _NoopOrchestrator(registry, AgentDiscovery(registry), max_concurrent_tasks=agents * max_load)
+    await orchestrator.start()
+    requests = _requests(tasks, capabilities, rng)
+
+    start = time.perf_counter()
+    await orchestrator.submit_batch(requests)
+    while orchestrator._active_tasks:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+    await orchestrator.stop()
+
+    completed = len(orchestrator._completed_tasks)
+    return {"tasks": completed, "seconds": elapsed, "us_per_task": elapsed / completed * 1e6,
+            "tasks_per_second": completed / elapsed}
+
+
+def bench_dispatcher(agents: int, tasks: int, capabilities: List[str], max_load: int, seed: int) -> Dict[str, Any]:
+    """The matching engine alone: queue everything, then release slots until drained"""
+    rng = random.Random(seed)
+    dispatcher = TaskDispatcher()
+    for n in range(agents):
+        dispatcher.update_agent(f"agent-{n}", rng.sample(capabilities, rng.randint(1, 3)), max_load)
+    entries = [(f"task-{n}", n, rng.choice(capabilities), rng.randint(1, 5)) for n in range(tasks)]
+
+    start = time.perf_counter()
+    running = dispatcher.submit_many(entries)
+    done = 0
+    while running:
+        _, slots = running.pop()
+        running.extend(dispatcher.release(slots.agent_id))
+        done += 1
+    elapsed = time.perf_counter() - start
+    return {"tasks": done, "seconds": elapsed, "us_per_task": elapsed / done * 1e6}
+
+
+async def bench_legacy(agents: int, tasks: int, capabilities: List[str], max_load: int, workers: int,
+                       seed: int) -> Dict[str, Any]:
+    """The previous loop: priority queue polled by workers, discovery and locked load per task"""
+    rng = random.Random(seed)
+    registry = await _registry(agents, capabilities, max_load, rng)
+    discovery = AgentDiscovery(registry)
+    queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    for request in _requests(tasks, capabilities, rng):
+        queue.put_nowait((-request.priority.value, time.time(), request))
+    done = 0
+
+    async def worker():
+        nonlocal done
+        while True:
+            try:
+                _, _, request = await asyncio.wait_for(queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            agent = await discovery.discover_agent(DiscoveryRequest(
+                capability=request.capability, strategy=DiscoveryStrategy.LEAST_LOADED, min_health_score=0.6
+            ))
+            await registry.increment_load(agent.agent_id)
+            await registry.decrement_load(agent.agent_id)
+            done += 1
+
+    start = time.perf_counter()
+    pool = [asyncio.create_task(worker()) for _ in range(workers)]
+    while done < tasks:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    for task in pool:
+        task.cancel()
+    await asyncio.gather(*pool, return_exceptions=True)
+    return {"tasks": done, "seconds": elapsed, "us_per_task": elapsed / done * 1e6,
+            "tasks_per_second": done / elapsed}
+
+
+async def main():
+    """Run the dispatch benchmark"""
+    parser = argparse.ArgumentParser(description="Task orchestrator dispatch benchmark")
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--legacy-tasks", type=int, default=5000,
+                        help="The previous path is much slower; it is timed on fewer tasks")
+    parser.add_argument("--capabilities", type=int, default=20)
+    parser.add_argument("--max-load", type=int, default=10)
+    parser.add_argument("--legacy-workers", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    # Per-task info logs would swamp what is being measured
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    capabilities = [f"capability_{n}" for n in range(args.capabilities)]
+
+    print(f"Starting dispatch benchmark ({args.agents} agents, {args.capabilities} capabilities)...")
+    results = {
+        "dispatcher": bench_dispatcher(args.agents, args.tasks, capabilities, args.max_load, args.seed),
+        "orchestrator": await bench_orchestrator(args.agents, args.tasks, capabilities, args.max_load, args.seed),
+        "legacy": await bench_legacy(args.agents, args.legacy_tasks, capabilities, args.max_load,
+                                     args.legacy_workers, args.seed)
+    }
+
+    print(f"\n{'path':<14} {'tasks':>8} {'seconds':>9} {'us/task':>9}")
+    for name, stats in results.items():
+        print(f"{name:<14} {stats['tasks']:>8} {stats['seconds']:>9.2f} {stats['us_per_task']:>9.1f}")
+    speedup = results["legacy"]["us_per_task"] / results["orchestrator"]["us_per_task"]
+    print(f"\nOrchestrator dispatch overhead is {speedup:.1f}x lower than the previous path")
+
+    with open("dispatch_benchmark.json", "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
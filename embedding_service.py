@@ -0,0 +1,389 @@
+"""
+Embedding Service
+=================
+Async front-end for sentence embedding models used by RAG.
+
+- Concurrent encode requests are micro-batched into a single model call
+- Encoding runs in a worker thread so the event loop never blocks on the model
+- Vectors are cached by content hash in a bounded LRU; identical in-flight
+  texts share one encode
+- Vector indexes with a common async interface: Qdrant, or a pure-NumPy
+  in-memory index when Qdrant is unavailable
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+try:
+    from qdrant_client.http.models import Distance, VectorParams, PointStruct
+    HAS_QDRANT = True
+except ImportError:
+    HAS_QDRANT = False
+
+_WORD = re.compile(r"\w+")
+
+
+def content_hash(text: str) -> str:
+    """Cache key for a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=65536)
+def _feature_bucket(feature: str, dimensions: int) -> Tuple[int, float]:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dimensions, 1.0 if value >> 63 else -1.0
+
+
+class HashingEncoder:
+    """
+    Dependency-light encoder (feature hashing of word unigrams and bigrams)
+    Exposes the subset of the SentenceTransformer API the service uses; meant
+    for tests, benchmarks and deployments without sentence-transformers.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        if not HAS_NUMPY:
+            raise RuntimeError("HashingEncoder requires numpy")
+        self.dimensions = dimensions
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimensions
+
+    def encode(self, sentences: Sequence[str], **kwargs) -> "np.ndarray":
+        vectors = np.zeros((len(sentences), self.dimensions), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            words = _WORD.findall(sentence.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                index, sign = _feature_bucket(feature, self.dimensions)
+                vectors[row, index] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+@dataclass
+class _PendingEncode:
+    key: str
+    text: str
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class EmbeddingService:
+    """Micro-batching, caching wrapper around an embedding model"""
+
+    def __init__(
+        self,
+        encoder: Any,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        cache_size: int = 10000,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self.logger = logger or logging.getLogger(__name__)
+
+        # One model worker: batches are serialized and the queue fills while
+        # the previous batch encodes, which is what makes batching effective
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "encoded": 0,
+            "batches": 0,
+            "encode_ms_total": 0.0,
+            "queue_wait_ms_total": 0.0
+        }
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.encoder.get_sentence_embedding_dimension())
+
+    async def embed(self, text: str) -> "np.ndarray":
+        """Embedding of a single text"""
+        return (await self.embed_many([text]))[0]
+
+    async def embed_many(self, texts: Sequence[str]) -> List["np.ndarray"]:
+        """Embeddings in input order; misses are encoded in shared batches"""
+        self._ensure_worker()
+        self.stats["requests"] += len(texts)
+
+        keys = [content_hash(text) for text in texts]
+        found: Dict[str, "np.ndarray"] = {}
+        waits: Dict[str, asyncio.Future] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in waits:
+                continue
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                found[key] = cached
+                continue
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+            else:
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = future
+                self._queue.put_nowait(_PendingEncode(key, text, future))
+            waits[key] = future
+
+        if waits:
+            # Shielded: a caller giving up must not fail other waiters on the same text
+            await asyncio.gather(*(asyncio.shield(f) for f in waits.values()))
+
+        return [found[key] if key in found else waits[key].result() for key in keys]
+
+    def _ensure_worker(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._batch_loop())
+
+    async def _next_batch(self) -> List[_PendingEncode]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        yielded = False
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            if not yielded:
+                # Let callers scheduled in the same loop tick enqueue first
+                yielded = True
+                await asyncio.sleep(0)
+                continue
+            if len(batch) > 1:
+                break  # Requests arrived together; don't hold them for stragglers
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            start = time.monotonic()
+            try:
+                vectors = await loop.run_in_executor(
+                    self._executor, self._encode_sync, [item.text for item in batch]
+                )
+            except Exception as e:
+                self.logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+                for item in batch:
+                    self._inflight.pop(item.key, None)
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["encoded"] += len(batch)
+            self.stats["encode_ms_total"] += (time.monotonic() - start) * 1000
+            for item, vector in zip(batch, vectors):
+                self.stats["queue_wait_ms_total"] += (start - item.enqueued_at) * 1000
+                self._store(item.key, vector)
+                self._inflight.pop(item.key, None)
+                if not item.future.done():
+                    item.future.set_result(vector)
+
+    def _encode_sync(self, texts: List[str]) -> "np.ndarray":
+        vectors = self.encoder.encode(
+            texts, batch_size=len(texts), show_progress_bar=False, convert_to_numpy=True
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+    def _store(self, key: str, vector: "np.ndarray"):
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "cache_size": len(self._cache),
+            "cache_hit_rate": self.stats["cache_hits"] / self.stats["requests"] if self.stats["requests"] else 0.0,
+            "avg_batch_size": self.stats["encoded"] / batches if batches else 0.0,
+            "avg_encode_ms": self.stats["encode_ms_total"] / batches if batches else 0.0,
+            "queued": self._queue.qsize() if self._queue else 0
+        }
+
+    async def close(self):
+        """Stop the batcher and fail anything still waiting"""
+        if self._worker:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for future in self._inflight.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding service closed"))
+        self._inflight.clear()
+        self._executor.shutdown(wait=False)
+
+
+# ----------------------------------------------------------------------
+# Vector indexes
+# ----------------------------------------------------------------------
+
+@dataclass
+class VectorHit:
+    """Search result; mirrors the fields of Qdrant's ScoredPoint that RAG uses"""
+    id: str
+    score: float
+    payload: Dict[str, Any]
+
+
+class _MemoryCollection:
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+        self.vectors = np.zeros((64, dimensions), dtype=np.float32)
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.payloads: List[Dict[str, Any]] = []
+
+    def upsert(self, point_id: str, vector: "np.ndarray", payload: Dict[str, Any]):
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm else vector
+        row = self.rows.get(point_id)
+        if row is None:
+            row = len(self.ids)
+            if row == len(self.vectors):
+                self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+            self.rows[point_id] = row
+            self.ids.append(point_id)
+            self.payloads.append(payload)
+        else:
+            self.payloads[row] = payload
+        self.vectors[row] = vector
+
+    def search(self, vector: "np.ndarray", limit: int) -> List[VectorHit]:
+        count = len(self.ids)
+        if count == 0:
+            return []
+        norm = np.linalg.norm(vector)
+        scores = self.vectors[:count] @ (vector / norm if norm else vector)
+        limit = min(limit, count)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [VectorHit(self.ids[i], float(scores[i]), self.payloads[i]) for i in top]
+
+
+class InMemoryVectorIndex:
+    """Exact cosine search over NumPy matrices, one per collection"""
+
+    backend = "memory"
+
+    def __init__(self):
+        if not HAS_NUMPY:
+            raise RuntimeError("InMemoryVectorIndex requires numpy")
+        self._collections: Dict[str, _MemoryCollection] = {}
+
+    async def ensure_collection(self, name: str, dimensions: int):
+        if name not in self._collections:
+            self._collections[name] = _MemoryCollection(dimensions)
+
+    async def upsert(self, name: str, ids: Sequence[str], vectors: Sequence["np.ndarray"],
+                     payloads: Sequence[Dict[str, Any]]):
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = _MemoryCollection(len(vectors[0]))
+        for point_id, vector, payload in zip(ids, vectors, payloads):
+            collection.upsert(point_id, np.asarray(vector, dtype=np.float32), payload)
+
+    async def search(self, name: str, vector: "np.ndarray", limit: int) -> List[VectorHit]:
+        collection = self._collections.get(name)
+        if collection is None:
+            raise KeyError(f"Collection {name} does not exist")
+        return collection.search(np.asarray(vector, dtype=np.float32), limit)
+
+    def count(self, name: str) -> int:
+        collection = self._collections.get(name)
+        return len(collection.ids) if collection else 0
+
+    async def close(self):
+        self._collections.clear()
+
+
+class QdrantVectorIndex:
+    """Qdrant client calls moved off the event loop"""
+
+    backend = "qdrant"
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    @staticmethod
+    def point_id(doc_id: str) -> str:
+        """Qdrant only accepts UUIDs or integers; other ids map to a stable UUID"""
+        try:
+            return str(uuid.UUID(doc_id))
+        except ValueError:
+            return str(uuid.uuid5(uuid.NAMESPACE_URL, doc_id))
+
+    async def ensure_collection(self, name: str, dimensions: int):
+        def ensure():
+            try:
+                self.client.get_collection(name)
+            except Exception:
+                self.client.create_collection(
+                    collection_name=name,
+                    vectors_config=VectorParams(size=dimensions, distance=Distance.COSINE)
+                )
+        await asyncio.to_thread(ensure)
+
+    async def upsert(self, name: str, ids: Sequence[str], vectors: Sequence["np.ndarray"],
+                     payloads: Sequence[Dict[str, Any]]):
+        points = [
+            PointStruct(id=self.point_id(point_id), vector=[float(v) for v in vector], payload=payload)
+            for point_id, vector, payload in zip(ids, vectors, payloads)
+        ]
+        await asyncio.to_thread(self.client.upsert, collection_name=name, points=points)
+
+    async def search(self, name: str, vector: "np.ndarray", limit: int) -> List[VectorHit]:
+        hits = await asyncio.to_thread(
+            self.client.search,
+            collection_name=name,
+            query_vector=[float(v) for v in vector],
+            limit=limit,
+            with_payload=True
+        )
+        return [VectorHit(hit.payload.get("id", str(hit.id)), hit.score, hit.payload) for hit in hits]
+
+    async def close(self):
+        await asyncio.to_thread(self.client.close)
@@ -4,13 +4,16 @@ Advanced LLM capabilities with RAG, multi-provider support, and enhanced reliabi
 
 Features:
 - Multi-provider LLM support (OpenAI, Anthropic, with easy extensibility)
-- RAG (Retrieval Augmented Generation) with Qdrant
-- Conversation memory management with automatic cleanup
+- RAG (Retrieval Augmented Generation) with Qdrant, or an in-memory NumPy index
+- Micro-batched, cached embeddings computed off the event loop
+- Tiered conversation memory (LRU in memory, spilled to Redis/disk) with
+  token-budgeted context packing and background summarization
 - Intelligent model routing based on complexity
 - Production-grade error handling and recovery
 - Comprehensive metrics and monitoring
 - Token usage tracking and cost optimization
-- Streaming response support
+- Rate-limit aware scheduling of provider calls (RPM/TPM, priorities)
+- Streaming response support (token deltas over NATS with cancellation)
 - Easy to add new LLM providers
 
 Improvements in v2.1:
@@ -27,7 +30,10 @@ import json
 import time
 import uuid
 import os
-from typing import Dict, List, Optional, Any, Set, Callable
+import random
+import re
+import tempfile
+from typing import Dict, List, Optional, Any, Callable, AsyncIterator, Tuple
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from collections import deque
@@ -38,6 +44,16 @@ from enhanced_base_agent import (
     BaseAgent, AgentConfig, TaskRequest, Priority,
     AgentState, ConnectionState, run_agent
 )
+from conversation_store import (
+    ConversationMemory, ConversationStore, MessageRole
+)
+from embedding_service import (
+    EmbeddingService, HashingEncoder, InMemoryVectorIndex, QdrantVectorIndex, HAS_NUMPY
+)
+from llm_call_scheduler import (
+    LLMCallScheduler, ModelRateLimits, is_rate_limit_error, retry_after_seconds
+)
+from circuit_breaker import CircuitBreakerConfig, CircuitBreakerOpenError, CircuitBreakerRegistry
 
 # Third-party imports with graceful degradation
 try:
@@ -56,7 +72,6 @@ except ImportError:
 
 try:
     from qdrant_client import QdrantClient
-    from qdrant_client.http.models import Distance, VectorParams, PointStruct
     QDRANT_AVAILABLE = True
 except ImportError:
     QdrantClient = None
@@ -84,68 +99,6 @@ class LLMProvider(Enum):
     CUSTOM = "custom"  # For future custom providers
 
 
-class MessageRole(Enum):
-    """Message roles in conversations"""
-    SYSTEM = "system"
-    USER = "user"
-    ASSISTANT = "assistant"
-
-
-@dataclass
-class ConversationMessage:
-    """Individual message in a conversation"""
-    role: MessageRole
-    content: str
-    timestamp: float = field(default_factory=time.time)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    token_count: int = 0
-    
-    def to_dict(self) -> Dict[str, Any]:
-        return {
-            "role": self.role.value,
-            "content": self.content,
-            "timestamp": self.timestamp,
-            "metadata": self.metadata,
-            "token_count": self.token_count
-        }
-
-
-@dataclass
-class ConversationMemory:
-    """Conversation memory with automatic summarization"""
-    conversation_id: str
-    messages: List[ConversationMessage] = field(default_factory=list)
-    summary: Optional[str] = None
-    created_at: float = field(default_factory=time.time)
-    updated_at: float = field(default_factory=time.time)
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    total_tokens: int = 0
-    
-    def add_message(self, role: MessageRole, content: str, metadata: Optional[Dict] = None, token_count: int = 0):
-        """Add a message to conversation"""
-        msg = ConversationMessage(
-            role=role,
-            content=content,
-            metadata=metadata or {},
-            token_count=token_count
-        )
-        self.messages.append(msg)
-        self.total_tokens += token_count
-        self.updated_at = time.time()
-    
-    def get_context_messages(self, max_messages: int = 10) -> List[Dict[str, str]]:
-        """Get recent messages formatted for LLM context"""
-        recent = self.messages[-max_messages:]
-        return [
-            {"role": msg.role.value, "content": msg.content}
-            for msg in recent
-        ]
-    
-    def get_token_count(self) -> int:
-        """Get total token count"""
-        return sum(msg.token_count for msg in self.messages)
-
-
 @dataclass
 class RAGDocument:
     """Document for RAG indexing"""
@@ -156,6 +109,31 @@ class RAGDocument:
     created_at: float = field(default_factory=time.time)
 
 
+@dataclass
+class StreamChunk:
+    """Incremental piece of a streamed completion; the final chunk carries usage"""
+    content: str = ""
+    finish_reason: Optional[str] = None
+    tokens_used: Optional[Dict[str, int]] = None
+    model: Optional[str] = None
+    cost: Optional[float] = None
+    
+    @property
+    def is_final(self) -> bool:
+        return self.tokens_used is not None
+
+
+async def _iterate_with_timeout(stream, timeout: float):
+    """Iterate an async stream, failing if no item arrives within ``timeout`` seconds"""
+    iterator = stream.__aiter__()
+    while True:
+        try:
+            item = await asyncio.wait_for(iterator.__anext__(), timeout=timeout)
+        except StopAsyncIteration:
+            return
+        yield item
+
+
 @dataclass
 class LLMConfig:
     """Configuration for LLM model"""
@@ -171,6 +149,9 @@ class LLMConfig:
     timeout: int = 60
     cost_per_1k_prompt: float = 0.0
     cost_per_1k_completion: float = 0.0
+    requests_per_minute: int = 0  # 0 = unlimited
+    tokens_per_minute: int = 0
+    context_window: int = 0  # 0 = unknown, only the history budget applies
 
 
 class BaseLLMProvider(ABC):
@@ -201,6 +182,25 @@ class BaseLLMProvider(ABC):
         """
         pass
     
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        config: LLMConfig
+    ) -> AsyncIterator[StreamChunk]:
+        """
+        Stream completion deltas
+        Yields content chunks followed by one final chunk with tokens_used.
+        Closing the iterator early must abort the upstream request.
+        Providers without native streaming fall back to a single delta.
+        """
+        response = await self.generate(messages, config)
+        yield StreamChunk(content=response["content"])
+        yield StreamChunk(
+            finish_reason="stop",
+            tokens_used=response["tokens_used"],
+            model=response["model"]
+        )
+    
     @abstractmethod
     async def close(self):
         """Cleanup provider resources"""
@@ -250,6 +250,55 @@ class OpenAIProvider(BaseLLMProvider):
             "model": config.model
         }
     
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        config: LLMConfig
+    ) -> AsyncIterator[StreamChunk]:
+        if not self.client:
+            raise RuntimeError("Provider not initialized")
+        
+        response = await asyncio.wait_for(
+            self.client.chat.completions.create(
+                model=config.model,
+                messages=messages,
+                max_tokens=config.max_tokens,
+                temperature=config.temperature,
+                top_p=config.top_p,
+                frequency_penalty=config.frequency_penalty,
+                presence_penalty=config.presence_penalty,
+                stream=True,
+                stream_options={"include_usage": True}
+            ),
+            timeout=config.timeout
+        )
+        
+        usage = None
+        finish_reason = None
+        try:
+            async for chunk in _iterate_with_timeout(response, config.timeout):
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    if choice.delta and choice.delta.content:
+                        yield StreamChunk(content=choice.delta.content)
+                    if choice.finish_reason:
+                        finish_reason = choice.finish_reason
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+        finally:
+            # Closing the HTTP stream stops generation upstream on early exit
+            await response.close()
+        
+        yield StreamChunk(
+            finish_reason=finish_reason or "stop",
+            tokens_used={
+                "prompt": usage.prompt_tokens if usage else 0,
+                "completion": usage.completion_tokens if usage else 0,
+                "total": usage.total_tokens if usage else 0
+            },
+            model=config.model
+        )
+    
     async def close(self):
         if self.client:
             await self.client.close()
@@ -303,11 +352,125 @@ class AnthropicProvider(BaseLLMProvider):
             "model": config.model
         }
     
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        config: LLMConfig
+    ) -> AsyncIterator[StreamChunk]:
+        if not self.client:
+            raise RuntimeError("Provider not initialized")
+        
+        system_message = next(
+            (m["content"] for m in messages if m["role"] == "system"),
+            None
+        )
+        request = {
+            "model": config.model,
+            "max_tokens": config.max_tokens,
+            "temperature": config.temperature,
+            "messages": [m for m in messages if m["role"] != "system"]
+        }
+        if system_message:
+            request["system"] = system_message
+        
+        # Leaving the context manager early closes the HTTP stream
+        async with self.client.messages.stream(**request) as response:
+            async for text in _iterate_with_timeout(response.text_stream, config.timeout):
+                if text:
+                    yield StreamChunk(content=text)
+            final_message = await response.get_final_message()
+        
+        yield StreamChunk(
+            finish_reason=final_message.stop_reason or "stop",
+            tokens_used={
+                "prompt": final_message.usage.input_tokens,
+                "completion": final_message.usage.output_tokens,
+                "total": final_message.usage.input_tokens + final_message.usage.output_tokens
+            },
+            model=config.model
+        )
+    
     async def close(self):
         if self.client:
             await self.client.close()
 
 
+class StubLLMProvider(BaseLLMProvider):
+    """
+    Deterministic in-process provider for tests and latency benchmarks
+    Emits the configured text (or echoes the last user message) word by word
+    after a fixed time-to-first-token, at a fixed token rate.
+    """
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        response_text: Optional[str] = None,
+        time_to_first_token_ms: float = 200.0,
+        tokens_per_second: float = 50.0
+    ):
+        super().__init__(api_key)
+        self.response_text = response_text
+        self.time_to_first_token_ms = time_to_first_token_ms
+        self.tokens_per_second = tokens_per_second
+    
+    async def initialize(self):
+        self.client = self
+    
+    def _tokens(self, messages: List[Dict[str, str]], config: LLMConfig) -> List[str]:
+        text = self.response_text
+        if text is None:
+            last_user = next(
+                (m["content"] for m in reversed(messages) if m["role"] == "user"),
+                ""
+            )
+            text = f"Echo: {last_user}"
+        return re.findall(r"\S+\s*", text)[:config.max_tokens]
+    
+    def _usage(self, messages: List[Dict[str, str]], completion_tokens: int) -> Dict[str, int]:
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        return {
+            "prompt": prompt_tokens,
+            "completion": completion_tokens,
+            "total": prompt_tokens + completion_tokens
+        }
+    
+    async def generate(
+        self,
+        messages: List[Dict[str, str]],
+        config: LLMConfig
+    ) -> Dict[str, Any]:
+        tokens = self._tokens(messages, config)
+        await asyncio.sleep(
+            self.time_to_first_token_ms / 1000 + max(0, len(tokens) - 1) / self.tokens_per_second
+        )
+        return {
+            "content": "".join(tokens),
+            "tokens_used": self._usage(messages, len(tokens)),
+            "model": config.model
+        }
+    
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        config: LLMConfig
+    ) -> AsyncIterator[StreamChunk]:
+        tokens = self._tokens(messages, config)
+        await asyncio.sleep(self.time_to_first_token_ms / 1000)
+        for index, token in enumerate(tokens):
+            if index:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield StreamChunk(content=token)
+        yield StreamChunk(
+            finish_reason="stop",
+            tokens_used=self._usage(messages, len(tokens)),
+            model=config.model
+        )
+    
+    async def close(self):
+        self.client = None
+
+
 class LLMProviderManager:
     """Manages multiple LLM providers"""
     
@@ -343,6 +506,8 @@ class LLMAgent(BaseAgent):
         # Vector database components
         self.qdrant_client: Optional[QdrantClient] = None
         self.embedding_model: Optional[SentenceTransformer] = None
+        self.embedding_service: Optional[EmbeddingService] = None
+        self.vector_index: Optional[Any] = None  # QdrantVectorIndex or InMemoryVectorIndex
         
         # Model configurations with cost tracking
         self.llm_configs: Dict[str, LLMConfig] = {
@@ -350,6 +515,7 @@ class LLMAgent(BaseAgent):
                 provider=LLMProvider.OPENAI,
                 model="gpt-4-turbo-preview",
                 max_tokens=4096,
+                context_window=128000,
                 temperature=0.7,
                 system_prompt="You are a helpful AI assistant in a production multi-agent system.",
                 cost_per_1k_prompt=0.01,
@@ -360,6 +526,7 @@ class LLMAgent(BaseAgent):
                 provider=LLMProvider.OPENAI,
                 model="gpt-4",
                 max_tokens=4096,
+                context_window=8192,
                 temperature=0.7,
                 system_prompt="You are a helpful AI assistant in a production multi-agent system.",
                 cost_per_1k_prompt=0.03,
@@ -370,6 +537,7 @@ class LLMAgent(BaseAgent):
                 provider=LLMProvider.OPENAI,
                 model="gpt-3.5-turbo",
                 max_tokens=4096,
+                context_window=16385,
                 temperature=0.7,
                 system_prompt="You are a helpful AI assistant in a production multi-agent system.",
                 cost_per_1k_prompt=0.0005,
@@ -380,6 +548,7 @@ class LLMAgent(BaseAgent):
                 provider=LLMProvider.ANTHROPIC,
                 model="claude-3-opus-20240229",
                 max_tokens=4096,
+                context_window=200000,
                 temperature=0.7,
                 system_prompt="You are a helpful AI assistant in a production multi-agent system.",
                 cost_per_1k_prompt=0.015,
@@ -390,6 +559,7 @@ class LLMAgent(BaseAgent):
                 provider=LLMProvider.ANTHROPIC,
                 model="claude-3-sonnet-20240229",
                 max_tokens=4096,
+                context_window=200000,
                 temperature=0.7,
                 system_prompt="You are a helpful AI assistant in a production multi-agent system.",
                 cost_per_1k_prompt=0.003,
@@ -400,6 +570,7 @@ class LLMAgent(BaseAgent):
                 provider=LLMProvider.ANTHROPIC,
                 model="claude-3-haiku-20240307",
                 max_tokens=4096,
+                context_window=200000,
                 temperature=0.7,
                 system_prompt="You are a helpful AI assistant in a production multi-agent system.",
                 cost_per_1k_prompt=0.00025,
@@ -408,11 +579,34 @@ class LLMAgent(BaseAgent):
             )
         }
         
+        # Deterministic stub model for local testing and latency benchmarks
+        if os.getenv("LLM_STUB_PROVIDER"):
+            self.llm_configs["stub"] = LLMConfig(
+                provider=LLMProvider.CUSTOM,
+                model="stub",
+                max_tokens=4096,
+                context_window=8192,
+                system_prompt="You are a helpful AI assistant in a production multi-agent system.",
+                timeout=30
+            )
+        
         # Conversation management
-        self.conversations: Dict[str, ConversationMemory] = {}
         self.max_conversation_age = int(os.getenv("MAX_CONVERSATION_AGE", "86400"))  # 24 hours
         self.max_conversation_messages = int(os.getenv("MAX_CONVERSATION_MESSAGES", "50"))
         self.max_conversation_tokens = int(os.getenv("MAX_CONVERSATION_TOKENS", "100000"))
+        self.conversation_idle_seconds = int(os.getenv("CONVERSATION_IDLE_SECONDS", "900"))
+        self.history_token_budget = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "3000"))
+        self.conversation_store = ConversationStore(
+            max_resident=int(os.getenv("MAX_RESIDENT_CONVERSATIONS", "10000")),
+            redis_provider=lambda: self.redis,
+            spill_dir=os.getenv(
+                "CONVERSATION_SPILL_DIR",
+                os.path.join(tempfile.gettempdir(), f"llm-conversations-{config.agent_id}")
+            ),
+            ttl_seconds=self.max_conversation_age,
+            logger=self.logger
+        )
+        self.summarizing: Dict[str, asyncio.Task] = {}
         
         # RAG collections
         self.rag_collections = {
@@ -435,11 +629,41 @@ class LLMAgent(BaseAgent):
                 "tokens": 0,
                 "errors": 0,
                 "avg_latency_ms": 0,
-                "total_cost": 0.0
+                "total_cost": 0.0,
+                "streams": 0,
+                "avg_ttft_ms": 0,
+                "rate_limited": 0
             }
             for model in self.llm_configs
         }
         
+        # Shared admission control for provider calls; interactive chat runs at
+        # HIGH priority and keeps reserved slots that batch work cannot take
+        self.llm_scheduler = LLMCallScheduler(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+            reserved_slots=int(os.getenv("LLM_RESERVED_INTERACTIVE_SLOTS", "2")),
+            reserved_min_priority=Priority.HIGH.value,
+            logger=self.logger
+        )
+        rate_limit_overrides = json.loads(os.getenv("LLM_RATE_LIMITS", "{}"))
+        for model_key, llm_config in self.llm_configs.items():
+            if model_key in rate_limit_overrides:
+                limits = ModelRateLimits.from_dict(rate_limit_overrides[model_key])
+            else:
+                limits = ModelRateLimits(llm_config.requests_per_minute, llm_config.tokens_per_minute)
+            self.llm_scheduler.set_limits(model_key, limits)
+        self.batch_concurrency = int(os.getenv("LLM_BATCH_CONCURRENCY", "64"))
+        
+        # Streaming replies in flight, keyed by stream_id
+        self.active_streams: Dict[str, asyncio.Task] = {}
+        self.active_batches: Dict[str, asyncio.Task] = {}
+        self.streaming_stats = {
+            "started": 0,
+            "completed": 0,
+            "cancelled": 0,
+            "failed": 0
+        }
+        
         # Tokenizer for accurate token counting
         self.tokenizer: Optional[tiktoken.Encoding] = None
         
@@ -456,14 +680,22 @@ class LLMAgent(BaseAgent):
             "fast_response": "claude-haiku"
         }
         
-        # Circuit breaker tracking per model
-        self.llm_circuit_breakers: Dict[str, Dict[str, Any]] = {}
+        # Circuit breaker and adaptive bulkhead per model. Throttling is the
+        # scheduler's concern, so rate-limit errors never count as failures;
+        # the AIMD limit only backs off on timeouts.
+        self.llm_circuit_breakers = CircuitBreakerRegistry()
         for model_key in self.llm_configs:
-            self.llm_circuit_breakers[model_key] = {
-                "failures": 0,
-                "last_failure": None,
-                "state": "closed"  # closed, open, half-open
-            }
+            self.llm_circuit_breakers.get_or_create(model_key, CircuitBreakerConfig(
+                failure_threshold=5,
+                min_throughput=5,
+                timeout_seconds=60,
+                exclude_predicate=is_rate_limit_error,
+                concurrency_limit=int(os.getenv("LLM_INITIAL_CONCURRENCY", "32")),
+                limit_algorithm="aimd",
+                max_concurrency_limit=int(os.getenv("LLM_MAX_CONCURRENCY", "256")),
+                max_queue_size=int(os.getenv("LLM_MAX_QUEUED_CALLS", "256")),
+                queue_timeout_seconds=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+            ))
     
     async def _initialize_database(self):
         """Initialize database schema for LLM agent"""
@@ -569,6 +801,12 @@ class LLMAgent(BaseAgent):
             queue_group="llm-chat"
         )
         
+        # Stream cancellation is broadcast so the instance owning the stream sees it
+        await self._subscribe(
+            "llm.chat.cancel",
+            self._handle_chat_cancel
+        )
+        
         # Batch processing
         await self._subscribe(
             "llm.batch.process",
@@ -591,7 +829,7 @@ class LLMAgent(BaseAgent):
         
         # Conversation cleanup task
         task = asyncio.create_task(
-            self._run_background_task(self._conversation_cleanup_loop, 3600)
+            self._run_background_task(self._conversation_cleanup_loop, 300)
         )
         self.background_tasks.add(task)
         task.add_done_callback(self.background_tasks.discard)
@@ -633,6 +871,15 @@ class LLMAgent(BaseAgent):
             else:
                 self.logger.warning("Anthropic not available (missing key or library)")
             
+            # Stub provider for local testing
+            if "stub" in self.llm_configs:
+                provider = StubLLMProvider(
+                    time_to_first_token_ms=float(os.getenv("LLM_STUB_TTFT_MS", "200")),
+                    tokens_per_second=float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "50"))
+                )
+                await self.provider_manager.register_provider(LLMProvider.CUSTOM, provider)
+                self.logger.info("Stub LLM provider initialized")
+            
             # Initialize tokenizer
             if TIKTOKEN_AVAILABLE:
                 try:
@@ -646,49 +893,71 @@ class LLMAgent(BaseAgent):
             raise
     
     async def _setup_vector_database(self):
-        """Initialize Qdrant and embedding model"""
-        if not QDRANT_AVAILABLE or not EMBEDDING_AVAILABLE:
+        """
+        Initialize the embedding service and vector index
+        EMBEDDING_MODEL=hashing selects the dependency-free encoder; Qdrant is
+        used when reachable, otherwise (or with VECTOR_INDEX=memory) vectors are
+        kept in an in-process NumPy index.
+        """
+        embedding_model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+        use_hashing = embedding_model_name == "hashing"
+        if not HAS_NUMPY or (not EMBEDDING_AVAILABLE and not use_hashing):
             self.logger.warning("Vector database features disabled (missing dependencies)")
             return
         
         try:
-            qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
-            qdrant_api_key = os.getenv("QDRANT_API_KEY")
-            
-            if qdrant_api_key:
-                self.qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
+            if use_hashing:
+                encoder = HashingEncoder(int(os.getenv("EMBEDDING_DIMENSIONS", "384")))
             else:
-                self.qdrant_client = QdrantClient(url=qdrant_url)
-            
-            # Test connection
-            collections = self.qdrant_client.get_collections()
-            self.logger.info(f"Qdrant connected, {len(collections.collections)} collections found")
-            
-            # Initialize embedding model
-            embedding_model_name = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
-            self.embedding_model = SentenceTransformer(embedding_model_name)
+                # Model loading takes seconds; keep the loop responsive meanwhile
+                encoder = await asyncio.to_thread(SentenceTransformer, embedding_model_name)
+                self.embedding_model = encoder
+            self.embedding_service = EmbeddingService(
+                encoder,
+                max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+                max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "2")),
+                cache_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+                logger=self.logger
+            )
             self.logger.info(f"Embedding model loaded: {embedding_model_name}")
-            
-            # Ensure collections exist
-            for alias, collection_name in self.rag_collections.items():
-                try:
-                    self.qdrant_client.get_collection(collection_name)
-                    self.logger.info(f"Collection '{collection_name}' exists")
-                except:
-                    self.qdrant_client.create_collection(
-                        collection_name=collection_name,
-                        vectors_config=VectorParams(size=384, distance=Distance.COSINE)
-                    )
-                    self.logger.info(f"Collection '{collection_name}' created")
-        
         except Exception as e:
-            self.logger.error(f"Vector database setup failed: {e}")
-            self.qdrant_client = None
+            self.logger.error(f"Embedding model setup failed: {e}")
             self.embedding_model = None
+            return
+        
+        if QDRANT_AVAILABLE and os.getenv("VECTOR_INDEX", "qdrant") != "memory":
+            try:
+                qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
+                qdrant_api_key = os.getenv("QDRANT_API_KEY")
+                
+                if qdrant_api_key:
+                    self.qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
+                else:
+                    self.qdrant_client = QdrantClient(url=qdrant_url)
+                
+                # Test connection
+                collections = await asyncio.to_thread(self.qdrant_client.get_collections)
+                self.logger.info(f"Qdrant connected, {len(collections.collections)} collections found")
+                self.vector_index = QdrantVectorIndex(self.qdrant_client)
+            
+            except Exception as e:
+                self.logger.error(f"Qdrant setup failed, using in-memory vector index: {e}")
+                self.qdrant_client = None
+        
+        if self.vector_index is None:
+            self.vector_index = InMemoryVectorIndex()
+        
+        # Ensure collections exist
+        for collection_name in self.rag_collections.values():
+            await self.vector_index.ensure_collection(collection_name, self.embedding_service.dimensions)
+        self.logger.info(f"Vector index ready ({self.vector_index.backend})")
+    
+    def _rag_available(self) -> bool:
+        return self.vector_index is not None and self.embedding_service is not None
     
     async def _load_initial_knowledge_base(self):
         """Load initial documents into RAG system"""
-        if not self.qdrant_client or not self.embedding_model:
+        if not self._rag_available():
             return
         
         initial_docs = [
@@ -705,12 +974,10 @@ class LLMAgent(BaseAgent):
         ]
         
         indexed = 0
-        for doc in initial_docs:
-            try:
-                await self._index_document(doc, "general_knowledge")
-                indexed += 1
-            except Exception as e:
-                self.logger.error(f"Failed to index document {doc.id}: {e}")
+        try:
+            indexed = await self._index_documents(initial_docs, "general_knowledge")
+        except Exception as e:
+            self.logger.error(f"Failed to index initial documents: {e}")
         
         self.logger.info(f"Loaded {indexed}/{len(initial_docs)} initial documents")
     
@@ -721,7 +988,7 @@ class LLMAgent(BaseAgent):
         
         try:
             if task_type == "generate_text":
-                return await self._generate_text(payload)
+                return await self._generate_text(payload, priority=task_request.priority)
             
             elif task_type == "chat_completion":
                 return await self._chat_completion(payload)
@@ -733,7 +1000,7 @@ class LLMAgent(BaseAgent):
                 return await self._semantic_search(payload)
             
             elif task_type == "summarize_text":
-                return await self._summarize_text(payload)
+                return await self._summarize_text(payload, priority=task_request.priority)
             
             elif task_type == "analyze_sentiment":
                 return await self._analyze_sentiment(payload)
@@ -755,7 +1022,7 @@ class LLMAgent(BaseAgent):
                 "task_id": task_request.task_id
             }
     
-    async def _generate_text(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def _generate_text(self, payload: Dict[str, Any], priority: Priority = Priority.MEDIUM) -> Dict[str, Any]:
         """Generate text using LLM"""
         prompt = payload["prompt"]
         model_key = payload.get("model_key", "gpt35")
@@ -787,7 +1054,7 @@ class LLMAgent(BaseAgent):
             cost_per_1k_completion=llm_config.cost_per_1k_completion
         )
         
-        response = await self._call_llm_with_retry(model_key, custom_config, messages)
+        response = await self._call_llm_with_retry(model_key, custom_config, messages, priority=priority)
         
         return {
             "status": "success",
@@ -797,8 +1064,8 @@ class LLMAgent(BaseAgent):
             "cost": response["cost"]
         }
     
-    async def _chat_completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        """Chat completion with conversation memory and optional RAG"""
+    async def _prepare_chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the user message and build the LLM request for a chat turn"""
         conversation_id = payload.get("conversation_id", str(uuid.uuid4()))
         user_message = payload["message"]
         model_key = payload.get("model_key", "gpt35")
@@ -811,13 +1078,8 @@ class LLMAgent(BaseAgent):
         if not llm_config:
             raise ValueError(f"Unknown model: {model_key}")
         
-        # Get or create conversation
-        if conversation_id not in self.conversations:
-            self.conversations[conversation_id] = ConversationMemory(
-                conversation_id=conversation_id
-            )
-        
-        conversation = self.conversations[conversation_id]
+        # Get or create conversation (rehydrated if it was spilled)
+        conversation = await self.conversation_store.get_or_create(conversation_id)
         
         # Count tokens for user message
         user_token_count = self._count_tokens(user_message)
@@ -834,7 +1096,7 @@ class LLMAgent(BaseAgent):
             })
         
         # Add RAG context if enabled
-        if use_rag and self.qdrant_client and self.embedding_model:
+        if use_rag and self._rag_available():
             rag_docs = await self._perform_rag_search(user_message, rag_collections)
             if rag_docs:
                 rag_context = "\n\nRelevant Information:\n" + "\n---\n".join(
@@ -845,8 +1107,10 @@ class LLMAgent(BaseAgent):
                     "content": f"Context from knowledge base:{rag_context}"
                 })
         
-        # Add conversation history
-        messages.extend(conversation.get_context_messages())
+        # Add conversation history packed to the remaining token budget
+        messages.extend(conversation.build_context(
+            self._history_budget(llm_config, max_tokens, messages)
+        ))
         
         # Create custom config
         custom_config = LLMConfig(
@@ -860,40 +1124,115 @@ class LLMAgent(BaseAgent):
             cost_per_1k_completion=llm_config.cost_per_1k_completion
         )
         
-        # Call LLM
-        response = await self._call_llm_with_retry(model_key, custom_config, messages)
-        
-        # Store assistant response
-        assistant_token_count = response["tokens_used"]["completion"]
+        return {
+            "conversation_id": conversation_id,
+            "conversation": conversation,
+            "model_key": model_key,
+            "config": custom_config,
+            "messages": messages
+        }
+    
+    def _history_budget(self, llm_config: LLMConfig, max_tokens: int, prefix: List[Dict[str, str]]) -> int:
+        """Tokens available for conversation history"""
+        budget = self.history_token_budget
+        if llm_config.context_window:
+            prefix_tokens = sum(self._count_tokens(m["content"]) for m in prefix)
+            budget = min(budget, llm_config.context_window - max_tokens - prefix_tokens)
+        return max(budget, 0)
+    
+    async def _record_chat_reply(self, conversation: ConversationMemory, content: str, completion_tokens: int):
+        """Store the assistant reply and summarize long conversations"""
         conversation.add_message(
             MessageRole.ASSISTANT,
-            response["content"],
-            token_count=assistant_token_count
+            content,
+            token_count=completion_tokens
         )
+        await self.conversation_store.touch(conversation)
         
-        # Auto-summarize if conversation is getting long
+        # Auto-summarize if conversation is getting long, without delaying the reply
         if (len(conversation.messages) > self.max_conversation_messages or
             conversation.get_token_count() > self.max_conversation_tokens):
-            await self._summarize_conversation(conversation)
+            self._schedule_summarization(conversation)
+    
+    async def _chat_completion(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Chat completion with conversation memory and optional RAG"""
+        chat = await self._prepare_chat(payload)
+        conversation = chat["conversation"]
+        
+        # Call LLM
+        response = await self._call_llm_with_retry(
+            chat["model_key"], chat["config"], chat["messages"], priority=Priority.HIGH
+        )
+        
+        # Store assistant response
+        await self._record_chat_reply(
+            conversation, response["content"], response["tokens_used"]["completion"]
+        )
         
         return {
             "status": "success",
             "content": response["content"],
-            "conversation_id": conversation_id,
-            "model": model_key,
+            "conversation_id": chat["conversation_id"],
+            "model": chat["model_key"],
             "tokens_used": response["tokens_used"],
             "cost": response["cost"],
             "conversation_tokens": conversation.get_token_count()
         }
     
-    async def _create_embedding(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        """Create embedding for text"""
-        text = payload["text"]
+    async def _chat_completion_stream(self, payload: Dict[str, Any]) -> AsyncIterator[StreamChunk]:
+        """
+        Streaming chat completion
+        Yields content deltas, then a final chunk with usage and cost. If the
+        consumer stops early, the partial reply is kept in the conversation.
+        """
+        chat = await self._prepare_chat(payload)
+        conversation = chat["conversation"]
+        parts: List[str] = []
+        final_chunk: Optional[StreamChunk] = None
+        
+        stream = self._stream_llm_with_retry(
+            chat["model_key"], chat["config"], chat["messages"], priority=Priority.HIGH
+        )
+        try:
+            async for chunk in stream:
+                if chunk.is_final:
+                    final_chunk = chunk
+                else:
+                    parts.append(chunk.content)
+                    yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            if parts:
+                partial = "".join(parts)
+                conversation.add_message(
+                    MessageRole.ASSISTANT,
+                    partial,
+                    metadata={"cancelled": True},
+                    token_count=self._count_tokens(partial)
+                )
+                await self.conversation_store.touch(conversation)
+            raise
+        finally:
+            await stream.aclose()
         
-        if not self.embedding_model:
+        await self._record_chat_reply(
+            conversation, "".join(parts), final_chunk.tokens_used["completion"]
+        )
+        yield final_chunk
+    
+    async def _create_embedding(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Create embedding for text, or for a list of texts"""
+        if not self.embedding_service:
             raise RuntimeError("Embedding model not available")
         
-        embedding = self.embedding_model.encode(text).tolist()
+        if "texts" in payload:
+            vectors = await self.embedding_service.embed_many(payload["texts"])
+            return {
+                "status": "success",
+                "embeddings": [vector.tolist() for vector in vectors],
+                "dimensions": self.embedding_service.dimensions
+            }
+        
+        embedding = (await self.embedding_service.embed(payload["text"])).tolist()
         
         return {
             "status": "success",
@@ -907,7 +1246,7 @@ class LLMAgent(BaseAgent):
         collection = payload.get("collection", "general_knowledge")
         limit = payload.get("limit", 5)
         
-        if not self.qdrant_client or not self.embedding_model:
+        if not self._rag_available():
             raise RuntimeError("Vector database not available")
         
         docs = await self._perform_rag_search(query, [collection], limit)
@@ -925,7 +1264,7 @@ class LLMAgent(BaseAgent):
             "count": len(docs)
         }
     
-    async def _summarize_text(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def _summarize_text(self, payload: Dict[str, Any], priority: Priority = Priority.MEDIUM) -> Dict[str, Any]:
         """Summarize given text"""
         text = payload["text"]
         model_key = payload.get("model_key", "gpt35")
@@ -952,7 +1291,7 @@ class LLMAgent(BaseAgent):
             cost_per_1k_completion=llm_config.cost_per_1k_completion
         )
         
-        response = await self._call_llm_with_retry(model_key, custom_config, messages)
+        response = await self._call_llm_with_retry(model_key, custom_config, messages, priority=priority)
         
         return {
             "status": "success",
@@ -1037,35 +1376,28 @@ class LLMAgent(BaseAgent):
         model_key: str,
         config: LLMConfig,
         messages: List[Dict[str, str]],
-        max_retries: int = 3
+        max_retries: int = 3,
+        priority: Priority = Priority.MEDIUM
     ) -> Dict[str, Any]:
-        """Call LLM API with circuit breaker and retry logic"""
-        
-        # Check circuit breaker
-        breaker = self.llm_circuit_breakers[model_key]
-        if breaker["state"] == "open":
-            if breaker["last_failure"]:
-                time_since_failure = time.time() - breaker["last_failure"]
-                if time_since_failure < 60:  # 60 second timeout
-                    raise RuntimeError(
-                        f"Circuit breaker open for {model_key}, "
-                        f"retry after {60 - time_since_failure:.0f}s"
-                    )
-                else:
-                    breaker["state"] = "half-open"
-                    breaker["failures"] = 0
+        """Call LLM API with circuit breaker, rate-limit scheduling and retry logic"""
+        
+        breaker = self.llm_circuit_breakers.get(model_key)
+        estimated_tokens = self._estimate_request_tokens(messages, config)
         
         for attempt in range(max_retries):
             try:
-                start_time = time.time()
-                
                 # Get provider
                 provider = self.provider_manager.get_provider(config.provider)
                 if not provider:
                     raise RuntimeError(f"Provider {config.provider.value} not available")
                 
-                # Call provider
-                response = await provider.generate(messages, config)
+                # Call provider once the scheduler admits the request; the
+                # breaker measures provider latency only, not scheduling delay
+                async with self.llm_scheduler.reserve(model_key, estimated_tokens, priority.value) as lease:
+                    async with breaker.guard():
+                        start_time = time.time()
+                        response = await provider.generate(messages, config)
+                    lease.actual_tokens = response["tokens_used"]["total"]
                 
                 latency = (time.time() - start_time) * 1000
                 
@@ -1078,35 +1410,137 @@ class LLMAgent(BaseAgent):
                 # Update metrics
                 self._update_model_metrics(model_key, response, latency, cost)
                 
-                # Reset circuit breaker on success
-                breaker["failures"] = 0
-                breaker["state"] = "closed"
-                
                 return response
             
             except Exception as e:
-                self.logger.error(
-                    f"LLM call failed (attempt {attempt + 1}/{max_retries})",
-                    extra={"model": model_key, "error": str(e)}
-                )
+                self._record_llm_failure(model_key, e, attempt, max_retries)
                 
-                # Update circuit breaker
-                breaker["failures"] += 1
-                breaker["last_failure"] = time.time()
+                # An open or saturated breaker is not worth retrying against
+                if attempt == max_retries - 1 or isinstance(e, CircuitBreakerOpenError):
+                    raise
                 
-                if breaker["failures"] >= 5:
-                    breaker["state"] = "open"
-                    self.logger.warning(
-                        f"Circuit breaker opened for {model_key}",
-                        extra={"failures": breaker["failures"]}
-                    )
+                await asyncio.sleep(self._retry_delay(model_key, e, attempt))
+    
+    def _estimate_request_tokens(self, messages: List[Dict[str, str]], config: LLMConfig) -> int:
+        """Tokens to reserve against TPM limits (prompt plus the completion budget)"""
+        prompt_tokens = sum(self._count_tokens(m["content"]) for m in messages)
+        return int(prompt_tokens) + config.max_tokens
+    
+    def _retry_delay(self, model_key: str, error: Exception, attempt: int) -> float:
+        """
+        Backoff before the next attempt
+        Rate-limit responses pause the model in the scheduler for the provider's
+        Retry-After hint, so every queued call waits, not just this one.
+        """
+        hint = retry_after_seconds(error)
+        if is_rate_limit_error(error):
+            self.llm_scheduler.pause_model(model_key, hint if hint is not None else min(2 ** attempt, 30))
+            return 0.0  # The scheduler holds the retry until the pause ends
+        if hint is not None:
+            return min(hint, 60.0)
+        return random.uniform(0.5, 1.0) * min(2 ** attempt, 30)  # Jittered exponential backoff
+    
+    def _record_llm_failure(self, model_key: str, error: Exception, attempt: int, max_retries: int):
+        """Log a failed LLM call (the breaker records it in its guard)"""
+        self.logger.error(
+            f"LLM call failed (attempt {attempt + 1}/{max_retries})",
+            extra={"model": model_key, "error": str(error)}
+        )
+        
+        if is_rate_limit_error(error):
+            self.model_usage_stats[model_key]["rate_limited"] += 1
+        elif not isinstance(error, CircuitBreakerOpenError):
+            self.model_usage_stats[model_key]["errors"] += 1
+    
+    async def _stream_llm_with_retry(
+        self,
+        model_key: str,
+        config: LLMConfig,
+        messages: List[Dict[str, str]],
+        max_retries: int = 3,
+        priority: Priority = Priority.HIGH
+    ) -> AsyncIterator[StreamChunk]:
+        """
+        Stream from the provider with circuit breaker and retry logic
+        Retries only happen before the first delta; once output has reached
+        the caller a failure is raised instead of restarting the completion.
+        """
+        breaker = self.llm_circuit_breakers.get(model_key)
+        estimated_tokens = self._estimate_request_tokens(messages, config)
+        
+        for attempt in range(max_retries):
+            emitted = False
+            parts: List[str] = []
+            
+            # The scheduler slot is held for the whole stream
+            lease = await self.llm_scheduler.acquire(model_key, estimated_tokens, priority.value)
+            start_time = time.time()
+            ttft_ms = None
+            
+            provider = self.provider_manager.get_provider(config.provider)
+            stream = provider.stream(messages, config) if provider else None
+            try:
+                if not stream:
+                    raise RuntimeError(f"Provider {config.provider.value} not available")
+                
+                # The breaker slot is held for the whole stream
+                async with breaker.guard():
+                    final_chunk = None
+                    async for chunk in stream:
+                        if chunk.is_final:
+                            final_chunk = chunk
+                            continue
+                        if ttft_ms is None:
+                            ttft_ms = (time.time() - start_time) * 1000
+                        emitted = True
+                        parts.append(chunk.content)
+                        yield chunk
+                    
+                    if final_chunk is None:
+                        raise RuntimeError("Stream ended without usage information")
+                
+                latency = (time.time() - start_time) * 1000
+                tokens_used = dict(final_chunk.tokens_used)
+                if not tokens_used.get("completion"):
+                    # Some providers omit usage on streams; estimate it
+                    tokens_used["completion"] = int(self._count_tokens("".join(parts)))
+                    tokens_used["prompt"] = tokens_used.get("prompt") or int(sum(
+                        self._count_tokens(m["content"]) for m in messages
+                    ))
+                    tokens_used["total"] = tokens_used["prompt"] + tokens_used["completion"]
                 
-                self.model_usage_stats[model_key]["errors"] += 1
+                lease.actual_tokens = tokens_used["total"]
+                cost = self._calculate_cost(config, tokens_used["prompt"], tokens_used["completion"])
+                self._update_model_metrics(model_key, {"tokens_used": tokens_used}, latency, cost)
+                self._update_stream_metrics(model_key, ttft_ms if ttft_ms is not None else latency)
                 
-                if attempt == max_retries - 1:
+                yield StreamChunk(
+                    finish_reason=final_chunk.finish_reason,
+                    tokens_used=tokens_used,
+                    model=final_chunk.model or config.model,
+                    cost=cost
+                )
+                return
+            
+            except Exception as e:
+                self._record_llm_failure(model_key, e, attempt, max_retries)
+                
+                if emitted or attempt == max_retries - 1 or isinstance(e, CircuitBreakerOpenError):
                     raise
                 
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                await asyncio.sleep(self._retry_delay(model_key, e, attempt))
+            finally:
+                # Propagates cancellation to the provider's HTTP stream
+                if stream:
+                    await stream.aclose()
+                self.llm_scheduler.release(lease)
+    
+    def _update_stream_metrics(self, model_key: str, ttft_ms: float):
+        """Update time-to-first-token metrics"""
+        stats = self.model_usage_stats[model_key]
+        stats["streams"] += 1
+        n = stats["streams"]
+        stats["avg_ttft_ms"] = (stats["avg_ttft_ms"] * (n - 1) + ttft_ms) / n
     
     def _calculate_cost(
         self,
@@ -1151,31 +1585,40 @@ class LLMAgent(BaseAgent):
                 return len(self.tokenizer.encode(text))
             except:
                 pass
-        # Rough estimate if tokenizer not available
-        return len(text.split()) * 1.3
+        # Rough estimate if tokenizer not available: ~4 characters per token for
+        # English, with a floor of one token per word for short-word text
+        return max(len(text.split()), (len(text) + 3) // 4)
     
     async def _index_document(self, doc: RAGDocument, collection_name: str):
         """Index document in vector database"""
-        if not self.qdrant_client or not self.embedding_model:
+        await self._index_documents([doc], collection_name)
+    
+    async def _index_documents(self, docs: List[RAGDocument], collection_name: str) -> int:
+        """Embed documents in one batch and upsert them in a single call"""
+        if not self._rag_available():
             raise RuntimeError("Vector database not available")
-        
-        embedding = self.embedding_model.encode(doc.content).tolist()
-        
-        self.qdrant_client.upsert(
-            collection_name=collection_name,
-            points=[
-                PointStruct(
-                    id=doc.id,
-                    vector=embedding,
-                    payload={
-                        "id": doc.id,
-                        "content": doc.content,
-                        "metadata": doc.metadata,
-                        "indexed_at": doc.created_at
-                    }
-                )
+        if not docs:
+            return 0
+        
+        collection_name = self.rag_collections.get(collection_name, collection_name)
+        await self.vector_index.ensure_collection(collection_name, self.embedding_service.dimensions)
+        
+        vectors = await self.embedding_service.embed_many([doc.content for doc in docs])
+        await self.vector_index.upsert(
+            collection_name,
+            [doc.id for doc in docs],
+            vectors,
+            [
+                {
+                    "id": doc.id,
+                    "content": doc.content,
+                    "metadata": doc.metadata,
+                    "indexed_at": doc.created_at
+                }
+                for doc in docs
             ]
         )
+        return len(docs)
     
     async def _perform_rag_search(
         self,
@@ -1183,31 +1626,29 @@ class LLMAgent(BaseAgent):
         collections: List[str],
         limit: int = 3
     ) -> List[RAGDocument]:
-        """Perform RAG search across collections"""
-        if not self.qdrant_client or not self.embedding_model:
+        """Perform RAG search across collections concurrently"""
+        if not self._rag_available():
             return []
         
         try:
-            query_embedding = self.embedding_model.encode(query).tolist()
+            query_embedding = await self.embedding_service.embed(query)
+            collection_names = [
+                self.rag_collections.get(alias, alias) for alias in collections
+            ]
+            
+            searches = await asyncio.gather(*[
+                self.vector_index.search(name, query_embedding, limit)
+                for name in collection_names
+            ], return_exceptions=True)
             
             all_results = []
-            for collection_alias in collections:
-                collection_name = self.rag_collections.get(
-                    collection_alias, collection_alias
-                )
-                
-                try:
-                    results = self.qdrant_client.search(
-                        collection_name=collection_name,
-                        query_vector=query_embedding,
-                        limit=limit,
-                        with_payload=True
-                    )
-                    all_results.extend(results)
-                except Exception as e:
+            for collection_name, results in zip(collection_names, searches):
+                if isinstance(results, Exception):
                     self.logger.warning(
-                        f"Search failed in collection {collection_name}: {e}"
+                        f"Search failed in collection {collection_name}: {results}"
                     )
+                else:
+                    all_results.extend(results)
             
             # Sort by score and deduplicate
             all_results.sort(key=lambda x: x.score, reverse=True)
@@ -1237,19 +1678,36 @@ class LLMAgent(BaseAgent):
             self.logger.error(f"RAG search failed: {e}")
             return []
     
+    def _schedule_summarization(self, conversation: ConversationMemory) -> asyncio.Task:
+        """Summarize in the background; at most one run per conversation, returned to callers that wait"""
+        task = self.summarizing.get(conversation.conversation_id)
+        if task is not None:
+            return task
+        
+        task = asyncio.create_task(self._summarize_conversation(conversation))
+        self.summarizing[conversation.conversation_id] = task
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        task.add_done_callback(lambda _: self.summarizing.pop(conversation.conversation_id, None))
+        return task
+    
     async def _summarize_conversation(self, conversation: ConversationMemory):
         """Summarize conversation to reduce memory"""
         if len(conversation.messages) < 10:
             return
         
         try:
-            # Keep last 5 messages, summarize the rest
-            messages_to_summarize = conversation.messages[:-5]
+            # Keep last 5 messages, summarize the rest. Messages added while the
+            # summary is generated are preserved.
+            summarized_count = len(conversation.messages) - 5
+            messages_to_summarize = conversation.messages[:summarized_count]
             
             conversation_text = "\n".join([
                 f"{msg.role.value}: {msg.content}"
                 for msg in messages_to_summarize
             ])
+            if conversation.summary:
+                conversation_text = f"Earlier summary: {conversation.summary}\n\n{conversation_text}"
             
             llm_config = self.llm_configs["gpt35"]
             messages = [
@@ -1269,11 +1727,16 @@ class LLMAgent(BaseAgent):
                 cost_per_1k_completion=llm_config.cost_per_1k_completion
             )
             
-            response = await self._call_llm_with_retry("gpt35", custom_config, messages)
+            response = await self._call_llm_with_retry(
+                "gpt35", custom_config, messages, priority=Priority.LOW
+            )
             
-            conversation.summary = response["content"]
-            conversation.messages = conversation.messages[-5:]
-            conversation.updated_at = time.time()
+            conversation.apply_summary(
+                response["content"],
+                response["tokens_used"]["completion"],
+                summarized_count
+            )
+            await self.conversation_store.touch(conversation)
             
             self.logger.info(
                 "Conversation summarized",
@@ -1292,30 +1755,38 @@ class LLMAgent(BaseAgent):
     # Message handlers
     
     async def _handle_document_indexing(self, msg):
-        """Handle document indexing requests"""
+        """Handle document indexing requests (a single document or a "documents" list)"""
         try:
             data = json.loads(msg.data.decode())
             
-            doc = RAGDocument(
-                id=data.get("id", str(uuid.uuid4())),
-                content=data["content"],
-                metadata=data.get("metadata", {})
-            )
+            docs = [
+                RAGDocument(
+                    id=item.get("id", str(uuid.uuid4())),
+                    content=item["content"],
+                    metadata=item.get("metadata", {})
+                )
+                for item in data.get("documents", [data])
+            ]
             
             collection = data.get("collection", "general_knowledge")
             
-            await self._index_document(doc, collection)
+            await self._index_documents(docs, collection)
             
             if msg.reply:
-                await self._publish_response(msg.reply, {
+                response = {
                     "status": "success",
-                    "document_id": doc.id,
-                    "collection": collection
-                })
+                    "collection": collection,
+                    "indexed": len(docs)
+                }
+                if "documents" in data:
+                    response["document_ids"] = [doc.id for doc in docs]
+                else:
+                    response["document_id"] = docs[0].id
+                await self._publish_response(msg.reply, response)
             
             self.logger.info(
-                "Document indexed",
-                extra={"doc_id": doc.id, "collection": collection}
+                "Documents indexed",
+                extra={"count": len(docs), "collection": collection}
             )
         
         except Exception as e:
@@ -1332,7 +1803,7 @@ class LLMAgent(BaseAgent):
             data = json.loads(msg.data.decode())
             conversation_id = data["conversation_id"]
             
-            conversation = self.conversations.get(conversation_id)
+            conversation = await self.conversation_store.get(conversation_id)
             
             if conversation:
                 response = {
@@ -1368,8 +1839,7 @@ class LLMAgent(BaseAgent):
             data = json.loads(msg.data.decode())
             conversation_id = data["conversation_id"]
             
-            if conversation_id in self.conversations:
-                del self.conversations[conversation_id]
+            if await self.conversation_store.delete(conversation_id):
                 status = "success"
             else:
                 status = "not_found"
@@ -1396,10 +1866,11 @@ class LLMAgent(BaseAgent):
             data = json.loads(msg.data.decode())
             conversation_id = data["conversation_id"]
             
-            conversation = self.conversations.get(conversation_id)
+            conversation = await self.conversation_store.get(conversation_id)
             
             if conversation:
-                await self._summarize_conversation(conversation)
+                # Joins an automatic run already in progress instead of racing it
+                await asyncio.shield(self._schedule_summarization(conversation))
                 response = {
                     "status": "success",
                     "conversation_id": conversation_id,
@@ -1427,6 +1898,10 @@ class LLMAgent(BaseAgent):
         try:
             data = json.loads(msg.data.decode())
             
+            if data.get("stream"):
+                await self._start_chat_stream(data, data.get("reply_subject") or msg.reply)
+                return
+            
             task_request = TaskRequest(
                 task_id=data.get("task_id", str(uuid.uuid4())),
                 task_type="chat_completion",
@@ -1447,73 +1922,215 @@ class LLMAgent(BaseAgent):
                     "error": str(e)
                 })
     
+    async def _start_chat_stream(self, data: Dict[str, Any], reply_subject: Optional[str]):
+        """
+        Start a streaming chat reply
+        
+        Chunked reply protocol (published to the reply subject, in order):
+            {"type": "delta", "stream_id", "seq", "content"}
+            {"type": "done", "stream_id", "seq", "conversation_id", "model",
+             "tokens_used", "cost", "finish_reason", "ttft_ms", "duration_ms"}
+            {"type": "error" | "cancelled", "stream_id", "seq", ...}
+        Publish {"stream_id"} to llm.chat.cancel to stop a stream early.
+        """
+        if not reply_subject:
+            raise ValueError("Streaming requests need a reply subject")
+        
+        stream_id = data.get("stream_id") or str(uuid.uuid4())
+        data.setdefault("conversation_id", str(uuid.uuid4()))
+        
+        # Run outside the subscription callback so other requests keep flowing
+        task = asyncio.create_task(self._run_chat_stream(stream_id, reply_subject, data))
+        self.active_streams[stream_id] = task
+        task.add_done_callback(lambda _: self.active_streams.pop(stream_id, None))
+        self.streaming_stats["started"] += 1
+    
+    async def _run_chat_stream(self, stream_id: str, reply_subject: str, data: Dict[str, Any]):
+        """Forward a streamed chat completion to the reply subject"""
+        seq = 0
+        start_time = time.time()
+        ttft_ms = None
+        stream = self._chat_completion_stream(data)
+        
+        try:
+            async for chunk in stream:
+                if not chunk.is_final:
+                    if ttft_ms is None:
+                        ttft_ms = (time.time() - start_time) * 1000
+                    await self._publish_response(reply_subject, {
+                        "type": "delta",
+                        "stream_id": stream_id,
+                        "seq": seq,
+                        "content": chunk.content
+                    })
+                    seq += 1
+                    continue
+                
+                await self._publish_response(reply_subject, {
+                    "type": "done",
+                    "status": "success",
+                    "stream_id": stream_id,
+                    "seq": seq,
+                    "conversation_id": data["conversation_id"],
+                    "model": data.get("model_key", "gpt35"),
+                    "tokens_used": chunk.tokens_used,
+                    "cost": chunk.cost,
+                    "finish_reason": chunk.finish_reason,
+                    "ttft_ms": ttft_ms,
+                    "duration_ms": (time.time() - start_time) * 1000
+                })
+            self.streaming_stats["completed"] += 1
+        
+        except asyncio.CancelledError:
+            self.streaming_stats["cancelled"] += 1
+            await stream.aclose()
+            await self._publish_response(reply_subject, {
+                "type": "cancelled",
+                "stream_id": stream_id,
+                "seq": seq
+            })
+            raise
+        
+        except Exception as e:
+            self.streaming_stats["failed"] += 1
+            self.logger.error(f"Chat stream {stream_id} failed: {e}")
+            await self._publish_response(reply_subject, {
+                "type": "error",
+                "status": "error",
+                "stream_id": stream_id,
+                "seq": seq,
+                "error": str(e)
+            })
+        
+        finally:
+            await stream.aclose()
+    
+    async def _handle_chat_cancel(self, msg):
+        """Cancel an in-flight chat stream (client went away)"""
+        try:
+            data = json.loads(msg.data.decode())
+            task = self.active_streams.get(data.get("stream_id"))
+            if task and not task.done():
+                task.cancel()
+                self.logger.info(f"Chat stream {data['stream_id']} cancelled by client")
+        except Exception as e:
+            self.logger.error(f"Chat cancel handling failed: {e}")
+    
     async def _handle_batch_processing(self, msg):
-        """Handle batch processing requests"""
+        """
+        Handle batch processing requests
+        Tasks run concurrently at LOW priority by default; the shared scheduler
+        keeps them inside provider rate limits and behind interactive traffic.
+        Set "stream_results" to receive each result as it completes.
+        """
         try:
             data = json.loads(msg.data.decode())
             batch_id = data.get("batch_id", str(uuid.uuid4()))
             tasks = data.get("tasks", [])
+            priority = Priority[data.get("priority", "LOW").upper()]
             
             self.logger.info(f"Processing batch {batch_id} with {len(tasks)} tasks")
             
-            results = []
-            for task_data in tasks:
+            task = asyncio.create_task(self._run_batch(
+                batch_id, tasks, priority, msg.reply, bool(data.get("stream_results", False))
+            ))
+            self.active_batches[batch_id] = task
+            task.add_done_callback(lambda _: self.active_batches.pop(batch_id, None))
+        
+        except Exception as e:
+            self.logger.error(f"Batch processing failed: {e}")
+            if msg.reply:
+                await self._publish_response(msg.reply, {
+                    "status": "error",
+                    "error": str(e)
+                })
+    
+    async def _run_batch(
+        self,
+        batch_id: str,
+        tasks: List[Dict[str, Any]],
+        priority: Priority,
+        reply_subject: Optional[str],
+        stream_results: bool
+    ):
+        """Execute batch tasks concurrently and publish results"""
+        start_time = time.time()
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        
+        async def run_one(index: int, task_data: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
                 try:
                     task_type = task_data.get("type", "generate_text")
                     payload = task_data.get("payload", {})
                     
                     if task_type == "generate_text":
-                        result = await self._generate_text(payload)
+                        result = await self._generate_text(payload, priority=priority)
                     elif task_type == "summarize":
-                        result = await self._summarize_text(payload)
+                        result = await self._summarize_text(payload, priority=priority)
                     else:
                         result = {"status": "error", "error": f"Unknown task type: {task_type}"}
-                    
-                    results.append({
-                        "task_id": task_data.get("id"),
-                        "result": result
-                    })
                 
                 except Exception as e:
-                    results.append({
-                        "task_id": task_data.get("id"),
-                        "result": {"status": "error", "error": str(e)}
+                    result = {"status": "error", "error": str(e)}
+            
+            return index, {"task_id": task_data.get("id"), "result": result}
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        completed = 0
+        
+        try:
+            for future in asyncio.as_completed([run_one(i, t) for i, t in enumerate(tasks)]):
+                index, entry = await future
+                results[index] = entry
+                completed += 1
+                
+                if stream_results and reply_subject:
+                    await self._publish_response(reply_subject, {
+                        "type": "result",
+                        "batch_id": batch_id,
+                        "index": index,
+                        **entry,
+                        "completed": completed,
+                        "total": len(tasks)
                     })
             
-            if msg.reply:
-                await self._publish_response(msg.reply, {
+            duration_ms = (time.time() - start_time) * 1000
+            self.logger.info(
+                f"Batch {batch_id} completed",
+                extra={"tasks": len(tasks), "duration_ms": duration_ms}
+            )
+            
+            if reply_subject:
+                summary = {
                     "status": "success",
                     "batch_id": batch_id,
                     "results": results,
-                    "completed": len(results),
-                    "total": len(tasks)
-                })
+                    "completed": completed,
+                    "total": len(tasks),
+                    "duration_ms": duration_ms
+                }
+                if stream_results:
+                    summary["type"] = "done"
+                await self._publish_response(reply_subject, summary)
         
         except Exception as e:
             self.logger.error(f"Batch processing failed: {e}")
-            if msg.reply:
-                await self._publish_response(msg.reply, {
+            if reply_subject:
+                await self._publish_response(reply_subject, {
                     "status": "error",
+                    "batch_id": batch_id,
                     "error": str(e)
                 })
     
     # Background tasks
     
     async def _conversation_cleanup_loop(self):
-        """Clean up old conversations periodically"""
-        current_time = time.time()
-        to_remove = []
-        
-        for conv_id, conv in self.conversations.items():
-            age = current_time - conv.updated_at
-            if age > self.max_conversation_age:
-                to_remove.append(conv_id)
-        
-        for conv_id in to_remove:
-            del self.conversations[conv_id]
+        """Expire old conversations and move idle ones out of memory"""
+        removed = await self.conversation_store.expire(self.max_conversation_age)
+        spilled = await self.conversation_store.spill_idle(self.conversation_idle_seconds)
         
-        if to_remove:
-            self.logger.info(f"Cleaned up {len(to_remove)} old conversations")
+        if removed or spilled:
+            self.logger.info(f"Cleaned up {removed} old conversations, spilled {spilled} idle")
     
     async def _persist_token_usage_loop(self):
         """Persist token usage to database periodically"""
@@ -1585,19 +2202,25 @@ class LLMAgent(BaseAgent):
             "llm_metrics": {
                 "token_usage": self.token_usage,
                 "model_usage": self.model_usage_stats,
-                "active_conversations": len(self.conversations),
-                "circuit_breakers": {
-                    model: breaker["state"]
-                    for model, breaker in self.llm_circuit_breakers.items()
+                "active_conversations": len(self.conversation_store),
+                "conversation_store": self.conversation_store.get_stats(),
+                "streaming": {
+                    **self.streaming_stats,
+                    "active": len(self.active_streams)
                 },
+                "circuit_breakers": self.llm_circuit_breakers.get_load_metrics(),
+                "scheduler": self.llm_scheduler.get_stats(),
+                "active_batches": len(self.active_batches),
                 "available_providers": [
                     provider.value
                     for provider in self.provider_manager.providers.keys()
                 ]
             },
             "rag_status": {
-                "enabled": self.qdrant_client is not None,
-                "collections": list(self.rag_collections.keys()) if self.qdrant_client else []
+                "enabled": self._rag_available(),
+                "backend": self.vector_index.backend if self.vector_index else None,
+                "collections": list(self.rag_collections.keys()) if self._rag_available() else [],
+                "embeddings": self.embedding_service.get_stats() if self.embedding_service else None
             }
         })
         
@@ -1607,6 +2230,20 @@ class LLMAgent(BaseAgent):
         """Cleanup before shutdown"""
         self.logger.info("LLM Agent shutting down...")
         
+        # Cancel in-flight streams so providers stop generating
+        for task in list(self.active_streams.values()) + list(self.active_batches.values()):
+            task.cancel()
+        pending = list(self.active_streams.values()) + list(self.active_batches.values())
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self.llm_scheduler.shutdown()
+        
+        # Keep conversations across restarts
+        try:
+            await self.conversation_store.flush()
+        except Exception as e:
+            self.logger.error(f"Conversation flush failed: {e}")
+        
         # Persist final token usage and stats
         if self.db_pool:
             try:
@@ -1618,10 +2255,12 @@ class LLMAgent(BaseAgent):
         # Close LLM providers
         await self.provider_manager.close_all()
         
-        # Close Qdrant client
-        if self.qdrant_client:
+        # Close embedding worker and vector index
+        if self.embedding_service:
+            await self.embedding_service.close()
+        if self.vector_index:
             try:
-                self.qdrant_client.close()
+                await self.vector_index.close()
             except:
                 pass
         
@@ -9,13 +9,16 @@ import json
 import time
 import re
 import hashlib
+import inspect
 import statistics
 import traceback
+import uuid
 import os # Added for environment variables
 from typing import Dict, List, Optional, Any, Union, Tuple
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
 # Optional dependencies - Numerical computing
 try:
     import numpy as np
@@ -40,6 +43,7 @@ except ImportError:
 # import nltk # For tokenization, stemming, lemmatization
 
 from base_agent import BaseAgent, AgentConfig, TaskRequest, TaskResponse, Priority, AgentStatus, TaskStatus # Added TaskStatus
+from plagiarism_index import CorpusIndexConfig, PlagiarismCorpusIndex
 
 try:
     from opentelemetry import trace
@@ -90,8 +94,71 @@ class ComprehensiveAnalysis:
     summary: Dict[str, Any]
     recommendations: List[str]
     processing_time_ms: float
+    stage_timings_ms: Dict[str, float] = field(default_factory=dict)
     timestamp: float = field(default_factory=time.time)
 
+@dataclass
+class AnalysisContext:
+    """Text preprocessing computed once per document and shared by all examinations"""
+    content: str
+    content_lower: str
+    words_lower: List[str]
+    sentences: List[str]
+    paragraphs: List[str]
+    statistics: Dict[str, float]
+    _readability: Optional[Dict[str, float]] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def build(cls, content: str) -> "AnalysisContext":
+        content_lower = content.lower()
+        words_lower = content_lower.split()
+        sentences = re.split(r'[.!?]\s*', content)
+        paragraphs = [p for p in content.split("\n\n") if p.strip()]
+        non_empty_sentences = [s for s in sentences if s.strip()]
+        return cls(
+            content=content,
+            content_lower=content_lower,
+            words_lower=words_lower,
+            sentences=sentences,
+            paragraphs=paragraphs,
+            statistics={
+                "char_count": len(content),
+                "word_count": len(words_lower),
+                "sentence_count": len(non_empty_sentences),
+                "paragraph_count": len(paragraphs),
+                "avg_words_per_sentence": len(words_lower) / max(1, len(non_empty_sentences))
+            }
+        )
+
+    def readability(self) -> Dict[str, float]:
+        """Flesch reading ease and Flesch-Kincaid grade, computed on first use and cached"""
+        if self._readability is None:
+            words = [w for w in (re.sub(r"[^a-z]", "", w) for w in self.words_lower) if w]
+            sentence_count = max(1, int(self.statistics["sentence_count"]))
+            words_per_sentence = len(words) / sentence_count
+            syllables_per_word = sum(_count_syllables(w) for w in words) / max(1, len(words))
+            self._readability = {
+                "flesch_reading_ease": 206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word,
+                "flesch_kincaid_grade": 0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59
+            }
+        return self._readability
+
+def _count_syllables(word: str) -> int:
+    """Vowel-group syllable estimate for a lowercase alphabetic word"""
+    count = len(re.findall(r"[aeiouy]+", word))
+    if word.endswith("e") and not word.endswith(("le", "ee")) and count > 1:
+        count -= 1
+    return max(1, count)
+
+def _match_pattern_groups(content: str, groups: Dict[str, List[str]]) -> List[str]:
+    """Return the group name for every pattern found in content (CPU-bound, process-pool safe)"""
+    matched = []
+    for name, patterns in groups.items():
+        for pattern in patterns:
+            if re.search(pattern, content, re.IGNORECASE):
+                matched.append(name)
+    return matched
+
 class ExaminationAgent(BaseAgent):
     """
     Advanced Examination Agent with:
@@ -107,6 +174,12 @@ class ExaminationAgent(BaseAgent):
     - Learning-based quality improvement
     """
     
+    # Examinations whose implementations accept the shared AnalysisContext
+    _CONTEXT_AWARE = {
+        ExaminationType.SENTIMENT, ExaminationType.READABILITY,
+        ExaminationType.STRUCTURE, ExaminationType.COMPLETENESS
+    }
+    
     def __init__(self, config: AgentConfig):
         super().__init__(config)
         
@@ -120,6 +193,7 @@ class ExaminationAgent(BaseAgent):
         
         # Knowledge bases and references
         self.reference_corpus = {}
+        self.corpus_index: Optional[PlagiarismCorpusIndex] = None
         self.quality_benchmarks = self._load_quality_benchmarks()
         self.domain_standards = self._load_domain_standards()
         
@@ -139,6 +213,14 @@ class ExaminationAgent(BaseAgent):
         # Collaborative features
         self.peer_review_network = {}
         self.expert_validation_cache = {}
+        
+        # Examination pipeline
+        self.pipeline_config = {
+            "batch_concurrency": int(os.getenv("EXAMINATION_BATCH_CONCURRENCY", "8")),
+            "process_pool_workers": int(os.getenv("EXAMINATION_PROCESS_WORKERS", str(min(4, os.cpu_count() or 1)))),
+            "process_pool_min_chars": 20000  # below this, pickling costs more than the scan
+        }
+        self._cpu_executor: Optional[ProcessPoolExecutor] = None
     
     async def start(self):
         """Start examination agent services"""
@@ -178,6 +260,27 @@ class ExaminationAgent(BaseAgent):
             self._handle_batch_examination
         )
         
+        await self._subscribe(
+            "examination.corpus.add",
+            self._handle_corpus_addition
+        )
+        
+        # Plagiarism corpus index (memory-mapped, opened off the event loop)
+        index_config = self.plagiarism_engine["index"]
+        try:
+            self.corpus_index = await asyncio.to_thread(
+                PlagiarismCorpusIndex(CorpusIndexConfig(
+                    index_dir=index_config["path"],
+                    shingle_k=self.plagiarism_engine["algorithms"]["shingling"]["k"],
+                    chunk_size=self.plagiarism_engine["chunk_size"],
+                    num_perm=index_config["num_perm"],
+                    bands=index_config["bands"],
+                    max_candidates=index_config["max_candidates"]
+                )).open
+            )
+        except Exception as e:
+            self.logger.error(f"Failed to open plagiarism corpus index: {e}", traceback=traceback.format_exc())
+        
         # Feedback and learning
         await self._subscribe(
             "examination.feedback",
@@ -232,6 +335,13 @@ class ExaminationAgent(BaseAgent):
             "similarity_threshold": 0.15,
             "chunk_size": 50,  # words
             "overlap_threshold": 0.8,
+            "index": {
+                "path": os.getenv("PLAGIARISM_INDEX_DIR", "./data/plagiarism_index"),
+                "num_perm": 128,
+                "bands": 32,  # 4 rows per band
+                "max_candidates": 50,
+                "flush_interval": 60  # seconds
+            },
             "algorithms": {
                 "shingling": {"k": 5, "weight": 0.4},
                 "jaccard": {"weight": 0.3},
@@ -505,14 +615,21 @@ class ExaminationAgent(BaseAgent):
         else:
             raise RuntimeError(f"Examination for {task_type} failed to produce a result.")
 
-    async def _examine_content_quality(self, content_id: str, content: str, examination_id: str, payload: Dict) -> ExaminationResult:
+    async def _examine_content_quality(self, content_id: str, content: str, examination_id: str, payload: Dict,
+                                       context: Optional[AnalysisContext] = None,
+                                       sub_results: Optional[Dict[ExaminationType, ExaminationResult]] = None) -> ExaminationResult:
         """Perform a general content quality examination"""
         self.logger.info(f"Examining content quality for {content_id}")
         
-        # Combine multiple examination types for a holistic quality score
-        readability_res = await self._analyze_readability(content_id, content, str(uuid.uuid4()), payload)
-        sentiment_res = await self._analyze_sentiment(content_id, content, str(uuid.uuid4()), payload)
-        structure_res = await self._analyze_structure(content_id, content, str(uuid.uuid4()), payload)
+        # Combine multiple examination types for a holistic quality score,
+        # reusing results the comprehensive pipeline has already computed
+        context = context or AnalysisContext.build(content)
+        sub_results = sub_results or {}
+        readability_res, sentiment_res, structure_res = await asyncio.gather(
+            self._reuse_or_run(ExaminationType.READABILITY, sub_results, content_id, content, payload, context),
+            self._reuse_or_run(ExaminationType.SENTIMENT, sub_results, content_id, content, payload, context),
+            self._reuse_or_run(ExaminationType.STRUCTURE, sub_results, content_id, content, payload, context)
+        )
         # Add more sub-examinations as needed
 
         overall_score = (readability_res.score + sentiment_res.score + structure_res.score) / 3
@@ -539,21 +656,40 @@ class ExaminationAgent(BaseAgent):
         )
 
     async def _check_plagiarism(self, content_id: str, content: str, examination_id: str, payload: Dict) -> ExaminationResult:
-        """Check for plagiarism against a reference corpus or external services"""
+        """Check for plagiarism against the reference corpus index"""
         self.logger.info(f"Checking plagiarism for {content_id}")
         
-        # Placeholder for actual plagiarism detection logic
-        # This would involve comparing content against self.reference_corpus or external APIs
+        similarity_threshold = payload.get("similarity_threshold", self.plagiarism_engine["similarity_threshold"])
+        overlap_threshold = self.plagiarism_engine["overlap_threshold"]
         
-        similarity_score = 0.0 # Placeholder
+        similarity_score = 0.0
+        matched_sources = []
         issues = []
         suggestions = []
-
-        # Simulate some plagiarism detection
-        if "copy-paste" in content.lower():
-            similarity_score = 0.75
-            issues.append({"type": "plagiarism", "message": "High similarity detected in a section.", "severity": "critical"})
-            suggestions.append("Paraphrase the identified sections and cite sources.")
+        confidence = 0.0
+        
+        if self.corpus_index is not None:
+            # MinHash/LSH lookup and exact Jaccard verification are CPU-bound
+            matches = await asyncio.to_thread(
+                self.corpus_index.query,
+                content,
+                min_containment=similarity_threshold
+            )
+            matched_sources = [m.to_dict() for m in matches]
+            confidence = 0.9
+            
+            if matches:
+                similarity_score = matches[0].containment
+                severity = "critical" if similarity_score >= overlap_threshold else "high"
+                issues.append({
+                    "type": "plagiarism",
+                    "message": f"{similarity_score:.0%} of the content matches {matches[0].source_id}.",
+                    "severity": severity,
+                    "spans": matches[0].spans
+                })
+                suggestions.append("Paraphrase the identified sections and cite sources.")
+        else:
+            self.logger.warning("Plagiarism corpus index unavailable; skipping corpus comparison")
         
         quality_level = self._determine_quality_level(1.0 - similarity_score) # Higher similarity -> lower quality
 
@@ -565,14 +701,15 @@ class ExaminationAgent(BaseAgent):
             quality_level=quality_level,
             details={
                 "similarity_score": similarity_score,
-                "matched_sources": [] # In a real system, this would list sources
+                "matched_sources": matched_sources,
+                "corpus_size": len(self.corpus_index) if self.corpus_index is not None else 0
             },
             issues=issues,
             suggestions=suggestions,
-            confidence=0.8
+            confidence=confidence
         )
 
-    async def _analyze_sentiment(self, content_id: str, content: str, examination_id: str, payload: Dict) -> ExaminationResult:
+    async def _analyze_sentiment(self, content_id: str, content: str, examination_id: str, payload: Dict, context: Optional[AnalysisContext] = None) -> ExaminationResult:
         """Analyze the sentiment of the content"""
         self.logger.info(f"Analyzing sentiment for {content_id}")
         
@@ -582,7 +719,7 @@ class ExaminationAgent(BaseAgent):
         negative_words = ["bad", "poor", "terrible", "sad", "negative"]
         
         sentiment_score = 0.0
-        words = content.lower().split()
+        words = context.words_lower if context else content.lower().split()
         
         for word in words:
             if word in positive_words:
@@ -611,17 +748,14 @@ class ExaminationAgent(BaseAgent):
             confidence=0.7
         )
 
-    async def _analyze_readability(self, content_id: str, content: str, examination_id: str, payload: Dict) -> ExaminationResult:
+    async def _analyze_readability(self, content_id: str, content: str, examination_id: str, payload: Dict, context: Optional[AnalysisContext] = None) -> ExaminationResult:
         """Analyze the readability of the content"""
         self.logger.info(f"Analyzing readability for {content_id}")
         
-        # Placeholder for textstat integration
-        try:
-            flesch_ease = flesch_reading_ease(content)
-            flesch_kincaid = flesch_kincaid_grade(content)
-        except Exception:
-            flesch_ease = 50.0 # Default if textstat fails
-            flesch_kincaid = 8.0
+        context = context or AnalysisContext.build(content)
+        readability = context.readability()
+        flesch_ease = readability["flesch_reading_ease"]
+        flesch_kincaid = readability["flesch_kincaid_grade"]
 
         # Score based on Flesch-Kincaid (lower grade level is often better for general audience)
         # Target grade level can be configured
@@ -655,13 +789,14 @@ class ExaminationAgent(BaseAgent):
             confidence=0.9
         )
 
-    async def _analyze_structure(self, content_id: str, content: str, examination_id: str, payload: Dict) -> ExaminationResult:
+    async def _analyze_structure(self, content_id: str, content: str, examination_id: str, payload: Dict, context: Optional[AnalysisContext] = None) -> ExaminationResult:
         """Analyze the structural integrity and coherence of the content"""
         self.logger.info(f"Analyzing structure for {content_id}")
         
         # Placeholder for structural analysis
-        paragraphs = [p for p in content.split("\n\n") if p.strip()]
-        sentences = re.split(r'[.!?]\s*', content)
+        context = context or AnalysisContext.build(content)
+        paragraphs = context.paragraphs
+        sentences = context.sentences
         
         paragraph_count = len(paragraphs)
         sentence_count = len(sentences)
@@ -742,12 +877,14 @@ class ExaminationAgent(BaseAgent):
         issues = []
         suggestions = []
 
-        for bias_type, config in self.bias_detector["bias_types"].items():
-            for pattern in config["indicators"]:
-                if re.search(pattern, content, re.IGNORECASE):
-                    bias_score += 0.2 # Arbitrary increment
-                    issues.append({"type": "bias_detection", "message": f"Potential {bias_type} bias detected.", "severity": "medium"})
-                    suggestions.append(f"Review language for {bias_type} bias and use inclusive terminology.")
+        pattern_groups = {
+            bias_type: config["indicators"]
+            for bias_type, config in self.bias_detector["bias_types"].items()
+        }
+        for bias_type in await self._run_cpu_bound(_match_pattern_groups, content, pattern_groups):
+            bias_score += 0.2 # Arbitrary increment
+            issues.append({"type": "bias_detection", "message": f"Potential {bias_type} bias detected.", "severity": "medium"})
+            suggestions.append(f"Review language for {bias_type} bias and use inclusive terminology.")
         
         bias_score = min(1.0, bias_score) # Cap at 1.0
         quality_level = self._determine_quality_level(1.0 - bias_score) # Higher bias -> lower quality
@@ -775,12 +912,12 @@ class ExaminationAgent(BaseAgent):
         issues = []
         suggestions = []
 
-        for category, config in self.toxicity_filter["toxicity_categories"].items():
-            for pattern in config["patterns"]:
-                if re.search(pattern, content, re.IGNORECASE):
-                    toxicity_score += 0.3 # Arbitrary increment
-                    issues.append({"type": "toxicity", "message": f"Potential {category} detected.", "severity": config["severity"]})
-                    suggestions.append(f"Remove or rephrase content identified as {category}.")
+        categories = self.toxicity_filter["toxicity_categories"]
+        pattern_groups = {category: config["patterns"] for category, config in categories.items()}
+        for category in await self._run_cpu_bound(_match_pattern_groups, content, pattern_groups):
+            toxicity_score += 0.3 # Arbitrary increment
+            issues.append({"type": "toxicity", "message": f"Potential {category} detected.", "severity": categories[category]["severity"]})
+            suggestions.append(f"Remove or rephrase content identified as {category}.")
         
         toxicity_score = min(1.0, toxicity_score) # Cap at 1.0
         quality_level = self._determine_quality_level(1.0 - toxicity_score) # Higher toxicity -> lower quality
@@ -835,7 +972,7 @@ class ExaminationAgent(BaseAgent):
             confidence=0.8
         )
 
-    async def _check_completeness(self, content_id: str, content: str, examination_id: str, payload: Dict) -> ExaminationResult:
+    async def _check_completeness(self, content_id: str, content: str, examination_id: str, payload: Dict, context: Optional[AnalysisContext] = None) -> ExaminationResult:
         """Check if the content covers all required aspects or topics"""
         self.logger.info(f"Checking completeness for {content_id}")
         
@@ -843,7 +980,8 @@ class ExaminationAgent(BaseAgent):
         # or using an LLM to determine if all aspects of a prompt have been addressed.
         
         required_keywords = payload.get("required_keywords", ["introduction", "conclusion", "data", "analysis"])
-        missing_keywords = [kw for kw in required_keywords if kw.lower() not in content.lower()]
+        content_lower = context.content_lower if context else content.lower()
+        missing_keywords = [kw for kw in required_keywords if kw.lower() not in content_lower]
         
         completeness_score = (len(required_keywords) - len(missing_keywords)) / max(1, len(required_keywords))
         
@@ -870,10 +1008,59 @@ class ExaminationAgent(BaseAgent):
             confidence=0.85
         )
 
-    async def _perform_comprehensive_analysis(self, content_id: str, content: str, payload: Dict) -> Dict[str, Any]:
-        """Perform a comprehensive analysis by running multiple examination types"""
-        self.logger.info(f"Performing comprehensive analysis for {content_id}")
-        start_time = time.time()
+    def _examination_methods(self) -> Dict[ExaminationType, Any]:
+        """Examination type to implementation mapping used by the pipeline"""
+        return {
+            ExaminationType.PLAGIARISM: self._check_plagiarism,
+            ExaminationType.SENTIMENT: self._analyze_sentiment,
+            ExaminationType.READABILITY: self._analyze_readability,
+            ExaminationType.STRUCTURE: self._analyze_structure,
+            ExaminationType.FACTUAL_ACCURACY: self._check_factual_accuracy,
+            ExaminationType.BIAS_DETECTION: self._detect_bias,
+            ExaminationType.TOXICITY: self._detect_toxicity,
+            ExaminationType.CONSISTENCY: self._check_consistency,
+            ExaminationType.COMPLETENESS: self._check_completeness
+        }
+
+    async def _reuse_or_run(self, exam_type: ExaminationType, sub_results: Dict[ExaminationType, ExaminationResult],
+                            content_id: str, content: str, payload: Dict, context: AnalysisContext) -> ExaminationResult:
+        """Return an already computed examination result or run it now"""
+        if exam_type in sub_results:
+            return sub_results[exam_type]
+        method = self._examination_methods()[exam_type]
+        return await method(content_id, content, str(uuid.uuid4()), payload, context)
+
+    async def _run_timed_examination(self, exam_type: ExaminationType, content_id: str, content: str,
+                                     payload: Dict, context: AnalysisContext,
+                                     sub_results: Optional[Dict[ExaminationType, ExaminationResult]] = None) -> Optional[ExaminationResult]:
+        """Run one examination stage and record its duration in processing_time_ms"""
+        stage_start = time.perf_counter()
+        try:
+            if exam_type == ExaminationType.CONTENT_QUALITY:
+                result = await self._examine_content_quality(content_id, content, str(uuid.uuid4()), payload, context, sub_results)
+            elif exam_type in self._CONTEXT_AWARE:
+                result = await self._examination_methods()[exam_type](content_id, content, str(uuid.uuid4()), payload, context)
+            else:
+                result = await self._examination_methods()[exam_type](content_id, content, str(uuid.uuid4()), payload)
+        except Exception as e:
+            self.logger.error(f"Error during comprehensive analysis for {exam_type.value}", error=str(e), traceback=traceback.format_exc())
+            return None
+        result.processing_time_ms = (time.perf_counter() - stage_start) * 1000
+        return result
+
+    async def _run_cpu_bound(self, func, content: str, *args):
+        """Run a CPU-bound scan in the process pool when the document is large enough to pay for it"""
+        if len(content) < self.pipeline_config["process_pool_min_chars"] or self.pipeline_config["process_pool_workers"] < 1:
+            return func(content, *args)
+        if self._cpu_executor is None:
+            self._cpu_executor = ProcessPoolExecutor(max_workers=self.pipeline_config["process_pool_workers"])
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cpu_executor, func, content, *args)
+
+    async def _run_examination_pipeline(self, content_id: str, content: str, payload: Dict) -> ComprehensiveAnalysis:
+        """Preprocess once, then run independent examinations concurrently"""
+        start_time = time.perf_counter()
+        stage_timings: Dict[str, float] = {}
 
         examination_types = payload.get("examination_types", [
             ExaminationType.CONTENT_QUALITY.value,
@@ -888,91 +1075,126 @@ class ExaminationAgent(BaseAgent):
             ExaminationType.COMPLETENESS.value
         ])
 
-        results: List[ExaminationResult] = []
+        requested: List[ExaminationType] = []
         for exam_type_str in examination_types:
             try:
-                exam_type = ExaminationType(exam_type_str)
-                # Call the corresponding examination method
-                if exam_type == ExaminationType.CONTENT_QUALITY:
-                    result = await self._examine_content_quality(content_id, content, str(uuid.uuid4()), payload)
-                elif exam_type == ExaminationType.PLAGIARISM:
-                    result = await self._check_plagiarism(content_id, content, str(uuid.uuid4()), payload)
-                elif exam_type == ExaminationType.SENTIMENT:
-                    result = await self._analyze_sentiment(content_id, content, str(uuid.uuid4()), payload)
-                elif exam_type == ExaminationType.READABILITY:
-                    result = await self._analyze_readability(content_id, content, str(uuid.uuid4()), payload)
-                elif exam_type == ExaminationType.STRUCTURE:
-                    result = await self._analyze_structure(content_id, content, str(uuid.uuid4()), payload)
-                elif exam_type == ExaminationType.FACTUAL_ACCURACY:
-                    result = await self._check_factual_accuracy(content_id, content, str(uuid.uuid4()), payload)
-                elif exam_type == ExaminationType.BIAS_DETECTION:
-                    result = await self._detect_bias(content_id, content, str(uuid.uuid4()), payload)
-                elif exam_type == ExaminationType.TOXICITY:
-                    result = await self._detect_toxicity(content_id, content, str(uuid.uuid4()), payload)
-                elif exam_type == ExaminationType.CONSISTENCY:
-                    result = await self._check_consistency(content_id, content, str(uuid.uuid4()), payload)
-                elif exam_type == ExaminationType.COMPLETENESS:
-                    result = await self._check_completeness(content_id, content, str(uuid.uuid4()), payload)
-                else:
-                    self.logger.warning(f"Unhandled examination type in comprehensive analysis: {exam_type_str}")
-                    continue
-                
-                results.append(result)
+                requested.append(ExaminationType(exam_type_str))
+            except ValueError:
+                self.logger.warning(f"Unhandled examination type in comprehensive analysis: {exam_type_str}")
+
+        # Stage 1: shared preprocessing (tokenization, sentence split, statistics)
+        stage_start = time.perf_counter()
+        if len(content) >= self.pipeline_config["process_pool_min_chars"]:
+            context = await asyncio.to_thread(AnalysisContext.build, content)
+        else:
+            context = AnalysisContext.build(content)
+        stage_timings["preprocessing"] = (time.perf_counter() - stage_start) * 1000
+
+        # Stage 2: independent examinations, including content quality's dependencies
+        independent = [t for t in requested if t != ExaminationType.CONTENT_QUALITY]
+        if ExaminationType.CONTENT_QUALITY in requested:
+            for dependency in (ExaminationType.READABILITY, ExaminationType.SENTIMENT, ExaminationType.STRUCTURE):
+                if dependency not in independent:
+                    independent.append(dependency)
+
+        stage_start = time.perf_counter()
+        independent_results = await asyncio.gather(*[
+            self._run_timed_examination(exam_type, content_id, content, payload, context)
+            for exam_type in independent
+        ])
+        computed = {t: r for t, r in zip(independent, independent_results) if r is not None}
+        stage_timings["examinations"] = (time.perf_counter() - stage_start) * 1000
+
+        # Stage 3: composite examinations built from stage 2 results
+        if ExaminationType.CONTENT_QUALITY in requested:
+            stage_start = time.perf_counter()
+            quality_result = await self._run_timed_examination(
+                ExaminationType.CONTENT_QUALITY, content_id, content, payload, context, computed
+            )
+            if quality_result is not None:
+                computed[ExaminationType.CONTENT_QUALITY] = quality_result
+            stage_timings["composite"] = (time.perf_counter() - stage_start) * 1000
+
+        results: List[ExaminationResult] = []
+        for exam_type in requested:
+            if exam_type in computed:
+                results.append(computed[exam_type])
+                stage_timings[exam_type.value] = computed[exam_type].processing_time_ms
                 # Update global stats
                 self.examination_stats["total_examinations"] += 1
-                self.examination_stats["examination_types_count"][exam_type_str] += 1
+                self.examination_stats["examination_types_count"][exam_type.value] += 1
 
-            except Exception as e:
-                self.logger.error(f"Error during comprehensive analysis for {exam_type_str}", error=str(e), traceback=traceback.format_exc())
-        
         if not results:
             raise RuntimeError("No examination results generated for comprehensive analysis.")
 
         overall_score = statistics.mean([r.score for r in results]) if results else 0.0
         overall_quality = self._determine_quality_level(overall_score)
-        all_issues = [issue for r in results for issue in r.issues]
         all_suggestions = [s for r in results for s in r.suggestions]
 
-        summary = {"overall_score": overall_score, "overall_quality": overall_quality.value}
+        summary = {"overall_score": overall_score, "overall_quality": overall_quality.value, "statistics": context.statistics}
         for r in results:
             summary[r.examination_type.value] = {"score": r.score, "quality_level": r.quality_level.value, "issues_count": len(r.issues)}
 
-        comprehensive_analysis = ComprehensiveAnalysis(
+        return ComprehensiveAnalysis(
             content_id=content_id,
             overall_score=overall_score,
             overall_quality=overall_quality,
             examinations=results,
             summary=summary,
             recommendations=all_suggestions,
-            processing_time_ms=(time.time() - start_time) * 1000
+            processing_time_ms=(time.perf_counter() - start_time) * 1000,
+            stage_timings_ms=stage_timings
         )
+
+    async def _perform_comprehensive_analysis(self, content_id: str, content: str, payload: Dict) -> Dict[str, Any]:
+        """Perform a comprehensive analysis by running multiple examination types"""
+        self.logger.info(f"Performing comprehensive analysis for {content_id}")
+
+        comprehensive_analysis = await self._run_examination_pipeline(content_id, content, payload)
         
         # Store comprehensive analysis in DB
         if self.db_pool:
-            await self._store_comprehensive_analysis(comprehensive_analysis)
+            stage_start = time.perf_counter()
+            await self._store_comprehensive_analyses([comprehensive_analysis])
+            comprehensive_analysis.stage_timings_ms["persistence"] = (time.perf_counter() - stage_start) * 1000
 
         return asdict(comprehensive_analysis)
 
     async def _perform_batch_examination(self, payload: Dict) -> Dict[str, Any]:
-        """Perform examinations on a batch of content items"""
+        """Perform examinations on a batch of content items concurrently"""
         self.logger.info("Performing batch examination")
         batch_items = payload.get("batch_items", []) # List of {content_id, content, examination_types, ...}
-        
-        results = []
-        for item in batch_items:
-            try:
-                content_id = item["content_id"]
-                content = item["content"]
-                examination_types = item.get("examination_types", [ExaminationType.CONTENT_QUALITY.value])
-                
-                # Call comprehensive analysis for each item in the batch
-                comp_analysis = await self._perform_comprehensive_analysis(content_id, content, {"examination_types": examination_types})
-                results.append(comp_analysis)
-            except Exception as e:
-                self.logger.error(f"Error processing batch item {item.get("content_id")}: {e}", traceback=traceback.format_exc())
-                results.append({"content_id": item.get("content_id"), "error": str(e)})
-        
-        return {"batch_results": results, "total_items": len(batch_items), "processed_items": len(results)}
+        start_time = time.perf_counter()
+        semaphore = asyncio.Semaphore(payload.get("max_concurrency", self.pipeline_config["batch_concurrency"]))
+
+        async def examine_item(item: Dict) -> Union[ComprehensiveAnalysis, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    content_id = item["content_id"]
+                    content = item["content"]
+                    examination_types = item.get("examination_types", [ExaminationType.CONTENT_QUALITY.value])
+                    return await self._run_examination_pipeline(content_id, content, {"examination_types": examination_types})
+                except Exception as e:
+                    self.logger.error(f"Error processing batch item {item.get('content_id')}: {e}", traceback=traceback.format_exc())
+                    return {"content_id": item.get("content_id"), "error": str(e)}
+
+        outcomes = await asyncio.gather(*[examine_item(item) for item in batch_items])
+        stage_timings = {"examinations": (time.perf_counter() - start_time) * 1000}
+
+        analyses = [o for o in outcomes if isinstance(o, ComprehensiveAnalysis)]
+        if analyses and self.db_pool:
+            stage_start = time.perf_counter()
+            await self._store_comprehensive_analyses(analyses)
+            stage_timings["persistence"] = (time.perf_counter() - stage_start) * 1000
+
+        results = [asdict(o) if isinstance(o, ComprehensiveAnalysis) else o for o in outcomes]
+        return {
+            "batch_results": results,
+            "total_items": len(batch_items),
+            "processed_items": len(results),
+            "processing_time_ms": (time.perf_counter() - start_time) * 1000,
+            "stage_timings_ms": stage_timings
+        }
 
     def _determine_quality_level(self, score: float) -> QualityLevel:
         """Determine quality level based on a score (0-1)"""
@@ -1068,6 +1290,27 @@ class ExaminationAgent(BaseAgent):
             if msg.reply:
                 await self._publish(msg.reply, json.dumps({"error": str(e), "success": False}).encode())
 
+    async def _handle_corpus_addition(self, msg):
+        """Add reference documents to the plagiarism corpus index"""
+        try:
+            data = json.loads(msg.data.decode())
+            if self.corpus_index is None:
+                raise RuntimeError("Plagiarism corpus index is not available")
+            
+            documents = [
+                (doc["source_id"], doc["content"], doc.get("metadata"))
+                for doc in data.get("documents", [])
+            ]
+            added = await asyncio.to_thread(self.corpus_index.add_documents, documents)
+            self.logger.info("Added documents to plagiarism corpus", count=added)
+            
+            if msg.reply:
+                await self._publish(msg.reply, json.dumps({"status": "indexed", "added": added, "corpus_size": len(self.corpus_index)}).encode())
+        except Exception as e:
+            self.logger.error("Error adding documents to plagiarism corpus", error=str(e), traceback=traceback.format_exc())
+            if msg.reply:
+                await self._publish(msg.reply, json.dumps({"error": str(e), "success": False}).encode())
+
     async def _handle_user_feedback(self, msg):
         """Process user feedback to improve examination models"""
         try:
@@ -1112,16 +1355,18 @@ class ExaminationAgent(BaseAgent):
                 await self._publish(msg.reply, json.dumps({"error": str(e), "success": False}).encode())
 
     async def _update_reference_corpus(self):
-        """Background task to update reference corpus for plagiarism and factual checks"""
+        """Background task to persist incremental plagiarism corpus additions"""
+        flush_interval = self.plagiarism_engine["index"]["flush_interval"]
         while not self._shutdown_event.is_set():
             try:
-                # In a real system, this would fetch new documents from a data source
-                # and update self.reference_corpus or a dedicated search index.
-                self.logger.debug("Updating reference corpus (placeholder).")
-                await asyncio.sleep(3600 * 24) # Update once a day
+                await asyncio.sleep(flush_interval)
+                if self.corpus_index is not None:
+                    # New documents are searchable from the memtable immediately;
+                    # flushing makes them durable as a memory-mapped segment.
+                    await asyncio.to_thread(self.corpus_index.flush)
             except Exception as e:
                 self.logger.error(f"Reference corpus update failed: {e}", traceback=traceback.format_exc())
-                await asyncio.sleep(3600)
+                await asyncio.sleep(flush_interval)
 
     async def _learn_from_feedback(self):
         """Background task to learn from user feedback and adapt models"""
@@ -1138,6 +1383,21 @@ class ExaminationAgent(BaseAgent):
                 self.logger.error(f"Learning from feedback failed: {e}", traceback=traceback.format_exc())
                 await asyncio.sleep(300)
 
+    async def shutdown(self):
+        """Close the plagiarism corpus index and process pool before base agent shutdown"""
+        if self._cpu_executor is not None:
+            self._cpu_executor.shutdown(wait=False, cancel_futures=True)
+            self._cpu_executor = None
+        if self.corpus_index is not None:
+            try:
+                await asyncio.to_thread(self.corpus_index.close)
+            except Exception as e:
+                self.logger.error(f"Failed to close plagiarism corpus index: {e}", traceback=traceback.format_exc())
+            self.corpus_index = None
+        result = super().shutdown()
+        if inspect.isawaitable(result):
+            await result
+
     # Database Operations
     async def _store_examination_result(self, result: ExaminationResult):
         """Store a single examination result in the database"""
@@ -1167,29 +1427,57 @@ class ExaminationAgent(BaseAgent):
 
     async def _store_comprehensive_analysis(self, analysis: ComprehensiveAnalysis):
         """Store a comprehensive analysis result in the database"""
+        await self._store_comprehensive_analyses([analysis])
+
+    async def _store_comprehensive_analyses(self, analyses: List[ComprehensiveAnalysis]):
+        """Bulk insert comprehensive analyses and their examination results in one transaction"""
         if not self.db_pool:
             self.logger.warning("Database pool not initialized. Comprehensive analysis not stored.")
             return
         try:
-            async with self.db_pool.acquire() as conn:
-                await conn.execute("""
-                    INSERT INTO comprehensive_analyses (content_id, overall_score, overall_quality, summary, recommendations, processing_time_ms, created_at)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7)
-                """,
-                analysis.content_id,
-                analysis.overall_score,
-                analysis.overall_quality.value,
-                json.dumps(analysis.summary),
-                json.dumps(analysis.recommendations),
-                analysis.processing_time_ms,
-                time.time()
+            created_at = time.time()
+            analysis_rows = [
+                (
+                    analysis.content_id,
+                    analysis.overall_score,
+                    analysis.overall_quality.value,
+                    json.dumps(analysis.summary),
+                    json.dumps(analysis.recommendations),
+                    analysis.processing_time_ms,
+                    created_at
                 )
-            # Also store individual examination results if not already done by _store_examination_result
-            for exam_result in analysis.examinations:
-                await self._store_examination_result(exam_result)
+                for analysis in analyses
+            ]
+            result_rows = [
+                (
+                    result.examination_id,
+                    result.content_id,
+                    result.examination_type.value,
+                    result.score,
+                    result.quality_level.value,
+                    json.dumps(result.details, default=str),
+                    json.dumps(result.issues),
+                    json.dumps(result.suggestions),
+                    result.confidence,
+                    result.processing_time_ms,
+                    created_at
+                )
+                for analysis in analyses
+                for result in analysis.examinations
+            ]
+            async with self.db_pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.executemany("""
+                        INSERT INTO comprehensive_analyses (content_id, overall_score, overall_quality, summary, recommendations, processing_time_ms, created_at)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7)
+                    """, analysis_rows)
+                    await conn.executemany("""
+                        INSERT INTO examination_results (examination_id, content_id, examination_type, score, quality_level, details, issues, suggestions, confidence, processing_time_ms, created_at)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+                    """, result_rows)
 
         except Exception as e:
-            self.logger.error("Failed to store comprehensive analysis in DB", content_id=analysis.content_id, error=str(e), traceback=traceback.format_exc())
+            self.logger.error("Failed to store comprehensive analyses in DB", count=len(analyses), error=str(e), traceback=traceback.format_exc())
 
     def _get_agent_metrics(self) -> Dict[str, Any]:
         """Provide Examination agent specific metrics."""
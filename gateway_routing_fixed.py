@@ -11,7 +11,7 @@ import hashlib
 import aiohttp
 import aiofiles
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Callable, Union
+from typing import Dict, List, Optional, Any, Union
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
@@ -31,6 +31,10 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import structlog
 from pydantic import BaseModel, Field
 
+from circuit_breaker import (
+    BulkheadFullError, CircuitBreakerConfig, CircuitBreakerOpenError, CircuitBreakerRegistry
+)
+
 logger = structlog.get_logger("ymera.routing")
 
 # ===================== ROUTING MODELS =====================
@@ -82,41 +86,6 @@ class RoutingRule:
     circuit_breaker_threshold: int = 5
     priority: int = 1
 
-# ===================== CIRCUIT BREAKER =====================
-
-class CircuitBreaker:
-    """Circuit breaker pattern implementation"""
-
-    def __init__(self, threshold: int = 5, timeout: int = 60):
-        self.threshold = threshold
-        self.timeout = timeout
-        self.failure_count = 0
-        self.last_failure_time = None
-        self.state = "closed"  # closed, open, half-open
-
-    async def call(self, func: Callable, *args, **kwargs):
-        """Execute function with circuit breaker protection"""
-        if self.state == "open":
-            if time.time() - self.last_failure_time > self.timeout:
-                self.state = "half-open"
-            else:
-                raise HTTPException(status_code=503, detail="Service unavailable (circuit breaker open)")
-        
-        try:
-            result = await func(*args, **kwargs)
-            if self.state == "half-open":
-                self.state = "closed"
-                self.failure_count = 0
-            return result
-        except Exception as e:
-            self.failure_count += 1
-            self.last_failure_time = time.time()
-            
-            if self.failure_count >= self.threshold:
-                self.state = "open"
-            
-            raise e
-
 # ===================== SERVICE DISCOVERY =====================
 
 class ServiceRegistry:
@@ -126,12 +95,24 @@ class ServiceRegistry:
         self.services: Dict[str, List[ServiceEndpoint]] = defaultdict(list)
         self.health_check_interval = 30  # seconds
         self.health_check_task = None
-        self._circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self.circuit_breakers = CircuitBreakerRegistry()
 
     def register_service(self, service_name: str, endpoint: ServiceEndpoint):
         """Register a new service endpoint"""
         self.services[service_name].append(endpoint)
-        self._circuit_breakers[endpoint.id] = CircuitBreaker()
+        # The gradient limit adapts in-flight requests to the endpoint's latency,
+        # never exceeding its connection cap
+        self.circuit_breakers.get_or_create(endpoint.id, CircuitBreakerConfig(
+            failure_threshold=5,
+            min_throughput=5,
+            timeout_seconds=60,
+            slow_call_duration_seconds=endpoint.timeout * 0.5,
+            concurrency_limit=max(1, endpoint.max_connections // 2),
+            limit_algorithm="gradient",
+            max_concurrency_limit=endpoint.max_connections,
+            max_queue_size=endpoint.max_connections,
+            queue_timeout_seconds=min(5.0, endpoint.timeout)
+        ))
         logger.info(f"Service registered: {service_name} -> {endpoint.url}")
 
     def unregister_service(self, service_name: str, endpoint_id: str):
@@ -140,7 +121,7 @@ class ServiceRegistry:
             ep for ep in self.services[service_name] 
             if ep.id != endpoint_id
         ]
-        self._circuit_breakers.pop(endpoint_id, None)
+        self.circuit_breakers.remove(endpoint_id)
         logger.info(f"Service unregistered: {service_name} -> {endpoint_id}")
 
     def get_healthy_endpoints(self, service_name: str) -> List[ServiceEndpoint]:
@@ -296,7 +277,7 @@ class RequestRouter:
         endpoint = self.load_balancer.select_endpoint(rule.service_name, rule.strategy)
         
         # Route request with circuit breaker
-        circuit_breaker = self.registry._circuit_breakers[endpoint.id]
+        circuit_breaker = self.registry.circuit_breakers.get(endpoint.id)
         
         try:
             response = await circuit_breaker.call(
@@ -308,7 +289,15 @@ class RequestRouter:
                 self.cache[cache_key] = (response, time.time())
             
             return response
-            
+        
+        except BulkheadFullError:
+            raise HTTPException(
+                status_code=503,
+                detail="Service overloaded, request shed",
+                headers={"Retry-After": "1"}
+            )
+        except CircuitBreakerOpenError:
+            raise HTTPException(status_code=503, detail="Service unavailable (circuit breaker open)")
         except Exception as e:
             logger.error(f"Request routing failed: {e}")
             raise HTTPException(status_code=503, detail="Service temporarily unavailable")
@@ -557,6 +546,14 @@ class YMERAAPIGateway:
         async def health_check():
             return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
         
+        # Per-endpoint breaker state, in-flight requests, limits and latency
+        @self.app.get("/health/dependencies")
+        async def dependency_health():
+            return {
+                "circuit_breakers": self.service_registry.circuit_breakers.get_load_metrics(),
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        
         # File upload
         @self.app.post("/api/v1/files/upload")
         async def upload_file(
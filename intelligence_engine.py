@@ -20,6 +20,7 @@ import weakref
 from datetime import datetime, timedelta
 
 from base_agent import BaseAgent, AgentConfig, TaskRequest, Priority
+from capability_index import CapabilityIndex
 from opentelemetry import trace
 from redis import asyncio as aioredis
 import asyncpg
@@ -96,6 +97,8 @@ class IntelligenceEngine(BaseAgent):
         self.agent_capabilities: Dict[str, List[AgentCapability]] = defaultdict(list)
         self.agent_load: Dict[str, float] = defaultdict(float)
         self.agent_health: Dict[str, Dict] = {}
+        # Capability bitsets over the registry for routing queries
+        self.capability_index = CapabilityIndex()
         
         # Decision engine
         self.decision_strategy = DecisionStrategy.ADAPTIVE
@@ -251,6 +254,7 @@ class IntelligenceEngine(BaseAgent):
                                 last_updated=time.time()
                             )
                         )
+                    self._index_agent(agent_name)
             
             # Load optimization rules (if any, from OptimizingEngine's perspective)
             # This engine doesn't directly manage optimization rules, but might consume them
@@ -307,6 +311,7 @@ class IntelligenceEngine(BaseAgent):
                         last_updated=time.time()
                     )
                 )
+            self._index_agent(agent_name)
             
             self.logger.info(f"Agent registered: {agent_name}", 
                            agent_type=agent_info.get('type'),
@@ -340,6 +345,11 @@ class IntelligenceEngine(BaseAgent):
                 
                 # Update load tracking
                 self.agent_load[agent_name] = metrics.get('load', 0.0)
+                self.capability_index.update(
+                    agent_name,
+                    rank=self.agent_load[agent_name],
+                    eligible=self.agent_health[agent_name]['status'] == 'healthy'
+                )
                 
                 # Update capabilities performance
                 await self._update_capability_performance(agent_name, metrics)
@@ -423,27 +433,27 @@ class IntelligenceEngine(BaseAgent):
     
     def _find_capable_agents(self, task_type: str, requirements: Dict[str, Any]) -> List[str]:
         """Find agents capable of handling the task"""
-        capable_agents = []
-        
-        # Direct capability match
-        if task_type in self.agent_capabilities:
-            for capability in self.agent_capabilities[task_type]:
-                if (capability.agent_id in self.agent_registry and 
-                    self.agent_health.get(capability.agent_id, {}).get('status') == 'healthy'):
-                    capable_agents.append(capability.agent_id)
-        
-        # Check for agents with compatible capabilities
-        for agent_name, agent_info in self.agent_registry.items():
-            if agent_name not in capable_agents:
-                agent_capabilities = agent_info.get('capabilities', [])
-                
-                # Check if agent has required capabilities
-                required_caps = requirements.get('required_capabilities', [])
-                if all(cap in agent_capabilities for cap in required_caps):
-                    if self.agent_health.get(agent_name, {}).get('status') == 'healthy':
-                        capable_agents.append(agent_name)
+        index = self.capability_index
+        
+        # Direct capability match, plus agents with every required capability
+        # (every agent when none are required); healthy agents only
+        required_caps = requirements.get('required_capabilities', [])
+        capable = index.mask([task_type]) | index.mask(required_caps)
         
-        return list(set(capable_agents)) # Remove duplicates
+        return index.names(capable & index.eligible_mask())
+    
+    def _index_agent(self, agent_name: str):
+        """Sync an agent's capabilities, load and health into the capability index"""
+        agent_info = self.agent_registry.get(agent_name)
+        if agent_info is None:
+            self.capability_index.remove(agent_name)
+            return
+        self.capability_index.add(
+            agent_name,
+            agent_info.get('capabilities', []),
+            rank=self.agent_load.get(agent_name, 0.0),
+            eligible=self.agent_health.get(agent_name, {}).get('status') == 'healthy'
+        )
     
     async def _adaptive_routing(self, agents: List[str], context: DecisionContext) -> AgentRecommendation:
         """Adaptive routing that learns from past performance"""
@@ -1082,6 +1092,7 @@ class IntelligenceEngine(BaseAgent):
                     if time.time() - health_info.get('last_seen', 0) > 60: # Agent not seen for 60 seconds
                         self.logger.warning(f"Agent {agent_name} is unresponsive. Marking as degraded.")
                         self.agent_health[agent_name]['status'] = 'degraded'
+                        self.capability_index.update(agent_name, eligible=False)
                         # Optionally, remove from active capabilities or trigger restart
                         await self._publish_to_stream("alerts.agent.unresponsive", {"agent_name": agent_name})
                         # Update DB status
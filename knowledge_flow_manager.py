@@ -3,15 +3,16 @@ Knowledge Flow Manager
 Manages the flow of knowledge between agents and the learning system
 """
 
+import asyncio
 import uuid
 import structlog
 from typing import Dict, List, Optional, Any, Set
 from datetime import datetime
-from collections import defaultdict
 from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from shared.utils.message_broker import MessageBroker
+from subscription_index import IndexedSubscription, SubscriptionIndex
 try:
     from models import KnowledgeItem
     KnowledgeSubscriptionModel = None
@@ -23,6 +24,9 @@ except ImportError:
 
 logger = structlog.get_logger(__name__)
 
+# Notifications published concurrently per delivery method
+NOTIFICATION_BATCH_SIZE = 200
+
 
 class KnowledgeFlowManager:
     """
@@ -33,7 +37,8 @@ class KnowledgeFlowManager:
         self.db = db_session
         self.broker = message_broker
         self.learning_agent = learning_agent
-        self.active_subscriptions: Dict[str, Set[str]] = defaultdict(set)
+        # Active subscriptions, kept in sync by create/update/cancel
+        self.subscription_index = SubscriptionIndex()
         self.flow_metrics = {
             'knowledge_shared': 0,
             'requests_fulfilled': 0,
@@ -101,8 +106,7 @@ class KnowledgeFlowManager:
             await self.db.commit()
             
             # Track active subscription
-            for category in categories:
-                self.active_subscriptions[category].add(agent_id)
+            self.subscription_index.add(IndexedSubscription.from_model(subscription))
             
             self.flow_metrics['subscriptions_active'] += 1
             
@@ -136,29 +140,28 @@ class KnowledgeFlowManager:
                 raise ValueError(f"Subscription {subscription_id} not found")
             
             # Update fields
+            was_active = subscription.active
             if categories is not None:
-                # Remove from old categories
-                for cat in subscription.categories:
-                    self.active_subscriptions[cat].discard(subscription.agent_id)
-                
                 subscription.categories = categories
-                
-                # Add to new categories
-                for cat in categories:
-                    self.active_subscriptions[cat].add(subscription.agent_id)
             
             if tags is not None:
                 subscription.tags = tags
             
             if active is not None:
                 subscription.active = active
-                if not active:
-                    for cat in subscription.categories:
-                        self.active_subscriptions[cat].discard(subscription.agent_id)
-                    self.flow_metrics['subscriptions_active'] -= 1
             
             await self.db.commit()
             
+            # Re-index the committed row
+            if subscription.active:
+                self.subscription_index.add(IndexedSubscription.from_model(subscription))
+                if not was_active:
+                    self.flow_metrics['subscriptions_active'] += 1
+            else:
+                self.subscription_index.remove(subscription_id)
+                if was_active:
+                    self.flow_metrics['subscriptions_active'] -= 1
+            
             logger.info("Subscription updated", subscription_id=subscription_id)
             
             return {
@@ -216,35 +219,22 @@ class KnowledgeFlowManager:
     ):
         """Notify subscribed agents about new knowledge"""
         try:
-            subscribers = self.active_subscriptions.get(category, set())
+            # Matched in memory; no database round trip per knowledge event
+            subscriptions = self.subscription_index.match(category, knowledge_data)
             
-            if not subscribers:
+            if not subscriptions:
                 return
             
-            # Get subscription details for filtering
-            stmt = select(KnowledgeSubscriptionModel).where(
-                and_(
-                    KnowledgeSubscriptionModel.agent_id.in_(subscribers),
-                    KnowledgeSubscriptionModel.active == True
-                )
-            )
-            result = await self.db.execute(stmt)
-            subscriptions = result.scalars().all()
-            
-            # Send notifications
+            # One notification per agent and delivery method
+            recipients: Dict[str, Set[str]] = {}
             for subscription in subscriptions:
-                # Check if knowledge matches subscription filters
-                if self._matches_subscription(knowledge_data, subscription):
-                    await self._send_knowledge_notification(
-                        subscription.agent_id,
-                        knowledge_id,
-                        knowledge_data,
-                        subscription.delivery_method
-                    )
-            
-            self.flow_metrics['knowledge_shared'] += len(subscriptions)
-            
-            logger.info(f"Notified {len(subscriptions)} subscribers",
+                recipients.setdefault(subscription.delivery_method, set()).add(subscription.agent_id)
+            
+            notified = await self._send_knowledge_notifications(recipients, knowledge_id, knowledge_data)
+            
+            self.flow_metrics['knowledge_shared'] += notified
+            
+            logger.info(f"Notified {notified} subscribers",
                        category=category,
                        knowledge_id=knowledge_id)
             
@@ -319,21 +309,16 @@ class KnowledgeFlowManager:
             # Get all active agents (would integrate with agent manager)
             # For now, broadcast to all subscribed agents
             
-            notified = 0
+            subscribers: Set[str] = set()
             for category in target_categories:
-                subscribers = self.active_subscriptions.get(category, set())
-                
-                if exclude_agents:
-                    subscribers = subscribers - set(exclude_agents)
-                
-                for agent_id in subscribers:
-                    await self._send_knowledge_notification(
-                        agent_id,
-                        knowledge_id,
-                        knowledge_data,
-                        "broadcast"
-                    )
-                    notified += 1
+                subscribers |= self.subscription_index.agents(category)
+            
+            if exclude_agents:
+                subscribers -= set(exclude_agents)
+            
+            notified = await self._send_knowledge_notifications(
+                {"broadcast": subscribers}, knowledge_id, knowledge_data
+            )
             
             logger.info(f"Knowledge broadcast to {notified} agents",
                        knowledge_id=knowledge_id)
@@ -353,10 +338,8 @@ class KnowledgeFlowManager:
         """Get knowledge flow metrics"""
         return {
             **self.flow_metrics,
-            "active_subscriptions_count": sum(
-                len(agents) for agents in self.active_subscriptions.values()
-            ),
-            "categories_with_subscribers": len(self.active_subscriptions),
+            "active_subscriptions_count": len(self.subscription_index),
+            "categories_with_subscribers": len(self.subscription_index.categories()),
             "timestamp": datetime.utcnow().isoformat()
         }
     
@@ -372,8 +355,7 @@ class KnowledgeFlowManager:
             subscriptions = result.scalars().all()
             
             for subscription in subscriptions:
-                for category in subscription.categories:
-                    self.active_subscriptions[category].add(subscription.agent_id)
+                self.subscription_index.add(IndexedSubscription.from_model(subscription))
             
             self.flow_metrics['subscriptions_active'] = len(subscriptions)
             
@@ -431,53 +413,63 @@ class KnowledgeFlowManager:
         except Exception as e:
             logger.error("Failed to handle knowledge share", error=str(e))
     
-    def _matches_subscription(
+    async def _send_knowledge_notifications(
         self,
-        knowledge_data: Dict[str, Any],
-        subscription: KnowledgeSubscriptionModel
-    ) -> bool:
-        """Check if knowledge matches subscription criteria"""
-        # Check tags
-        if subscription.tags:
-            knowledge_tags = knowledge_data.get('tags', [])
-            if not any(tag in knowledge_tags for tag in subscription.tags):
-                return False
-        
-        # Check additional filters
-        if subscription.filters:
-            for key, value in subscription.filters.items():
-                if knowledge_data.get(key) != value:
-                    return False
+        recipients: Dict[str, Set[str]],
+        knowledge_id: str,
+        knowledge_data: Dict[str, Any]
+    ) -> int:
+        """
+        Notify agents grouped by delivery method. Methods are sent concurrently,
+        each in batches of NOTIFICATION_BATCH_SIZE concurrent publishes.
+        Returns the number of notifications delivered.
+        """
+        async def send_method(delivery_method: str, agent_ids: Set[str]) -> int:
+            payload = self._notification_payload(knowledge_id, knowledge_data, delivery_method)
+            agent_ids = list(agent_ids)
+            delivered = 0
+            for i in range(0, len(agent_ids), NOTIFICATION_BATCH_SIZE):
+                batch = agent_ids[i:i + NOTIFICATION_BATCH_SIZE]
+                results = await asyncio.gather(
+                    *(self._send_knowledge_notification(agent_id, payload) for agent_id in batch)
+                )
+                delivered += sum(results)
+            return delivered
         
-        return True
+        counts = await asyncio.gather(
+            *(send_method(method, agent_ids) for method, agent_ids in recipients.items() if agent_ids)
+        )
+        return sum(counts)
     
-    async def _send_knowledge_notification(
+    def _notification_payload(
         self,
-        agent_id: str,
         knowledge_id: str,
         knowledge_data: Dict[str, Any],
         delivery_method: str
-    ):
+    ) -> Dict[str, Any]:
+        """Notification payload, shared by every recipient of a delivery method"""
+        return {
+            "notification_type": "new_knowledge",
+            "knowledge_id": knowledge_id,
+            "title": knowledge_data.get('title', 'New Knowledge Available'),
+            "category": knowledge_data.get('category'),
+            "summary": knowledge_data.get('summary', ''),
+            "delivery_method": delivery_method,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    
+    async def _send_knowledge_notification(self, agent_id: str, payload: Dict[str, Any]) -> bool:
         """Send knowledge notification to an agent"""
         try:
-            # Prepare notification payload
-            payload = {
-                "notification_type": "new_knowledge",
-                "knowledge_id": knowledge_id,
-                "title": knowledge_data.get('title', 'New Knowledge Available'),
-                "category": knowledge_data.get('category'),
-                "summary": knowledge_data.get('summary', ''),
-                "delivery_method": delivery_method,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
             # Send via message broker
             await self.broker.publish(
                 f"agent.{agent_id}.notifications",
                 payload
             )
+            return True
             
         except Exception as e:
             logger.error("Failed to send notification", 
                         agent_id=agent_id,
                         error=str(e))
+            return False
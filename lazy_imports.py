@@ -0,0 +1,81 @@
+"""
+Lazy Imports
+============
+Defers heavy optional imports (sklearn, sentence-transformers, torch...) until
+first use, so importing an agent module - and starting the system - does not
+pay for libraries a process may never touch.
+
+    HAS_SENTENCE_TRANSFORMERS = module_available("sentence_transformers")
+    sentence_transformers = lazy_import("sentence_transformers")
+    ...
+    model = sentence_transformers.SentenceTransformer("all-MiniLM-L6-v2")  # imported here
+
+``module_available`` only locates the module; nothing is executed. The time
+each lazy module took to import is kept in ``import_timings()`` for the
+startup profiler.
+"""
+
+import importlib
+import importlib.util
+import threading
+import time
+from types import ModuleType
+from typing import Dict, Optional
+
+_import_timings: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def module_available(name: str) -> bool:
+    """True if ``name`` can be imported, without importing it"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def import_timings() -> Dict[str, float]:
+    """Seconds spent importing each lazy module so far"""
+    return dict(_import_timings)
+
+
+class LazyModule(ModuleType):
+    """Module proxy that imports the real module on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with _lock:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.__name__)
+                    _import_timings[self.__name__] = time.perf_counter() - start
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_lazy_module"] is not None
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Proxy for ``name``; raises ImportError on first use if it is not installed"""
+    return LazyModule(name)
+
+
+def load_module(name: str) -> Optional[ModuleType]:
+    """Import ``name`` now (timed like a lazy import); None if it is not installed"""
+    if not module_available(name):
+        return None
+    return lazy_import(name)._load()
@@ -8,7 +8,7 @@ import json
 import time
 import traceback # Added for detailed error logging
 import os # Added for environment variables
-from typing import Dict, List, Optional, Any, Union, Set
+from typing import Dict, List, Optional, Any, Union, Set, Tuple
 from dataclasses import dataclass, field, asdict # Added asdict for easier serialization
 from enum import Enum
 import uuid
@@ -111,6 +111,12 @@ class LiveChattingManager(BaseAgent):
         self.ai_enabled_sessions: Set[str] = set()
         self.conversation_contexts: Dict[str, List[Dict]] = defaultdict(list)
         
+        # Streaming AI replies from the LLM agent, keyed by session_id
+        self.ai_streaming_enabled = self.config.get_setting("ai_streaming_enabled", True)
+        self.ai_model_key = self.config.get_setting("ai_model_key", "gpt35")
+        self.ai_stream_idle_timeout = self.config.get_setting("ai_stream_idle_timeout_seconds", 60)
+        self.ai_streams: Dict[str, Dict[str, Any]] = {}
+        
         # WebSocket server configuration from config or environment
         self.websocket_host = self.config.get_setting("websocket_host", "0.0.0.0")
         self.websocket_port = int(self.config.get_setting("websocket_port", 8765))
@@ -130,7 +136,9 @@ class LiveChattingManager(BaseAgent):
             "active_sessions": 0,
             "total_users": 0,
             "ai_responses_generated": 0,
-            "average_response_time": 0.0
+            "average_response_time": 0.0,
+            "ai_streams_cancelled": 0,
+            "average_time_to_first_token": 0.0
         }
         
         # Rate limiting
@@ -357,6 +365,8 @@ class LiveChattingManager(BaseAgent):
         session.ended_at = time.time()
         self.chat_metrics["active_sessions"] = len(self.chat_sessions)
 
+        await self._cancel_ai_stream(session_id, reason="session_ended")
+        
         # Notify participants
         await self._broadcast_to_session(session_id, {
             "type": "session_ended",
@@ -711,6 +721,10 @@ class LiveChattingManager(BaseAgent):
 
     async def _request_ai_response(self, session_id: str, last_message: ChatMessage):
         """Request an AI response from the CommunicationAgent"""
+        if self.ai_streaming_enabled and self.nc:
+            await self._start_ai_stream(session_id, last_message)
+            return
+        
         # This sends a task to the CommunicationAgent to generate a response
         # The CommunicationAgent will then publish back to "chat.ai.response"
         self.logger.info(f"Requesting AI response for session {session_id} from CommunicationAgent.")
@@ -762,6 +776,141 @@ class LiveChattingManager(BaseAgent):
         except Exception as e:
             self.logger.error(f"Error handling AI response: {e}", traceback=traceback.format_exc())
 
+    async def _start_ai_stream(self, session_id: str, last_message: ChatMessage):
+        """Request a streamed reply from the LLM agent and forward deltas as they arrive"""
+        # A newer message supersedes a reply still being generated
+        await self._cancel_ai_stream(session_id, reason="superseded")
+        
+        stream_id = str(uuid.uuid4())
+        inbox = self.nc.new_inbox()
+        session = self.chat_sessions[session_id]
+        stream = {
+            "stream_id": stream_id,
+            "message_id": str(uuid.uuid4()),
+            "replied_to": last_message.id,
+            "parts": [],
+            "requested_at": time.time(),
+            "last_chunk_at": time.time(),
+            "first_token_at": None,
+            "subscription": None
+        }
+        self.ai_streams[session_id] = stream
+        
+        async def on_chunk(msg):
+            await self._handle_ai_stream_chunk(session_id, stream_id, msg)
+        
+        stream["subscription"] = await self.nc.subscribe(inbox, cb=on_chunk)
+        
+        request = {
+            "stream": True,
+            "stream_id": stream_id,
+            "conversation_id": session_id,
+            "message": last_message.content,
+            "model_key": session.settings.get("ai_model_key", self.ai_model_key),
+            "user_id": last_message.user_id
+        }
+        await self._publish("llm.chat.generate", json.dumps(request).encode(), reply_to=inbox)
+        self.logger.info(f"Requested streamed AI response {stream_id} for session {session_id}.")
+
+    async def _handle_ai_stream_chunk(self, session_id: str, stream_id: str, msg):
+        """Forward one frame of the LLM agent's chunked reply protocol"""
+        stream = self.ai_streams.get(session_id)
+        if not stream or stream["stream_id"] != stream_id:
+            return  # Stale frame from a cancelled stream
+        
+        try:
+            frame = json.loads(msg.data.decode())
+            frame_type = frame.get("type")
+            stream["last_chunk_at"] = time.time()
+            
+            if frame_type == "delta":
+                if stream["first_token_at"] is None:
+                    stream["first_token_at"] = time.time()
+                    self._record_time_to_first_token(stream["first_token_at"] - stream["requested_at"])
+                stream["parts"].append(frame.get("content", ""))
+                await self._broadcast_to_session(session_id, {
+                    "type": "ai_stream_delta",
+                    "session_id": session_id,
+                    "stream_id": stream_id,
+                    "message_id": stream["message_id"],
+                    "seq": frame.get("seq"),
+                    "content": frame.get("content", "")
+                })
+            
+            elif frame_type == "done":
+                await self._finish_ai_stream(session_id)
+                chat_message = ChatMessage(
+                    id=stream["message_id"],
+                    session_id=session_id,
+                    user_id="ai_assistant",
+                    message_type=MessageType.ASSISTANT,
+                    content="".join(stream["parts"]),
+                    metadata={
+                        "streamed": True,
+                        "model": frame.get("model"),
+                        "tokens_used": frame.get("tokens_used"),
+                        "ttft_ms": frame.get("ttft_ms")
+                    },
+                    replied_to=stream["replied_to"]
+                )
+                self.message_buffer[session_id].append(chat_message)
+                self.chat_metrics["total_messages"] += 1
+                self.chat_metrics["ai_responses_generated"] += 1
+                if session_id in self.chat_sessions:
+                    self.chat_sessions[session_id].last_activity = time.time()
+                
+                await self._broadcast_to_session(session_id, {
+                    "type": "ai_stream_end",
+                    "session_id": session_id,
+                    "stream_id": stream_id,
+                    "message": asdict(chat_message)
+                })
+                if self.db_pool:
+                    await self._store_message_in_db(chat_message)
+            
+            elif frame_type in ("error", "cancelled"):
+                await self._finish_ai_stream(session_id)
+                await self._broadcast_to_session(session_id, {
+                    "type": "ai_stream_error",
+                    "session_id": session_id,
+                    "stream_id": stream_id,
+                    "message_id": stream["message_id"],
+                    "error": frame.get("error", frame_type)
+                })
+        
+        except Exception as e:
+            self.logger.error(f"Error handling AI stream chunk for session {session_id}: {e}", traceback=traceback.format_exc())
+
+    def _record_time_to_first_token(self, ttft_seconds: float):
+        """Exponential moving average of AI time-to-first-token"""
+        current = self.chat_metrics["average_time_to_first_token"]
+        self.chat_metrics["average_time_to_first_token"] = (
+            ttft_seconds if current == 0.0 else 0.9 * current + 0.1 * ttft_seconds
+        )
+
+    async def _finish_ai_stream(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Drop a session's stream state and its reply subscription"""
+        stream = self.ai_streams.pop(session_id, None)
+        if stream and stream["subscription"]:
+            try:
+                await stream["subscription"].unsubscribe()
+            except Exception:
+                pass
+        return stream
+
+    async def _cancel_ai_stream(self, session_id: str, reason: str = "client_left"):
+        """Stop an in-flight AI reply; the LLM agent aborts the provider request"""
+        stream = await self._finish_ai_stream(session_id)
+        if not stream:
+            return
+        
+        await self._publish("llm.chat.cancel", json.dumps({
+            "stream_id": stream["stream_id"],
+            "reason": reason
+        }).encode())
+        self.chat_metrics["ai_streams_cancelled"] += 1
+        self.logger.info(f"Cancelled AI stream {stream['stream_id']} for session {session_id} ({reason}).")
+
     async def _cleanup_connection(self, user_id: str):
         """Clean up a disconnected user's WebSocket connection"""
         if user_id in self.user_connections:
@@ -782,6 +931,12 @@ class LiveChattingManager(BaseAgent):
 
             self.chat_metrics["total_users"] = len(self.user_connections)
             self.logger.info(f"Cleaned up connection for user {user_id} from session {session_id}.")
+            
+            # Nobody is left to read an in-flight AI reply
+            if session_id in self.ai_streams and not any(
+                uc.session_id == session_id for uc in self.user_connections.values()
+            ):
+                await self._cancel_ai_stream(session_id)
 
     async def _session_cleanup_loop(self):
         """Background task to clean up idle or ended sessions"""
@@ -800,6 +955,11 @@ class LiveChattingManager(BaseAgent):
                     self.logger.info(f"Ending idle chat session {session_id}.")
                     await self._end_chat_session_task({"session_id": session_id})
                 
+                # Abandon AI streams that stopped producing output
+                for session_id, stream in list(self.ai_streams.items()):
+                    if current_time - stream["last_chunk_at"] > self.ai_stream_idle_timeout:
+                        await self._cancel_ai_stream(session_id, reason="idle_timeout")
+                
                 # Remove ended sessions from memory after a grace period
                 ended_sessions_to_remove = []
                 session_retention_period = self.config.get_setting("session_retention_seconds", 86400) # 24 hours
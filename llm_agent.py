@@ -63,14 +63,11 @@ except ImportError:
     FieldCondition = None
     MatchValue = None
     HAS_QDRANT = False
-# Optional dependencies - Text embeddings
+# Optional dependencies - Text embeddings, imported when the embedding model is first loaded
+from lazy_imports import lazy_import, module_available
 
-try:
-    from sentence_transformers import SentenceTransformer
-    HAS_SENTENCE_TRANSFORMERS = True
-except ImportError:
-    SentenceTransformer = None
-    HAS_SENTENCE_TRANSFORMERS = False
+HAS_SENTENCE_TRANSFORMERS = module_available("sentence_transformers")
+sentence_transformers = lazy_import("sentence_transformers")
 # Optional dependencies - Numerical computing
 
 try:
@@ -475,7 +472,7 @@ class LLMAgent(BaseAgent):
         
         # Initialize embedding model
         try:
-            self.embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+            self.embedding_model = sentence_transformers.SentenceTransformer("all-MiniLM-L6-v2")
             self.logger.info("SentenceTransformer embedding model loaded.")
         except Exception as e:
             self.logger.error(f"Failed to load SentenceTransformer: {e}. RAG features will be limited.")
@@ -0,0 +1,369 @@
+"""
+LLM Call Scheduler
+==================
+Admission control for LLM provider calls shared by interactive and batch work.
+
+- Per-model token buckets for requests-per-minute and tokens-per-minute
+- A priority queue per model; higher priority is dispatched first
+- A global concurrency limit, with slots reserved for high-priority calls
+- Model pauses driven by provider backoff hints (Retry-After and friends)
+
+Token usage is reserved up front from an estimate and reconciled with the
+actual usage when the call is released.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+@dataclass
+class ModelRateLimits:
+    """Provider limits for a model; 0 means unlimited"""
+    requests_per_minute: float = 0
+    tokens_per_minute: float = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ModelRateLimits':
+        return cls(
+            requests_per_minute=float(data.get("rpm", data.get("requests_per_minute", 0))),
+            tokens_per_minute=float(data.get("tpm", data.get("tokens_per_minute", 0)))
+        )
+
+
+class TokenBucket:
+    """Continuously refilling bucket; balance may go negative to record debt"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate_per_second = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate_per_second)
+        self.updated = now
+
+    def delay_for(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` can be taken (requests larger than capacity wait for a full bucket)"""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate_per_second
+
+    def consume(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+    def adjust(self, delta: float):
+        """Charge (positive) or refund (negative) the difference from the estimate"""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+@dataclass
+class SchedulerLease:
+    """Admission granted to a single call"""
+    model_key: str
+    estimated_tokens: int
+    priority: int
+    queued_ms: float = 0.0
+    actual_tokens: Optional[int] = None
+
+
+@dataclass(order=True)
+class _Job:
+    sort_key: tuple
+    model_key: str = field(compare=False)
+    estimated_tokens: int = field(compare=False)
+    priority: int = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+class LLMCallScheduler:
+    """Priority scheduler for LLM calls with per-model rate limits"""
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        limits: Optional[Dict[str, ModelRateLimits]] = None,
+        reserved_slots: int = 0,
+        reserved_min_priority: int = 3,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.reserved_slots = min(reserved_slots, max(0, max_concurrency - 1))
+        self.reserved_min_priority = reserved_min_priority
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._limits: Dict[str, ModelRateLimits] = {}
+        self._request_buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._token_buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._queues: Dict[str, List[_Job]] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._in_flight = 0
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "submitted": 0,
+            "dispatched": 0,
+            "completed": 0,
+            "cancelled": 0,
+            "rate_limit_pauses": 0,
+            "total_queue_wait_ms": 0.0,
+            "max_queue_wait_ms": 0.0
+        }
+
+        for model_key, model_limits in (limits or {}).items():
+            self.set_limits(model_key, model_limits)
+
+    def set_limits(self, model_key: str, limits: ModelRateLimits):
+        """Configure (or reconfigure) the rate limits of a model"""
+        self._limits[model_key] = limits
+        self._request_buckets[model_key] = (
+            TokenBucket(limits.requests_per_minute) if limits.requests_per_minute > 0 else None
+        )
+        self._token_buckets[model_key] = (
+            TokenBucket(limits.tokens_per_minute) if limits.tokens_per_minute > 0 else None
+        )
+
+    def pause_model(self, model_key: str, seconds: float):
+        """Hold back dispatches for a model (e.g. after a 429 with Retry-After)"""
+        until = time.monotonic() + seconds
+        if until > self._paused_until.get(model_key, 0.0):
+            self._paused_until[model_key] = until
+            self.stats["rate_limit_pauses"] += 1
+            self.logger.warning(f"LLM scheduler pausing {model_key} for {seconds:.1f}s")
+        if self._wakeup:
+            self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    async def acquire(self, model_key: str, estimated_tokens: int, priority: int = 0) -> SchedulerLease:
+        """Wait until the call may be sent"""
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(
+            sort_key=(-priority, next(self._sequence)),
+            model_key=model_key,
+            estimated_tokens=estimated_tokens,
+            priority=priority,
+            future=future
+        )
+        heapq.heappush(self._queues.setdefault(model_key, []), job)
+        self.stats["submitted"] += 1
+        self._wakeup.set()
+
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Granted just before cancellation: give the slot back
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(future.result())
+            self.stats["cancelled"] += 1
+            raise
+
+    def release(self, lease: SchedulerLease, actual_tokens: Optional[int] = None):
+        """Return the slot and reconcile token usage"""
+        self._in_flight -= 1
+        self.stats["completed"] += 1
+        actual = actual_tokens if actual_tokens is not None else lease.actual_tokens
+        bucket = self._token_buckets.get(lease.model_key)
+        if bucket and actual is not None:
+            bucket.adjust(actual - lease.estimated_tokens)
+        if self._wakeup:
+            self._wakeup.set()
+
+    @asynccontextmanager
+    async def reserve(self, model_key: str, estimated_tokens: int, priority: int = 0):
+        """``async with`` form of acquire/release; set ``lease.actual_tokens`` inside"""
+        lease = await self.acquire(model_key, estimated_tokens, priority)
+        try:
+            yield lease
+        finally:
+            self.release(lease)
+
+    async def run(
+        self,
+        model_key: str,
+        estimated_tokens: int,
+        call: Callable[[], Awaitable[Any]],
+        priority: int = 0,
+        usage: Optional[Callable[[Any], int]] = None
+    ) -> Any:
+        """Run ``call`` once admitted; ``usage`` extracts actual tokens from the result"""
+        async with self.reserve(model_key, estimated_tokens, priority) as lease:
+            result = await call()
+            if usage:
+                lease.actual_tokens = usage(result)
+            return result
+
+    # ------------------------------------------------------------------
+    # Dispatcher
+    # ------------------------------------------------------------------
+
+    def _ensure_dispatcher(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    def _admission_delay(self, job: _Job, now: float) -> float:
+        delay = max(0.0, self._paused_until.get(job.model_key, 0.0) - now)
+        request_bucket = self._request_buckets.get(job.model_key)
+        if request_bucket:
+            delay = max(delay, request_bucket.delay_for(1, now))
+        token_bucket = self._token_buckets.get(job.model_key)
+        if token_bucket:
+            delay = max(delay, token_bucket.delay_for(job.estimated_tokens, now))
+        return delay
+
+    def _slots_for(self, priority: int) -> int:
+        if priority >= self.reserved_min_priority:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved_slots
+
+    def _dispatch_ready(self) -> Optional[float]:
+        """Grant every admissible job; returns seconds until the next one may become admissible"""
+        next_check: Optional[float] = None
+        while self._in_flight < self.max_concurrency:
+            now = time.monotonic()
+            best: Optional[_Job] = None
+            for queue in self._queues.values():
+                while queue and queue[0].future.done():
+                    heapq.heappop(queue)  # Caller gave up while queued
+                if not queue:
+                    continue
+                head = queue[0]
+                if self._in_flight >= self._slots_for(head.priority):
+                    continue
+                delay = self._admission_delay(head, now)
+                if delay > 0:
+                    next_check = delay if next_check is None else min(next_check, delay)
+                elif best is None or head < best:
+                    best = head
+            if best is None:
+                return next_check
+
+            heapq.heappop(self._queues[best.model_key])
+            if self._request_buckets.get(best.model_key):
+                self._request_buckets[best.model_key].consume(1, now)
+            if self._token_buckets.get(best.model_key):
+                self._token_buckets[best.model_key].consume(best.estimated_tokens, now)
+
+            queued_ms = (now - best.enqueued_at) * 1000
+            self.stats["dispatched"] += 1
+            self.stats["total_queue_wait_ms"] += queued_ms
+            self.stats["max_queue_wait_ms"] = max(self.stats["max_queue_wait_ms"], queued_ms)
+            self._in_flight += 1
+            best.future.set_result(SchedulerLease(
+                model_key=best.model_key,
+                estimated_tokens=best.estimated_tokens,
+                priority=best.priority,
+                queued_ms=queued_ms
+            ))
+        return None
+
+    async def _dispatch_loop(self):
+        while True:
+            self._wakeup.clear()
+            next_check = self._dispatch_ready()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=next_check)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            **self.stats,
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queued": {model: len(queue) for model, queue in self._queues.items() if queue},
+            "paused": {
+                model: round(until - now, 1)
+                for model, until in self._paused_until.items() if until > now
+            },
+            "avg_queue_wait_ms": (
+                self.stats["total_queue_wait_ms"] / self.stats["dispatched"]
+                if self.stats["dispatched"] else 0.0
+            )
+        }
+
+    async def shutdown(self):
+        """Stop dispatching and fail queued calls"""
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for queue in self._queues.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.set_exception(RuntimeError("LLM scheduler shut down"))
+            queue.clear()
+
+
+# ----------------------------------------------------------------------
+# Provider backoff hints
+# ----------------------------------------------------------------------
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse '1.5', '20ms', '6m0s' or an HTTP date into seconds"""
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(f"{n}{u}" for n, u in parts) == value:
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether a provider error is a rate-limit/overload response"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in (429, 529) or "RateLimit" in type(error).__name__
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Extract a provider backoff hint from an exception, if it carries one"""
+    hint = getattr(error, "retry_after", None)
+    if isinstance(hint, (int, float)):
+        return float(hint)
+
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    for header in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        if headers.get(header):
+            seconds = _parse_duration(str(headers[header]))
+            if seconds is not None:
+                return seconds
+    return None
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+LLM Streaming Benchmark
+Compares time-to-first-token and throughput of blocking vs streaming generation
+using the deterministic stub provider
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Any
+
+from enhanced_llm_agent import StubLLMProvider, LLMConfig, LLMProvider
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples in milliseconds"""
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "avg_ms": sum(samples) / len(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[int(len(samples) * 0.95)],
+        "p99_ms": samples[int(len(samples) * 0.99)],
+        "max_ms": samples[-1],
+    }
+
+
+async def _blocking_request(provider: StubLLMProvider, config: LLMConfig,
+                            messages: List[Dict[str, str]]) -> Dict[str, float]:
+    """Users see nothing until the full completion returns"""
+    start = time.perf_counter()
+    response = await provider.generate(messages, config)
+    elapsed = (time.perf_counter() - start) * 1000
+    return {"ttft_ms": elapsed, "total_ms": elapsed, "tokens": response["tokens_used"]["completion"]}
+
+
+async def _streaming_request(provider: StubLLMProvider, config: LLMConfig,
+                             messages: List[Dict[str, str]]) -> Dict[str, float]:
+    """Users see the first delta as soon as it is generated"""
+    start = time.perf_counter()
+    ttft_ms = None
+    tokens = 0
+    async for chunk in provider.stream(messages, config):
+        if chunk.is_final:
+            continue
+        if ttft_ms is None:
+            ttft_ms = (time.perf_counter() - start) * 1000
+        tokens += 1
+    return {"ttft_ms": ttft_ms or 0.0, "total_ms": (time.perf_counter() - start) * 1000, "tokens": tokens}
+
+
+async def benchmark_mode(mode: str, concurrent_requests: int, response_tokens: int,
+                         ttft_ms: float, tokens_per_second: float) -> Dict[str, Any]:
+    """Run concurrent chat requests in one mode"""
+    provider = StubLLMProvider(
+        response_text=" ".join(f"token{i}" for i in range(response_tokens)),
+        time_to_first_token_ms=ttft_ms,
+        tokens_per_second=tokens_per_second
+    )
+    await provider.initialize()
+    config = LLMConfig(provider=LLMProvider.CUSTOM, model="stub")
+    messages = [{"role": "user", "content": "benchmark"}]
+    request = _streaming_request if mode == "streaming" else _blocking_request
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        request(provider, config, messages) for _ in range(concurrent_requests)
+    ])
+    wall_time = time.perf_counter() - start
+    await provider.close()
+
+    total_tokens = sum(r["tokens"] for r in results)
+    return {
+        "mode": mode,
+        "concurrent_requests": concurrent_requests,
+        "response_tokens": response_tokens,
+        "wall_time_s": wall_time,
+        "tokens_per_second": total_tokens / wall_time if wall_time else 0,
+        "time_to_first_token": _percentiles([r["ttft_ms"] for r in results]),
+        "completion_time": _percentiles([r["total_ms"] for r in results]),
+    }
+
+
+async def main():
+    """Run the streaming benchmark"""
+    parser = argparse.ArgumentParser(description="LLM streaming TTFT benchmark")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    args = parser.parse_args()
+
+    print("Starting LLM streaming benchmark...")
+    results = []
+    for mode in ("blocking", "streaming"):
+        result = await benchmark_mode(mode, args.requests, args.tokens, args.ttft_ms, args.tokens_per_second)
+        results.append(result)
+        ttft = result["time_to_first_token"]
+        print(f"Mode: {mode}")
+        print(f"  TTFT p50: {ttft['p50_ms']:.1f}ms  p99: {ttft['p99_ms']:.1f}ms")
+        print(f"  Throughput: {result['tokens_per_second']:.0f} tokens/s")
+
+    with open("llm_streaming_benchmark.json", "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
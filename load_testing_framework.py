@@ -2,19 +2,480 @@
 """
 Load Testing Framework for Agents
 Tests agent performance under realistic concurrent loads
+
+Two modes are supported:
+- closed loop: a fixed pool of workers issuing requests back to back
+- open loop: requests issued at a fixed arrival rate (constant, ramp or
+  Poisson) with HDR-style histograms and coordinated-omission corrected
+  latency, comparable against a saved baseline
 """
 
 import asyncio
 import time
+import math
+import random
 import statistics
 import json
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List, Any, Callable
+from typing import Dict, List, Any, Callable, Iterator, Optional
 from pathlib import Path
 import importlib.util
 import sys
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+
+# =============================================================================
+# Open-loop load engine
+# =============================================================================
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear latency histogram (microsecond resolution)
+
+    Values keep ``significant_figures`` decimal digits of precision across the
+    whole range, so recording is O(1) and memory stays bounded regardless of
+    the number of samples.
+    """
+
+    def __init__(self, significant_figures: int = 3):
+        self.significant_figures = significant_figures
+        self._sub_bucket_bits = math.ceil(math.log2(2 * 10 ** significant_figures))
+        self._sub_bucket_count = 1 << self._sub_bucket_bits
+        self._sub_bucket_half = self._sub_bucket_count // 2
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+        self.sum_us = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self._sub_bucket_bits
+        return shift * self._sub_bucket_half + (value >> shift)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self._sub_bucket_count:
+            return index
+        shift = index // self._sub_bucket_half - 1
+        sub_bucket = index - shift * self._sub_bucket_half
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, value_us: float, count: int = 1):
+        """Record a latency in microseconds"""
+        value = max(0, int(value_us))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += count
+        self.sum_us += value * count
+        self.max_us = max(self.max_us, value)
+        self.min_us = value if self.min_us is None else min(self.min_us, value)
+
+    def record_corrected(self, value_us: float, expected_interval_us: float):
+        """
+        Record a closed-loop sample with coordinated-omission correction
+
+        Back-fills the samples that would have been taken had the load
+        generator not been blocked behind a slow response.
+        """
+        self.record(value_us)
+        if expected_interval_us <= 0:
+            return
+        missing = value_us - expected_interval_us
+        while missing >= expected_interval_us:
+            self.record(missing)
+            missing -= expected_interval_us
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add another histogram's samples into this one"""
+        if other.significant_figures != self.significant_figures:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+        if other.min_us is not None:
+            self.min_us = other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+
+    def percentile(self, percentile: float) -> int:
+        """Value (us) at or below which ``percentile`` percent of samples fall"""
+        if not self.total_count:
+            return 0
+        target = max(1, math.ceil(percentile / 100.0 * self.total_count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max_us)
+        return self.max_us
+
+    def summary(self) -> Dict[str, float]:
+        """Latency summary in milliseconds"""
+        if not self.total_count:
+            return {"count": 0}
+        return {
+            "count": self.total_count,
+            "mean_ms": round(self.sum_us / self.total_count / 1000, 3),
+            "min_ms": round((self.min_us or 0) / 1000, 3),
+            "p50_ms": round(self.percentile(50) / 1000, 3),
+            "p90_ms": round(self.percentile(90) / 1000, 3),
+            "p99_ms": round(self.percentile(99) / 1000, 3),
+            "p99_9_ms": round(self.percentile(99.9) / 1000, 3),
+            "max_ms": round(self.max_us / 1000, 3)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "significant_figures": self.significant_figures,
+            "total_count": self.total_count,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+            "sum_us": self.sum_us,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LatencyHistogram':
+        histogram = cls(data.get("significant_figures", 3))
+        histogram.counts = {int(index): count for index, count in data.get("counts", {}).items()}
+        histogram.total_count = data.get("total_count", sum(histogram.counts.values()))
+        histogram.min_us = data.get("min_us")
+        histogram.max_us = data.get("max_us", 0)
+        histogram.sum_us = data.get("sum_us", 0)
+        return histogram
+
+
+class ArrivalProfile:
+    """Base class for open-loop arrival schedules"""
+
+    name = "base"
+
+    def arrivals(self, duration_s: float) -> Iterator[float]:
+        """Yield send offsets (seconds from start) up to ``duration_s``"""
+        raise NotImplementedError
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"profile": self.name}
+
+
+class ConstantRate(ArrivalProfile):
+    """Evenly spaced arrivals at a fixed rate"""
+
+    name = "constant"
+
+    def __init__(self, rate_per_s: float):
+        self.rate_per_s = rate_per_s
+
+    def arrivals(self, duration_s: float) -> Iterator[float]:
+        if self.rate_per_s <= 0:
+            return
+        interval = 1.0 / self.rate_per_s
+        for i in range(int(duration_s * self.rate_per_s)):
+            yield i * interval
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"profile": self.name, "rate_per_s": self.rate_per_s}
+
+
+class RampRate(ArrivalProfile):
+    """Rate increasing linearly from ``start_rate_per_s`` to ``end_rate_per_s``"""
+
+    name = "ramp"
+
+    def __init__(self, start_rate_per_s: float, end_rate_per_s: float):
+        self.start_rate_per_s = start_rate_per_s
+        self.end_rate_per_s = end_rate_per_s
+
+    def arrivals(self, duration_s: float) -> Iterator[float]:
+        # Invert the cumulative arrival count N(t) = r0*t + (r1-r0)*t^2/(2T)
+        r0, r1 = max(self.start_rate_per_s, 0.0), max(self.end_rate_per_s, 0.0)
+        if duration_s <= 0 or (r0 == 0 and r1 == 0):
+            return
+        slope = (r1 - r0) / duration_s
+        total = int(r0 * duration_s + slope * duration_s ** 2 / 2)
+        for n in range(total):
+            if abs(slope) < 1e-12:
+                yield n / r0
+            else:
+                # max(): rounding can push the discriminant of a falling ramp just below zero
+                yield (-r0 + math.sqrt(max(r0 * r0 + 2 * slope * n, 0.0))) / slope
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "profile": self.name,
+            "start_rate_per_s": self.start_rate_per_s,
+            "end_rate_per_s": self.end_rate_per_s
+        }
+
+
+class PoissonArrivals(ArrivalProfile):
+    """Poisson process arrivals (exponential inter-arrival times)"""
+
+    name = "poisson"
+
+    def __init__(self, rate_per_s: float, seed: Optional[int] = None):
+        self.rate_per_s = rate_per_s
+        self.seed = seed
+
+    def arrivals(self, duration_s: float) -> Iterator[float]:
+        if self.rate_per_s <= 0:
+            return
+        rng = random.Random(self.seed)
+        offset = rng.expovariate(self.rate_per_s)
+        while offset < duration_s:
+            yield offset
+            offset += rng.expovariate(self.rate_per_s)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"profile": self.name, "rate_per_s": self.rate_per_s, "seed": self.seed}
+
+
+def build_profile(profile: str, rate_per_s: float, start_rate_per_s: float = 1.0,
+                  seed: Optional[int] = None) -> ArrivalProfile:
+    """Build an arrival profile by name"""
+    if profile == "constant":
+        return ConstantRate(rate_per_s)
+    if profile == "ramp":
+        return RampRate(start_rate_per_s, rate_per_s)
+    if profile == "poisson":
+        return PoissonArrivals(rate_per_s, seed)
+    raise ValueError(f"Unknown arrival profile: {profile}")
+
+
+class AgentMethodTarget:
+    """Load target calling an in-process agent method (sync or async)"""
+
+    def __init__(self, method: Callable, *args, payload_factory: Optional[Callable[[int], Any]] = None,
+                 **kwargs):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.payload_factory = payload_factory
+        self.is_async = asyncio.iscoroutinefunction(method)
+
+    async def __call__(self, sequence: int) -> Any:
+        args = (self.payload_factory(sequence),) + self.args if self.payload_factory else self.args
+        if self.is_async:
+            return await self.method(*args, **self.kwargs)
+        return await asyncio.to_thread(self.method, *args, **self.kwargs)
+
+    async def aclose(self):
+        pass
+
+
+class HttpTarget:
+    """Load target issuing HTTP requests; 5xx responses count as errors"""
+
+    def __init__(self, url: str, method: str = "GET", json_body: Optional[Any] = None,
+                 max_connections: int = 1000):
+        if not HAS_HTTPX:
+            raise ImportError("httpx is required for HTTP load targets")
+        self.url = url
+        self.method = method
+        self.json_body = json_body
+        self.client = httpx.AsyncClient(limits=httpx.Limits(max_connections=max_connections))
+
+    async def __call__(self, sequence: int) -> Any:
+        response = await self.client.request(self.method, self.url, json=self.json_body)
+        if response.status_code >= 500:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        return response.status_code
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+@dataclass
+class LoadTestResult:
+    """Result of an open-loop load test"""
+    name: str
+    profile: Dict[str, Any]
+    duration_s: float
+    scheduled: int = 0
+    completed: int = 0
+    errors: Dict[str, int] = field(default_factory=dict)
+    max_send_lag_ms: float = 0.0
+    wall_time_s: float = 0.0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    service_time: LatencyHistogram = field(default_factory=LatencyHistogram)
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def error_count(self) -> int:
+        return sum(self.errors.values())
+
+    @property
+    def achieved_rate_per_s(self) -> float:
+        return self.completed / self.wall_time_s if self.wall_time_s else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "timestamp": self.timestamp,
+            "profile": self.profile,
+            "duration_s": self.duration_s,
+            "wall_time_s": round(self.wall_time_s, 3),
+            "scheduled": self.scheduled,
+            "completed": self.completed,
+            "error_count": self.error_count,
+            "error_rate": round(self.error_count / self.scheduled, 6) if self.scheduled else 0.0,
+            "errors": self.errors,
+            "achieved_rate_per_s": round(self.achieved_rate_per_s, 2),
+            "max_send_lag_ms": round(self.max_send_lag_ms, 3),
+            # Latency is measured from the intended send time, so it includes
+            # queueing the target caused (coordinated-omission corrected).
+            "latency": self.latency.summary(),
+            "service_time": self.service_time.summary(),
+            "histograms": {
+                "latency": self.latency.to_dict(),
+                "service_time": self.service_time.to_dict()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LoadTestResult':
+        histograms = data.get("histograms", {})
+        result = cls(
+            name=data["name"],
+            profile=data.get("profile", {}),
+            duration_s=data.get("duration_s", 0.0),
+            scheduled=data.get("scheduled", 0),
+            completed=data.get("completed", 0),
+            errors=data.get("errors", {}),
+            max_send_lag_ms=data.get("max_send_lag_ms", 0.0),
+            wall_time_s=data.get("wall_time_s", 0.0),
+            timestamp=data.get("timestamp", "")
+        )
+        if "latency" in histograms:
+            result.latency = LatencyHistogram.from_dict(histograms["latency"])
+        if "service_time" in histograms:
+            result.service_time = LatencyHistogram.from_dict(histograms["service_time"])
+        return result
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def compare(self, baseline: 'LoadTestResult', max_regression_pct: float = 10.0) -> Dict[str, Any]:
+        """Compare latency percentiles and error rate against a baseline run"""
+        current_summary = self.latency.summary()
+        baseline_summary = baseline.latency.summary()
+        metrics = {}
+        regressions = []
+        for key in ("p50_ms", "p90_ms", "p99_ms", "p99_9_ms", "max_ms"):
+            current = current_summary.get(key, 0.0)
+            previous = baseline_summary.get(key, 0.0)
+            change_pct = ((current - previous) / previous * 100) if previous else 0.0
+            metrics[key] = {
+                "baseline": previous,
+                "current": current,
+                "change_pct": round(change_pct, 2)
+            }
+            if change_pct > max_regression_pct:
+                regressions.append(key)
+
+        current_error_rate = self.error_count / self.scheduled if self.scheduled else 0.0
+        baseline_error_rate = baseline.error_count / baseline.scheduled if baseline.scheduled else 0.0
+        metrics["error_rate"] = {"baseline": baseline_error_rate, "current": current_error_rate}
+        if current_error_rate > baseline_error_rate + 0.01:
+            regressions.append("error_rate")
+
+        return {
+            "name": self.name,
+            "baseline_timestamp": baseline.timestamp,
+            "max_regression_pct": max_regression_pct,
+            "metrics": metrics,
+            "regressions": regressions,
+            "passed": not regressions
+        }
+
+
+class OpenLoopLoadEngine:
+    """
+    Asyncio open-loop load generator
+
+    Requests are issued on the arrival schedule whether or not earlier
+    requests have completed, so a slow target cannot throttle the offered
+    load. ``max_in_flight`` caps the requests outstanding against the target;
+    arrivals beyond it still get a task on schedule and wait for a slot, timed
+    from their intended send time (so memory grows with the backlog when the
+    target cannot keep up with the offered rate).
+    """
+
+    def __init__(self, max_in_flight: int = 1000, request_timeout_s: float = 30.0,
+                 significant_figures: int = 3):
+        self.max_in_flight = max_in_flight
+        self.request_timeout_s = request_timeout_s
+        self.significant_figures = significant_figures
+
+    async def run(self, name: str, target: Callable[[int], Any], profile: ArrivalProfile,
+                  duration_s: float, warmup_requests: int = 0) -> LoadTestResult:
+        """Drive ``target`` with ``profile`` for ``duration_s`` seconds"""
+        for i in range(warmup_requests):
+            try:
+                await asyncio.wait_for(target(-i - 1), timeout=self.request_timeout_s)
+            except Exception:
+                pass
+
+        result = LoadTestResult(
+            name=name,
+            profile=profile.to_dict(),
+            duration_s=duration_s,
+            latency=LatencyHistogram(self.significant_figures),
+            service_time=LatencyHistogram(self.significant_figures)
+        )
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        pending = set()
+        start = loop.time()
+
+        for sequence, offset in enumerate(profile.arrivals(duration_s)):
+            intended = start + offset
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            result.max_send_lag_ms = max(result.max_send_lag_ms, (loop.time() - intended) * 1000)
+            result.scheduled += 1
+            task = asyncio.create_task(self._issue(target, sequence, intended, slots, result))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        if pending:
+            await asyncio.gather(*pending)
+        result.wall_time_s = loop.time() - start
+        return result
+
+    async def _issue(self, target: Callable[[int], Any], sequence: int, intended: float,
+                     slots: asyncio.Semaphore, result: LoadTestResult):
+        loop = asyncio.get_running_loop()
+        async with slots:
+            sent = loop.time()
+            try:
+                await asyncio.wait_for(target(sequence), timeout=self.request_timeout_s)
+                result.completed += 1
+            except Exception as e:
+                error_type = type(e).__name__
+                result.errors[error_type] = result.errors.get(error_type, 0) + 1
+            finished = loop.time()
+        result.latency.record((finished - intended) * 1_000_000)
+        result.service_time.record((finished - sent) * 1_000_000)
+
+
+def load_baseline(path: str) -> Dict[str, LoadTestResult]:
+    """Load saved results (single result or a list of them) keyed by name"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    entries = data if isinstance(data, list) else data.get("open_loop_tests", [data])
+    return {entry["name"]: LoadTestResult.from_dict(entry) for entry in entries if "name" in entry}
+
 
 class AgentLoadTester:
     """Load testing framework for agents"""
@@ -24,7 +485,8 @@ class AgentLoadTester:
         self.results = {
             "test_timestamp": datetime.now().isoformat(),
             "max_workers": max_workers,
-            "load_tests": []
+            "load_tests": [],
+            "open_loop_tests": []
         }
     
     def load_agent_module(self, file_path: str, agent_name: str):
@@ -206,12 +668,66 @@ class AgentLoadTester:
         
         return results
     
+    async def open_loop_test(
+        self,
+        target: Callable[[int], Any],
+        name: str,
+        profile: ArrivalProfile,
+        duration_s: float = 10.0,
+        max_in_flight: int = 1000,
+        baseline: Optional[LoadTestResult] = None,
+        max_regression_pct: float = 10.0
+    ) -> Dict[str, Any]:
+        """
+        Open-loop load test against an agent method or HTTP target
+        
+        Args:
+            target: AgentMethodTarget, HttpTarget or any async callable taking a sequence number
+            name: Name recorded in the results (and used to match baselines)
+            profile: Arrival profile
+            duration_s: Length of the arrival schedule in seconds
+            max_in_flight: Maximum concurrently outstanding requests
+            baseline: Optional previous result to compare against
+            max_regression_pct: Allowed percentile regression before failing the comparison
+        """
+        print(f"Open-loop load testing {name}...")
+        print(f"  Profile: {profile.to_dict()}, Duration: {duration_s}s")
+        
+        engine = OpenLoopLoadEngine(max_in_flight=max_in_flight)
+        try:
+            result = await engine.run(name, target, profile, duration_s)
+        finally:
+            if hasattr(target, 'aclose'):
+                await target.aclose()
+        
+        results = result.to_dict()
+        results["status"] = "SUCCESS" if result.completed else "FAILED"
+        latency = results["latency"]
+        print(f"  ✅ {result.completed}/{result.scheduled} completed ({result.error_count} errors)")
+        print(f"  ⚡ {results['achieved_rate_per_s']:.1f} req/s achieved")
+        if result.completed:
+            print(f"  📊 Latency: p50 {latency['p50_ms']:.2f}ms, p99 {latency['p99_ms']:.2f}ms, "
+                  f"p99.9 {latency['p99_9_ms']:.2f}ms")
+        
+        if baseline is not None:
+            comparison = result.compare(baseline, max_regression_pct)
+            results["baseline_comparison"] = comparison
+            if not comparison["passed"]:
+                print(f"  ⚠️  Regressed vs baseline: {', '.join(comparison['regressions'])}")
+        
+        self.results["open_loop_tests"].append(results)
+        return results
+    
     def run_load_tests(
         self, 
         test_results_file: str = "agent_test_results_complete.json",
         num_requests: int = 100,
         concurrent_workers: int = None,
-        max_agents: int = 10
+        max_agents: int = 10,
+        mode: str = "closed",
+        profile: Optional[ArrivalProfile] = None,
+        duration_s: float = 10.0,
+        baseline_file: Optional[str] = None
     ):
         """
         Run load tests on passing agents
@@ -221,6 +737,10 @@ class AgentLoadTester:
             num_requests: Number of requests per agent
             concurrent_workers: Number of concurrent workers
             max_agents: Maximum number of agents to test
+            mode: "closed" (worker pool) or "open" (fixed arrival rate)
+            profile: Arrival profile for open-loop mode
+            duration_s: Duration of each open-loop test
+            baseline_file: Saved results to compare open-loop runs against
         """
         if concurrent_workers is None:
             concurrent_workers = self.max_workers
@@ -245,6 +765,8 @@ class AgentLoadTester:
         # Limit to max_agents
         agents_to_test = passing_agents[:max_agents]
         
+        baselines = load_baseline(baseline_file) if baseline_file else {}
+        
         print(f"Testing {len(agents_to_test)} agents (of {len(passing_agents)} passing)")
         print()
         
@@ -269,6 +791,21 @@ class AgentLoadTester:
                     continue
                 
                 # Run load test
+                if mode == "open":
+                    agent = agent_class()
+                    if not hasattr(agent, 'process'):
+                        print("  ❌ Agent has no process() method")
+                        continue
+                    asyncio.run(self.open_loop_test(
+                        AgentMethodTarget(agent.process),
+                        agent_name,
+                        profile or ConstantRate(num_requests / duration_s),
+                        duration_s=duration_s,
+                        max_in_flight=concurrent_workers,
+                        baseline=baselines.get(agent_name)
+                    ))
+                    continue
+                
                 result = self.load_test_agent(
                     agent_class, 
                     agent_name,
@@ -304,6 +841,17 @@ class AgentLoadTester:
                 )
             }
         
+        open_loop_tests = self.results["open_loop_tests"]
+        if open_loop_tests:
+            self.results["open_loop_summary"] = {
+                "total_agents_tested": len(open_loop_tests),
+                "successful_tests": sum(1 for t in open_loop_tests if t["status"] == "SUCCESS"),
+                "baseline_regressions": sum(
+                    1 for t in open_loop_tests
+                    if not t.get("baseline_comparison", {}).get("passed", True)
+                )
+            }
+        
         # Save results
         output_file = "agent_load_test_results.json"
         with open(output_file, 'w') as f:
@@ -318,6 +866,11 @@ class AgentLoadTester:
             
             if summary["agents_with_degradation"] > 0:
                 print(f"  ⚠️  Agents with degradation: {summary['agents_with_degradation']}")
+        elif open_loop_tests:
+            summary = self.results["open_loop_summary"]
+            print(f"  Open-loop tests completed: {summary['successful_tests']}/{summary['total_agents_tested']}")
+            if summary["baseline_regressions"] > 0:
+                print(f"  ⚠️  Agents regressed vs baseline: {summary['baseline_regressions']}")
         else:
             print("  No successful tests")
         
@@ -337,13 +890,29 @@ def main():
                        help='Number of concurrent workers (default: 10)')
     parser.add_argument('--max-agents', type=int, default=10,
                        help='Maximum number of agents to test (default: 10)')
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed',
+                       help='Closed-loop worker pool or open-loop arrival rate (default: closed)')
+    parser.add_argument('--profile', choices=['constant', 'ramp', 'poisson'], default='constant',
+                       help='Open-loop arrival profile (default: constant)')
+    parser.add_argument('--rate', type=float, default=100.0,
+                       help='Open-loop arrival rate, or final rate for ramp (default: 100/s)')
+    parser.add_argument('--start-rate', type=float, default=1.0,
+                       help='Initial rate for the ramp profile (default: 1/s)')
+    parser.add_argument('--duration', type=float, default=10.0,
+                       help='Open-loop test duration in seconds (default: 10)')
+    parser.add_argument('--baseline', default=None,
+                       help='Saved load test results to compare open-loop runs against')
     args = parser.parse_args()
     
     tester = AgentLoadTester(max_workers=args.workers)
     tester.run_load_tests(
         num_requests=args.requests,
         concurrent_workers=args.workers,
-        max_agents=args.max_agents
+        max_agents=args.max_agents,
+        mode=args.mode,
+        profile=build_profile(args.profile, args.rate, args.start_rate),
+        duration_s=args.duration,
+        baseline_file=args.baseline
     )
 
 
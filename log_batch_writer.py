@@ -0,0 +1,212 @@
+"""
+Batched Log Writer
+==================
+Accumulates append-only log rows per table and writes them with a single
+``COPY`` (asyncpg ``copy_records_to_table``) instead of one ``INSERT`` round
+trip per row.
+
+Rows carry their primary key and timestamp, generated client-side by the
+caller, so nothing has to be read back from the database. A table is flushed
+when it reaches ``flush_size`` rows or at the latest every ``flush_interval``
+seconds. A failed flush puts the rows back in front of the buffer so they are
+retried by the next flush; the buffer is capped at ``max_pending`` rows per
+table, beyond which the oldest rows are dropped and counted.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class _TableBuffer:
+    """Pending rows for one table"""
+
+    def __init__(self, table: str, columns: Sequence[str], key_column: str):
+        self.table = table
+        self.columns = tuple(columns)
+        self.key_index = self.columns.index(key_column)
+        self.rows: List[List[Any]] = []
+        self.by_key: Dict[Any, List[Any]] = {}
+        self.in_flight: Dict[Any, List[Any]] = {}
+        self.lock = asyncio.Lock()
+
+
+class LogBatchWriter:
+    """
+    Per-table COPY batching writer
+
+    Usage:
+        writer = LogBatchWriter(database, flush_size=1000, flush_interval=0.5)
+        writer.register_table("project_event_logs", ["id", "project_id", ...])
+        writer.start()
+        await writer.add("project_event_logs", {"id": uuid.uuid4(), ...})
+        await writer.close()               # flushes what is left
+    """
+
+    def __init__(
+        self,
+        database,
+        flush_size: int = 1000,
+        flush_interval: float = 0.5,
+        max_pending: int = 50000
+    ):
+        self.database = database
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._tables: Dict[str, _TableBuffer] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.stats = {
+            "added": 0,
+            "written": 0,
+            "batches": 0,
+            "flush_failures": 0,
+            "dropped": 0,
+            "last_flush_ms": 0.0
+        }
+
+    def register_table(self, table: str, columns: Sequence[str], key_column: str = "id"):
+        """Declare a table and the column order rows are copied in"""
+        self._tables[table] = _TableBuffer(table, columns, key_column)
+
+    def pending(self, table: Optional[str] = None) -> int:
+        """Number of rows not yet written, for one table or all of them"""
+        if table is not None:
+            return len(self._tables[table].rows)
+        return sum(len(buffer.rows) for buffer in self._tables.values())
+
+    # ------------------------------------------------------------------ writes
+
+    async def add(self, table: str, record: Dict[str, Any]):
+        """Queue a row; missing columns are written as NULL"""
+        buffer = self._tables[table]
+        row = [record.get(column) for column in buffer.columns]
+        buffer.rows.append(row)
+        buffer.by_key[row[buffer.key_index]] = row
+        self.stats["added"] += 1
+
+        if len(buffer.rows) >= self.flush_size:
+            if self._task is not None:
+                self._wake.set()
+            else:
+                await self.flush_table(table)
+
+        if len(buffer.rows) >= self.max_pending:
+            # Back-pressure: the caller waits for the write instead of growing the buffer
+            try:
+                await self.flush_table(table)
+            except Exception as e:
+                logger.error(f"Log batch flush for {table} failed under back-pressure: {e}")
+            self._trim(buffer)
+
+    async def update_pending(self, table: str, key: Any, changes: Dict[str, Any]) -> bool:
+        """
+        Apply changes to a row that has not been written yet. Returns False once
+        the row is in the database; if it is being copied right now this waits
+        for that flush to finish first, so the caller can UPDATE it instead.
+        """
+        buffer = self._tables[table]
+        while True:
+            row = buffer.by_key.get(key)
+            if row is not None:
+                for column, value in changes.items():
+                    row[buffer.columns.index(column)] = value
+                return True
+            if key not in buffer.in_flight:
+                return False
+            async with buffer.lock:
+                pass
+
+    def _trim(self, buffer: _TableBuffer):
+        overflow = len(buffer.rows) - self.max_pending
+        if overflow <= 0:
+            return
+        for row in buffer.rows[:overflow]:
+            buffer.by_key.pop(row[buffer.key_index], None)
+        del buffer.rows[:overflow]
+        self.stats["dropped"] += overflow
+        logger.warning(f"Dropped {overflow} unwritten rows for {buffer.table}")
+
+    # ------------------------------------------------------------------ flushing
+
+    async def flush_table(self, table: str) -> int:
+        """Write all pending rows of one table; returns the number written"""
+        buffer = self._tables[table]
+        async with buffer.lock:
+            if not buffer.rows:
+                return 0
+
+            rows, buffer.rows = buffer.rows, []
+            buffer.in_flight, buffer.by_key = buffer.by_key, {}
+            start = time.perf_counter()
+            try:
+                async with self.database.get_connection() as conn:
+                    await conn.copy_records_to_table(
+                        table,
+                        records=[tuple(row) for row in rows],
+                        columns=list(buffer.columns)
+                    )
+            except BaseException:
+                # Keep them for the next flush (also on cancellation), ahead of anything added meanwhile
+                buffer.rows = rows + buffer.rows
+                buffer.in_flight.update(buffer.by_key)
+                buffer.in_flight, buffer.by_key = {}, buffer.in_flight
+                self.stats["flush_failures"] += 1
+                self._trim(buffer)
+                raise
+
+            buffer.in_flight = {}
+            self.stats["written"] += len(rows)
+            self.stats["batches"] += 1
+            self.stats["last_flush_ms"] = (time.perf_counter() - start) * 1000
+            return len(rows)
+
+    async def flush(self) -> int:
+        """Write pending rows of every table"""
+        written = 0
+        for table in list(self._tables):
+            try:
+                written += await self.flush_table(table)
+            except Exception as e:
+                logger.error(f"Log batch flush for {table} failed: {e}")
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the background flusher"""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the flusher and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Writer statistics"""
+        return {
+            **self.stats,
+            "pending": self.pending(),
+            "avg_batch_size": self.stats["written"] / self.stats["batches"] if self.stats["batches"] else 0.0
+        }
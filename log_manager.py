@@ -4,15 +4,83 @@ Comprehensive logging system for tracking all activities, file locations, and kn
 """
 
 import asyncio
+import base64
 import logging
-from typing import Dict, List, Any, Optional
+import re
+import uuid
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
 from collections import defaultdict
 
+from log_batch_writer import LogBatchWriter
+
 logger = logging.getLogger(__name__)
 
+# Append-only log tables: written through the COPY batch writer and partitioned
+# by month on this column, so retention is a partition drop
+PARTITIONED_LOG_TABLES = {
+    'project_event_logs': 'timestamp',
+    'module_integration_logs': 'integrated_at',
+    'knowledge_flow_logs': 'created_at',
+    'agent_interaction_logs': 'timestamp'
+}
+
+_BATCHED_COLUMNS = {
+    'project_event_logs': [
+        'id', 'project_id', 'event_type', 'event_category', 'severity',
+        'details', 'user_id', 'agent_id', 'timestamp'
+    ],
+    'module_integration_logs': [
+        'id', 'project_id', 'module_id', 'submission_id', 'module_name',
+        'integration_status', 'integration_method', 'file_paths', 'dependencies',
+        'quality_score', 'integration_time_seconds', 'error_message', 'metadata',
+        'integrated_at'
+    ],
+    'knowledge_flow_logs': [
+        'id', 'request_type', 'source_agent', 'target_agent', 'knowledge_type',
+        'query', 'response', 'approval_status', 'approved_by', 'processing_time_ms',
+        'metadata', 'created_at'
+    ],
+    'agent_interaction_logs': [
+        'id', 'interaction_type', 'source_agent', 'target_agent', 'action',
+        'request_data', 'response_data', 'status_code', 'response_time_ms',
+        'success', 'error_message', 'timestamp'
+    ]
+}
+
+_PARTITION_SUFFIX = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def _month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def _add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(table: str, month: datetime) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def encode_log_cursor(timestamp: datetime, log_id: Any) -> str:
+    """Opaque keyset cursor pointing just past a log row"""
+    raw = f"{timestamp.isoformat()}|{log_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_log_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Inverse of encode_log_cursor; raises ValueError on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, log_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), uuid.UUID(log_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid log cursor: {cursor}") from e
+
 
 class ProjectLogManager:
     """
@@ -40,7 +108,19 @@ class ProjectLogManager:
         
         # Log retention
         self.log_retention_days = 90
+        self.partition_months_ahead = 2
+        self.partitioned_tables = set()
+        
+        # Append-only tables are written in COPY batches
+        self.writer = LogBatchWriter(
+            database,
+            flush_size=getattr(settings, 'log_batch_size', 1000),
+            flush_interval=getattr(settings, 'log_flush_interval', 0.5)
+        )
+        for table, columns in _BATCHED_COLUMNS.items():
+            self.writer.register_table(table, columns)
         
+        self._maintenance_task: Optional[asyncio.Task] = None
         self.is_initialized = False
     
     async def initialize(self):
@@ -52,6 +132,9 @@ class ProjectLogManager:
             # Load recent data into cache
             await self._load_caches()
             
+            self.writer.start()
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+            
             self.is_initialized = True
             logger.info("✓ Log manager initialized")
             
@@ -62,9 +145,9 @@ class ProjectLogManager:
     async def _create_log_tables(self):
         """Create logging tables if they don't exist"""
         await self.database.execute_command("""
-            -- Project event logs
+            -- Project event logs (partitioned by month)
             CREATE TABLE IF NOT EXISTS project_event_logs (
-                id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+                id UUID NOT NULL DEFAULT uuid_generate_v4(),
                 project_id UUID NOT NULL,
                 event_type VARCHAR(100) NOT NULL,
                 event_category VARCHAR(50) DEFAULT 'general',
@@ -72,11 +155,13 @@ class ProjectLogManager:
                 details JSONB DEFAULT '{}',
                 user_id UUID,
                 agent_id VARCHAR(255),
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_project_logs_project (project_id),
-                INDEX idx_project_logs_type (event_type),
-                INDEX idx_project_logs_timestamp (timestamp DESC)
-            );
+                timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, timestamp)
+            ) PARTITION BY RANGE (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_project_logs_page
+                ON project_event_logs (project_id, timestamp DESC, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_project_logs_type ON project_event_logs (event_type);
+            CREATE INDEX IF NOT EXISTS idx_project_logs_timestamp ON project_event_logs (timestamp DESC);
             
             -- File location tracking
             CREATE TABLE IF NOT EXISTS file_location_logs (
@@ -91,14 +176,14 @@ class ProjectLogManager:
                 metadata JSONB DEFAULT '{}',
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_file_logs_project (project_id),
-                INDEX idx_file_logs_path (file_path),
                 UNIQUE(project_id, file_path)
             );
+            CREATE INDEX IF NOT EXISTS idx_file_logs_project ON file_location_logs (project_id);
+            CREATE INDEX IF NOT EXISTS idx_file_logs_path ON file_location_logs (file_path);
             
-            -- Module integration history
+            -- Module integration history (partitioned by month)
             CREATE TABLE IF NOT EXISTS module_integration_logs (
-                id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+                id UUID NOT NULL DEFAULT uuid_generate_v4(),
                 project_id UUID NOT NULL,
                 module_id UUID NOT NULL,
                 submission_id UUID,
@@ -111,15 +196,17 @@ class ProjectLogManager:
                 integration_time_seconds FLOAT,
                 error_message TEXT,
                 metadata JSONB DEFAULT '{}',
-                integrated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_module_logs_project (project_id),
-                INDEX idx_module_logs_module (module_id),
-                INDEX idx_module_logs_status (integration_status)
-            );
+                integrated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, integrated_at)
+            ) PARTITION BY RANGE (integrated_at);
+            CREATE INDEX IF NOT EXISTS idx_module_logs_project ON module_integration_logs (project_id);
+            CREATE INDEX IF NOT EXISTS idx_module_logs_module
+                ON module_integration_logs (module_id, integrated_at DESC);
+            CREATE INDEX IF NOT EXISTS idx_module_logs_status ON module_integration_logs (integration_status);
             
-            -- Knowledge flow logs
+            -- Knowledge flow logs (partitioned by month)
             CREATE TABLE IF NOT EXISTS knowledge_flow_logs (
-                id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+                id UUID NOT NULL DEFAULT uuid_generate_v4(),
                 request_type VARCHAR(50) NOT NULL,
                 source_agent VARCHAR(255),
                 target_agent VARCHAR(255),
@@ -130,11 +217,14 @@ class ProjectLogManager:
                 approved_by VARCHAR(255),
                 processing_time_ms INTEGER,
                 metadata JSONB DEFAULT '{}',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_knowledge_logs_source (source_agent),
-                INDEX idx_knowledge_logs_type (knowledge_type),
-                INDEX idx_knowledge_logs_status (approval_status)
-            );
+                created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at);
+            CREATE INDEX IF NOT EXISTS idx_knowledge_logs_source ON knowledge_flow_logs (source_agent);
+            CREATE INDEX IF NOT EXISTS idx_knowledge_logs_target ON knowledge_flow_logs (target_agent);
+            CREATE INDEX IF NOT EXISTS idx_knowledge_logs_type ON knowledge_flow_logs (knowledge_type);
+            CREATE INDEX IF NOT EXISTS idx_knowledge_logs_status ON knowledge_flow_logs (approval_status);
+            CREATE INDEX IF NOT EXISTS idx_knowledge_logs_created ON knowledge_flow_logs (created_at DESC);
             
             -- Build process logs
             CREATE TABLE IF NOT EXISTS build_process_logs (
@@ -150,15 +240,14 @@ class ProjectLogManager:
                 error_log TEXT,
                 metadata JSONB DEFAULT '{}',
                 started_at TIMESTAMP,
-                completed_at TIMESTAMP,
-                INDEX idx_build_logs_project (project_id),
-                INDEX idx_build_logs_build (build_id),
-                INDEX idx_build_logs_status (build_status)
+                completed_at TIMESTAMP
             );
+            CREATE INDEX IF NOT EXISTS idx_build_logs_project ON build_process_logs (project_id);
+            CREATE INDEX IF NOT EXISTS idx_build_logs_status ON build_process_logs (build_status);
             
-            -- Agent interaction logs
+            -- Agent interaction logs (partitioned by month)
             CREATE TABLE IF NOT EXISTS agent_interaction_logs (
-                id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+                id UUID NOT NULL DEFAULT uuid_generate_v4(),
                 interaction_type VARCHAR(100) NOT NULL,
                 source_agent VARCHAR(255),
                 target_agent VARCHAR(255),
@@ -169,11 +258,13 @@ class ProjectLogManager:
                 response_time_ms INTEGER,
                 success BOOLEAN,
                 error_message TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_interaction_logs_source (source_agent),
-                INDEX idx_interaction_logs_target (target_agent),
-                INDEX idx_interaction_logs_type (interaction_type)
-            );
+                timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (id, timestamp)
+            ) PARTITION BY RANGE (timestamp);
+            CREATE INDEX IF NOT EXISTS idx_interaction_logs_source ON agent_interaction_logs (source_agent);
+            CREATE INDEX IF NOT EXISTS idx_interaction_logs_target ON agent_interaction_logs (target_agent);
+            CREATE INDEX IF NOT EXISTS idx_interaction_logs_type ON agent_interaction_logs (interaction_type);
+            CREATE INDEX IF NOT EXISTS idx_interaction_logs_timestamp ON agent_interaction_logs (timestamp DESC);
             
             -- Directory structure snapshots
             CREATE TABLE IF NOT EXISTS directory_structure_snapshots (
@@ -183,11 +274,46 @@ class ProjectLogManager:
                 file_count INTEGER,
                 total_size BIGINT,
                 snapshot_type VARCHAR(50) DEFAULT 'periodic',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_directory_snapshots_project (project_id),
-                INDEX idx_directory_snapshots_created (created_at DESC)
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
+            CREATE INDEX IF NOT EXISTS idx_directory_snapshots_project ON directory_structure_snapshots (project_id);
+            CREATE INDEX IF NOT EXISTS idx_directory_snapshots_created
+                ON directory_structure_snapshots (created_at DESC);
         """)
+        
+        # Tables created before partitioning stay plain tables; retention falls back to DELETE for them
+        rows = await self.database.execute_query(
+            "SELECT relname FROM pg_class WHERE relkind = 'p' AND relname = ANY($1::text[])",
+            list(PARTITIONED_LOG_TABLES)
+        )
+        self.partitioned_tables = {row['relname'] for row in rows}
+        for table in set(PARTITIONED_LOG_TABLES) - self.partitioned_tables:
+            logger.warning(f"{table} is not partitioned; old rows will be deleted instead of dropped")
+        
+        await self._ensure_partitions()
+    
+    async def _ensure_partitions(self):
+        """Create monthly partitions from the current month up to partition_months_ahead"""
+        month = _month_start(datetime.utcnow())
+        months = [month]
+        for _ in range(self.partition_months_ahead):
+            months.append(_add_months(months[-1], 1))
+        
+        for table in self.partitioned_tables:
+            await self.database.execute_command(
+                f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+            )
+            for start in months:
+                end = _add_months(start, 1)
+                try:
+                    await self.database.execute_command(
+                        f"CREATE TABLE IF NOT EXISTS {_partition_name(table, start)} "
+                        f"PARTITION OF {table} "
+                        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                    )
+                except Exception as e:
+                    # Typically rows for this month already sit in the default partition
+                    logger.error(f"Failed to create partition {_partition_name(table, start)}: {e}")
     
     async def _load_caches(self):
         """Load recent data into memory caches"""
@@ -215,62 +341,102 @@ class ProjectLogManager:
         agent_id: Optional[str] = None,
         severity: str = "info",
         category: str = "general"
-    ):
-        """Log project event"""
+    ) -> Optional[str]:
+        """Log project event; returns the event ID (written in the next batch)"""
         try:
-            query = """
-                INSERT INTO project_event_logs 
-                (project_id, event_type, event_category, severity, details, user_id, agent_id)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                RETURNING id
-            """
+            event_id = uuid.uuid4()
+            timestamp = datetime.utcnow()
             
-            result = await self.database.execute_single(
-                query,
-                project_id,
-                event_type,
-                category,
-                severity,
-                json.dumps(details),
-                user_id,
-                agent_id
-            )
+            await self.writer.add('project_event_logs', {
+                'id': event_id,
+                'project_id': project_id,
+                'event_type': event_type,
+                'event_category': category,
+                'severity': severity,
+                'details': json.dumps(details),
+                'user_id': user_id,
+                'agent_id': agent_id,
+                'timestamp': timestamp
+            })
             
             # Add to recent cache
             self.recent_logs_cache[project_id].append({
-                'id': str(result['id']),
+                'id': str(event_id),
                 'event_type': event_type,
                 'details': details,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': timestamp.isoformat()
             })
             
             # Keep cache size limited
             if len(self.recent_logs_cache[project_id]) > 100:
                 self.recent_logs_cache[project_id] = self.recent_logs_cache[project_id][-100:]
             
+            return str(event_id)
+            
         except Exception as e:
             logger.error(f"Failed to log project event: {e}")
+            return None
+    
+    async def _flush_before_read(self, *tables: str):
+        """Write buffered rows so a read sees events logged before it"""
+        for table in tables or _BATCHED_COLUMNS:
+            try:
+                await self.writer.flush_table(table)
+            except Exception as e:
+                logger.warning(f"Reading {table} without {self.writer.pending(table)} buffered rows: {e}")
     
     async def get_project_logs(
         self,
         project_id: str,
         limit: int = 100,
         offset: int = 0,
-        event_type: Optional[str] = None
+        event_type: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Dict]:
-        """Get project logs with filtering"""
+        """Get project logs with filtering, newest first"""
+        page = await self.get_project_logs_page(project_id, limit, cursor, event_type, offset)
+        return page['logs']
+    
+    async def get_project_logs_page(
+        self,
+        project_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        event_type: Optional[str] = None,
+        offset: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Keyset-paginated project logs. Pass the returned next_cursor to get the
+        following page; offset is only honoured without a cursor, for old clients.
+        """
+        await self._flush_before_read('project_event_logs')
+        
         query = "SELECT * FROM project_event_logs WHERE project_id = $1"
-        params = [project_id]
+        params: List[Any] = [project_id]
         
         if event_type:
-            query += " AND event_type = $2"
             params.append(event_type)
+            query += f" AND event_type = ${len(params)}"
         
-        query += f" ORDER BY timestamp DESC LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-        params.extend([limit, offset])
+        if cursor:
+            before_timestamp, before_id = decode_log_cursor(cursor)
+            params.extend([before_timestamp, before_id])
+            query += f" AND (timestamp, id) < (${len(params) - 1}, ${len(params)})"
         
-        logs = await self.database.execute_query(query, *params)
-        return [dict(log) for log in logs]
+        params.append(limit)
+        query += f" ORDER BY timestamp DESC, id DESC LIMIT ${len(params)}"
+        
+        if offset and not cursor:
+            params.append(offset)
+            query += f" OFFSET ${len(params)}"
+        
+        logs = [dict(log) for log in await self.database.execute_query(query, *params)]
+        
+        next_cursor = None
+        if len(logs) == limit:
+            next_cursor = encode_log_cursor(logs[-1]['timestamp'], logs[-1]['id'])
+        
+        return {'logs': logs, 'next_cursor': next_cursor}
     
     # =========================================================================
     # FILE LOCATION TRACKING
@@ -373,32 +539,22 @@ class ProjectLogManager:
     ):
         """Log module integration"""
         try:
-            query = """
-                INSERT INTO module_integration_logs (
-                    project_id, module_id, submission_id, module_name,
-                    integration_status, integration_method, file_paths,
-                    dependencies, quality_score, integration_time_seconds,
-                    error_message, metadata
-                )
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
-                RETURNING id
-            """
-            
-            await self.database.execute_single(
-                query,
-                project_id,
-                module_id,
-                submission_id,
-                module_name,
-                integration_status,
-                integration_method,
-                json.dumps(file_paths),
-                json.dumps(dependencies),
-                quality_score,
-                integration_time,
-                error_message,
-                json.dumps(metadata or {})
-            )
+            await self.writer.add('module_integration_logs', {
+                'id': uuid.uuid4(),
+                'project_id': project_id,
+                'module_id': module_id,
+                'submission_id': submission_id,
+                'module_name': module_name,
+                'integration_status': integration_status,
+                'integration_method': integration_method,
+                'file_paths': json.dumps(file_paths),
+                'dependencies': json.dumps(dependencies),
+                'quality_score': quality_score,
+                'integration_time_seconds': integration_time,
+                'error_message': error_message,
+                'metadata': json.dumps(metadata or {}),
+                'integrated_at': datetime.utcnow()
+            })
             
             # Log as project event
             await self.log_project_event(
@@ -419,6 +575,8 @@ class ProjectLogManager:
     
     async def get_module_logs(self, module_id: str) -> List[Dict]:
         """Get logs for specific module"""
+        await self._flush_before_read('module_integration_logs')
+        
         query = """
             SELECT * FROM module_integration_logs 
             WHERE module_id = $1
@@ -441,25 +599,21 @@ class ProjectLogManager:
     ):
         """Log knowledge request"""
         try:
-            sql = """
-                INSERT INTO knowledge_flow_logs (
-                    request_type, source_agent, target_agent, 
-                    knowledge_type, query
-                )
-                VALUES ($1, $2, $3, $4, $5)
-                RETURNING id
-            """
+            request_id = uuid.uuid4()
             
-            result = await self.database.execute_single(
-                sql,
-                "request",
-                agent_id,
-                target_agent,
-                knowledge_type,
-                query
-            )
+            await self.writer.add('knowledge_flow_logs', {
+                'id': request_id,
+                'request_type': "request",
+                'source_agent': agent_id,
+                'target_agent': target_agent,
+                'knowledge_type': knowledge_type,
+                'query': query,
+                'approval_status': 'pending',
+                'metadata': '{}',
+                'created_at': datetime.utcnow()
+            })
             
-            return str(result['id'])
+            return str(request_id)
             
         except Exception as e:
             logger.error(f"Failed to log knowledge request: {e}")
@@ -475,6 +629,17 @@ class ProjectLogManager:
     ):
         """Log knowledge response"""
         try:
+            changes = {
+                'response': json.dumps(response),
+                'approval_status': approval_status,
+                'approved_by': approved_by,
+                'processing_time_ms': processing_time_ms
+            }
+            
+            # The request may still be waiting for its batch
+            if await self.writer.update_pending('knowledge_flow_logs', uuid.UUID(str(request_id)), changes):
+                return
+            
             query = """
                 UPDATE knowledge_flow_logs
                 SET response = $1,
@@ -486,7 +651,7 @@ class ProjectLogManager:
             
             await self.database.execute_command(
                 query,
-                json.dumps(response),
+                changes['response'],
                 approval_status,
                 approved_by,
                 processing_time_ms,
@@ -503,24 +668,18 @@ class ProjectLogManager:
     ):
         """Log knowledge contribution"""
         try:
-            query = """
-                INSERT INTO knowledge_flow_logs (
-                    request_type, source_agent, target_agent,
-                    knowledge_type, query, response, approval_status
-                )
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-            """
-            
-            await self.database.execute_single(
-                query,
-                "contribution",
-                "project_agent",
-                "learning_agent",
-                knowledge_data.get('type', 'module_knowledge'),
-                f"Contribution from module {module_id}",
-                json.dumps(knowledge_data),
-                "auto_approved"
-            )
+            await self.writer.add('knowledge_flow_logs', {
+                'id': uuid.uuid4(),
+                'request_type': "contribution",
+                'source_agent': "project_agent",
+                'target_agent': "learning_agent",
+                'knowledge_type': knowledge_data.get('type', 'module_knowledge'),
+                'query': f"Contribution from module {module_id}",
+                'response': json.dumps(knowledge_data),
+                'approval_status': "auto_approved",
+                'metadata': '{}',
+                'created_at': datetime.utcnow()
+            })
             
         except Exception as e:
             logger.error(f"Failed to log knowledge contribution: {e}")
@@ -531,6 +690,8 @@ class ProjectLogManager:
         limit: int = 100
     ) -> List[Dict]:
         """Get knowledge flow logs"""
+        await self._flush_before_read('knowledge_flow_logs')
+        
         if agent_id:
             query = """
                 SELECT * FROM knowledge_flow_logs 
@@ -666,28 +827,20 @@ class ProjectLogManager:
     ):
         """Log agent interaction"""
         try:
-            query = """
-                INSERT INTO agent_interaction_logs (
-                    interaction_type, source_agent, target_agent, action,
-                    request_data, response_data, status_code, response_time_ms,
-                    success, error_message
-                )
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-            """
-            
-            await self.database.execute_command(
-                query,
-                interaction_type,
-                source_agent,
-                target_agent,
-                action,
-                json.dumps(request_data or {}),
-                json.dumps(response_data or {}),
-                status_code,
-                response_time_ms,
-                success,
-                error_message
-            )
+            await self.writer.add('agent_interaction_logs', {
+                'id': uuid.uuid4(),
+                'interaction_type': interaction_type,
+                'source_agent': source_agent,
+                'target_agent': target_agent,
+                'action': action,
+                'request_data': json.dumps(request_data or {}),
+                'response_data': json.dumps(response_data or {}),
+                'status_code': status_code,
+                'response_time_ms': response_time_ms,
+                'success': success,
+                'error_message': error_message,
+                'timestamp': datetime.utcnow()
+            })
             
         except Exception as e:
             logger.error(f"Failed to log agent interaction: {e}")
@@ -698,6 +851,8 @@ class ProjectLogManager:
         limit: int = 100
     ) -> List[Dict]:
         """Get agent interaction logs"""
+        await self._flush_before_read('agent_interaction_logs')
+        
         if agent_id:
             query = """
                 SELECT * FROM agent_interaction_logs 
@@ -849,6 +1004,7 @@ class ProjectLogManager:
     async def get_daily_summary(self) -> Dict[str, Any]:
         """Get comprehensive daily summary for synchronization"""
         cutoff_time = datetime.utcnow() - timedelta(hours=24)
+        await self._flush_before_read()
         
         summary = {
             'period': 'daily',
@@ -943,29 +1099,71 @@ class ProjectLogManager:
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=self.log_retention_days)
             
-            tables = [
-                'project_event_logs',
-                'agent_interaction_logs',
-                'knowledge_flow_logs'
-            ]
-            
-            for table in tables:
-                query = f"DELETE FROM {table} WHERE timestamp < $1"
-                await self.database.execute_command(query, cutoff_date)
+            for table, time_column in PARTITIONED_LOG_TABLES.items():
+                if table not in self.partitioned_tables:
+                    await self.database.execute_command(
+                        f"DELETE FROM {table} WHERE {time_column} < $1", cutoff_date
+                    )
+                    continue
+                
+                # Whole months past retention are dropped, no row-by-row delete
+                partitions = await self.database.execute_query("""
+                    SELECT child.relname
+                    FROM pg_inherits
+                    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                    WHERE parent.relname = $1
+                """, table)
+                
+                for partition in partitions:
+                    name = partition['relname']
+                    match = _PARTITION_SUFFIX.search(name)
+                    if not match:
+                        continue
+                    month = datetime(int(match.group(1)), int(match.group(2)), 1)
+                    if _add_months(month, 1) <= cutoff_date:
+                        await self.database.execute_command(f"DROP TABLE IF EXISTS {name}")
+                        logger.info(f"Dropped log partition {name}")
+                
+                await self.database.execute_command(
+                    f"DELETE FROM {table}_default WHERE {time_column} < $1", cutoff_date
+                )
             
             logger.info(f"Cleaned up logs older than {self.log_retention_days} days")
             
         except Exception as e:
             logger.error(f"Failed to cleanup old logs: {e}")
     
+    async def _maintenance_loop(self, interval_seconds: float = 6 * 3600):
+        """Keep future partitions created and expired ones dropped"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self._ensure_partitions()
+                await self.cleanup_old_logs()
+            except Exception as e:
+                logger.error(f"Log maintenance failed: {e}")
+    
     async def health_check(self) -> bool:
         """Check log manager health"""
         return self.is_initialized
     
+    def get_writer_stats(self) -> Dict[str, Any]:
+        """Batch writer statistics"""
+        return self.writer.get_stats()
+    
     async def shutdown(self):
         """Shutdown log manager"""
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+        
         # Save all cached directory structures
         for project_id in self.directory_structure_cache:
             await self.save_directory_snapshot(project_id)
         
-        logger.info("Log manager shutdown complete")
\ No newline at end of file
+        # Write whatever is still buffered
+        await self.writer.close()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Log Manager Insert Benchmark
+Project events/sec through the previous path (one ``INSERT ... RETURNING id``
+round trip per event) versus the COPY batch writer, with the same number of
+concurrent loggers.
+
+With --database-url both paths write to a scratch table in that PostgreSQL
+database (asyncpg). Without it a simulated database charges --rtt-ms per round
+trip plus --row-us per row, which is where the two paths differ.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Dict
+
+from log_batch_writer import LogBatchWriter
+
+_COLUMNS = ["id", "project_id", "event_type", "event_category", "severity", "details", "agent_id", "timestamp"]
+
+_SCRATCH_TABLE = """
+    CREATE TABLE IF NOT EXISTS log_benchmark_events (
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
+        project_id UUID NOT NULL,
+        event_type VARCHAR(100) NOT NULL,
+        event_category VARCHAR(50) DEFAULT 'general',
+        severity VARCHAR(20) DEFAULT 'info',
+        details JSONB DEFAULT '{}',
+        agent_id VARCHAR(255),
+        timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, timestamp)
+    )
+"""
+
+
+class _SimulatedDatabase:
+    """Charges a fixed round-trip cost plus a per-row cost"""
+
+    def __init__(self, rtt_ms: float, row_us: float, pool_size: int):
+        self.rtt = rtt_ms / 1000
+        self.row = row_us / 1_000_000
+        self.pool = asyncio.Semaphore(pool_size)
+
+    @asynccontextmanager
+    async def get_connection(self):
+        async with self.pool:
+            yield self
+
+    async def execute_single(self, query: str, *args) -> Dict[str, Any]:
+        async with self.pool:
+            await asyncio.sleep(self.rtt + self.row)
+            return {"id": uuid.uuid4()}
+
+    async def copy_records_to_table(self, table, records, columns):
+        await asyncio.sleep(self.rtt + self.row * len(records))
+
+
+def _event(n: int, project_id: str) -> Dict[str, Any]:
+    return {
+        "id": uuid.uuid4(),
+        "project_id": project_id,
+        "event_type": "file_uploaded",
+        "event_category": "general",
+        "severity": "info",
+        "details": json.dumps({"n": n, "file": f"src/module_{n % 100}.py"}),
+        "agent_id": f"agent-{n % 20}",
+        "timestamp": datetime.utcnow()
+    }
+
+
+async def _run_loggers(log_one, seconds: float, concurrency: int) -> int:
+    count = 0
+    deadline = time.perf_counter() + seconds
+
+    async def logger_task(worker: int):
+        nonlocal count
+        n = worker
+        while time.perf_counter() < deadline:
+            await log_one(n)
+            count += 1
+            n += concurrency
+
+    await asyncio.gather(*(logger_task(worker) for worker in range(concurrency)))
+    return count
+
+
+async def bench_single_insert(database, seconds: float, concurrency: int) -> Dict[str, Any]:
+    project_id = str(uuid.uuid4())
+    query = """
+        INSERT INTO log_benchmark_events
+        (project_id, event_type, event_category, severity, details, agent_id)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        RETURNING id
+    """
+
+    async def log_one(n: int):
+        event = _event(n, project_id)
+        await database.execute_single(
+            query, project_id, event["event_type"], event["event_category"],
+            event["severity"], event["details"], event["agent_id"]
+        )
+
+    start = time.perf_counter()
+    count = await _run_loggers(log_one, seconds, concurrency)
+    elapsed = time.perf_counter() - start
+    return {"events": count, "events_per_second": count / elapsed}
+
+
+async def bench_batched(database, seconds: float, concurrency: int, flush_size: int) -> Dict[str, Any]:
+    project_id = str(uuid.uuid4())
+    writer = LogBatchWriter(database, flush_size=flush_size, flush_interval=0.5)
+    writer.register_table("log_benchmark_events", _COLUMNS)
+    writer.start()
+
+    async def log_one(n: int):
+        await writer.add("log_benchmark_events", _event(n, project_id))
+        await asyncio.sleep(0)  # callers of log_project_event do other work between events
+
+    start = time.perf_counter()
+    count = await _run_loggers(log_one, seconds, concurrency)
+    await writer.close()
+    elapsed = time.perf_counter() - start
+    stats = writer.get_stats()
+    return {
+        "events": count,
+        "events_per_second": count / elapsed,
+        "batches": stats["batches"],
+        "avg_batch_size": stats["avg_batch_size"]
+    }
+
+
+async def main():
+    """Run the log manager insert benchmark"""
+    parser = argparse.ArgumentParser(description="Project log insert throughput benchmark")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--flush-size", type=int, default=1000)
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    parser.add_argument("--row-us", type=float, default=20.0)
+    args = parser.parse_args()
+
+    if args.database_url:
+        from database import Database
+
+        database = Database(args.database_url)
+        await database.initialize()
+        await database.execute_command(_SCRATCH_TABLE)
+    else:
+        database = _SimulatedDatabase(args.rtt_ms, args.row_us, pool_size=20)
+
+    print("Starting log manager insert benchmark...")
+    single = await bench_single_insert(database, args.seconds, args.concurrency)
+    print(f"INSERT per event: {single['events_per_second']:.0f} events/s")
+    batched = await bench_batched(database, args.seconds, args.concurrency, args.flush_size)
+    print(f"COPY batches:     {batched['events_per_second']:.0f} events/s "
+          f"({batched['batches']} batches, avg {batched['avg_batch_size']:.0f} rows)")
+    print(f"Speedup:          {batched['events_per_second'] / single['events_per_second']:.1f}x")
+
+    if args.database_url:
+        await database.execute_command("DROP TABLE IF EXISTS log_benchmark_events")
+        await database.close()
+
+    with open("log_manager_benchmark.json", "w") as f:
+        json.dump({"single_insert": single, "batched_copy": batched, "simulated": not args.database_url}, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,372 @@
+"""
+Message Codec
+=============
+Wire encoding for inter-agent messages.
+
+A message body is serialized as JSON, msgpack or CBOR and optionally
+compressed with zstd (with or without a trained dictionary) or zlib. The
+format travels in NATS headers:
+
+    Content-Type:      application/json | application/msgpack | application/cbor
+    Content-Encoding:  zstd | zlib                (absent = uncompressed)
+    Zstd-Dictionary:   <dictionary id>            (zstd with a dictionary only)
+
+A message without headers is plain JSON, which is what agents that predate
+this module send and expect, so old and new agents interoperate:
+
+* every agent decodes whatever a message's headers say it is;
+* requests carry ``Accept`` / ``Accept-Encoding`` headers listing what the
+  sender can decode (including its dictionary ids), and replies are encoded
+  with the best format both sides support - plain JSON for a legacy peer;
+* unsolicited publishes use the agent's configured format, which should stay
+  ``json`` until every subscriber on the subject understands the others.
+
+msgpack and CBOR carry ``bytes`` values as raw binary. JSON has no binary
+type, so bytes are written as hex strings there (the representation the
+legacy compressed payloads already used).
+"""
+
+import json
+import zlib
+from dataclasses import asdict, is_dataclass
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# Optional dependencies - binary serializers and zstd
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    msgpack = None
+    HAS_MSGPACK = False
+
+try:
+    import cbor2
+    HAS_CBOR = True
+except ImportError:
+    cbor2 = None
+    HAS_CBOR = False
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    zstandard = None
+    HAS_ZSTD = False
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+ZSTD = "zstd"
+ZLIB = "zlib"
+
+CONTENT_TYPE_HEADER = "Content-Type"
+CONTENT_ENCODING_HEADER = "Content-Encoding"
+DICTIONARY_HEADER = "Zstd-Dictionary"
+ACCEPT_HEADER = "Accept"
+ACCEPT_ENCODING_HEADER = "Accept-Encoding"
+
+# Short names accepted in configuration
+FORMAT_ALIASES = {"json": JSON, "msgpack": MSGPACK, "cbor": CBOR}
+
+# Preference order when choosing a format for a peer
+_TYPE_PREFERENCE = [MSGPACK, CBOR, JSON]
+
+DEFAULT_COMPRESS_THRESHOLD = 1024
+MAX_DECODED_SIZE = 64 * 1024 * 1024
+
+
+class CodecError(ValueError):
+    """Message cannot be encoded or decoded with the available codecs"""
+
+
+def _to_plain(value: Any) -> Any:
+    """Fallback for types the serializers do not know"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if is_dataclass(value) and not isinstance(value, type):
+        return asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return _to_plain(value)
+
+
+def _cbor_default(encoder, value):
+    encoder.encode(_to_plain(value))
+
+
+def available_content_types() -> List[str]:
+    """Serializers usable in this process, most preferred first"""
+    return [ct for ct in _TYPE_PREFERENCE
+            if ct == JSON or (ct == MSGPACK and HAS_MSGPACK) or (ct == CBOR and HAS_CBOR)]
+
+
+def available_encodings() -> List[str]:
+    return [ZSTD, ZLIB] if HAS_ZSTD else [ZLIB]
+
+
+def serialize(obj: Any, content_type: str = JSON) -> bytes:
+    """Serialize without compression"""
+    if content_type == JSON:
+        return json.dumps(obj, default=_json_default, separators=(",", ":")).encode("utf-8")
+    if content_type == MSGPACK and HAS_MSGPACK:
+        return msgpack.packb(obj, default=_to_plain, use_bin_type=True)
+    if content_type == CBOR and HAS_CBOR:
+        return cbor2.dumps(obj, default=_cbor_default)
+    raise CodecError(f"Content type {content_type!r} is not available")
+
+
+def deserialize(data: bytes, content_type: str = JSON) -> Any:
+    try:
+        if content_type == JSON:
+            return json.loads(data)
+        if content_type == MSGPACK and HAS_MSGPACK:
+            return msgpack.unpackb(data, raw=False, strict_map_key=False)
+        if content_type == CBOR and HAS_CBOR:
+            return cbor2.loads(data)
+    except Exception as e:
+        raise CodecError(f"Malformed {content_type} message: {e}") from e
+    raise CodecError(f"Content type {content_type!r} is not available")
+
+
+def train_dictionary(samples: Iterable[bytes], size: int = 16 * 1024) -> bytes:
+    """
+    Train a zstd dictionary from serialized sample messages. Samples should be
+    encoded in the format the dictionary will be used with (e.g. msgpack).
+    """
+    if not HAS_ZSTD:
+        raise CodecError("zstandard is not installed")
+    return zstandard.train_dictionary(size, list(samples)).as_bytes()
+
+
+def dictionary_id(dictionary: bytes) -> int:
+    if not HAS_ZSTD:
+        raise CodecError("zstandard is not installed")
+    return zstandard.ZstdCompressionDict(dictionary).dict_id()
+
+
+def _header_list(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+class MessageCodec:
+    """
+    Encodes messages in one configured wire format and decodes any format
+
+    Usage:
+        codec = MessageCodec(content_type=MSGPACK, compression=ZSTD)
+        codec.add_dictionary(open("messages.dict", "rb").read())
+        data, headers = codec.encode(message)
+        await nc.publish(subject, data, headers=headers)
+
+        message = codec.decode(msg.data, msg.headers)
+        reply_data, reply_headers = codec.for_peer(msg.headers).encode(response)
+    """
+
+    def __init__(
+        self,
+        content_type: str = JSON,
+        compression: Optional[str] = None,
+        compress_threshold: int = DEFAULT_COMPRESS_THRESHOLD,
+        level: int = 3,
+        dictionaries: Iterable[bytes] = (),
+        dictionary_id: Optional[int] = None,
+        max_decoded_size: int = MAX_DECODED_SIZE
+    ):
+        content_type = FORMAT_ALIASES.get(content_type, content_type)
+        if content_type not in available_content_types():
+            raise CodecError(f"Content type {content_type!r} is not available")
+        if compression not in (None, ZSTD, ZLIB):
+            raise CodecError(f"Unknown compression {compression!r}")
+        if compression == ZSTD and not HAS_ZSTD:
+            raise CodecError("zstandard is not installed")
+
+        self.content_type = content_type
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        self.level = level
+        self.max_decoded_size = max_decoded_size
+
+        self._dictionaries: Dict[int, Any] = {}
+        self._compressors: Dict[Optional[int], Any] = {}
+        self._decompressors: Dict[Optional[int], Any] = {}
+        for data in dictionaries:
+            self.add_dictionary(data)
+        if dictionary_id is not None and dictionary_id not in self._dictionaries:
+            raise CodecError(f"Unknown zstd dictionary {dictionary_id}")
+        self.dictionary_id = dictionary_id
+
+    @classmethod
+    def from_config(
+        cls,
+        wire_format: str = "json",
+        compression: Optional[str] = None,
+        dictionary_path: Optional[str] = None
+    ) -> "MessageCodec":
+        """Build a codec from agent settings; a dictionary file implies zstd"""
+        if not dictionary_path:
+            return cls(content_type=wire_format, compression=compression)
+        with open(dictionary_path, "rb") as f:
+            data = f.read()
+        return cls(
+            content_type=wire_format,
+            compression=ZSTD,
+            dictionaries=[data],
+            dictionary_id=dictionary_id(data)
+        )
+
+    # ------------------------------------------------------------------ dictionaries
+
+    def add_dictionary(self, data: bytes) -> int:
+        """Register a zstd dictionary for decoding (and encoding when selected)"""
+        if not HAS_ZSTD:
+            raise CodecError("zstandard is not installed")
+        dictionary = zstandard.ZstdCompressionDict(data)
+        dict_id = dictionary.dict_id()
+        self._dictionaries[dict_id] = dictionary
+        self._compressors.pop(dict_id, None)
+        self._decompressors.pop(dict_id, None)
+        return dict_id
+
+    def _compressor(self, dict_id: Optional[int]):
+        compressor = self._compressors.get(dict_id)
+        if compressor is None:
+            dictionary = self._dictionaries[dict_id] if dict_id is not None else None
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+            self._compressors[dict_id] = compressor
+        return compressor
+
+    def _decompressor(self, dict_id: Optional[int]):
+        decompressor = self._decompressors.get(dict_id)
+        if decompressor is None:
+            if dict_id is not None and dict_id not in self._dictionaries:
+                raise CodecError(f"Unknown zstd dictionary {dict_id}")
+            dictionary = self._dictionaries[dict_id] if dict_id is not None else None
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            self._decompressors[dict_id] = decompressor
+        return decompressor
+
+    # ------------------------------------------------------------------ compression
+
+    def compress(self, data: bytes) -> Tuple[str, bytes, Optional[int]]:
+        """
+        Compress with the configured algorithm, zlib if none is configured.
+        Returns ``(algorithm, compressed, dictionary_id)``.
+        """
+        if self.compression == ZSTD:
+            return ZSTD, self._compressor(self.dictionary_id).compress(data), self.dictionary_id
+        return ZLIB, zlib.compress(data, 6), None
+
+    def decompress(self, algorithm: str, data: bytes, dict_id: Optional[int] = None) -> bytes:
+        if algorithm == ZLIB:
+            inflater = zlib.decompressobj()
+            try:
+                result = inflater.decompress(data, self.max_decoded_size)
+            except zlib.error as e:
+                raise CodecError(f"Malformed zlib data: {e}") from e
+            if inflater.unconsumed_tail:
+                raise CodecError(f"Message expands beyond {self.max_decoded_size} bytes")
+            return result
+
+        if algorithm == ZSTD:
+            if not HAS_ZSTD:
+                raise CodecError("zstandard is not installed")
+            try:
+                if zstandard.frame_content_size(data) > self.max_decoded_size:
+                    raise CodecError(f"Message expands beyond {self.max_decoded_size} bytes")
+                return self._decompressor(dict_id).decompress(data, max_output_size=self.max_decoded_size)
+            except zstandard.ZstdError as e:
+                raise CodecError(f"Malformed zstd data: {e}") from e
+
+        raise CodecError(f"Unknown content encoding {algorithm!r}")
+
+    # ------------------------------------------------------------------ encode / decode
+
+    def encode(self, obj: Any) -> Tuple[bytes, Dict[str, str]]:
+        """
+        Serialize and, above the size threshold, compress. Returns the body and
+        the headers describing it; plain JSON needs no headers at all.
+        """
+        data = serialize(obj, self.content_type)
+        headers = {}
+        if self.content_type != JSON:
+            headers[CONTENT_TYPE_HEADER] = self.content_type
+
+        if self.compression and len(data) > self.compress_threshold:
+            algorithm, data, dict_id = self.compress(data)
+            headers[CONTENT_ENCODING_HEADER] = algorithm
+            if dict_id is not None:
+                headers[DICTIONARY_HEADER] = str(dict_id)
+        return data, headers
+
+    def decode(self, data: bytes, headers: Optional[Mapping[str, str]] = None) -> Any:
+        """Decode a message in whatever format its headers declare"""
+        headers = headers or {}
+        encoding = headers.get(CONTENT_ENCODING_HEADER)
+        if encoding:
+            dict_id = headers.get(DICTIONARY_HEADER)
+            data = self.decompress(encoding, data, int(dict_id) if dict_id else None)
+        return deserialize(data, headers.get(CONTENT_TYPE_HEADER, JSON))
+
+    # ------------------------------------------------------------------ negotiation
+
+    def accept_headers(self) -> Dict[str, str]:
+        """Headers a request carries to advertise what its replies may use"""
+        encodings = available_encodings()
+        encodings += [f"{ZSTD};dict={dict_id}" for dict_id in self._dictionaries]
+        return {
+            ACCEPT_HEADER: ", ".join(available_content_types()),
+            ACCEPT_ENCODING_HEADER: ", ".join(encodings)
+        }
+
+    def for_peer(self, headers: Optional[Mapping[str, str]]) -> "MessageCodec":
+        """
+        The codec to reply with: this codec's preferences restricted to what
+        the peer advertised. A peer without Accept headers gets plain JSON.
+        """
+        headers = headers or {}
+        accepted_types = _header_list(headers.get(ACCEPT_HEADER))
+        if not accepted_types:
+            return _PLAIN_JSON
+
+        preference = [self.content_type] + [ct for ct in available_content_types() if ct != self.content_type]
+        content_type = next((ct for ct in preference if ct in accepted_types), JSON)
+
+        accepted_encodings = set(_header_list(headers.get(ACCEPT_ENCODING_HEADER)))
+        compression, dict_id = None, None
+        if self.compression == ZSTD and ZSTD in accepted_encodings:
+            compression = ZSTD
+            if self.dictionary_id is not None and f"{ZSTD};dict={self.dictionary_id}" in accepted_encodings:
+                dict_id = self.dictionary_id
+        elif self.compression and ZLIB in accepted_encodings:
+            compression = ZLIB
+
+        if (content_type, compression, dict_id) == (self.content_type, self.compression, self.dictionary_id):
+            return self
+        peer = MessageCodec(
+            content_type=content_type,
+            compression=compression,
+            compress_threshold=self.compress_threshold,
+            level=self.level,
+            max_decoded_size=self.max_decoded_size
+        )
+        # Share dictionaries and cached (de)compressors
+        peer._dictionaries = self._dictionaries
+        peer._compressors = self._compressors
+        peer._decompressors = self._decompressors
+        peer.dictionary_id = dict_id
+        return peer
+
+
+_PLAIN_JSON = MessageCodec()
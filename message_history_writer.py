@@ -0,0 +1,369 @@
+"""
+Message History Writer
+======================
+Continuous, bounded persistence of CommunicationAgent message history.
+
+Messages are buffered in memory and drained by a background task as soon as
+``flush_size`` rows are waiting, or at the latest every ``flush_interval``
+seconds. Each batch is written with one ``COPY`` into a temporary staging
+table followed by ``INSERT ... SELECT ... ON CONFLICT (message_id) DO NOTHING``,
+so replayed rows never create duplicates.
+
+The buffer never holds more than ``max_pending`` rows. When the database falls
+behind:
+
+- with a ``spill_dir`` the oldest rows are appended to local JSON-lines
+  segment files and replayed once the database has caught up (also after a
+  restart, since segments left on disk are picked up by ``start``);
+- without one, ``add`` waits up to ``block_timeout`` seconds for the drain
+  (back-pressure on the sender) and then drops the oldest rows, counting them.
+
+Without a database pool nothing can be written, so the buffer simply keeps the
+newest ``max_pending`` rows.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = (
+    "message_id", "type", "sender", "recipients", "subject", "payload", "status", "created_at", "metadata"
+)
+
+
+def _plain(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def history_record(message: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-serialisable history row for a message dict (as produced by ``asdict``)"""
+    return {
+        "message_id": message["id"],
+        "type": _plain(message["type"]),
+        "sender": message["sender"],
+        "recipients": message.get("recipients") or [],
+        "subject": message["subject"],
+        "payload": message.get("payload") or {},
+        "status": _plain(message.get("status")) or "sent",
+        "created_at": message["created_at"],
+        "metadata": message.get("metadata") or {}
+    }
+
+
+def _copy_row(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        record["message_id"],
+        record["type"],
+        record["sender"],
+        json.dumps(record["recipients"]),
+        record["subject"],
+        json.dumps(record["payload"], default=str),
+        record["status"],
+        datetime.fromtimestamp(record["created_at"]),
+        json.dumps(record["metadata"], default=str)
+    )
+
+
+class MessageHistoryWriter:
+    """
+    Bounded, continuously draining COPY writer for the message_history table
+
+    Usage:
+        writer = MessageHistoryWriter(lambda: agent.db_pool, spill_dir="/var/lib/ymera/history")
+        writer.start()
+        await writer.add(history_record(asdict(message)))
+        await writer.close()               # drains, spilling whatever cannot be written
+    """
+
+    def __init__(
+        self,
+        get_pool: Callable[[], Any],
+        table: str = "message_history",
+        flush_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 20000,
+        spill_dir: Optional[str] = None,
+        spill_segment_bytes: int = 16 * 1024 * 1024,
+        block_timeout: float = 5.0,
+        max_backoff: float = 30.0
+    ):
+        self.get_pool = get_pool
+        self.table = table
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.spill_dir = spill_dir
+        self.spill_segment_bytes = spill_segment_bytes
+        self.block_timeout = block_timeout
+        self.max_backoff = max_backoff
+
+        # (enqueued at, record), oldest first
+        self._pending: Deque[Tuple[float, Dict[str, Any]]] = deque()
+        self._wake: Optional[asyncio.Event] = None
+        self._drained: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._backoff = 0.0
+
+        self._spill_file = None
+        self._spill_path: Optional[str] = None
+        self._replay_offsets: Dict[str, int] = {}
+
+        self.stats = {
+            "added": 0,
+            "written": 0,
+            "batches": 0,
+            "flush_failures": 0,
+            "last_batch_size": 0,
+            "max_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "last_write_lag_seconds": 0.0,
+            "max_write_lag_seconds": 0.0,
+            "blocked_adds": 0,
+            "dropped": 0,
+            "spilled_rows": 0,
+            "spilled_bytes": 0,
+            "replayed_rows": 0
+        }
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def lag(self) -> float:
+        """Seconds the oldest buffered row has been waiting"""
+        return time.monotonic() - self._pending[0][0] if self._pending else 0.0
+
+    # =========================================================================
+    # INTAKE
+    # =========================================================================
+
+    async def add(self, record: Dict[str, Any]):
+        """Buffer one history row; may wait briefly (back-pressure) when the buffer is full"""
+        self._pending.append((time.monotonic(), record))
+        self.stats["added"] += 1
+        if len(self._pending) >= self.flush_size and self._wake is not None:
+            self._wake.set()
+        if len(self._pending) <= self.max_pending:
+            return
+
+        if self.get_pool() is None:
+            self._drop(len(self._pending) - self.max_pending)
+        elif self.spill_dir:
+            # Spill down to half the ceiling so the next spill is not one row away
+            self._spill(len(self._pending) - self.max_pending // 2)
+        else:
+            await self._wait_for_room()
+
+    async def _wait_for_room(self):
+        self.stats["blocked_adds"] += 1
+        if self._drained is not None:
+            self._drained.clear()
+            self._wake.set()
+            try:
+                await asyncio.wait_for(self._drained.wait(), timeout=self.block_timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._drop(len(self._pending) - self.max_pending)
+
+    def _drop(self, count: int):
+        if count <= 0:
+            return
+        for _ in range(count):
+            self._pending.popleft()
+        self.stats["dropped"] += count
+        logger.warning(f"Dropped {count} unwritten {self.table} rows")
+
+    # =========================================================================
+    # SPILL FILES
+    # =========================================================================
+
+    def _segments(self) -> List[str]:
+        if not self.spill_dir or not os.path.isdir(self.spill_dir):
+            return []
+        names = sorted(name for name in os.listdir(self.spill_dir) if name.endswith(".jsonl"))
+        return [os.path.join(self.spill_dir, name) for name in names]
+
+    def _spill(self, count: int):
+        """Append the ``count`` oldest buffered rows to the current spill segment"""
+        if count <= 0:
+            return
+        lines = []
+        for _ in range(min(count, len(self._pending))):
+            lines.append(json.dumps(self._pending.popleft()[1], default=str))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+
+        try:
+            if self._spill_file is None or self._spill_file.tell() >= self.spill_segment_bytes:
+                self._close_segment()
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._spill_path = os.path.join(self.spill_dir, f"{self.table}-{time.time_ns()}.jsonl")
+                self._spill_file = open(self._spill_path, "ab")
+            self._spill_file.write(data)
+            self._spill_file.flush()
+        except OSError as e:
+            self.stats["dropped"] += len(lines)
+            logger.error(f"Spilling {len(lines)} {self.table} rows failed, dropped: {e}")
+            return
+
+        self.stats["spilled_rows"] += len(lines)
+        self.stats["spilled_bytes"] += len(data)
+
+    def _close_segment(self):
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+            self._spill_path = None
+
+    async def _replay_segment(self) -> bool:
+        """Write the oldest spill segment back; returns True if one was finished"""
+        segments = self._segments()
+        if not segments:
+            return False
+        path = segments[0]
+        if path == self._spill_path:
+            self._close_segment()
+
+        offset = self._replay_offsets.get(path, 0)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                lines = [line for line in (f.readline() for _ in range(self.flush_size)) if line.strip()]
+                if not lines:
+                    break
+                records = []
+                for line in lines:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # A torn last line from a crash mid-append
+                        logger.warning(f"Skipping unreadable line in {path}")
+                if records:
+                    await self._write(records)
+                self.stats["replayed_rows"] += len(records)
+                self._replay_offsets[path] = f.tell()
+
+        os.unlink(path)
+        self._replay_offsets.pop(path, None)
+        return True
+
+    # =========================================================================
+    # DRAINING
+    # =========================================================================
+
+    async def _write(self, records: List[Dict[str, Any]]):
+        pool = self.get_pool()
+        if pool is None:
+            raise ConnectionError("No database pool")
+        staging = f"{self.table}_staging"
+        columns = ", ".join(HISTORY_COLUMNS)
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+                    f"(LIKE {self.table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+                )
+                await conn.copy_records_to_table(
+                    staging, records=[_copy_row(record) for record in records], columns=list(HISTORY_COLUMNS)
+                )
+                await conn.execute(
+                    f"INSERT INTO {self.table} ({columns}) SELECT {columns} FROM {staging} "
+                    f"ON CONFLICT (message_id) DO NOTHING"
+                )
+
+    async def flush(self) -> int:
+        """Write buffered rows in batches until the buffer is empty; returns rows written"""
+        written = 0
+        while self._pending:
+            # Taken out of the buffer while in flight, so spills and drops only touch newer rows
+            batch = [self._pending.popleft() for _ in range(min(self.flush_size, len(self._pending)))]
+            start = time.perf_counter()
+            try:
+                await self._write([record for _, record in batch])
+            except BaseException:
+                self._pending.extendleft(reversed(batch))
+                raise
+
+            lag = time.monotonic() - batch[0][0]
+            written += len(batch)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["last_batch_size"] = len(batch)
+            self.stats["max_batch_size"] = max(self.stats["max_batch_size"], len(batch))
+            self.stats["last_flush_ms"] = (time.perf_counter() - start) * 1000
+            self.stats["last_write_lag_seconds"] = lag
+            self.stats["max_write_lag_seconds"] = max(self.stats["max_write_lag_seconds"], lag)
+            if self._drained is not None and len(self._pending) <= self.max_pending:
+                self._drained.set()
+        return written
+
+    async def _drain_once(self):
+        if self.get_pool() is None:
+            return
+        try:
+            await self.flush()
+            # Live rows first; spilled history is replayed once we have caught up
+            if len(self._pending) < self.flush_size:
+                await self._replay_segment()
+            self._backoff = 0.0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["flush_failures"] += 1
+            self._backoff = min(self.max_backoff, max(self.flush_interval, self._backoff * 2))
+            logger.error(f"Writing {self.table} failed, retrying in {self._backoff:.1f}s: {e}")
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self._drain_once()
+            if self._backoff:
+                await asyncio.sleep(self._backoff)
+
+    def start(self):
+        """Start the background drain (segments spilled before a restart are replayed by it)"""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._drained = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop draining, write what is left and spill anything the database would not take"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.get_pool() is not None:
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Final {self.table} flush failed: {e}")
+        if self._pending and self.spill_dir:
+            self._spill(len(self._pending))
+        self._close_segment()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Lag, batch size and spill volume"""
+        segments = self._segments()
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "lag_seconds": self.lag(),
+            "avg_batch_size": self.stats["written"] / self.stats["batches"] if self.stats["batches"] else 0.0,
+            "spill_segments": len(segments),
+            "spill_bytes_pending": sum(os.path.getsize(path) for path in segments),
+            "backoff_seconds": self._backoff
+        }
@@ -2,7 +2,7 @@
 
 import logging
 import asyncio
-from typing import Dict, List, Optional, Any
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Any, Set, Tuple
 from datetime import datetime
 import json
 import uuid
@@ -24,6 +24,110 @@ class NotificationChannel:
     SMS = "sms"
     WEBHOOK = "webhook"
 
+# Per-channel dispatch defaults: concurrent workers, seconds per batch, notifications per batch
+DEFAULT_DISPATCH = {
+    NotificationChannel.WEBSOCKET: {"workers": 8, "timeout": 2.0, "batch_size": 200},
+    NotificationChannel.EMAIL: {"workers": 4, "timeout": 10.0, "batch_size": 100},
+    NotificationChannel.SMS: {"workers": 4, "timeout": 10.0, "batch_size": 100},
+    NotificationChannel.WEBHOOK: {"workers": 4, "timeout": 10.0, "batch_size": 100},
+}
+MAX_NOTIFICATIONS_PER_USER = 500
+NOTIFICATION_TTL_SECONDS = 86400 * 30
+STREAM_MAX_LENGTH = 100000
+STORE_CHUNK_SIZE = 500
+
+class ChannelWorkerPool:
+    """
+    Queue plus workers for one delivery channel. Each worker takes up to
+    ``batch_size`` queued notifications and hands them to the channel's batch
+    handler under a timeout, so a slow channel only backs up its own queue.
+    """
+
+    def __init__(self, name: str, send_batch: Callable[[List[Tuple[str, Dict]]], Awaitable[List[bool]]],
+                 workers: int = 4, timeout: float = 10.0, batch_size: int = 100, max_queue: int = 10000):
+        self.name = name
+        self.send_batch = send_batch
+        self.worker_count = workers
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.stats = {"sent": 0, "failed": 0, "timeouts": 0, "batches": 0}
+
+    def _ensure_started(self):
+        if not self.workers:
+            self.queue = self.queue or asyncio.Queue(self.max_queue)
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def submit(self, recipient_id: str, notification: Dict) -> asyncio.Future:
+        """Queue one delivery; the returned future resolves to True or False"""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((recipient_id, notification, future))
+        return future
+
+    async def _worker(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                try:
+                    results = await asyncio.wait_for(
+                        self.send_batch([(recipient, notification) for recipient, notification, _ in batch]),
+                        self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"{self.name} delivery timed out after {self.timeout}s ({len(batch)} notifications)")
+                    self.stats["timeouts"] += 1
+                    results = [False] * len(batch)
+                except Exception as e:
+                    logger.error(f"Error sending {self.name} notifications: {e}")
+                    results = [False] * len(batch)
+
+                results = list(results)
+                if len(results) != len(batch):
+                    logger.error(f"{self.name} batch handler returned {len(results)} results "
+                                 f"for {len(batch)} notifications")
+                    # Notifications without a result count as failed
+                    results = results[:len(batch)] + [False] * (len(batch) - len(results))
+
+                self.stats["batches"] += 1
+                for (_, _, future), success in zip(batch, results):
+                    self.stats["sent" if success else "failed"] += 1
+                    if not future.done():
+                        future.set_result(bool(success))
+            finally:
+                # Also on cancellation: no caller is left waiting and join() still completes
+                for _, _, future in batch:
+                    if not future.done():
+                        self.stats["failed"] += 1
+                        future.set_result(False)
+                    self.queue.task_done()
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    async def close(self, timeout: float = 5.0):
+        """Let queued deliveries finish (up to ``timeout``), then stop the workers"""
+        if not self.workers:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self.name} pool closed with {self.queue.qsize()} undelivered notifications")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        while not self.queue.empty():
+            _, _, future = self.queue.get_nowait()
+            if not future.done():
+                self.stats["failed"] += 1
+                future.set_result(False)
+            self.queue.task_done()
+
 class NotificationManager:
     """Multi-channel notification system with priority routing"""
     
@@ -31,6 +135,25 @@ class NotificationManager:
         self.redis = redis_client
         self.config = config
         self.channels = self._initialize_channels(config)
+        self.max_per_user = config.get("max_notifications_per_user", MAX_NOTIFICATIONS_PER_USER)
+        self.stream_max_length = config.get("stream_max_length", STREAM_MAX_LENGTH)
+        
+        # One worker pool per channel, so slow SMTP or webhooks never delay WebSocket delivery
+        dispatch = config.get("dispatch", {})
+        self.pools: Dict[str, ChannelWorkerPool] = {
+            name: ChannelWorkerPool(name, channel["batch_handler"],
+                                    **{**DEFAULT_DISPATCH[name], **dispatch.get(name, {})})
+            for name, channel in self.channels.items()
+        }
+        
+        # Low-priority notifications are coalesced into per-user digests
+        digest = config.get("digest", {})
+        self.digest_enabled = digest.get("enabled", True)
+        self.digest_window = digest.get("window_seconds", 300)
+        self.digest_max_items = digest.get("max_items", 50)
+        self._digests: Dict[str, List[Dict]] = {}
+        self._digest_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._background: Set[asyncio.Task] = set()
     
     def _initialize_channels(self, config: Dict) -> Dict:
         """Initialize notification channels"""
@@ -40,6 +163,7 @@ class NotificationManager:
         if config.get("email", {}).get("enabled", False):
             channels[NotificationChannel.EMAIL] = {
                 "handler": self._send_email_notification,
+                "batch_handler": self._send_email_notifications,
                 "config": config.get("email", {})
             }
         
@@ -47,6 +171,7 @@ class NotificationManager:
         if config.get("sms", {}).get("enabled", False):
             channels[NotificationChannel.SMS] = {
                 "handler": self._send_sms_notification,
+                "batch_handler": self._send_sms_notifications,
                 "config": config.get("sms", {})
             }
         
@@ -54,23 +179,22 @@ class NotificationManager:
         if config.get("webhook", {}).get("enabled", False):
             channels[NotificationChannel.WEBHOOK] = {
                 "handler": self._send_webhook_notification,
+                "batch_handler": self._send_webhook_notifications,
                 "config": config.get("webhook", {})
             }
         
         # WebSocket channel is always enabled
         channels[NotificationChannel.WEBSOCKET] = {
             "handler": self._send_websocket_notification,
+            "batch_handler": self._send_websocket_notifications,
             "config": {}
         }
         
         return channels
     
-    async def send_notification(self, recipient_id: str, notification: Dict) -> Dict:
-        """
-        Send notification through appropriate channels based on priority
-        """
-        # Ensure notification has required fields
-        notification = {
+    def _normalize_notification(self, notification: Dict) -> Dict:
+        """Ensure notification has required fields"""
+        return {
             "id": notification.get("id", str(uuid.uuid4())),
             "type": notification.get("type", "info"),
             "title": notification.get("title", "Notification"),
@@ -82,24 +206,30 @@ class NotificationManager:
             "actions": notification.get("actions", []),
             "read": False
         }
+    
+    async def send_notification(self, recipient_id: str, notification: Dict) -> Dict:
+        """
+        Send notification through appropriate channels based on priority
+        """
+        notification = self._normalize_notification(notification)
         
         # Store notification for retrieval
-        await self._store_notification(recipient_id, notification)
+        await self._store_notifications([(recipient_id, notification)])
         
-        # Determine channels based on priority
-        channels = self._get_channels_for_priority(notification["priority"])
+        # Low priority waits for the recipient's next digest
+        if self._should_digest(notification):
+            self._add_to_digest(recipient_id, notification)
+            return {
+                "notification_id": notification["id"],
+                "recipient_id": recipient_id,
+                "results": {},
+                "digested": True
+            }
         
-        # Send through appropriate channels
-        results = {}
-        for channel in channels:
-            if channel in self.channels:
-                handler = self.channels[channel]["handler"]
-                try:
-                    success = await handler(recipient_id, notification)
-                    results[channel] = success
-                except Exception as e:
-                    logger.error(f"Error sending {channel} notification: {e}")
-                    results[channel] = False
+        # Fan out to every channel at once
+        channels = [c for c in self._get_channels_for_priority(notification["priority"]) if c in self.pools]
+        futures = [await self.pools[channel].submit(recipient_id, notification) for channel in channels]
+        results = dict(zip(channels, await asyncio.gather(*futures)))
         
         return {
             "notification_id": notification["id"],
@@ -107,13 +237,54 @@ class NotificationManager:
             "results": results
         }
     
+    async def send_many(self, recipient_ids: Iterable[str], notification: Dict) -> Dict:
+        """
+        Send the same notification to many recipients: stored in pipelined
+        chunks and handed to the channel pools in batches. Returns per-channel
+        sent/failed counts.
+        """
+        notification = self._normalize_notification(notification)
+        recipient_ids = list(dict.fromkeys(recipient_ids))
+        items = [(recipient_id, notification) for recipient_id in recipient_ids]
+        
+        for i in range(0, len(items), STORE_CHUNK_SIZE):
+            await self._store_notifications(items[i:i + STORE_CHUNK_SIZE])
+        
+        if self._should_digest(notification):
+            for recipient_id in recipient_ids:
+                self._add_to_digest(recipient_id, notification)
+            return {
+                "notification_id": notification["id"],
+                "recipients": len(recipient_ids),
+                "results": {},
+                "digested": True
+            }
+        
+        channels = [c for c in self._get_channels_for_priority(notification["priority"]) if c in self.pools]
+        futures: Dict[str, List[asyncio.Future]] = {channel: [] for channel in channels}
+        for recipient_id in recipient_ids:
+            for channel in channels:
+                futures[channel].append(await self.pools[channel].submit(recipient_id, notification))
+        
+        results = {}
+        for channel, channel_futures in futures.items():
+            outcomes = await asyncio.gather(*channel_futures)
+            sent = sum(1 for outcome in outcomes if outcome)
+            results[channel] = {"sent": sent, "failed": len(outcomes) - sent}
+        
+        return {
+            "notification_id": notification["id"],
+            "recipients": len(recipient_ids),
+            "results": results
+        }
+    
     def _get_channels_for_priority(self, priority: str) -> List[str]:
         """Determine notification channels based on priority"""
         if priority == NotificationPriority.CRITICAL:
-            return [NotificationChannel.WEBSOCKET, NotificationChannel.EMAIL, 
+            return [NotificationChannel.WEBSOCKET, NotificationChannel.EMAIL,
                     NotificationChannel.SMS, NotificationChannel.WEBHOOK]
         elif priority == NotificationPriority.HIGH:
-            return [NotificationChannel.WEBSOCKET, NotificationChannel.EMAIL, 
+            return [NotificationChannel.WEBSOCKET, NotificationChannel.EMAIL,
                     NotificationChannel.WEBHOOK]
         elif priority == NotificationPriority.NORMAL:
             return [NotificationChannel.WEBSOCKET, NotificationChannel.EMAIL]
@@ -122,31 +293,114 @@ class NotificationManager:
     
     async def _store_notification(self, recipient_id: str, notification: Dict):
         """Store notification for retrieval"""
+        await self._store_notifications([(recipient_id, notification)])
+    
+    async def _store_notifications(self, items: List[Tuple[str, Dict]]):
+        """Store notifications in one pipelined round trip, capping each user's list"""
         try:
-            # Add to user's notification list
-            await self.redis.lpush(
-                f"notifications:{recipient_id}",
-                json.dumps(notification)
-            )
-            
-            # Set expiry (30 days default)
-            await self.redis.expire(
-                f"notifications:{recipient_id}",
-                86400 * 30
-            )
-            
-            # Add to real-time notification stream
-            await self.redis.xadd(
-                "notification_stream",
-                {
-                    "recipient": recipient_id,
-                    "notification": json.dumps(notification)
-                }
-            )
-            
+            pipe = self.redis.pipeline(transaction=False)
+            for recipient_id, notification in items:
+                key = f"notifications:{recipient_id}"
+                payload = json.dumps(notification)
+                
+                # Add to user's notification list, keeping the newest max_per_user
+                pipe.lpush(key, payload)
+                pipe.ltrim(key, 0, self.max_per_user - 1)
+                
+                # Set expiry (30 days default)
+                pipe.expire(key, NOTIFICATION_TTL_SECONDS)
+                
+                # Add to real-time notification stream
+                pipe.xadd(
+                    "notification_stream",
+                    {
+                        "recipient": recipient_id,
+                        "notification": payload
+                    },
+                    maxlen=self.stream_max_length,
+                    approximate=True
+                )
+            await pipe.execute()
+        
         except Exception as e:
             logger.error(f"Error storing notification: {e}")
     
+    # Digests
+    def _should_digest(self, notification: Dict) -> bool:
+        return (self.digest_enabled
+                and notification["priority"] == NotificationPriority.LOW
+                and notification["type"] != "digest")
+    
+    def _add_to_digest(self, recipient_id: str, notification: Dict):
+        """Buffer a low-priority notification; the digest goes out when the window closes or fills"""
+        pending = self._digests.setdefault(recipient_id, [])
+        pending.append(notification)
+        if len(pending) >= self.digest_max_items:
+            self._schedule_digest_flush(recipient_id)
+        elif recipient_id not in self._digest_timers:
+            self._digest_timers[recipient_id] = asyncio.get_running_loop().call_later(
+                self.digest_window, self._schedule_digest_flush, recipient_id
+            )
+    
+    def _schedule_digest_flush(self, recipient_id: str):
+        task = asyncio.create_task(self._flush_digest(recipient_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _flush_digest(self, recipient_id: str) -> Optional[Dict]:
+        """Deliver one digest summarising the recipient's buffered notifications"""
+        timer = self._digest_timers.pop(recipient_id, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._digests.pop(recipient_id, [])
+        if not pending:
+            return None
+        
+        digest = {
+            "id": str(uuid.uuid4()),
+            "type": "digest",
+            "title": pending[0]["title"] if len(pending) == 1 else f"{len(pending)} new notifications",
+            "message": "; ".join(n["title"] for n in pending[:5]) + ("; ..." if len(pending) > 5 else ""),
+            "timestamp": datetime.utcnow().isoformat(),
+            "priority": NotificationPriority.LOW,
+            "source": "digest",
+            "data": {
+                "notifications": [
+                    {"id": n["id"], "type": n["type"], "title": n["title"], "timestamp": n["timestamp"]}
+                    for n in pending
+                ]
+            },
+            "actions": [],
+            "read": False
+        }
+        
+        channels = [c for c in self._get_channels_for_priority(NotificationPriority.LOW) if c in self.pools]
+        futures = [await self.pools[channel].submit(recipient_id, digest) for channel in channels]
+        results = dict(zip(channels, await asyncio.gather(*futures)))
+        return {"notification_id": digest["id"], "recipient_id": recipient_id,
+                "count": len(pending), "results": results}
+    
+    async def flush_digests(self):
+        """Send every pending digest now"""
+        await asyncio.gather(*(self._flush_digest(recipient_id) for recipient_id in list(self._digests)))
+    
+    async def close(self):
+        """Flush digests and drain the channel pools"""
+        await self.flush_digests()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await asyncio.gather(*(pool.close() for pool in self.pools.values()))
+    
+    def get_dispatch_stats(self) -> Dict[str, Any]:
+        """Per-channel delivery counters and queue depths, plus pending digests"""
+        return {
+            "channels": {
+                name: {**pool.stats, "queued": pool.queue_depth()}
+                for name, pool in self.pools.items()
+            },
+            "pending_digests": len(self._digests),
+            "pending_digest_notifications": sum(len(items) for items in self._digests.values())
+        }
+    
     async def get_user_notifications(self, user_id: str, limit: int = 50,
                                   include_read: bool = False) -> List[Dict]:
         """Get notifications for a user"""
@@ -172,7 +426,7 @@ class NotificationManager:
                     continue
             
             return result
-            
+        
         except Exception as e:
             logger.error(f"Error retrieving notifications: {e}")
             return []
@@ -207,109 +461,117 @@ class NotificationManager:
                     continue
             
             return False
-            
+        
         except Exception as e:
             logger.error(f"Error marking notification read: {e}")
             return False
     
-    # Channel-specific notification methods
+    # Channel-specific notification methods. Each channel has a batch handler
+    # (one pipelined round trip per batch, used by the worker pools) and a
+    # single-notification wrapper around it.
     async def _send_websocket_notification(self, recipient_id: str, notification: Dict) -> bool:
         """Send notification via WebSocket"""
+        return (await self._send_websocket_notifications([(recipient_id, notification)]))[0]
+    
+    async def _send_websocket_notifications(self, items: List[Tuple[str, Dict]]) -> List[bool]:
+        """Publish a batch of notifications to WebSocket subscribers"""
         try:
             # In production, this would use the connection manager
-            await self.redis.publish(
-                f"ws:notifications:{recipient_id}",
-                json.dumps({
-                    "type": "notification",
-                    "data": notification
-                })
-            )
-            return True
+            pipe = self.redis.pipeline(transaction=False)
+            for recipient_id, notification in items:
+                pipe.publish(
+                    f"ws:notifications:{recipient_id}",
+                    json.dumps({
+                        "type": "notification",
+                        "data": notification
+                    })
+                )
+            await pipe.execute()
+            return [True] * len(items)
         except Exception as e:
             logger.error(f"WebSocket notification failed: {e}")
-            return False
+            return [False] * len(items)
     
     async def _send_email_notification(self, recipient_id: str, notification: Dict) -> bool:
         """Send notification via email"""
-        try:
-            # Get user email (would retrieve from database in production)
-            recipient_email = await self._get_user_email(recipient_id)
-            if not recipient_email:
-                return False
-                
-            # Queue email for sending
-            await self.redis.lpush(
-                "email_queue",
-                json.dumps({
-                    "to": recipient_email,
-                    "subject": notification["title"],
-                    "body": notification["message"],
-                    "priority": notification["priority"],
-                    "metadata": {
-                        "notification_id": notification["id"],
-                        "recipient_id": recipient_id
-                    }
-                })
-            )
-            return True
-        except Exception as e:
-            logger.error(f"Email notification failed: {e}")
-            return False
+        return (await self._send_email_notifications([(recipient_id, notification)]))[0]
+    
+    async def _send_email_notifications(self, items: List[Tuple[str, Dict]]) -> List[bool]:
+        """Queue a batch of emails"""
+        # Get user emails (would retrieve from database in production)
+        emails = await asyncio.gather(*(self._get_user_email(recipient_id) for recipient_id, _ in items))
+        jobs = [
+            json.dumps({
+                "to": email,
+                "subject": notification["title"],
+                "body": notification["message"],
+                "priority": notification["priority"],
+                "metadata": {
+                    "notification_id": notification["id"],
+                    "recipient_id": recipient_id
+                }
+            }) if email else None
+            for (recipient_id, notification), email in zip(items, emails)
+        ]
+        return await self._queue_jobs("email_queue", jobs, "Email")
     
     async def _send_sms_notification(self, recipient_id: str, notification: Dict) -> bool:
         """Send notification via SMS"""
-        try:
-            # Get user phone number (would retrieve from database in production)
-            recipient_phone = await self._get_user_phone(recipient_id)
-            if not recipient_phone:
-                return False
-                
-            # Queue SMS for sending
-            await self.redis.lpush(
-                "sms_queue",
-                json.dumps({
-                    "to": recipient_phone,
-                    "body": f"{notification['title']}: {notification['message']}",
-                    "priority": notification["priority"],
-                    "metadata": {
-                        "notification_id": notification["id"],
-                        "recipient_id": recipient_id
-                    }
-                })
-            )
-            return True
-        except Exception as e:
-            logger.error(f"SMS notification failed: {e}")
-            return False
+        return (await self._send_sms_notifications([(recipient_id, notification)]))[0]
+    
+    async def _send_sms_notifications(self, items: List[Tuple[str, Dict]]) -> List[bool]:
+        """Queue a batch of SMS messages"""
+        # Get user phone numbers (would retrieve from database in production)
+        phones = await asyncio.gather(*(self._get_user_phone(recipient_id) for recipient_id, _ in items))
+        jobs = [
+            json.dumps({
+                "to": phone,
+                "body": f"{notification['title']}: {notification['message']}",
+                "priority": notification["priority"],
+                "metadata": {
+                    "notification_id": notification["id"],
+                    "recipient_id": recipient_id
+                }
+            }) if phone else None
+            for (recipient_id, notification), phone in zip(items, phones)
+        ]
+        return await self._queue_jobs("sms_queue", jobs, "SMS")
     
     async def _send_webhook_notification(self, recipient_id: str, notification: Dict) -> bool:
         """Send notification via webhook"""
+        return (await self._send_webhook_notifications([(recipient_id, notification)]))[0]
+    
+    async def _send_webhook_notifications(self, items: List[Tuple[str, Dict]]) -> List[bool]:
+        """Queue a batch of webhook calls"""
+        # Get webhook URLs (would retrieve from database in production)
+        urls = await asyncio.gather(*(self._get_user_webhook(recipient_id) for recipient_id, _ in items))
+        jobs = [
+            json.dumps({
+                "url": url,
+                "payload": {
+                    "notification": notification,
+                    "recipient_id": recipient_id
+                },
+                "priority": notification["priority"],
+                "metadata": {
+                    "notification_id": notification["id"],
+                    "recipient_id": recipient_id
+                }
+            }) if url else None
+            for (recipient_id, notification), url in zip(items, urls)
+        ]
+        return await self._queue_jobs("webhook_queue", jobs, "Webhook")
+    
+    async def _queue_jobs(self, queue: str, jobs: List[Optional[str]], label: str) -> List[bool]:
+        """LPUSH the non-empty jobs in one call; a None job (no contact info) counts as failed"""
+        payloads = [job for job in jobs if job is not None]
         try:
-            # Get webhook URL (would retrieve from database in production)
-            webhook_url = await self._get_user_webhook(recipient_id)
-            if not webhook_url:
-                return False
-                
-            # Queue webhook for sending
-            await self.redis.lpush(
-                "webhook_queue",
-                json.dumps({
-                    "url": webhook_url,
-                    "payload": {
-                        "notification": notification,
-                        "recipient_id": recipient_id
-                    },
-                    "priority": notification["priority"],
-                    "metadata": {
-                        "notification_id": notification["id"],
-                        "recipient_id": recipient_id
-                    }
-                })
-            )
-            return True
+            if payloads:
+                await self.redis.lpush(queue, *payloads)
+            return [job is not None for job in jobs]
         except Exception as e:
-            logger.error(f"Webhook notification failed: {e}")
-            return False
+            logger.error(f"{label} notification failed: {e}")
+            return [False] * len(jobs)
     
     # Helper methods for retrieving user contact information
     async def _get_user_email(self, user_id: str) -> Optional[str]:
@@ -325,4 +587,4 @@ class NotificationManager:
     async def _get_user_webhook(self, user_id: str) -> Optional[str]:
         """Get user webhook URL"""
         # This would query database in production
-        return "https://example.com/webhook"
\ No newline at end of file
+        return "https://example.com/webhook"
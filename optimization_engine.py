@@ -19,6 +19,7 @@ import redis.asyncio as aioredis
 import asyncpg
 
 from base_agent import BaseAgent, AgentConfig, TaskRequest, Priority
+from rule_compiler import CompiledCondition, RuleCompileError, compile_condition
 from opentelemetry import trace
 
 class OptimizationType(Enum):
@@ -107,6 +108,14 @@ class OptimizingEngine(BaseAgent):
         self.optimization_rules: Dict[str, OptimizationRule] = {}
         self.optimization_history: List[OptimizationResult] = []
         
+        # Rule conditions compiled once per distinct condition string
+        self.compiled_conditions: Dict[str, CompiledCondition] = {}
+        self.condition_defaults = {
+            "time_window": 300,
+            "worker_count": 4,  # Default, should be dynamic
+            "memory_growth_rate": 0  # Should be calculated
+        }
+        
         # Performance metrics storage
         self.metrics_buffer: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
         self.metric_aggregates: Dict[str, Dict] = {}
@@ -215,6 +224,7 @@ class OptimizingEngine(BaseAgent):
                         last_applied=r["last_applied"].timestamp() if r["last_applied"] else 0.0
                     )
                     self.optimization_rules[rule.rule_id] = rule
+                self._compile_rule_conditions()
                 self.logger.info(f"Loaded {len(self.optimization_rules)} optimization rules from DB.")
             else:
                 self.logger.info("No optimization rules found in DB. Loading default rules.")
@@ -342,6 +352,7 @@ class OptimizingEngine(BaseAgent):
         all_default_rules = cpu_rules + memory_rules + cache_rules + db_rules + network_rules
         for rule in all_default_rules:
             self.optimization_rules[rule.rule_id] = rule
+        self._compile_rule_conditions()
         self.logger.info(f"Loaded {len(self.optimization_rules)} default optimization rules.")
 
     async def _execute_task_impl(self, request: TaskRequest) -> Dict[str, Any]:
@@ -373,6 +384,9 @@ class OptimizingEngine(BaseAgent):
         elif task_type == "tune_parameters":
             return await self._tune_parameters(payload)
         
+        elif task_type == "evaluate_rules":
+            return await self._evaluate_rules_across_services(payload)
+        
         else:
             raise ValueError(f"Unknown optimization task type: {task_type}")
     
@@ -535,32 +549,86 @@ class OptimizingEngine(BaseAgent):
         
         return opportunities
     
+    def _compile_rule_conditions(self):
+        """Compile conditions of new or changed rules and drop ones no rule uses any more"""
+        in_use = set()
+        for rule in self.optimization_rules.values():
+            if self._get_compiled_condition(rule.condition) is not None:
+                in_use.add(rule.condition)
+        
+        for condition in list(self.compiled_conditions):
+            if condition not in in_use:
+                del self.compiled_conditions[condition]
+    
+    def _get_compiled_condition(self, condition: str) -> Optional[CompiledCondition]:
+        """Compiled form of a condition, compiling it on first use; None if it is invalid"""
+        compiled = self.compiled_conditions.get(condition)
+        if compiled is None:
+            try:
+                compiled = compile_condition(condition)
+            except RuleCompileError as e:
+                self.logger.error("Invalid optimization rule condition",
+                                condition=condition, error=str(e))
+                return None
+            self.compiled_conditions[condition] = compiled
+        return compiled
+    
     async def _evaluate_optimization_condition(self, condition: str, metrics: Dict[str, float]) -> bool:
         """Evaluate optimization rule condition"""
+        compiled = self._get_compiled_condition(condition)
+        if compiled is None:
+            return False
+        
         try:
-            # Create safe evaluation context
-            context = {
-                **metrics,
-                "time_window": 300,
-                "worker_count": 4,  # Default, should be dynamic
-                "memory_growth_rate": 0  # Should be calculated
-            }
-            
-            # Add safe functions
-            context.update({
-                "abs": abs, "min": min, "max": max,
-                "len": len, "sum": sum, "avg": statistics.mean
-            })
-            
-            # Evaluate condition
-            result = eval(condition, {"__builtins__": {}}, context)
-            return bool(result)
-            
+            return compiled.evaluate(metrics, self.condition_defaults)
         except Exception as e:
             self.logger.error("Failed to evaluate optimization condition",
                             condition=condition, error=str(e))
             return False
     
+    async def _evaluate_rules_across_services(self, payload: Dict) -> Dict[str, Any]:
+        """
+        Evaluate every active rule over many services in one pass.
+        
+        payload["services"] names the services and payload["metrics"] maps each
+        metric to a list of values aligned with them (None where a service has none).
+        """
+        services = payload.get("services", [])
+        size = len(services)
+        columns = {
+            name: np.array([np.nan if v is None else v for v in values], dtype=float)
+            for name, values in payload.get("metrics", {}).items()
+            if len(values) == size
+        }
+        
+        now = time.time()
+        matches: Dict[str, List[str]] = {service: [] for service in services}
+        evaluated = 0
+        
+        for rule_id, rule in self.optimization_rules.items():
+            if not rule.enabled or now - rule.last_applied < rule.cooldown_seconds:
+                continue
+            compiled = self._get_compiled_condition(rule.condition)
+            if compiled is None:
+                continue
+            
+            try:
+                hits = compiled.evaluate_batch(columns, size, self.condition_defaults)
+            except Exception as e:
+                self.logger.error("Failed to evaluate optimization condition",
+                                condition=rule.condition, error=str(e))
+                continue
+            
+            evaluated += 1
+            for index in np.flatnonzero(hits):
+                matches[services[index]].append(rule_id)
+        
+        return {
+            "services": size,
+            "rules_evaluated": evaluated,
+            "matches": {service: rule_ids for service, rule_ids in matches.items() if rule_ids}
+        }
+    
     async def _estimate_optimization_impact(self, rule: OptimizationRule, metrics: Dict[str, float]) -> float:
         """Estimate the impact of applying an optimization rule"""
         # Simple heuristic-based impact estimation
@@ -1252,7 +1320,7 @@ class OptimizingEngine(BaseAgent):
             opportunities = service_predictions.get("optimization_opportunities", [])
             for opp in opportunities:
                 if opp["probability"] > 0.7:
-                    recommendations.append(f"Service {service}: {opp["recommended_action"]}")
+                    recommendations.append(f"Service {service}: {opp['recommended_action']}")
         
         return recommendations[:6]
     
@@ -1905,6 +1973,7 @@ class OptimizingEngine(BaseAgent):
                     last_applied=rule_data.get("last_applied", 0.0)
                 )
                 self.optimization_rules[rule_id] = rule
+                self._compile_rule_conditions()
                 # Persist to DB
                 await self._db_query(
                     """INSERT INTO optimization_rules (rule_id, name, optimization_type, condition, action, priority, enabled, parameters, cooldown_seconds, last_applied)
@@ -1922,6 +1991,7 @@ class OptimizingEngine(BaseAgent):
             elif action == "delete":
                 if rule_id in self.optimization_rules:
                     del self.optimization_rules[rule_id]
+                    self._compile_rule_conditions()
                     await self._db_query("DELETE FROM optimization_rules WHERE rule_id = $1", rule_id)
                     self.logger.info(f"Optimization rule {rule_id} deleted.")
                 else:
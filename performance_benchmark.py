@@ -5,10 +5,15 @@ Can be re-run to measure system performance
 """
 
 import asyncio
+import json
 import time
 import httpx
 import psutil
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+from load_testing_framework import (
+    HttpTarget, OpenLoopLoadEngine, LoadTestResult, build_profile, load_baseline
+)
 
 
 async def benchmark_api_endpoint(endpoint: str, method: str = "GET") -> Dict[str, Any]:
@@ -45,7 +50,26 @@ async def benchmark_api_endpoint(endpoint: str, method: str = "GET") -> Dict[str
     return {"endpoint": endpoint, "error": "No successful requests"}
 
 
-async def main():
+async def benchmark_api_endpoint_open_loop(
+    endpoint: str,
+    method: str = "GET",
+    profile: str = "constant",
+    rate_per_s: float = 100.0,
+    duration_s: float = 10.0,
+    max_in_flight: int = 1000
+) -> LoadTestResult:
+    """Benchmark an endpoint at a fixed arrival rate (coordinated-omission corrected)"""
+    target = HttpTarget(endpoint, method, max_connections=max_in_flight)
+    engine = OpenLoopLoadEngine(max_in_flight=max_in_flight, request_timeout_s=5.0)
+    try:
+        return await engine.run(
+            endpoint, target, build_profile(profile, rate_per_s), duration_s, warmup_requests=5
+        )
+    finally:
+        await target.aclose()
+
+
+async def main(args=None):
     """Run all benchmarks"""
     print("Starting performance benchmarks...")
     
@@ -54,12 +78,38 @@ async def main():
         "http://localhost:8000/health",
         "http://localhost:8000/api/v1/agents",
     ]
+    if args and args.endpoints:
+        endpoints = args.endpoints
     
-    for endpoint in endpoints:
-        result = await benchmark_api_endpoint(endpoint)
-        print(f"Endpoint: {result['endpoint']}")
-        if 'avg_response_time_ms' in result:
-            print(f"  Avg: {result.get('avg_response_time_ms', 'N/A')}ms")
+    if args and args.open_loop:
+        baselines = load_baseline(args.baseline) if args.baseline else {}
+        results = []
+        for endpoint in endpoints:
+            result = await benchmark_api_endpoint_open_loop(
+                endpoint, profile=args.profile, rate_per_s=args.rate, duration_s=args.duration
+            )
+            entry = result.to_dict()
+            latency = entry["latency"]
+            print(f"Endpoint: {endpoint}")
+            print(f"  Achieved: {entry['achieved_rate_per_s']:.1f} req/s, errors: {entry['error_count']}")
+            if result.completed:
+                print(f"  p50: {latency['p50_ms']:.2f}ms  p99: {latency['p99_ms']:.2f}ms  "
+                      f"p99.9: {latency['p99_9_ms']:.2f}ms")
+            if endpoint in baselines:
+                comparison = result.compare(baselines[endpoint], args.max_regression_pct)
+                entry["baseline_comparison"] = comparison
+                print(f"  Baseline: {'OK' if comparison['passed'] else 'REGRESSED ' + ', '.join(comparison['regressions'])}")
+            results.append(entry)
+        
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+    else:
+        for endpoint in endpoints:
+            result = await benchmark_api_endpoint(endpoint)
+            print(f"Endpoint: {result['endpoint']}")
+            if 'avg_response_time_ms' in result:
+                print(f"  Avg: {result.get('avg_response_time_ms', 'N/A')}ms")
     
     # Memory usage
     process = psutil.Process()
@@ -67,5 +117,21 @@ async def main():
     print(f"\nMemory Usage: {memory_mb:.2f} MB")
 
 
+def parse_args(argv: Optional[List[str]] = None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints")
+    parser.add_argument('endpoints', nargs='*', help='Endpoints to benchmark')
+    parser.add_argument('--open-loop', action='store_true',
+                       help='Issue requests at a fixed arrival rate instead of back to back')
+    parser.add_argument('--profile', choices=['constant', 'ramp', 'poisson'], default='constant')
+    parser.add_argument('--rate', type=float, default=100.0, help='Arrival rate per second')
+    parser.add_argument('--duration', type=float, default=10.0, help='Duration in seconds')
+    parser.add_argument('--output', default='performance_benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help='Previous results file to compare against')
+    parser.add_argument('--max-regression-pct', type=float, default=10.0)
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(main(parse_args()))
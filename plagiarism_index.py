@@ -0,0 +1,537 @@
+"""
+Plagiarism Corpus Index
+Shingle hashing, MinHash signatures and LSH banding over a memory-mapped on-disk corpus
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import random
+import re
+import struct
+import threading
+import zlib
+from array import array
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Optional dependencies - Numerical computing
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+logger = logging.getLogger(__name__)
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+UINT64_MASK = (1 << 64) - 1
+MINHASH_SEED = 1729
+
+MANIFEST_FILE = "manifest.json"
+DOCS_FILE = "docs.jsonl"
+SHINGLES_FILE = "shingles.bin"
+SEGMENT_PREFIX = "segment-"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class CorpusIndexConfig:
+    """On-disk corpus index configuration"""
+    index_dir: str
+    shingle_k: int = 5
+    chunk_size: int = 50
+    num_perm: int = 128
+    bands: int = 32
+    memtable_limit: int = 500_000
+    max_segments: int = 8
+    max_candidates: int = 50
+
+    @property
+    def rows_per_band(self) -> int:
+        return self.num_perm // self.bands
+
+
+@dataclass
+class PlagiarismMatch:
+    """A verified match between a submission and a corpus document"""
+    source_id: str
+    jaccard: float
+    containment: float
+    shared_shingles: int
+    spans: List[Dict[str, int]] = field(default_factory=list)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source_id": self.source_id,
+            "jaccard": self.jaccard,
+            "containment": self.containment,
+            "shared_shingles": self.shared_shingles,
+            "spans": self.spans,
+            "metadata": self.metadata,
+        }
+
+
+def tokenize(text: str) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """Lowercased word tokens with their character offsets"""
+    tokens, offsets = [], []
+    for match in _TOKEN_RE.finditer(text):
+        tokens.append(match.group().lower())
+        offsets.append(match.span())
+    return tokens, offsets
+
+
+def shingle_hashes(tokens: Sequence[str], k: int) -> List[int]:
+    """32-bit hashes of every k-word shingle; shingle i starts at token i"""
+    if len(tokens) < k:
+        return [zlib.crc32(" ".join(tokens).encode("utf-8"))] if tokens else []
+    return [
+        zlib.crc32(" ".join(tokens[i:i + k]).encode("utf-8"))
+        for i in range(len(tokens) - k + 1)
+    ]
+
+
+def _merge_runs(positions: Iterable[int], width: int) -> List[Tuple[int, int]]:
+    """Merge shingle start positions into [start, end) word spans"""
+    spans: List[Tuple[int, int]] = []
+    for pos in sorted(positions):
+        end = pos + width
+        if spans and pos <= spans[-1][1]:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((pos, end))
+    return spans
+
+
+class MinHasher:
+    """MinHash signatures with deterministic universal hash permutations"""
+
+    def __init__(self, num_perm: int = 128, seed: int = MINHASH_SEED):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._a = [rng.randint(1, MAX_HASH) for _ in range(num_perm)]
+        self._b = [rng.randint(0, MAX_HASH) for _ in range(num_perm)]
+        if HAS_NUMPY:
+            self._a_np = np.array(self._a, dtype=np.uint64)[:, None]
+            self._b_np = np.array(self._b, dtype=np.uint64)[:, None]
+
+    def signature(self, hashes: Sequence[int]) -> List[int]:
+        """MinHash signature of a set of 32-bit shingle hashes"""
+        if not hashes:
+            return [MAX_HASH] * self.num_perm
+
+        if HAS_NUMPY:
+            values = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))[None, :]
+            permuted = ((self._a_np * values + self._b_np) % np.uint64(MERSENNE_PRIME)) & np.uint64(MAX_HASH)
+            return permuted.min(axis=1).tolist()
+
+        unique = set(hashes)
+        return [
+            min((((a * x + b) & UINT64_MASK) % MERSENNE_PRIME) & MAX_HASH for x in unique)
+            for a, b in zip(self._a, self._b)
+        ]
+
+
+class _Segment:
+    """Immutable sorted (band_key, doc_id) table memory-mapped from disk"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (self.count,) = struct.unpack_from("<Q", self._mmap, 0)
+        keys_end = 8 + self.count * 8
+        self.keys = memoryview(self._mmap)[8:keys_end].cast("Q")
+        self.doc_ids = memoryview(self._mmap)[keys_end:keys_end + self.count * 4].cast("I")
+
+    @staticmethod
+    def write(path: str, entries: List[Tuple[int, int]]) -> None:
+        entries.sort()
+        keys = array("Q", (key for key, _ in entries))
+        doc_ids = array("I", (doc_id for _, doc_id in entries))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack("<Q", len(entries)))
+            keys.tofile(f)
+            doc_ids.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def lookup(self, key: int) -> List[int]:
+        start = bisect.bisect_left(self.keys, key)
+        result = []
+        while start < self.count and self.keys[start] == key:
+            result.append(self.doc_ids[start])
+            start += 1
+        return result
+
+    def entries(self) -> Iterable[Tuple[int, int]]:
+        for i in range(self.count):
+            yield self.keys[i], self.doc_ids[i]
+
+    def close(self) -> None:
+        self.keys.release()
+        self.doc_ids.release()
+        self._mmap.close()
+        self._file.close()
+
+
+class PlagiarismCorpusIndex:
+    """
+    Near-duplicate index over a reference corpus.
+
+    Documents are split into chunk_size-word chunks whose MinHash signatures are
+    banded into LSH keys. New band entries accumulate in an in-memory memtable
+    and are flushed to immutable sorted segments that are memory-mapped for
+    lookup. Ordered shingle hashes per document are kept in an append-only file
+    so candidates can be verified with exact Jaccard and matched spans.
+    """
+
+    def __init__(self, config: CorpusIndexConfig):
+        if config.num_perm % config.bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.config = config
+        self.minhasher = MinHasher(config.num_perm)
+        self._lock = threading.RLock()
+        self._memtable: Dict[int, List[int]] = defaultdict(list)
+        self._memtable_entries = 0
+        self._segments: List[_Segment] = []
+        self._next_segment = 0
+        self._source_ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._offsets = array("Q")
+        self._counts = array("I")
+        self._shingle_file = None
+        self._docs_file = None
+        self._shingle_mmap: Optional[mmap.mmap] = None
+        self._shingle_view: Optional[memoryview] = None
+        self._mapped_bytes = 0
+        self._shingle_bytes = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def open(self) -> "PlagiarismCorpusIndex":
+        """Open or create the index directory and map existing segments"""
+        os.makedirs(self.config.index_dir, exist_ok=True)
+        manifest = self._read_manifest()
+        if manifest:
+            for key in ("shingle_k", "chunk_size", "num_perm", "bands"):
+                if manifest["config"][key] != getattr(self.config, key):
+                    raise ValueError(f"Index was built with {key}={manifest['config'][key]}")
+            self._next_segment = manifest["next_segment"]
+            for name in manifest["segments"]:
+                self._segments.append(_Segment(os.path.join(self.config.index_dir, name)))
+
+        docs_path = os.path.join(self.config.index_dir, DOCS_FILE)
+        shingles_path = os.path.join(self.config.index_dir, SHINGLES_FILE)
+        durable_bytes = os.path.getsize(shingles_path) if os.path.exists(shingles_path) else 0
+        if os.path.exists(docs_path):
+            valid_bytes = 0
+            with open(docs_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    if record["offset"] + record["count"] * 4 > durable_bytes:
+                        # Torn write after a crash; the rest of the log is not trustworthy
+                        break
+                    valid_bytes += len(line)
+                    self._source_ids.append(record["source_id"])
+                    self._offsets.append(record["offset"])
+                    self._counts.append(record["count"])
+                    self._metadata.append(record.get("metadata") or {})
+            if valid_bytes < os.path.getsize(docs_path):
+                os.truncate(docs_path, valid_bytes)
+
+        # Drop shingles past the last logged document (a torn append may not even be
+        # a whole number of 4-byte hashes, which would break the mmap view)
+        shingle_end = self._offsets[-1] + self._counts[-1] * 4 if self._offsets else 0
+        if durable_bytes > shingle_end:
+            os.truncate(shingles_path, shingle_end)
+
+        self._shingle_file = open(shingles_path, "ab+")
+        self._shingle_bytes = self._shingle_file.seek(0, os.SEEK_END)
+        self._docs_file = open(docs_path, "a", encoding="utf-8")
+
+        # Band entries of documents appended after the last flush live only in the
+        # memtable, so rebuild them from the shingle store.
+        indexed = manifest.get("indexed_docs", 0) if manifest else 0
+        for doc_id in range(indexed, len(self._source_ids)):
+            self._index_bands(doc_id, self._read_shingles(doc_id))
+
+        logger.info("Plagiarism corpus index opened: %d documents, %d segments",
+                    len(self._source_ids), len(self._segments))
+        return self
+
+    def close(self) -> None:
+        """Flush pending entries and release file handles"""
+        with self._lock:
+            if self._shingle_file is None:
+                return
+            self.flush()
+            self._unmap_shingles()
+            for segment in self._segments:
+                segment.close()
+            self._segments.clear()
+            self._shingle_file.close()
+            self._docs_file.close()
+            self._shingle_file = None
+            self._docs_file = None
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def add_document(self, source_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Append a document to the corpus; searchable immediately via the memtable"""
+        tokens, _ = tokenize(text)
+        hashes = shingle_hashes(tokens, self.config.shingle_k)
+
+        with self._lock:
+            doc_id = len(self._source_ids)
+            offset = self._shingle_bytes
+            encoded = array("I", hashes).tobytes()
+            self._shingle_file.write(encoded)
+            self._shingle_bytes += len(encoded)
+
+            record = {"source_id": source_id, "offset": offset, "count": len(hashes)}
+            if metadata:
+                record["metadata"] = metadata
+            self._docs_file.write(json.dumps(record) + "\n")
+
+            self._source_ids.append(source_id)
+            self._offsets.append(offset)
+            self._counts.append(len(hashes))
+            self._metadata.append(metadata or {})
+
+            self._index_bands(doc_id, hashes)
+            if self._memtable_entries >= self.config.memtable_limit:
+                self.flush()
+            return doc_id
+
+    def add_documents(self, documents: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]) -> int:
+        """Bulk append of (source_id, text, metadata) tuples"""
+        added = 0
+        for source_id, text, metadata in documents:
+            self.add_document(source_id, text, metadata)
+            added += 1
+        return added
+
+    def _index_bands(self, doc_id: int, hashes: Sequence[int]) -> None:
+        if not hashes:
+            return
+        keys: Set[int] = set()
+        chunk = self.config.chunk_size
+        for start in range(0, len(hashes), chunk):
+            keys.update(self._band_keys(self.minhasher.signature(hashes[start:start + chunk])))
+        for key in keys:
+            self._memtable[key].append(doc_id)
+        self._memtable_entries += len(keys)
+
+    def _band_keys(self, signature: Sequence[int]) -> List[int]:
+        rows = self.config.rows_per_band
+        keys = []
+        for band in range(self.config.bands):
+            payload = struct.pack(f"<H{rows}I", band, *signature[band * rows:(band + 1) * rows])
+            keys.append(int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), "little"))
+        return keys
+
+    def flush(self) -> None:
+        """Persist memtable band entries as a new segment and sync data files"""
+        with self._lock:
+            if self._shingle_file:
+                self._shingle_file.flush()
+                os.fsync(self._shingle_file.fileno())
+            if self._docs_file:
+                self._docs_file.flush()
+                os.fsync(self._docs_file.fileno())
+
+            if self._memtable_entries:
+                entries = [(key, doc_id) for key, doc_ids in self._memtable.items() for doc_id in doc_ids]
+                name = f"{SEGMENT_PREFIX}{self._next_segment:06d}.bin"
+                self._next_segment += 1
+                _Segment.write(os.path.join(self.config.index_dir, name), entries)
+                self._segments.append(_Segment(os.path.join(self.config.index_dir, name)))
+                self._memtable.clear()
+                self._memtable_entries = 0
+
+            if len(self._segments) > self.config.max_segments:
+                self._compact()
+            self._write_manifest()
+
+    def _compact(self) -> None:
+        """Merge all segments into one to bound lookup fan-out"""
+        entries = [entry for segment in self._segments for entry in segment.entries()]
+        name = f"{SEGMENT_PREFIX}{self._next_segment:06d}.bin"
+        self._next_segment += 1
+        _Segment.write(os.path.join(self.config.index_dir, name), entries)
+
+        old_segments, self._segments = self._segments, [_Segment(os.path.join(self.config.index_dir, name))]
+        self._write_manifest()
+        for segment in old_segments:
+            segment.close()
+            os.remove(segment.path)
+        logger.info("Compacted %d segments into %s", len(old_segments), name)
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def query(self, text: str, min_jaccard: float = 0.0, min_containment: float = 0.1,
+              max_candidates: Optional[int] = None) -> List[PlagiarismMatch]:
+        """Find corpus documents sharing content with text, verified by exact Jaccard"""
+        tokens, offsets = tokenize(text)
+        hashes = shingle_hashes(tokens, self.config.shingle_k)
+        if not hashes:
+            return []
+
+        query_set = set(hashes)
+        chunk = self.config.chunk_size
+        stride = max(1, chunk // 2)
+        keys: Set[int] = set()
+        for start in range(0, max(1, len(hashes) - chunk + stride), stride):
+            keys.update(self._band_keys(self.minhasher.signature(hashes[start:start + chunk])))
+
+        with self._lock:
+            candidates: Counter = Counter()
+            for key in keys:
+                for doc_id in self._memtable.get(key, ()):
+                    candidates[doc_id] += 1
+                for segment in self._segments:
+                    for doc_id in segment.lookup(key):
+                        candidates[doc_id] += 1
+
+            matches = []
+            for doc_id, _ in candidates.most_common(max_candidates or self.config.max_candidates):
+                match = self._verify(doc_id, hashes, query_set, offsets)
+                if match and (match.jaccard >= min_jaccard and match.containment >= min_containment):
+                    matches.append(match)
+
+        matches.sort(key=lambda m: (m.containment, m.jaccard), reverse=True)
+        return matches
+
+    def _verify(self, doc_id: int, query_hashes: List[int], query_set: Set[int],
+                offsets: List[Tuple[int, int]]) -> Optional[PlagiarismMatch]:
+        source_hashes = self._read_shingles(doc_id)
+        source_set = set(source_hashes)
+        shared = query_set & source_set
+        if not shared:
+            return None
+
+        source_positions: Dict[int, int] = {}
+        for position, value in enumerate(source_hashes):
+            if value in shared and value not in source_positions:
+                source_positions[value] = position
+
+        k = min(self.config.shingle_k, len(offsets))
+        spans = []
+        for start, end in _merge_runs((i for i, h in enumerate(query_hashes) if h in shared), k):
+            matched = [source_positions[query_hashes[i]] for i in range(start, end - k + 1)
+                       if query_hashes[i] in shared]
+            spans.append({
+                "start_char": offsets[start][0],
+                "end_char": offsets[min(end, len(offsets)) - 1][1],
+                "start_word": start,
+                "end_word": end,
+                "source_start_word": min(matched),
+                "source_end_word": max(matched) + k,
+            })
+
+        return PlagiarismMatch(
+            source_id=self._source_ids[doc_id],
+            jaccard=len(shared) / len(query_set | source_set),
+            containment=len(shared) / len(query_set),
+            shared_shingles=len(shared),
+            spans=spans,
+            metadata=self._metadata[doc_id],
+        )
+
+    def _read_shingles(self, doc_id: int) -> List[int]:
+        offset, count = self._offsets[doc_id], self._counts[doc_id]
+        if offset + count * 4 > self._mapped_bytes:
+            self._remap_shingles()
+        start = offset // 4
+        return self._shingle_view[start:start + count].tolist()
+
+    def _remap_shingles(self) -> None:
+        self._unmap_shingles()
+        self._shingle_file.flush()
+        if self._shingle_bytes:
+            self._shingle_mmap = mmap.mmap(self._shingle_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._shingle_view = memoryview(self._shingle_mmap).cast("I")
+            self._mapped_bytes = self._shingle_bytes
+
+    def _unmap_shingles(self) -> None:
+        if self._shingle_view is not None:
+            self._shingle_view.release()
+            self._shingle_view = None
+        if self._shingle_mmap is not None:
+            self._shingle_mmap.close()
+            self._shingle_mmap = None
+        self._mapped_bytes = 0
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    def _read_manifest(self) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.config.index_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "config": {
+                "shingle_k": self.config.shingle_k,
+                "chunk_size": self.config.chunk_size,
+                "num_perm": self.config.num_perm,
+                "bands": self.config.bands,
+            },
+            "segments": [os.path.basename(s.path) for s in self._segments],
+            "next_segment": self._next_segment,
+            "indexed_docs": len(self._source_ids),
+        }
+        path = os.path.join(self.config.index_dir, MANIFEST_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and layout statistics"""
+        return {
+            "documents": len(self._source_ids),
+            "segments": len(self._segments),
+            "segment_entries": sum(s.count for s in self._segments),
+            "memtable_entries": self._memtable_entries,
+            "shingle_bytes": self._shingle_bytes,
+        }
+
+    def __len__(self) -> int:
+        return len(self._source_ids)
+
+
+__all__ = [
+    "CorpusIndexConfig",
+    "PlagiarismCorpusIndex",
+    "PlagiarismMatch",
+    "MinHasher",
+    "tokenize",
+    "shingle_hashes",
+]
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Plagiarism Index Benchmark
+Builds a synthetic corpus and measures MinHash/LSH query latency
+"""
+
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Any
+
+from plagiarism_index import CorpusIndexConfig, PlagiarismCorpusIndex, HAS_NUMPY
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples in milliseconds"""
+    samples = sorted(samples)
+    return {
+        "avg_ms": sum(samples) / len(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[int(len(samples) * 0.95)],
+        "p99_ms": samples[int(len(samples) * 0.99)],
+    }
+
+
+def _document(rng: random.Random, vocabulary: List[str], words: int) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def _corpus_words(doc_id: int, vocabulary: List[str], words: int) -> List[str]:
+    """Corpus documents are seeded by ID so sources can be regenerated for queries"""
+    rng = random.Random(doc_id)
+    return [rng.choice(vocabulary) for _ in range(words)]
+
+
+def run_benchmark(documents: int, words_per_document: int, queries: int, index_dir: str) -> Dict[str, Any]:
+    """Index a synthetic corpus and time plagiarised and clean queries"""
+    rng = random.Random(42)
+    vocabulary = [f"term{i}" for i in range(50000)]
+    index = PlagiarismCorpusIndex(CorpusIndexConfig(index_dir=index_dir)).open()
+
+    start = time.perf_counter()
+    for doc_id in range(documents):
+        index.add_document(f"doc-{doc_id}", " ".join(_corpus_words(doc_id, vocabulary, words_per_document)))
+        if doc_id and doc_id % 100000 == 0:
+            print(f"  indexed {doc_id} documents ({doc_id / (time.perf_counter() - start):.0f} docs/s)")
+    index.flush()
+    indexing_time = time.perf_counter() - start
+
+    copied_latency, clean_latency, hits = [], [], 0
+    for _ in range(queries):
+        source = rng.randrange(documents)
+        source_words = _corpus_words(source, vocabulary, words_per_document)
+        offset = rng.randrange(max(1, words_per_document - 80))
+        query = _document(rng, vocabulary, 40) + " " + " ".join(source_words[offset:offset + 80])
+
+        t0 = time.perf_counter()
+        matches = index.query(query)
+        copied_latency.append((time.perf_counter() - t0) * 1000)
+        hits += bool(matches and matches[0].source_id == f"doc-{source}")
+
+        t0 = time.perf_counter()
+        index.query(_document(rng, vocabulary, 120))
+        clean_latency.append((time.perf_counter() - t0) * 1000)
+
+    stats = index.stats()
+    index.close()
+    return {
+        "documents": documents,
+        "words_per_document": words_per_document,
+        "numpy": HAS_NUMPY,
+        "indexing_time_s": indexing_time,
+        "docs_per_second": documents / indexing_time,
+        "index_stats": stats,
+        "recall": hits / queries,
+        "copied_query_latency": _percentiles(copied_latency),
+        "clean_query_latency": _percentiles(clean_latency),
+    }
+
+
+def main():
+    """Run the plagiarism index benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=1_000_000)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--index-dir", default=None)
+    args = parser.parse_args()
+
+    index_dir = args.index_dir or tempfile.mkdtemp(prefix="plagiarism_index_")
+    print(f"Building plagiarism index with {args.documents} documents in {index_dir}...")
+    try:
+        result = run_benchmark(args.documents, args.words, args.queries, index_dir)
+    finally:
+        if not args.index_dir:
+            shutil.rmtree(index_dir, ignore_errors=True)
+
+    print(f"Indexing: {result['docs_per_second']:.0f} docs/s")
+    print(f"Recall on copied passages: {result['recall']:.2%}")
+    for name in ("copied_query_latency", "clean_query_latency"):
+        latency = result[name]
+        print(f"{name}: p50 {latency['p50_ms']:.2f}ms  p99 {latency['p99_ms']:.2f}ms")
+
+    with open("plagiarism_index_benchmark.json", "w") as f:
+        json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,12 +17,11 @@ from datetime import datetime
 import traceback
 import time
 
-try:
-    import numpy as np
-    from sklearn.ensemble import IsolationForest
-    HAS_ML = True
-except ImportError:
-    HAS_ML = False
+from lazy_imports import lazy_import, module_available
+
+# Optional dependencies - scikit-learn, imported on first analysis
+HAS_ML = module_available("sklearn")
+sklearn_ensemble = lazy_import("sklearn.ensemble")
 
 from base_agent import BaseAgent, AgentConfig, TaskRequest
 
@@ -213,10 +212,9 @@ class AnalyzerEngine(BaseAgent):
         self.code_smell_detectors = self._load_code_smell_detectors()
         self.best_practices = self._load_best_practices()
         
-        # ML models for false positive reduction
+        # ML models for false positive reduction, created on first use
         self.ml_models: Dict[str, Any] = {}
-        if HAS_ML:
-            self._init_ml_models()
+        self._ml_models_initialized = False
         
         # Analysis cache
         self.analysis_cache: Dict[str, AnalysisReport] = {}
@@ -248,11 +246,14 @@ class AnalyzerEngine(BaseAgent):
             ml_enabled=HAS_ML
         )
     
-    def _init_ml_models(self):
-        """Initialize ML models for advanced analysis"""
+    def _init_ml_models(self) -> bool:
+        """Initialize ML models for advanced analysis (imports sklearn on first call)"""
+        if self._ml_models_initialized:
+            return bool(self.ml_models)
+        self._ml_models_initialized = True
         try:
             # False positive detector
-            self.ml_models["false_positive_detector"] = IsolationForest(
+            self.ml_models["false_positive_detector"] = sklearn_ensemble.IsolationForest(
                 contamination=0.1,
                 random_state=42
             )
@@ -260,6 +261,7 @@ class AnalyzerEngine(BaseAgent):
             self.logger.info("ML models initialized")
         except Exception as e:
             self.logger.warning(f"Failed to initialize ML models: {e}")
+        return bool(self.ml_models)
     
     def _load_security_patterns(self) -> Dict[str, List[Dict]]:
         """Comprehensive security patterns"""
@@ -604,7 +606,7 @@ class AnalyzerEngine(BaseAgent):
             all_issues.extend(code_smells)
             
             # 5. ML-based false positive filtering
-            if HAS_ML and self.ml_models:
+            if HAS_ML and self._init_ml_models():
                 all_issues = self._filter_false_positives(all_issues)
             
             # 6. Calculate scores
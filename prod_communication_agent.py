@@ -9,7 +9,7 @@ import json
 import time
 import re
 import hashlib
-import zlib
+import inspect
 import traceback
 import os
 from typing import Dict, List, Optional, Any, Union, Set, Tuple, Callable
@@ -20,6 +20,10 @@ import uuid
 from datetime import datetime, timedelta
 
 from base_agent import BaseAgent, AgentConfig, TaskRequest, TaskResponse, Priority, AgentStatus, TaskStatus
+from circuit_breaker import CircuitBreaker, CircuitBreakerConfig, CircuitBreakerRegistry
+from delivery_engine import DeliveryEngine
+from message_codec import JSON, ZLIB, deserialize, serialize
+from message_history_writer import MessageHistoryWriter, history_record
 from opentelemetry import trace
 
 # Constants
@@ -30,6 +34,15 @@ MESSAGE_TTL_SECONDS = 3600
 CLEANUP_INTERVAL = 300
 RATE_LIMIT_WINDOW = 60
 DEFAULT_RATE_LIMIT = 100
+DELIVERY_MAX_IN_FLIGHT = int(os.getenv("DELIVERY_MAX_IN_FLIGHT", "16"))
+DELIVERY_RATE_PER_SECOND = float(os.getenv("DELIVERY_RATE_PER_SECOND", "500"))
+DELIVERY_BURST = float(os.getenv("DELIVERY_BURST", "100"))
+DELIVERY_RETRY_BASE_DELAY = float(os.getenv("DELIVERY_RETRY_BASE_DELAY", "0.5"))
+DELIVERY_RETRY_MAX_DELAY = float(os.getenv("DELIVERY_RETRY_MAX_DELAY", "30"))
+HISTORY_FLUSH_SIZE = int(os.getenv("HISTORY_FLUSH_SIZE", "500"))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1.0"))
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", "20000"))
+HISTORY_SPILL_DIR = os.getenv("HISTORY_SPILL_DIR") or None
 
 class MessageType(Enum):
     """Message types for inter-agent communication"""
@@ -108,7 +121,7 @@ class Message:
     
     def size_bytes(self) -> int:
         """Calculate message size in bytes"""
-        return len(json.dumps(asdict(self)).encode('utf-8'))
+        return len(serialize(asdict(self)))
 
 @dataclass
 class MessageRoute:
@@ -170,9 +183,29 @@ class CommunicationAgent(BaseAgent):
         
         # Message routing and delivery
         self.message_routes: List[MessageRoute] = []
-        self.message_queue: Dict[str, deque] = defaultdict(lambda: deque(maxlen=MAX_QUEUE_SIZE))
+        self.delivery_engine = DeliveryEngine(
+            send=self._send_to_agent,
+            is_available=self._can_deliver_to,
+            max_in_flight=DELIVERY_MAX_IN_FLIGHT,
+            rate_per_second=DELIVERY_RATE_PER_SECOND,
+            burst=DELIVERY_BURST,
+            max_queue_size=MAX_QUEUE_SIZE,
+            on_expired=self._on_queued_message_expired,
+            on_dropped=self._on_queued_message_dropped,
+            priority_labels={p.value: p.name.lower() for p in MessagePriority}
+        )
         self.pending_messages: Dict[str, Union[Message, asyncio.Future]] = {}
-        self.message_history: deque = deque(maxlen=10000)
+        # (message_id, recipient) -> timer re-queueing a failed delivery after its backoff
+        self._retry_timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        # Recent messages for duplicate detection; persistence goes through the history writer
+        self.message_history: deque = deque(maxlen=100)
+        self.history_writer = MessageHistoryWriter(
+            lambda: self.db_pool,
+            flush_size=HISTORY_FLUSH_SIZE,
+            flush_interval=HISTORY_FLUSH_INTERVAL,
+            max_pending=HISTORY_MAX_PENDING,
+            spill_dir=HISTORY_SPILL_DIR
+        )
         
         # Agent directory and presence
         self.agent_directory: Dict[str, Dict] = {}
@@ -204,8 +237,19 @@ class CommunicationAgent(BaseAgent):
         self._rate_limits: Dict[str, deque] = defaultdict(deque)
         self._rate_limit_config: Dict[str, Dict] = {}
         
-        # Circuit breaker for failing agents
-        self._circuit_breakers: Dict[str, Dict] = {}
+        # Circuit breaker and delivery bulkhead per recipient agent
+        self._circuit_breakers = CircuitBreakerRegistry()
+        self._circuit_breaker_config = CircuitBreakerConfig(
+            failure_threshold=5,
+            success_threshold=3,
+            timeout_seconds=60,
+            min_throughput=5,
+            slow_call_duration_seconds=5.0,
+            concurrency_limit=64,
+            limit_algorithm="gradient",
+            max_queue_size=1000,
+            queue_timeout_seconds=5.0
+        )
         
         # Performance metrics (enhanced)
         self.communication_metrics = {
@@ -297,13 +341,13 @@ class CommunicationAgent(BaseAgent):
             )
             
             # Background tasks
-            asyncio.create_task(self._message_delivery_loop())
+            self.delivery_engine.start()
             asyncio.create_task(self._retry_failed_messages())
             asyncio.create_task(self._cleanup_expired_messages())
             asyncio.create_task(self._monitor_conversations())
             asyncio.create_task(self._health_check_loop())
             asyncio.create_task(self._circuit_breaker_monitor())
-            asyncio.create_task(self._persist_message_history())
+            self.history_writer.start()
             
             self._health_status['status'] = 'healthy'
             self._health_status['last_check'] = time.time()
@@ -319,6 +363,18 @@ class CommunicationAgent(BaseAgent):
             self.logger.error("Failed to start Communication Agent", error=str(e), traceback=traceback.format_exc())
             raise
     
+    async def shutdown(self):
+        """Stop delivery workers and drain message history before the base agent closes its connections"""
+        for timer in self._retry_timers.values():
+            timer.cancel()
+        self._retry_timers.clear()
+        await self.delivery_engine.stop()
+        await self.history_writer.close()
+        # BaseAgent.shutdown may be the plain synchronous variant
+        result = super().shutdown()
+        if inspect.isawaitable(result):
+            await result
+    
     def _load_communication_protocols(self):
         """Load communication protocol configurations with validation"""
         try:
@@ -436,25 +492,32 @@ class CommunicationAgent(BaseAgent):
     def _compress_message_payload(self, payload: Dict) -> Dict:
         """Compress large message payloads with error handling"""
         try:
-            payload_str = json.dumps(payload)
-            payload_bytes = payload_str.encode('utf-8')
+            payload_bytes = serialize(payload, self.codec.content_type)
             
             # Only compress if payload is larger than 1KB
             if len(payload_bytes) > 1024:
-                compressed = zlib.compress(payload_bytes, level=6)
+                # zstd (with the shared dictionary) when configured, zlib otherwise;
+                # binary envelopes carry the bytes as-is, JSON ones as hex
+                algorithm, compressed, dict_id = self.codec.compress(payload_bytes)
                 compression_ratio = len(compressed) / len(payload_bytes)
                 
                 self.logger.debug("Payload compressed",
+                                algorithm=algorithm,
                                 original_size=len(payload_bytes),
                                 compressed_size=len(compressed),
                                 ratio=compression_ratio)
                 
-                return {
+                compressed_payload = {
                     '_compressed': True,
-                    '_algorithm': 'zlib',
+                    '_algorithm': algorithm,
                     '_original_size': len(payload_bytes),
-                    '_data': compressed.hex()
+                    '_data': compressed
                 }
+                if self.codec.content_type != JSON:
+                    compressed_payload['_content_type'] = self.codec.content_type
+                if dict_id is not None:
+                    compressed_payload['_dictionary'] = dict_id
+                return compressed_payload
             
             return payload
             
@@ -468,9 +531,13 @@ class CommunicationAgent(BaseAgent):
             if not payload.get('_compressed'):
                 return payload
             
-            compressed_data = bytes.fromhex(payload['_data'])
-            decompressed = zlib.decompress(compressed_data)
-            result = json.loads(decompressed.decode('utf-8'))
+            compressed_data = payload['_data']
+            if isinstance(compressed_data, str):
+                compressed_data = bytes.fromhex(compressed_data)
+            decompressed = self.codec.decompress(
+                payload.get('_algorithm', ZLIB), compressed_data, payload.get('_dictionary')
+            )
+            result = deserialize(decompressed, payload.get('_content_type', JSON))
             
             # Validate decompressed size
             if payload.get('_original_size') and len(decompressed) != payload['_original_size']:
@@ -789,8 +856,8 @@ class CommunicationAgent(BaseAgent):
             )
             
             # Publish to NATS
-            message_data = json.dumps(asdict(event_message)).encode('utf-8')
-            await self._publish(subject, message_data)
+            message_data, headers = self.codec.encode(asdict(event_message))
+            await self._publish(subject, message_data, headers=headers)
             
             self.communication_metrics['messages_sent'] += 1
             self.communication_metrics['bytes_transferred'] += len(message_data)
@@ -871,6 +938,9 @@ class CommunicationAgent(BaseAgent):
             if isinstance(msg, Message):
                 msg.status = MessageStatus.EXPIRED
                 del self.pending_messages[message_id]
+                self.delivery_engine.cancel(message_id)
+                for key in [key for key in self._retry_timers if key[0] == message_id]:
+                    self._retry_timers.pop(key).cancel()
                 self.logger.info("Message cancelled", message_id=message_id)
                 return {'status': 'cancelled', 'message_id': message_id}
         
@@ -888,8 +958,11 @@ class CommunicationAgent(BaseAgent):
             'presence': self.agent_presence.get(agent_name),
             'health': self.agent_health.get(agent_name),
             'subscriptions': list(self.agent_subscriptions.get(agent_name, [])),
-            'queued_messages': len(self.message_queue.get(agent_name, [])),
-            'circuit_breaker': self._circuit_breakers.get(agent_name, {}).get('state', 'closed')
+            'queued_messages': self.delivery_engine.queue_depth(agent_name),
+            'circuit_breaker': (
+                self._circuit_breakers.get(agent_name).state.value
+                if agent_name in self._circuit_breakers else 'closed'
+            )
         }
         
         return status
@@ -1002,7 +1075,9 @@ class CommunicationAgent(BaseAgent):
             
             # Update message history
             message.status = MessageStatus.SENT
-            self.message_history.append(asdict(message))
+            record = asdict(message)
+            self.message_history.append(record)
+            await self.history_writer.add(history_record(record))
             
             return {
                 'status': 'processed',
@@ -1043,13 +1118,14 @@ class CommunicationAgent(BaseAgent):
             return False
     
     async def _deliver_to_recipients(self, message: Message, recipients: Set[str]) -> Dict[str, Any]:
-        """Deliver message to all recipients with circuit breaker"""
+        """Deliver message to all recipients concurrently through the delivery engine"""
         delivery_results = {
             'success': [],
             'failed': [],
             'queued': []
         }
         
+        waiting = {}
         for recipient in recipients:
             try:
                 # Check circuit breaker
@@ -1059,17 +1135,14 @@ class CommunicationAgent(BaseAgent):
                     continue
                 
                 # Check agent availability
-                if recipient in self.agent_presence and \
-                   self.agent_presence[recipient].get("status") == AgentStatus.ACTIVE.value:
-                    await self._send_to_agent(recipient, message)
-                    delivery_results['success'].append(recipient)
-                    self._record_circuit_success(recipient)
+                if self._is_agent_active(recipient):
+                    waiting[recipient] = self._enqueue_delivery(recipient, message, wait=True)
                 else:
                     # Queue for later delivery
                     self.logger.debug("Agent not active, queuing message",
                                     recipient=recipient,
                                     message_id=message.id)
-                    self.message_queue[recipient].append(message)
+                    self._enqueue_delivery(recipient, message)
                     delivery_results['queued'].append(recipient)
                     # Store in pending for retry
                     self.pending_messages[message.id] = message
@@ -1080,58 +1153,69 @@ class CommunicationAgent(BaseAgent):
                                 message_id=message.id,
                                 error=str(e))
                 delivery_results['failed'].append(recipient)
-                self._record_circuit_failure(recipient)
+        
+        if waiting:
+            outcomes = await asyncio.gather(*waiting.values())
+            for recipient, delivered in zip(waiting, outcomes):
+                delivery_results['success' if delivered else 'failed'].append(recipient)
         
         return delivery_results
     
+    def _enqueue_delivery(self, recipient: str, message: Message, wait: bool = False) -> Optional[asyncio.Future]:
+        """Queue a message for a recipient, ordered by priority then expiry"""
+        return self.delivery_engine.enqueue(
+            recipient,
+            message,
+            priority=message.priority.value,
+            expires_at=message.created_at + message.ttl_seconds,
+            wait=wait
+        )
+    
+    def _schedule_retry(self, recipient: str, message: Message):
+        """Re-queue a failed delivery after an exponential backoff instead of at the pacing rate"""
+        delay = min(DELIVERY_RETRY_BASE_DELAY * (2 ** max(message.retry_count - 1, 0)), DELIVERY_RETRY_MAX_DELAY)
+        key = (message.id, recipient)
+        previous = self._retry_timers.pop(key, None)
+        if previous is not None:
+            previous.cancel()
+        self._retry_timers[key] = asyncio.get_running_loop().call_later(
+            delay, self._requeue_retry, recipient, message
+        )
+    
+    def _requeue_retry(self, recipient: str, message: Message):
+        self._retry_timers.pop((message.id, recipient), None)
+        if message.is_expired():
+            self._on_queued_message_expired(recipient, message)
+            return
+        self._enqueue_delivery(recipient, message)
+    
+    def _is_agent_active(self, agent_name: str) -> bool:
+        return self.agent_presence.get(agent_name, {}).get("status") == AgentStatus.ACTIVE.value
+    
+    def _can_deliver_to(self, agent_name: str) -> bool:
+        """Whether the delivery engine may send to an agent right now"""
+        return self._is_agent_active(agent_name) and not self._is_circuit_open(agent_name)
+    
+    def _on_queued_message_expired(self, agent_name: str, message: Message):
+        message.status = MessageStatus.EXPIRED
+        self.communication_metrics['messages_expired'] += 1
+        self.pending_messages.pop(message.id, None)
+    
+    def _on_queued_message_dropped(self, agent_name: str, message: Message):
+        self.logger.warning("Delivery queue full, message dropped",
+                          agent=agent_name,
+                          message_id=message.id,
+                          priority=message.priority.name)
+        self.communication_metrics['messages_failed'] += 1
+    
+    def _agent_breaker(self, agent_name: str) -> CircuitBreaker:
+        """Circuit breaker guarding deliveries to an agent"""
+        return self._circuit_breakers.get_or_create(agent_name, self._circuit_breaker_config)
+    
     def _is_circuit_open(self, agent_name: str) -> bool:
         """Check if circuit breaker is open for an agent"""
-        if agent_name not in self._circuit_breakers:
-            return False
-        
-        breaker = self._circuit_breakers[agent_name]
-        if breaker['state'] == 'open':
-            # Check if should try half-open
-            if time.time() - breaker['opened_at'] > breaker['timeout']:
-                breaker['state'] = 'half_open'
-                self.logger.info("Circuit breaker half-open", agent=agent_name)
-                return False
-            return True
-        
-        return False
-    
-    def _record_circuit_success(self, agent_name: str):
-        """Record successful delivery for circuit breaker"""
-        if agent_name in self._circuit_breakers:
-            breaker = self._circuit_breakers[agent_name]
-            breaker['failure_count'] = 0
-            breaker['success_count'] += 1
-            
-            if breaker['state'] == 'half_open' and breaker['success_count'] >= 3:
-                breaker['state'] = 'closed'
-                self.logger.info("Circuit breaker closed", agent=agent_name)
-    
-    def _record_circuit_failure(self, agent_name: str):
-        """Record failed delivery for circuit breaker"""
-        if agent_name not in self._circuit_breakers:
-            self._circuit_breakers[agent_name] = {
-                'state': 'closed',
-                'failure_count': 0,
-                'success_count': 0,
-                'threshold': 5,
-                'timeout': 60,
-                'opened_at': None
-            }
-        
-        breaker = self._circuit_breakers[agent_name]
-        breaker['failure_count'] += 1
-        breaker['success_count'] = 0
-        
-        if breaker['failure_count'] >= breaker['threshold']:
-            breaker['state'] = 'open'
-            breaker['opened_at'] = time.time()
-            self.communication_metrics['circuit_breakers_open'] += 1
-            self.logger.warning("Circuit breaker opened", agent=agent_name)
+        breaker = self._circuit_breakers.get(agent_name)
+        return breaker is not None and not breaker.allow_request()
     
     async def _send_to_agent(self, recipient_agent_name: str, message: Message):
         """Send message to specific agent with retry logic"""
@@ -1139,18 +1223,19 @@ class CommunicationAgent(BaseAgent):
         delivery_start = time.time()
         
         try:
-            message_data = json.dumps(asdict(message)).encode('utf-8')
+            message_data, headers = self.codec.encode(asdict(message))
             
             # Check message size
             if len(message_data) > MAX_MESSAGE_SIZE:
                 raise ValueError(f"Message size {len(message_data)} exceeds maximum {MAX_MESSAGE_SIZE}")
             
-            # Send message
-            if message.type == MessageType.REQUEST:
-                reply_to_subject = f"communication.response.{message.id}"
-                await self._publish_request(subject, message_data, reply_to_subject)
-            else:
-                await self._publish(subject, message_data)
+            # Send message; the breaker records the outcome and bounds in-flight sends
+            async with self._agent_breaker(recipient_agent_name).guard():
+                if message.type == MessageType.REQUEST:
+                    reply_to_subject = f"communication.response.{message.id}"
+                    await self._publish_request(subject, message_data, reply_to_subject)
+                else:
+                    await self._publish(subject, message_data, headers=headers)
             
             # Track delivery
             delivery_time = time.time() - delivery_start
@@ -1208,7 +1293,7 @@ class CommunicationAgent(BaseAgent):
             if message.should_retry():
                 message.retry_count += 1
                 message.status = MessageStatus.RETRYING
-                self.message_queue[recipient_agent_name].appendleft(message)
+                self._schedule_retry(recipient_agent_name, message)
                 self.communication_metrics['messages_retried'] += 1
             else:
                 message.status = MessageStatus.FAILED
@@ -1220,55 +1305,6 @@ class CommunicationAgent(BaseAgent):
     
     # Background monitoring and cleanup tasks
     
-    async def _message_delivery_loop(self):
-        """Enhanced message delivery loop with prioritization"""
-        while not self._shutdown_event.is_set():
-            try:
-                for agent_name, queue in list(self.message_queue.items()):
-                    if not queue:
-                        continue
-                    
-                    # Check agent availability
-                    if self.agent_presence.get(agent_name, {}).get("status") != AgentStatus.ACTIVE.value:
-                        continue
-                    
-                    # Check circuit breaker
-                    if self._is_circuit_open(agent_name):
-                        continue
-                    
-                    # Process messages with priority
-                    messages_to_send = []
-                    while queue and len(messages_to_send) < 10:  # Batch size
-                        msg = queue.popleft()
-                        if not msg.is_expired():
-                            messages_to_send.append(msg)
-                        else:
-                            msg.status = MessageStatus.EXPIRED
-                            self.communication_metrics['messages_expired'] += 1
-                            if msg.id in self.pending_messages:
-                                del self.pending_messages[msg.id]
-                    
-                    # Send messages
-                    for message in messages_to_send:
-                        try:
-                            await self._send_to_agent(agent_name, message)
-                            await asyncio.sleep(0.01)  # Rate limiting
-                        except Exception as e:
-                            self.logger.error("Delivery loop send failed", error=str(e))
-                
-                # Update queue depth metric
-                total_queued = sum(len(q) for q in self.message_queue.values())
-                self.communication_metrics['queue_depth_max'] = max(
-                    self.communication_metrics['queue_depth_max'],
-                    total_queued
-                )
-                
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                self.logger.error("Message delivery loop failed", error=str(e), traceback=traceback.format_exc())
-                await asyncio.sleep(5)
-    
     async def _retry_failed_messages(self):
         """Enhanced retry logic with exponential backoff"""
         while not self._shutdown_event.is_set():
@@ -1314,7 +1350,7 @@ class CommunicationAgent(BaseAgent):
                     message.status = MessageStatus.RETRYING
                     
                     for recipient in message.recipients:
-                        self.message_queue[recipient].appendleft(message)
+                        self._enqueue_delivery(recipient, message)
                     
                     if message.id in self.delivery_receipts:
                         self.delivery_receipts[message.id]["status"] = "retrying"
@@ -1358,10 +1394,7 @@ class CommunicationAgent(BaseAgent):
                         del self.failed_deliveries[msg_id]
                 
                 # Clean expired queued messages
-                for agent_name, queue in list(self.message_queue.items()):
-                    for i in range(len(queue) - 1, -1, -1):
-                        if queue[i].is_expired():
-                            del queue[i]
+                self.delivery_engine.purge_expired()
                 
                 self.logger.debug("Cleanup completed",
                                 expired_messages=len(expired_ids),
@@ -1421,17 +1454,17 @@ class CommunicationAgent(BaseAgent):
                 issues = []
                 
                 # Check queue depths
-                for agent_name, queue in self.message_queue.items():
-                    if len(queue) > MAX_QUEUE_SIZE * 0.8:
-                        issues.append(f"Queue for {agent_name} is {len(queue)}/{MAX_QUEUE_SIZE}")
+                for agent_name, depth in self.delivery_engine.queue_depths().items():
+                    if depth > MAX_QUEUE_SIZE * 0.8:
+                        issues.append(f"Queue for {agent_name} is {depth}/{MAX_QUEUE_SIZE}")
                 
                 # Check pending messages
                 if len(self.pending_messages) > 1000:
                     issues.append(f"High pending message count: {len(self.pending_messages)}")
                 
                 # Check circuit breakers
-                open_breakers = [name for name, breaker in self._circuit_breakers.items()
-                               if breaker['state'] == 'open']
+                open_breakers = self._circuit_breakers.list_open_breakers()
+                self.communication_metrics['circuit_breakers_open'] = len(open_breakers)
                 if open_breakers:
                     issues.append(f"Open circuit breakers: {', '.join(open_breakers)}")
                 
@@ -1447,6 +1480,18 @@ class CommunicationAgent(BaseAgent):
                     self.communication_metrics['p95_delivery_time'] = sorted_times[int(len(sorted_times) * 0.95)]
                     self.communication_metrics['p99_delivery_time'] = sorted_times[int(len(sorted_times) * 0.99)]
                 
+                # Publish queue-wait histograms per priority
+                delivery_metrics = self.delivery_engine.get_metrics()
+                self.communication_metrics['queue_depth_max'] = delivery_metrics['max_total_queued']
+                await self._publish(
+                    "metrics.communication.delivery",
+                    json.dumps({
+                        "agent": self.config.name,
+                        "timestamp": time.time(),
+                        **delivery_metrics
+                    }).encode()
+                )
+                
                 await asyncio.sleep(30)
                 
             except Exception as e:
@@ -1459,16 +1504,15 @@ class CommunicationAgent(BaseAgent):
         """Monitor and reset circuit breakers"""
         while not self._shutdown_event.is_set():
             try:
-                current_time = time.time()
+                for agent_name in self._circuit_breakers.list_open_breakers():
+                    # Try to recover after timeout
+                    if self._circuit_breakers.get(agent_name).allow_request():
+                        self.logger.info("Circuit breaker attempting recovery",
+                                       agent=agent_name)
                 
-                for agent_name, breaker in list(self._circuit_breakers.items()):
-                    if breaker['state'] == 'open':
-                        # Try to recover after timeout
-                        if current_time - breaker['opened_at'] > breaker['timeout']:
-                            breaker['state'] = 'half_open'
-                            breaker['failure_count'] = 0
-                            self.logger.info("Circuit breaker attempting recovery",
-                                           agent=agent_name)
+                self.communication_metrics['circuit_breakers_open'] = len(
+                    self._circuit_breakers.list_open_breakers()
+                )
                 
                 await asyncio.sleep(30)
                 
@@ -1476,64 +1520,6 @@ class CommunicationAgent(BaseAgent):
                 self.logger.error("Circuit breaker monitor failed", error=str(e))
                 await asyncio.sleep(60)
     
-    async def _persist_message_history(self):
-        """Persist message history to database"""
-        while not self._shutdown_event.is_set():
-            try:
-                if not self.db_pool or not self.message_history:
-                    await asyncio.sleep(300)
-                    continue
-                
-                # Batch persist messages
-                messages_to_persist = []
-                while self.message_history and len(messages_to_persist) < 100:
-                    messages_to_persist.append(self.message_history.popleft())
-                
-                if messages_to_persist:
-                    await self._batch_persist_messages(messages_to_persist)
-                
-                await asyncio.sleep(300)  # Persist every 5 minutes
-                
-            except Exception as e:
-                self.logger.error("Message history persistence failed", error=str(e))
-                await asyncio.sleep(600)
-    
-    async def _batch_persist_messages(self, messages: List[Dict]):
-        """Batch persist messages to database"""
-        try:
-            if not self.db_pool:
-                return
-            
-            query = """
-                INSERT INTO message_history 
-                (message_id, type, sender, recipients, subject, payload, status, created_at, metadata)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                ON CONFLICT (message_id) DO NOTHING
-            """
-            
-            records = [
-                (
-                    msg['id'],
-                    msg['type'],
-                    msg['sender'],
-                    json.dumps(msg['recipients']),
-                    msg['subject'],
-                    json.dumps(msg['payload']),
-                    msg.get('status', 'sent'),
-                    datetime.fromtimestamp(msg['created_at']),
-                    json.dumps(msg.get('metadata', {}))
-                )
-                for msg in messages
-            ]
-            
-            async with self.db_pool.acquire() as conn:
-                await conn.executemany(query, records)
-            
-            self.logger.debug("Persisted message batch", count=len(messages))
-            
-        except Exception as e:
-            self.logger.error("Batch persist failed", error=str(e))
-    
     async def _archive_conversation(self, conv: ConversationContext):
         """Archive conversation to database"""
         try:
@@ -1571,7 +1557,7 @@ class CommunicationAgent(BaseAgent):
     async def _handle_agent_registration(self, msg):
         """Handle agent registration with validation"""
         try:
-            data = json.loads(msg.data.decode())
+            data = self._decode_message(msg)
             
             # Validate required fields
             required = ['agent_name', 'agent_type']
@@ -1600,6 +1586,7 @@ class CommunicationAgent(BaseAgent):
                 "status": "healthy",
                 "last_check": time.time()
             }
+            self.delivery_engine.wake(agent_name)
             
             self.logger.info("Agent registered",
                            agent_name=agent_name,
@@ -1613,20 +1600,20 @@ class CommunicationAgent(BaseAgent):
                     "agent_name": agent_name,
                     "timestamp": time.time()
                 }
-                await self._publish(msg.reply, json.dumps(response).encode())
+                await self._reply(msg, response)
         
         except Exception as e:
             self.logger.error("Agent registration failed", error=str(e), traceback=traceback.format_exc())
             if msg.reply:
-                await self._publish(msg.reply, json.dumps({
+                await self._reply(msg, {
                     "error": str(e),
                     "success": False
-                }).encode())
+                })
     
     async def _handle_subscription(self, msg):
         """Handle agent subscription to topics"""
         try:
-            data = json.loads(msg.data.decode())
+            data = self._decode_message(msg)
             agent_name = data["agent_name"]
             topic = data["topic"]
             
@@ -1638,24 +1625,24 @@ class CommunicationAgent(BaseAgent):
                            topic=topic)
             
             if msg.reply:
-                await self._publish(msg.reply, json.dumps({
+                await self._reply(msg, {
                     "status": "subscribed",
                     "agent_name": agent_name,
                     "topic": topic
-                }).encode())
+                })
         
         except Exception as e:
             self.logger.error("Subscription failed", error=str(e))
             if msg.reply:
-                await self._publish(msg.reply, json.dumps({
+                await self._reply(msg, {
                     "error": str(e),
                     "success": False
-                }).encode())
+                })
     
     async def _handle_start_conversation(self, msg):
         """Handle conversation start request"""
         try:
-            data = json.loads(msg.data.decode())
+            data = self._decode_message(msg)
             participants = set(data["participants"])
             topic = data.get("topic", "general")
             metadata = data.get("metadata", {})
@@ -1681,24 +1668,24 @@ class CommunicationAgent(BaseAgent):
                            topic=topic)
             
             if msg.reply:
-                await self._publish(msg.reply, json.dumps({
+                await self._reply(msg, {
                     "status": "conversation_started",
                     "conversation_id": conv_id,
                     "participants": list(participants)
-                }).encode())
+                })
         
         except Exception as e:
             self.logger.error("Start conversation failed", error=str(e))
             if msg.reply:
-                await self._publish(msg.reply, json.dumps({
+                await self._reply(msg, {
                     "error": str(e),
                     "success": False
-                }).encode())
+                })
     
     async def _handle_add_route(self, msg):
         """Handle route addition request"""
         try:
-            data = json.loads(msg.data.decode())
+            data = self._decode_message(msg)
             route = MessageRoute(**data)
             
             # Validate route pattern
@@ -1716,23 +1703,23 @@ class CommunicationAgent(BaseAgent):
                            priority=route.priority)
             
             if msg.reply:
-                await self._publish(msg.reply, json.dumps({
+                await self._reply(msg, {
                     "status": "route_added",
                     "pattern": route.pattern
-                }).encode())
+                })
         
         except Exception as e:
             self.logger.error("Add route failed", error=str(e))
             if msg.reply:
-                await self._publish(msg.reply, json.dumps({
+                await self._reply(msg, {
                     "error": str(e),
                     "success": False
-                }).encode())
+                })
     
     async def _handle_acknowledgment(self, msg):
         """Handle message acknowledgments"""
         try:
-            data = json.loads(msg.data.decode())
+            data = self._decode_message(msg)
             original_message_id = data["original_message_id"]
             sender_agent = data["sender_agent"]
             status = data.get("status", "received")
@@ -1765,7 +1752,7 @@ class CommunicationAgent(BaseAgent):
     async def _handle_delivery_receipt(self, msg):
         """Handle detailed delivery receipts"""
         try:
-            data = json.loads(msg.data.decode())
+            data = self._decode_message(msg)
             original_message_id = data["original_message_id"]
             recipient_agent = data["recipient_agent"]
             delivery_status = data["delivery_status"]
@@ -1788,7 +1775,7 @@ class CommunicationAgent(BaseAgent):
     async def _handle_presence_update(self, msg):
         """Handle agent presence updates"""
         try:
-            data = json.loads(msg.data.decode())
+            data = self._decode_message(msg)
             agent_name = data["agent_name"]
             status = data["status"]
             
@@ -1804,11 +1791,12 @@ class CommunicationAgent(BaseAgent):
                                old_status=old_status,
                                new_status=status)
                 
-                # If agent became active, trigger message delivery
-                if status == AgentStatus.ACTIVE.value and agent_name in self.message_queue:
+                # If agent became active, deliver its queue right away
+                if status == AgentStatus.ACTIVE.value and self.delivery_engine.queue_depth(agent_name):
                     self.logger.info("Agent active, triggering message delivery",
                                    agent=agent_name,
-                                   queued_messages=len(self.message_queue[agent_name]))
+                                   queued_messages=self.delivery_engine.queue_depth(agent_name))
+                    self.delivery_engine.wake(agent_name)
             else:
                 self.logger.warning("Presence update for unknown agent",
                                   agent_name=agent_name)
@@ -1825,16 +1813,14 @@ class CommunicationAgent(BaseAgent):
                 'agent_count': len(self.agent_directory),
                 'active_agents': len([a for a, p in self.agent_presence.items()
                                     if p.get('status') == AgentStatus.ACTIVE.value]),
-                'total_queued': sum(len(q) for q in self.message_queue.values()),
+                'total_queued': self.delivery_engine.total_queued(),
+                'delivery': self.delivery_engine.get_metrics(),
                 'pending_count': len(self.pending_messages),
-                'circuit_breakers': {
-                    name: breaker['state']
-                    for name, breaker in self._circuit_breakers.items()
-                }
+                'circuit_breakers': self._circuit_breakers.get_load_metrics()
             }
             
             if msg.reply:
-                await self._publish(msg.reply, json.dumps(health_data).encode())
+                await self._reply(msg, health_data)
         
         except Exception as e:
             self.logger.error("Health check failed", error=str(e))
@@ -1845,7 +1831,7 @@ class CommunicationAgent(BaseAgent):
             diagnostics = {
                 'agent_directory': self.agent_directory,
                 'agent_presence': self.agent_presence,
-                'queue_depths': {name: len(q) for name, q in self.message_queue.items()},
+                'queue_depths': self.delivery_engine.queue_depths(),
                 'routes': [asdict(r) for r in self.message_routes[:10]],  # First 10 routes
                 'conversations': len(self.conversations),
                 'delivery_receipts': len(self.delivery_receipts),
@@ -1853,7 +1839,7 @@ class CommunicationAgent(BaseAgent):
             }
             
             if msg.reply:
-                await self._publish(msg.reply, json.dumps(diagnostics).encode())
+                await self._reply(msg, diagnostics)
         
         except Exception as e:
             self.logger.error("Diagnostics failed", error=str(e))
@@ -1927,7 +1913,7 @@ class CommunicationAgent(BaseAgent):
     def _security_filter(self, message: Message, payload: Dict) -> bool:
         """Security validation filter"""
         # Check for suspicious patterns
-        payload_str = json.dumps(payload)
+        payload_str = serialize(payload).decode('utf-8')
         
         suspicious_patterns = [
             r'<script',
@@ -1973,7 +1959,8 @@ class CommunicationAgent(BaseAgent):
         base_metrics = super()._get_agent_metrics()
         base_metrics.update({
             **self.communication_metrics,
-            "queued_messages_count": sum(len(q) for q in self.message_queue.values()),
+            "queued_messages_count": self.delivery_engine.total_queued(),
+            "delivery": self.delivery_engine.get_metrics(),
             "pending_messages_count": len(self.pending_messages),
             "pending_acks_count": len([mid for mid, rec in self.delivery_receipts.items()
                                      if rec.get("status") == "pending_ack"]),
@@ -1982,6 +1969,7 @@ class CommunicationAgent(BaseAgent):
                                 if p.get('status') == AgentStatus.ACTIVE.value]),
             "routes_count": len(self.message_routes),
             "active_conversations": len(self.conversations),
+            "message_history": self.history_writer.get_metrics(),
             "health_status": self._health_status['status']
         })
         return base_metrics
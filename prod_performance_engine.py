@@ -12,7 +12,6 @@ from typing import Dict, List, Optional, Any, Tuple, Callable
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 import uuid
-import statistics
 from collections import deque, defaultdict
 from datetime import datetime, timedelta
 import traceback
@@ -29,6 +28,7 @@ except ImportError:
     HAS_OBSERVABILITY = False
 
 from base_agent import BaseAgent, AgentConfig, TaskRequest, Priority, AgentState
+from streaming_anomaly import ColumnarBuffer, StreamingAnomaly, StreamingDetectorBank, strongest_per_series
 
 # ============================================================================
 # ENUMS
@@ -216,6 +216,20 @@ class AnomalyDetection:
             "description": self.description
         }
 
+# Numeric snapshot fields, stored column-wise
+SNAPSHOT_COLUMNS = (
+    "cpu_percent", "memory_percent", "disk_read_mb", "disk_write_mb", "network_sent_mb",
+    "network_recv_mb", "active_connections", "thread_count", "response_time_ms", "error_rate"
+)
+
+# Metrics watched for anomalies and the snapshot column each is read from
+ANOMALY_METRICS = {
+    PerformanceMetric.CPU_USAGE: "cpu_percent",
+    PerformanceMetric.MEMORY_USAGE: "memory_percent",
+    PerformanceMetric.RESPONSE_TIME: "response_time_ms",
+    PerformanceMetric.ERROR_RATE: "error_rate"
+}
+
 # ============================================================================
 # PERFORMANCE ENGINE
 # ============================================================================
@@ -243,7 +257,7 @@ class PerformanceEngine(BaseAgent):
         self.metrics_history: Dict[str, deque] = defaultdict(
             lambda: deque(maxlen=10000)
         )
-        self.snapshots: deque = deque(maxlen=5000)
+        self.snapshots = ColumnarBuffer(SNAPSHOT_COLUMNS, capacity=5000)
         self.performance_baselines: Dict[str, Dict] = {}
         
         # Alerting system
@@ -275,7 +289,7 @@ class PerformanceEngine(BaseAgent):
         self.applied_optimizations: Dict[str, Dict] = {}
         
         # Anomaly detection
-        self.anomaly_detectors: Dict[str, 'AnomalyDetector'] = {}
+        self.anomaly_detectors: Optional[StreamingDetectorBank] = None
         self.detected_anomalies: deque = deque(maxlen=1000)
         
         # Statistics with rolling averages
@@ -383,18 +397,14 @@ class PerformanceEngine(BaseAgent):
             return False
     
     def _init_anomaly_detectors(self):
-        """Initialize anomaly detectors for each metric"""
-        for metric in [
-            PerformanceMetric.CPU_USAGE,
-            PerformanceMetric.MEMORY_USAGE,
-            PerformanceMetric.RESPONSE_TIME,
-            PerformanceMetric.ERROR_RATE
-        ]:
-            self.anomaly_detectors[metric.value] = AnomalyDetector(
-                metric=metric,
-                window_size=100,
-                sensitivity=2.5
-            )
+        """Initialize streaming anomaly detectors for each metric"""
+        self.anomaly_detectors = StreamingDetectorBank(
+            series=[metric.value for metric in ANOMALY_METRICS],
+            z_threshold=2.5,
+            mad_window=100,
+            season_period=86400,  # hour-of-day baseline
+            season_buckets=24
+        )
     
     async def _setup_subscriptions(self):
         """Setup NATS subscriptions"""
@@ -424,7 +434,6 @@ class PerformanceEngine(BaseAgent):
             ("alert_processor", self._alert_processor()),
             ("optimization_engine", self._optimization_engine()),
             ("baseline_calculator", self._baseline_calculator()),
-            ("anomaly_detector", self._anomaly_detection_loop()),
             ("metrics_aggregator", self._metrics_aggregator()),
             ("auto_remediation", self._auto_remediation_loop()),
             ("health_reporter", self._health_reporter())
@@ -447,7 +456,10 @@ class PerformanceEngine(BaseAgent):
                     snapshot = await self._collect_performance_snapshot()
                     
                     if snapshot.is_valid():
-                        self.snapshots.append(snapshot)
+                        self.snapshots.append_record(snapshot)
+                        
+                        # Score the new sample as soon as it arrives
+                        await self._detect_anomalies(snapshot)
                         
                         # Update metrics history
                         await self._update_metrics_history(snapshot)
@@ -463,7 +475,7 @@ class PerformanceEngine(BaseAgent):
                             self._update_prometheus(snapshot)
                         
                         # Persist periodically
-                        if len(self.snapshots) % 12 == 0:  # Every minute
+                        if self.snapshots.total % 12 == 0:  # Every minute
                             await self._persist_metrics()
                         
                         self.performance_stats["monitoring_cycles"] += 1
@@ -550,71 +562,58 @@ class PerformanceEngine(BaseAgent):
                 active_connections=0, thread_count=0
             )
     
-    async def _anomaly_detection_loop(self):
-        """Anomaly detection loop"""
-        self.logger.info("Starting anomaly detection")
+    async def _detect_anomalies(self, snapshot: PerformanceSnapshot):
+        """Run the streaming detectors on one snapshot"""
+        if self.anomaly_detectors is None:
+            return
         
-        while self.state == AgentState.RUNNING and not self.shutdown_event.is_set():
-            try:
-                if len(self.snapshots) < 100:
-                    await asyncio.sleep(30)
-                    continue
-                
-                # Get recent snapshots
-                recent = list(self.snapshots)[-100:]
+        try:
+            values = [getattr(snapshot, column) for column in ANOMALY_METRICS.values()]
+            findings = self.anomaly_detectors.update(values, snapshot.timestamp)
+            
+            for metric_name, series_findings in strongest_per_series(findings).items():
+                anomaly = self._to_anomaly_detection(metric_name, series_findings)
+                self.detected_anomalies.append(anomaly)
+                self.performance_stats["anomalies_detected"] += 1
                 
-                # Check each metric for anomalies
-                for metric_name, detector in self.anomaly_detectors.items():
-                    values = self._extract_metric_values(recent, metric_name)
-                    
-                    if values:
-                        anomaly = detector.detect(values[-1], values[:-1])
-                        
-                        if anomaly:
-                            self.detected_anomalies.append(anomaly)
-                            self.performance_stats["anomalies_detected"] += 1
-                            
-                            # Update Prometheus
-                            if HAS_OBSERVABILITY:
-                                self.prom_anomalies.labels(
-                                    type=anomaly.anomaly_type.value
-                                ).inc()
-                            
-                            # Generate alert if severe
-                            if anomaly.severity > 0.7:
-                                await self._create_anomaly_alert(anomaly)
-                            
-                            self.logger.warning(
-                                "Anomaly detected",
-                                metric=metric_name,
-                                type=anomaly.anomaly_type.value,
-                                severity=anomaly.severity
-                            )
+                # Update Prometheus
+                if HAS_OBSERVABILITY:
+                    self.prom_anomalies.labels(
+                        type=anomaly.anomaly_type.value
+                    ).inc()
                 
-                await asyncio.sleep(30)  # Check every 30 seconds
+                # Generate alert if severe
+                if anomaly.severity > 0.7:
+                    await self._create_anomaly_alert(anomaly)
                 
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                self.logger.error(f"Anomaly detection error: {e}", exc_info=True)
-                await asyncio.sleep(60)
-        
-        self.logger.info("Anomaly detection stopped")
-    
-    def _extract_metric_values(self, snapshots: List[PerformanceSnapshot], metric_name: str) -> List[float]:
-        """Extract metric values from snapshots"""
-        metric_map = {
-            "cpu_usage": lambda s: s.cpu_percent,
-            "memory_usage": lambda s: s.memory_percent,
-            "response_time": lambda s: s.response_time_ms,
-            "error_rate": lambda s: s.error_rate
-        }
-        
-        extractor = metric_map.get(metric_name)
-        if not extractor:
-            return []
+                self.logger.warning(
+                    "Anomaly detected",
+                    metric=metric_name,
+                    type=anomaly.anomaly_type.value,
+                    severity=anomaly.severity,
+                    detectors=[f.detector for f in series_findings]
+                )
         
-        return [extractor(s) for s in snapshots]
+        except Exception as e:
+            self.logger.error(f"Anomaly detection error: {e}", exc_info=True)
+    
+    def _to_anomaly_detection(self, metric_name: str, findings: List[StreamingAnomaly]) -> AnomalyDetection:
+        """Report the strongest detector; the others that agreed go in the description"""
+        strongest = findings[0]
+        low, high = strongest.expected_range
+        return AnomalyDetection(
+            timestamp=strongest.timestamp,
+            metric=PerformanceMetric(metric_name),
+            anomaly_type=AnomalyType(strongest.anomaly_type),
+            severity=strongest.severity,
+            expected_range=(low, high),
+            actual_value=strongest.value,
+            description=(
+                f"{metric_name} {strongest.anomaly_type}: {strongest.value:.2f} "
+                f"(expected: {strongest.expected:.2f}±{strongest.threshold * strongest.spread:.2f}; "
+                f"detectors: {', '.join(f.detector for f in findings)})"
+            )
+        )
     
     async def _auto_remediation_loop(self):
         """Auto-remediation loop"""
@@ -821,60 +820,6 @@ class PerformanceEngine(BaseAgent):
         self.logger.info("PerformanceEngine stopped")
 
 
-# ============================================================================
-# ANOMALY DETECTOR
-# ============================================================================
-
-class AnomalyDetector:
-    """Statistical anomaly detector"""
-    
-    def __init__(self, metric: PerformanceMetric, window_size: int = 100, sensitivity: float = 2.5):
-        self.metric = metric
-        self.window_size = window_size
-        self.sensitivity = sensitivity
-        self.history: deque = deque(maxlen=window_size)
-    
-    def detect(self, current_value: float, historical_values: List[float]) -> Optional[AnomalyDetection]:
-        """Detect anomalies using statistical methods"""
-        if len(historical_values) < 30:
-            return None
-        
-        # Calculate statistics
-        mean = statistics.mean(historical_values)
-        stdev = statistics.stdev(historical_values)
-        
-        if stdev == 0:
-            return None
-        
-        # Z-score
-        z_score = abs((current_value - mean) / stdev)
-        
-        if z_score > self.sensitivity:
-            # Determine anomaly type
-            if current_value > mean + (self.sensitivity * stdev):
-                anomaly_type = AnomalyType.SPIKE
-            else:
-                anomaly_type = AnomalyType.DROP
-            
-            # Calculate severity (0.0 to 1.0)
-            severity = min(1.0, z_score / (self.sensitivity * 2))
-            
-            return AnomalyDetection(
-                timestamp=time.time(),
-                metric=self.metric,
-                anomaly_type=anomaly_type,
-                severity=severity,
-                expected_range=(
-                    mean - (self.sensitivity * stdev),
-                    mean + (self.sensitivity * stdev)
-                ),
-                actual_value=current_value,
-                description=f"{self.metric.value} {anomaly_type.value}: {current_value:.2f} (expected: {mean:.2f}±{stdev:.2f})"
-            )
-        
-        return None
-
-
 # ============================================================================
 # MAIN
 # ============================================================================
@@ -882,23 +882,30 @@ async def get_project_logs(
     limit: int = 100,
     offset: int = 0,
     event_type: Optional[str] = None,
+    cursor: Optional[str] = None,
     user = Depends(get_current_user)
 ):
-    """Get project logs"""
-    logs = await log_manager.get_project_logs(
-        project_id=project_id,
-        limit=limit,
-        offset=offset,
-        event_type=event_type
-    )
+    """Get project logs; pass pagination.next_cursor back as cursor for the next page"""
+    try:
+        page = await log_manager.get_project_logs_page(
+            project_id=project_id,
+            limit=limit,
+            cursor=cursor,
+            event_type=event_type,
+            offset=offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
+    logs = page["logs"]
     return {
         "success": True,
         "logs": logs,
         "pagination": {
             "limit": limit,
             "offset": offset,
-            "total": len(logs)
+            "total": len(logs),
+            "next_cursor": page["next_cursor"]
         }
     }
 
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+RAG Benchmark
+Compares per-document, on-loop embedding (the previous LLMAgent behaviour)
+with the micro-batched EmbeddingService: documents/sec indexed, queries/sec
+and the longest event-loop stall observed while each runs
+
+The hashing encoder has no model cost of its own, so by default each encode
+call is charged a simulated forward pass (--forward-ms plus --per-item-ms per
+text, GIL released like a torch model). Pass --forward-ms 0 --per-item-ms 0 for
+raw numbers, or --model to benchmark a real sentence-transformers model.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from embedding_service import EmbeddingService, HashingEncoder, InMemoryVectorIndex
+
+_VOCABULARY = [
+    "agent", "latency", "queue", "vector", "index", "model", "token", "cache", "stream",
+    "batch", "retry", "cluster", "deploy", "metric", "alert", "schema", "policy", "route",
+    "memory", "search", "document", "session", "limit", "worker", "event", "task"
+]
+
+
+def _make_corpus(count: int, words: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_VOCABULARY) for _ in range(words)) for _ in range(count)]
+
+
+class SimulatedLatencyEncoder:
+    """Adds the fixed and per-item cost of a model forward pass to an encoder"""
+
+    def __init__(self, encoder: Any, forward_ms: float, per_item_ms: float):
+        self.encoder = encoder
+        self.forward_ms = forward_ms
+        self.per_item_ms = per_item_ms
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.encoder.get_sentence_embedding_dimension()
+
+    def encode(self, sentences, **kwargs):
+        time.sleep((self.forward_ms + self.per_item_ms * len(sentences)) / 1000)
+        return self.encoder.encode(sentences, **kwargs)
+
+
+def _load_encoder(model: str, dimensions: int, forward_ms: float, per_item_ms: float) -> Any:
+    if model == "hashing":
+        encoder = HashingEncoder(dimensions)
+        if forward_ms or per_item_ms:
+            encoder = SimulatedLatencyEncoder(encoder, forward_ms, per_item_ms)
+        return encoder
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model)
+
+
+class LoopLagMonitor:
+    """Measures how long the event loop is blocked between ticks"""
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.max_lag_ms = 0.0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = (time.perf_counter() - start - self.interval) * 1000
+            self.max_lag_ms = max(self.max_lag_ms, lag)
+
+    def __enter__(self):
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+async def benchmark_sequential(encoder: Any, corpus: List[str], queries: List[str],
+                               concurrency: int) -> Dict[str, Any]:
+    """One encode per document/query, synchronously on the loop"""
+    index = InMemoryVectorIndex()
+    await index.ensure_collection("bench", encoder.get_sentence_embedding_dimension())
+
+    with LoopLagMonitor() as monitor:
+        start = time.perf_counter()
+        for i, text in enumerate(corpus):
+            vector = encoder.encode([text])[0]
+            await index.upsert("bench", [f"doc-{i}"], [vector], [{"id": f"doc-{i}", "content": text}])
+        index_time = time.perf_counter() - start
+
+        async def query(text):
+            vector = encoder.encode([text])[0]
+            return await index.search("bench", vector, 3)
+
+        start = time.perf_counter()
+        for offset in range(0, len(queries), concurrency):
+            await asyncio.gather(*[query(q) for q in queries[offset:offset + concurrency]])
+        query_time = time.perf_counter() - start
+
+    return {
+        "mode": "sequential",
+        "docs_per_second": len(corpus) / index_time,
+        "queries_per_second": len(queries) / query_time,
+        "max_loop_stall_ms": monitor.max_lag_ms
+    }
+
+
+async def benchmark_batched(encoder: Any, corpus: List[str], queries: List[str],
+                            concurrency: int, batch_size: int) -> Dict[str, Any]:
+    """Bulk indexing and concurrent queries through the embedding service"""
+    service = EmbeddingService(encoder, max_batch_size=batch_size)
+    index = InMemoryVectorIndex()
+    await index.ensure_collection("bench", service.dimensions)
+
+    with LoopLagMonitor() as monitor:
+        start = time.perf_counter()
+        for offset in range(0, len(corpus), batch_size):
+            chunk = corpus[offset:offset + batch_size]
+            ids = [f"doc-{offset + i}" for i in range(len(chunk))]
+            vectors = await service.embed_many(chunk)
+            await index.upsert("bench", ids, vectors, [{"id": i, "content": t} for i, t in zip(ids, chunk)])
+        index_time = time.perf_counter() - start
+
+        async def query(text):
+            return await index.search("bench", await service.embed(text), 3)
+
+        start = time.perf_counter()
+        for offset in range(0, len(queries), concurrency):
+            await asyncio.gather(*[query(q) for q in queries[offset:offset + concurrency]])
+        query_time = time.perf_counter() - start
+
+    stats = service.get_stats()
+    await service.close()
+    return {
+        "mode": "batched",
+        "docs_per_second": len(corpus) / index_time,
+        "queries_per_second": len(queries) / query_time,
+        "max_loop_stall_ms": monitor.max_lag_ms,
+        "avg_batch_size": stats["avg_batch_size"],
+        "cache_hit_rate": stats["cache_hit_rate"]
+    }
+
+
+async def main():
+    """Run the RAG benchmark"""
+    parser = argparse.ArgumentParser(description="RAG indexing and query benchmark")
+    parser.add_argument("--model", default="hashing", help="'hashing' or a sentence-transformers model name")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--forward-ms", type=float, default=5.0)
+    parser.add_argument("--per-item-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    encoder = _load_encoder(args.model, args.dimensions, args.forward_ms, args.per_item_ms)
+    corpus = _make_corpus(args.docs, args.words)
+    # Half the queries repeat, as popular questions do in practice
+    unique_queries = _make_corpus(args.queries // 2, 8, seed=11)
+    queries = unique_queries + random.Random(3).choices(unique_queries, k=args.queries - len(unique_queries))
+
+    print("Starting RAG benchmark...")
+    results = [
+        await benchmark_sequential(encoder, corpus, queries, args.concurrency),
+        await benchmark_batched(encoder, corpus, queries, args.concurrency, args.batch_size)
+    ]
+    for result in results:
+        print(f"Mode: {result['mode']}")
+        print(f"  Indexing: {result['docs_per_second']:.0f} docs/s")
+        print(f"  Queries: {result['queries_per_second']:.0f} queries/s")
+        print(f"  Max event loop stall: {result['max_loop_stall_ms']:.1f}ms")
+
+    with open("rag_benchmark.json", "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,583 @@
+"""
+Reliable Redis Task Queue
+=========================
+Queue engine behind the auth service's TaskQueue.
+
+Layout (all keys share a prefix):
+- ``task:<id>``      hash with the task body (type, payload, priority, attempts, ...)
+- ``ready:<type>``   sorted set of due task ids, ordered by priority then enqueue time
+- ``delayed``        sorted set of task ids by due time (scheduled tasks and retries)
+- ``inflight``       sorted set of claimed task ids by visibility deadline
+- ``types``          set of task types seen, used for stats
+
+Claims run in one Lua script that promotes due delayed tasks and pops up to
+``batch`` ready tasks, respecting per-type limits, into ``inflight``. Tasks whose
+visibility deadline passes (crashed or stuck worker) are moved back to
+``delayed`` by ``reclaim_expired``; a task claimed ``max_attempts`` times goes
+to the dead letter set. The task's ``attempts`` counter doubles as a fencing
+token: acks, failures and lease extensions only apply while it still matches
+the claim the caller holds, so a worker whose lease was reclaimed (and possibly
+re-claimed by another worker) can neither complete, fail nor extend the task.
+
+The scripts touch keys derived from task ids, so the queue needs a single
+Redis instance (or all keys in one hash slot via a ``{...}`` prefix).
+"""
+
+import asyncio
+import json
+import logging
+import secrets
+import socket
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from redis.exceptions import WatchError
+
+# Priority dominates the ready score; enqueue time (ms) orders within a priority
+_PRIORITY_WEIGHT = 10 ** 13
+
+_CLAIM_SCRIPT = """
+local now = tonumber(ARGV[1])
+local deadline = tonumber(ARGV[2])
+local batch = tonumber(ARGV[3])
+local task_prefix = ARGV[4]
+local ready_prefix = ARGV[5]
+
+-- Promote due delayed tasks to their ready sets
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, 1000)
+for _, id in ipairs(due) do
+    local info = redis.call('HMGET', task_prefix .. id, 'type', 'score')
+    if info[1] then
+        redis.call('ZADD', ready_prefix .. info[1], info[2], id)
+    end
+    redis.call('ZREM', KEYS[1], id)
+end
+
+-- Gather candidates from each type within its free slots, best score first
+local candidates = {}
+for i = 3, #KEYS do
+    local cap = math.min(tonumber(ARGV[3 + i]), batch)
+    if cap > 0 then
+        local items = redis.call('ZRANGE', KEYS[i], 0, cap - 1, 'WITHSCORES')
+        for j = 1, #items, 2 do
+            table.insert(candidates, {KEYS[i], items[j], tonumber(items[j + 1])})
+        end
+    end
+end
+table.sort(candidates, function(a, b) return a[3] < b[3] end)
+
+local claimed = {}
+for i = 1, math.min(batch, #candidates) do
+    local key, id = candidates[i][1], candidates[i][2]
+    redis.call('ZREM', key, id)
+    local task_key = task_prefix .. id
+    if redis.call('EXISTS', task_key) == 1 then
+        redis.call('ZADD', KEYS[2], deadline, id)
+        local attempts = redis.call('HINCRBY', task_key, 'attempts', 1)
+        local body = redis.call('HMGET', task_key, 'type', 'payload', 'priority', 'created_at', 'max_attempts')
+        table.insert(claimed, {id, body[1], body[2], body[3], attempts, body[4], body[5]})
+    end
+end
+return claimed
+"""
+
+# Fencing check shared by ack, fail and extend: the lease is held while the task
+# is in flight and its attempts counter still equals the one seen at claim time
+_LEASE_LUA = """
+local function holds_lease(inflight_key, task_key, id, attempts)
+    return redis.call('ZSCORE', inflight_key, id) and redis.call('HGET', task_key, 'attempts') == attempts
+end
+"""
+
+_ACK_SCRIPT = _LEASE_LUA + """
+if not holds_lease(KEYS[1], KEYS[2], ARGV[1], ARGV[5]) then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('DEL', KEYS[2])
+if tonumber(ARGV[4]) > 0 then
+    redis.call('ZADD', KEYS[3], ARGV[3], ARGV[2])
+    redis.call('ZREMRANGEBYRANK', KEYS[3], 0, -tonumber(ARGV[4]) - 1)
+end
+return 1
+"""
+
+# Shared by failures and reclaims: retry later or dead-letter the task
+_DEAD_LETTER_LUA = """
+local function dead_letter(task_key, dlq_key, id, now, error, ttl)
+    local body = redis.call('HMGET', task_key, 'type', 'payload', 'priority', 'attempts', 'created_at')
+    local record = cjson.encode({
+        id = id, type = body[1], payload = cjson.decode(body[2]),
+        priority = tonumber(body[3]), attempts = tonumber(body[4]),
+        created_at = body[5], status = 'dead_letter', error = error,
+        moved_to_dlq_at = now / 1000
+    })
+    redis.call('ZADD', dlq_key, now / 1000, record)
+    redis.call('EXPIRE', dlq_key, ttl)
+    redis.call('DEL', task_key)
+end
+"""
+
+_FAIL_SCRIPT = _LEASE_LUA + _DEAD_LETTER_LUA + """
+if not holds_lease(KEYS[1], KEYS[2], ARGV[1], ARGV[6]) then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+local now = tonumber(ARGV[2])
+local attempts = tonumber(redis.call('HGET', KEYS[2], 'attempts') or '0')
+local max_attempts = tonumber(redis.call('HGET', KEYS[2], 'max_attempts') or '1')
+if attempts >= max_attempts then
+    dead_letter(KEYS[2], KEYS[4], ARGV[1], now, ARGV[4], tonumber(ARGV[5]))
+    return 2
+end
+redis.call('HSET', KEYS[2], 'last_error', ARGV[4])
+redis.call('ZADD', KEYS[3], now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+_EXTEND_SCRIPT = _LEASE_LUA + """
+local lost = {}
+for i = 3, #ARGV, 2 do
+    local id = ARGV[i]
+    if holds_lease(KEYS[1], ARGV[2] .. id, id, ARGV[i + 1]) then
+        redis.call('ZADD', KEYS[1], 'XX', ARGV[1], id)
+    else
+        table.insert(lost, (i - 1) / 2)
+    end
+end
+return lost
+"""
+
+_RECLAIM_SCRIPT = _DEAD_LETTER_LUA + """
+local now = tonumber(ARGV[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, tonumber(ARGV[2]))
+local dead = 0
+for _, id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], id)
+    local task_key = ARGV[3] .. id
+    local attempts = tonumber(redis.call('HGET', task_key, 'attempts') or '0')
+    local max_attempts = tonumber(redis.call('HGET', task_key, 'max_attempts') or '1')
+    if redis.call('EXISTS', task_key) == 0 then
+        -- Body already gone; nothing to retry
+    elseif attempts >= max_attempts then
+        dead_letter(task_key, KEYS[3], id, now, 'visibility timeout exceeded', tonumber(ARGV[4]))
+        dead = dead + 1
+    else
+        redis.call('HSET', task_key, 'last_error', 'visibility timeout exceeded')
+        redis.call('ZADD', KEYS[2], now, id)
+    end
+end
+return {#expired, dead}
+"""
+
+_DEAD_LETTER_READY_SCRIPT = _DEAD_LETTER_LUA + """
+local ids = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    local task_key = ARGV[2] .. id
+    if redis.call('EXISTS', task_key) == 1 then
+        dead_letter(task_key, KEYS[2], id, tonumber(ARGV[3]), ARGV[4], tonumber(ARGV[5]))
+    end
+end
+return #ids
+"""
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+@dataclass
+class ClaimedTask:
+    """A task leased to this worker until ``deadline_ms``"""
+    id: str
+    type: str
+    payload: Dict[str, Any]
+    priority: int
+    attempts: int
+    max_attempts: int
+    created_at: str
+    deadline_ms: int
+
+
+class RedisTaskQueue:
+    """Ready/delayed/in-flight task queue with atomic claims"""
+
+    def __init__(
+        self,
+        redis: Any,
+        prefix: str = "tq:",
+        visibility_timeout: float = 30.0,
+        max_attempts: int = 3,
+        retry_base_delay: float = 2.0,
+        dead_letter_key: Optional[str] = None,
+        dead_letter_ttl: int = 7 * 86400,
+        completed_key: Optional[str] = None,
+        completed_history: int = 1000
+    ):
+        self.redis = redis
+        self.prefix = prefix
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.dead_letter_key = dead_letter_key or f"{prefix}dlq"
+        self.dead_letter_ttl = dead_letter_ttl
+        self.completed_key = completed_key or f"{prefix}completed"
+        self.completed_history = completed_history
+
+        self.task_prefix = f"{prefix}task:"
+        self.ready_prefix = f"{prefix}ready:"
+        self.delayed_key = f"{prefix}delayed"
+        self.inflight_key = f"{prefix}inflight"
+        self.types_key = f"{prefix}types"
+        self.wakeup_key = f"{prefix}wakeup"
+
+        self._claim = redis.register_script(_CLAIM_SCRIPT)
+        self._ack = redis.register_script(_ACK_SCRIPT)
+        self._fail = redis.register_script(_FAIL_SCRIPT)
+        self._extend = redis.register_script(_EXTEND_SCRIPT)
+        self._reclaim = redis.register_script(_RECLAIM_SCRIPT)
+        self._dead_letter_ready = redis.register_script(_DEAD_LETTER_READY_SCRIPT)
+
+    # ------------------------------------------------------------------
+    # Producers
+    # ------------------------------------------------------------------
+
+    def _add_to_pipeline(self, pipe: Any, task_type: str, payload: Dict[str, Any], priority: int,
+                         delay_seconds: float, max_attempts: Optional[int]) -> str:
+        task_id = secrets.token_urlsafe(16)
+        now = _now_ms()
+        score = priority * _PRIORITY_WEIGHT + now
+        pipe.hset(self.task_prefix + task_id, mapping={
+            "type": task_type,
+            "payload": json.dumps(payload),
+            "priority": priority,
+            "score": score,
+            "attempts": 0,
+            "max_attempts": max_attempts or self.max_attempts,
+            "created_at": datetime.utcnow().isoformat()
+        })
+        if delay_seconds > 0:
+            pipe.zadd(self.delayed_key, {task_id: now + int(delay_seconds * 1000)})
+        else:
+            pipe.zadd(self.ready_prefix + task_type, {task_id: score})
+        pipe.sadd(self.types_key, task_type)
+        return task_id
+
+    def _signal(self, pipe: Any, count: int):
+        # Wake idle workers; the list is capped so bursts don't pile up tokens
+        pipe.rpush(self.wakeup_key, *([1] * min(count, 64)))
+        pipe.ltrim(self.wakeup_key, -64, -1)
+
+    async def enqueue(self, task_type: str, payload: Dict[str, Any], priority: int = 5,
+                      delay_seconds: float = 0, max_attempts: Optional[int] = None) -> str:
+        """Add a task; ``priority`` follows TaskPriority (lower runs first)"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            task_id = self._add_to_pipeline(pipe, task_type, payload, int(priority), delay_seconds, max_attempts)
+            self._signal(pipe, 1)
+            await pipe.execute()
+        return task_id
+
+    def _add_task_to_pipeline(self, pipe: Any, task: Dict[str, Any]) -> str:
+        return self._add_to_pipeline(
+            pipe, task["type"], task.get("payload", {}), int(task.get("priority", 5)),
+            task.get("delay_seconds", 0), task.get("max_attempts")
+        )
+
+    async def enqueue_many(self, tasks: List[Dict[str, Any]]) -> List[str]:
+        """Add tasks given as dicts with type, payload and optional priority/delay_seconds"""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            task_ids = [self._add_task_to_pipeline(pipe, task) for task in tasks]
+            self._signal(pipe, len(tasks))
+            await pipe.execute()
+        return task_ids
+
+    async def import_sorted_set(self, source_key: str, convert: Callable[[Any], Dict[str, Any]],
+                                batch_size: int = 100) -> int:
+        """
+        Move the members of another sorted set into the queue, ``convert`` turning
+        each member into an ``enqueue_many`` task dict. Each batch is removed from
+        the source in the same transaction that enqueues it (WATCHed, so
+        concurrent importers never duplicate a task); returns the number moved.
+        """
+        moved = 0
+        while True:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(source_key)
+                    members = await pipe.zrange(source_key, 0, batch_size - 1)
+                    if not members:
+                        return moved
+                    pipe.multi()
+                    for member in members:
+                        self._add_task_to_pipeline(pipe, convert(member))
+                    pipe.zrem(source_key, *members)
+                    self._signal(pipe, len(members))
+                    await pipe.execute()
+                except WatchError:
+                    continue
+            moved += len(members)
+
+    # ------------------------------------------------------------------
+    # Consumers
+    # ------------------------------------------------------------------
+
+    async def claim(self, capacity: Dict[str, int], batch_size: int = 10) -> List[ClaimedTask]:
+        """Lease up to ``batch_size`` ready tasks, at most ``capacity[type]`` per type"""
+        types = [t for t, free in capacity.items() if free > 0]
+        if not types or batch_size <= 0:
+            return []
+        now = _now_ms()
+        deadline = now + int(self.visibility_timeout * 1000)
+        rows = await self._claim(
+            keys=[self.delayed_key, self.inflight_key] + [self.ready_prefix + t for t in types],
+            args=[now, deadline, batch_size, self.task_prefix, self.ready_prefix]
+            + [capacity[t] for t in types]
+        )
+        claimed = []
+        for task_id, task_type, payload, priority, attempts, created_at, max_attempts in rows:
+            claimed.append(ClaimedTask(
+                id=_text(task_id),
+                type=_text(task_type),
+                payload=json.loads(payload),
+                priority=int(priority),
+                attempts=int(attempts),
+                max_attempts=int(max_attempts),
+                created_at=_text(created_at),
+                deadline_ms=deadline
+            ))
+        return claimed
+
+    async def ack(self, task: ClaimedTask) -> bool:
+        """Complete a task; False if the lease was lost (task was reclaimed)"""
+        record = json.dumps({
+            "id": task.id,
+            "type": task.type,
+            "payload": task.payload,
+            "priority": task.priority,
+            "attempts": task.attempts,
+            "created_at": task.created_at,
+            "status": "completed",
+            "completed_at": datetime.utcnow().isoformat()
+        })
+        return bool(await self._ack(
+            keys=[self.inflight_key, self.task_prefix + task.id, self.completed_key],
+            args=[task.id, record, time.time(), self.completed_history, task.attempts]
+        ))
+
+    async def fail(self, task: ClaimedTask, error: str, retry_delay: Optional[float] = None) -> str:
+        """Schedule a retry with exponential backoff, or dead-letter the task"""
+        if retry_delay is None:
+            retry_delay = self.retry_base_delay ** task.attempts
+        result = await self._fail(
+            keys=[self.inflight_key, self.task_prefix + task.id, self.delayed_key, self.dead_letter_key],
+            args=[task.id, _now_ms(), int(retry_delay * 1000), error, self.dead_letter_ttl, task.attempts]
+        )
+        return {0: "lease_lost", 1: "retrying", 2: "dead_letter"}[int(result)]
+
+    async def extend(self, tasks: List[ClaimedTask]) -> List[ClaimedTask]:
+        """Push the visibility deadline of running tasks forward; returns the tasks whose lease was lost"""
+        if not tasks:
+            return []
+        deadline = _now_ms() + int(self.visibility_timeout * 1000)
+        args: List[Any] = [deadline, self.task_prefix]
+        for task in tasks:
+            args += [task.id, task.attempts]
+        # 1-based positions in ``tasks``
+        lost_positions = {int(position) for position in await self._extend(keys=[self.inflight_key], args=args)}
+        lost = []
+        for position, task in enumerate(tasks, 1):
+            if position in lost_positions:
+                lost.append(task)
+            else:
+                task.deadline_ms = deadline
+        return lost
+
+    async def reclaim_expired(self, limit: int = 1000) -> Dict[str, int]:
+        """Requeue tasks whose workers stopped renewing their lease"""
+        expired, dead = await self._reclaim(
+            keys=[self.inflight_key, self.delayed_key, self.dead_letter_key],
+            args=[_now_ms(), limit, self.task_prefix, self.dead_letter_ttl]
+        )
+        return {"reclaimed": int(expired) - int(dead), "dead_letter": int(dead)}
+
+    async def dead_letter_ready(self, task_type: str, error: str, limit: int = 1000) -> int:
+        """Move up to ``limit`` ready tasks of one type straight to the dead letter set"""
+        return int(await self._dead_letter_ready(
+            keys=[self.ready_prefix + task_type, self.dead_letter_key],
+            args=[limit, self.task_prefix, _now_ms(), error, self.dead_letter_ttl]
+        ))
+
+    async def wait_for_work(self, timeout: float):
+        """Block until a producer signals new work or ``timeout`` elapses"""
+        await self.redis.blpop([self.wakeup_key], timeout=timeout)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        types = sorted(_text(t) for t in await self.redis.smembers(self.types_key))
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for task_type in types:
+                pipe.zcard(self.ready_prefix + task_type)
+            pipe.zcard(self.delayed_key)
+            pipe.zcard(self.inflight_key)
+            pipe.zcard(self.dead_letter_key)
+            pipe.zcard(self.completed_key)
+            counts = await pipe.execute()
+        ready_by_type = dict(zip(types, counts[:len(types)]))
+        delayed, inflight, dead_letter, completed = counts[len(types):]
+        return {
+            "ready": sum(ready_by_type.values()),
+            "ready_by_type": ready_by_type,
+            "delayed": delayed,
+            "in_flight": inflight,
+            "dead_letter": dead_letter,
+            "completed": completed
+        }
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class QueueWorker:
+    """
+    Runs handlers for claimed tasks with per-type concurrency limits
+    Several workers (in one or many processes) can share a queue; each renews
+    the leases of the tasks it is running and reclaims expired leases.
+    Ready tasks of a type no handler is registered for are dead-lettered; pass
+    ``dead_letter_unhandled=False`` when workers with different handler sets
+    share a queue, and they are only counted and logged.
+    """
+
+    def __init__(
+        self,
+        queue: RedisTaskQueue,
+        handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]],
+        concurrency: Optional[Dict[str, int]] = None,
+        default_concurrency: int = 10,
+        batch_size: int = 10,
+        poll_interval: float = 0.2,
+        worker_id: Optional[str] = None,
+        dead_letter_unhandled: bool = True,
+        logger: Optional[logging.Logger] = None
+    ):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency or {}
+        self.default_concurrency = default_concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}-{secrets.token_hex(4)}"
+        self.dead_letter_unhandled = dead_letter_unhandled
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._active: Dict[str, int] = defaultdict(int)
+        self._running_tasks: Dict[str, ClaimedTask] = {}
+        self._executions: set = set()
+        self._slot_freed = asyncio.Event()
+        self._stopping = False
+
+        self.stats = {"completed": 0, "failed": 0, "dead_letter": 0, "lease_lost": 0, "reclaimed": 0,
+                      "unhandled": 0, "unhandled_waiting": 0}
+
+    def _capacity(self) -> Dict[str, int]:
+        return {
+            task_type: self.concurrency.get(task_type, self.default_concurrency) - self._active[task_type]
+            for task_type in self.handlers
+        }
+
+    async def run(self):
+        """Claim and execute tasks until ``stop`` is called"""
+        self._stopping = False
+        maintenance = asyncio.create_task(self._maintenance_loop())
+        try:
+            while not self._stopping:
+                capacity = self._capacity()
+                if not any(free > 0 for free in capacity.values()):
+                    self._slot_freed.clear()
+                    await self._slot_freed.wait()
+                    continue
+
+                try:
+                    tasks = await self.queue.claim(capacity, self.batch_size)
+                except Exception as e:
+                    self.logger.error(f"Task claim failed: {e}")
+                    await asyncio.sleep(1)
+                    continue
+
+                if not tasks:
+                    await self.queue.wait_for_work(self.poll_interval)
+                    continue
+
+                for task in tasks:
+                    self._active[task.type] += 1
+                    self._running_tasks[task.id] = task
+                    execution = asyncio.create_task(self._execute(task))
+                    self._executions.add(execution)
+                    execution.add_done_callback(self._executions.discard)
+        finally:
+            maintenance.cancel()
+            if self._executions:
+                await asyncio.gather(*self._executions, return_exceptions=True)
+
+    async def stop(self):
+        """Stop claiming; running tasks finish (or are reclaimed if the process dies)"""
+        self._stopping = True
+        self._slot_freed.set()
+
+    async def _execute(self, task: ClaimedTask):
+        try:
+            await self.handlers[task.type](task.payload)
+        except Exception as e:
+            outcome = await self.queue.fail(task, str(e))
+            self.stats["failed"] += 1
+            if outcome == "dead_letter":
+                self.stats["dead_letter"] += 1
+            elif outcome == "lease_lost":
+                self.stats["lease_lost"] += 1
+            self.logger.warning(f"Task {task.id} ({task.type}) failed: {e} -> {outcome}")
+        else:
+            if await self.queue.ack(task):
+                self.stats["completed"] += 1
+            else:
+                self.stats["lease_lost"] += 1
+                self.logger.warning(f"Task {task.id} finished after its lease expired")
+        finally:
+            self._running_tasks.pop(task.id, None)
+            self._active[task.type] -= 1
+            self._slot_freed.set()
+
+    async def _maintenance_loop(self):
+        """Renew our leases, requeue tasks of workers that died and clear out unhandled types"""
+        interval = self.queue.visibility_timeout / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                lost = await self.queue.extend(list(self._running_tasks.values()))
+                if lost:
+                    self.logger.warning(f"Lost the lease of {len(lost)} running tasks: {[task.id for task in lost]}")
+                result = await self.queue.reclaim_expired()
+                self.stats["reclaimed"] += result["reclaimed"]
+                if result["reclaimed"] or result["dead_letter"]:
+                    self.logger.warning(f"Reclaimed expired task leases: {result}")
+                await self._handle_unhandled()
+            except Exception as e:
+                self.logger.error(f"Task queue maintenance failed: {e}")
+
+    async def _handle_unhandled(self):
+        """Dead-letter (or count) ready tasks that no handler will ever claim"""
+        waiting = 0
+        ready_by_type = (await self.queue.get_stats())["ready_by_type"]
+        for task_type, ready in ready_by_type.items():
+            if not ready or task_type in self.handlers:
+                continue
+            if self.dead_letter_unhandled:
+                moved = await self.queue.dead_letter_ready(task_type, f"No handler for task type: {task_type}")
+                self.stats["unhandled"] += moved
+                self.logger.warning(f"Dead-lettered {moved} tasks with no handler for type {task_type}")
+            else:
+                waiting += ready
+                self.logger.warning(f"{ready} ready tasks of type {task_type} have no handler on this worker")
+        self.stats["unhandled_waiting"] = waiting
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Response Aggregator Load Test
+Measures completion latency of ProductionResponseAggregator under concurrent requests
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, List, Any
+
+from response_aggregator_fixed import (
+    ProductionResponseAggregator,
+    AggregatorConfig,
+    AggregationRequest,
+    AggregatedResponse,
+    AggregationStrategy,
+    ResponseMetrics,
+)
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples in milliseconds"""
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "avg_ms": sum(samples) / len(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p95_ms": samples[int(len(samples) * 0.95)],
+        "p99_ms": samples[int(len(samples) * 0.99)],
+        "max_ms": samples[-1],
+    }
+
+
+async def _run_one(aggregator: ProductionResponseAggregator, strategy: AggregationStrategy,
+                   responses_per_request: int, latencies: List[float]) -> None:
+    """Create a request, submit its responses and time submission-to-result latency"""
+    correlation_id = str(uuid.uuid4())
+    request = AggregationRequest(
+        request_id="",
+        correlation_id=correlation_id,
+        strategy=strategy,
+        timeout=60,
+        expected_responses=responses_per_request,
+        minimum_responses=1,
+    )
+    request_id = await aggregator.create_aggregation_request(request)
+    task = aggregator._processing_tasks.get(request_id)
+
+    for index in range(responses_per_request):
+        await aggregator.submit_response(AggregatedResponse(
+            response_id=str(uuid.uuid4()),
+            agent_id=f"agent_{index}",
+            correlation_id=correlation_id,
+            data=index,
+            metrics=ResponseMetrics(quality_score=0.9, confidence=0.9, response_time=0.01 * index),
+        ))
+    submitted_at = time.perf_counter()
+
+    if task:
+        await task
+    latencies.append((time.perf_counter() - submitted_at) * 1000)
+
+
+async def benchmark_strategy(strategy: AggregationStrategy, concurrent_requests: int = 10000,
+                             responses_per_request: int = 3) -> Dict[str, Any]:
+    """Run concurrent aggregations for a single strategy"""
+    config = AggregatorConfig()
+    config.max_concurrent = concurrent_requests
+    config.enable_agent_reputation = False
+    aggregator = ProductionResponseAggregator(config)
+
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        _run_one(aggregator, strategy, responses_per_request, latencies)
+        for _ in range(concurrent_requests)
+    ])
+    wall_time = time.perf_counter() - start
+    await aggregator.shutdown()
+
+    return {
+        "strategy": strategy.value,
+        "concurrent_requests": concurrent_requests,
+        "responses_per_request": responses_per_request,
+        "wall_time_s": wall_time,
+        "requests_per_second": concurrent_requests / wall_time if wall_time else 0,
+        "completion_latency": _percentiles(latencies),
+    }
+
+
+async def main():
+    """Run the aggregator load test"""
+    print("Starting response aggregator load test...")
+
+    results = []
+    for strategy in (
+        AggregationStrategy.FIRST_RESPONSE,
+        AggregationStrategy.FASTEST_N,
+        AggregationStrategy.ALL_RESPONSES,
+        AggregationStrategy.WEIGHTED_AVERAGE,
+    ):
+        result = await benchmark_strategy(strategy)
+        results.append(result)
+        latency = result["completion_latency"]
+        print(f"Strategy: {result['strategy']}")
+        print(f"  Throughput: {result['requests_per_second']:.0f} req/s")
+        print(f"  p50: {latency.get('p50_ms', 0):.2f}ms  p99: {latency.get('p99_ms', 0):.2f}ms")
+
+    with open("response_aggregator_benchmark.json", "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -13,7 +13,7 @@ import json
 import logging
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Union, Callable, Set, Tuple
+from typing import Dict, List, Any, Optional, Union, Callable, Set, Tuple, AsyncIterator
 from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 from enum import Enum
@@ -25,8 +25,25 @@ import structlog
 from fastapi import HTTPException
 from pydantic import BaseModel, Field, validator
 
-from config.settings import get_settings
-from monitoring.performance_tracker import track_performance
+# ===============================================================================
+# LOCAL IMPORTS WITH FALLBACKS
+# ===============================================================================
+
+try:
+    from config.settings import get_settings
+except (ImportError, ValueError):
+    import os
+
+    class Settings:
+        REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    def get_settings():
+        return Settings()
+
+try:
+    from monitoring.performance_tracker import track_performance
+except ImportError:
+    from monitoring_compatibility import track_performance
 
 # ===============================================================================
 # LOGGING CONFIGURATION
@@ -133,7 +150,7 @@ class AggregationResult:
 class AggregationRequestSchema(BaseModel):
     """Schema for aggregation requests"""
     correlation_id: str = Field(..., min_length=1, max_length=100)
-    strategy: str = Field(..., regex="^(first_response|all_responses|majority_consensus|weighted_average|fastest_n|best_quality|timeout_based|custom)$")
+    strategy: str = Field(..., pattern="^(first_response|all_responses|majority_consensus|weighted_average|fastest_n|best_quality|timeout_based|custom)$")
     timeout: int = Field(default=DEFAULT_RESPONSE_TIMEOUT, ge=1, le=3600)
     expected_responses: Optional[int] = Field(None, ge=1, le=MAX_RESPONSES_PER_REQUEST)
     minimum_responses: int = Field(default=1, ge=1, le=MAX_RESPONSES_PER_REQUEST)
@@ -187,6 +204,10 @@ class ProductionResponseAggregator:
         self._collected_responses: Dict[str, List[AggregatedResponse]] = defaultdict(list)
         self._completed_results: Dict[str, AggregationResult] = {}
         self._processing_tasks: Dict[str, asyncio.Task] = {}
+        self._correlation_index: Dict[str, str] = {}
+        self._completion_events: Dict[str, asyncio.Event] = {}
+        self._partial_state: Dict[str, Dict[str, Any]] = {}
+        self._partial_subscribers: Dict[str, List[asyncio.Queue]] = defaultdict(list)
         self._cleanup_task: Optional[asyncio.Task] = None
         self._statistics: Dict[str, Any] = defaultdict(int)
         self._agent_reputation: Dict[str, float] = defaultdict(lambda: 1.0)
@@ -273,6 +294,13 @@ class ProductionResponseAggregator:
                 
                 self._active_requests[request_id] = request
                 self._collected_responses[request_id] = []
+                self._correlation_index[request.correlation_id] = request_id
+                self._completion_events[request_id] = asyncio.Event()
+                self._partial_state[request_id] = {
+                    "items": [],
+                    "weighted_sum": 0.0,
+                    "total_weight": 0.0
+                }
                 
                 processing_task = asyncio.create_task(
                     self._process_aggregation_request(request_id)
@@ -341,11 +369,7 @@ class ProductionResponseAggregator:
     async def submit_response(self, response: AggregatedResponse) -> bool:
         """Submit response for aggregation"""
         try:
-            request_id = None
-            for rid, request in self._active_requests.items():
-                if request.correlation_id == response.correlation_id:
-                    request_id = rid
-                    break
+            request_id = self._correlation_index.get(response.correlation_id)
             
             if not request_id:
                 self.logger.warning(
@@ -365,9 +389,16 @@ class ProductionResponseAggregator:
                     response.metrics.agent_reputation = agent_reputation
                     response.metrics.quality_score *= agent_reputation
                 
-                self._collected_responses[request_id].append(response)
+                responses = self._collected_responses[request_id]
+                responses.append(response)
                 self._statistics["responses_received"] += 1
                 
+                request = self._active_requests[request_id]
+                self._update_partial_state(request_id, request, response)
+                
+                if self._is_collection_complete(request, responses):
+                    self._completion_events[request_id].set()
+                
                 self.logger.info(
                     "Response submitted for aggregation",
                     request_id=request_id,
@@ -408,12 +439,12 @@ class ProductionResponseAggregator:
             
             async with self._lock:
                 self._completed_results[request_id] = result
-                
-                if request_id in self._active_requests:
-                    del self._active_requests[request_id]
+                self._release_correlation(request_id, self._active_requests.pop(request_id, None))
                 
                 if request_id in self._collected_responses:
                     del self._collected_responses[request_id]
+                
+                self._close_partial_streams(request_id, result)
             
             if self.config.enable_agent_reputation:
                 await self._update_agent_reputation(request_id, result)
@@ -437,8 +468,8 @@ class ProductionResponseAggregator:
             
             async with self._lock:
                 self._completed_results[request_id] = error_result
-                if request_id in self._active_requests:
-                    del self._active_requests[request_id]
+                self._release_correlation(request_id, self._active_requests.pop(request_id, None))
+                self._close_partial_streams(request_id, error_result)
             
             self._statistics["requests_failed"] += 1
             self.logger.error("Aggregation processing failed", request_id=request_id, error=str(e))
@@ -448,25 +479,114 @@ class ProductionResponseAggregator:
                 del self._processing_tasks[request_id]
     
     async def _wait_for_responses(self, request_id: str, timeout: int) -> None:
-        """Wait for responses with various completion conditions"""
-        request = self._active_requests[request_id]
-        start_time = datetime.utcnow()
+        """Wait until submissions satisfy the strategy's completion predicate or timeout"""
+        completion_event = self._completion_events.get(request_id)
+        if completion_event is None:
+            return
         
-        while True:
-            elapsed = (datetime.utcnow() - start_time).total_seconds()
-            
-            if elapsed >= timeout:
-                break
-            
-            responses = self._collected_responses[request_id]
-            
-            if len(responses) >= request.minimum_responses:
-                if request.strategy == AggregationStrategy.FIRST_RESPONSE:
-                    break
-                elif request.expected_responses and len(responses) >= request.expected_responses:
-                    break
-            
-            await asyncio.sleep(0.1)
+        try:
+            await asyncio.wait_for(completion_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    def _is_collection_complete(self, request: AggregationRequest, responses: List[AggregatedResponse]) -> bool:
+        """Completion predicate evaluated on every submission"""
+        if len(responses) < request.minimum_responses:
+            return False
+        
+        if request.strategy in (AggregationStrategy.FIRST_RESPONSE, AggregationStrategy.FASTEST_N):
+            return True
+        
+        return bool(request.expected_responses) and len(responses) >= request.expected_responses
+    
+    def _update_partial_state(self, request_id: str, request: AggregationRequest, response: AggregatedResponse) -> None:
+        """Fold a submission into the running partial aggregate and notify stream subscribers"""
+        state = self._partial_state.get(request_id)
+        if state is None or response.metrics.quality_score < request.quality_threshold:
+            return
+        
+        if request.strategy == AggregationStrategy.ALL_RESPONSES:
+            delta = {
+                "agent_id": response.agent_id,
+                "data": response.data,
+                "quality_score": response.metrics.quality_score,
+                "confidence": response.metrics.confidence
+            }
+            state["items"].append(delta)
+            partial_data = list(state["items"])
+        elif request.strategy == AggregationStrategy.WEIGHTED_AVERAGE:
+            if not isinstance(response.data, (int, float)):
+                return
+            weight_function = request.weight_function or (
+                lambda r: r.metrics.quality_score * r.metrics.confidence
+            )
+            try:
+                weight = weight_function(response)
+            except Exception:
+                return
+            state["weighted_sum"] += response.data * weight
+            state["total_weight"] += weight
+            delta = {"agent_id": response.agent_id, "value": response.data, "weight": weight}
+            partial_data = (
+                state["weighted_sum"] / state["total_weight"] if state["total_weight"] > 0 else 0
+            )
+        else:
+            return
+        
+        subscribers = self._partial_subscribers.get(request_id)
+        if not subscribers:
+            return
+        
+        partial_result = AggregationResult(
+            request_id=request_id,
+            status=AggregationStatus.COLLECTING,
+            aggregated_data=partial_data,
+            total_responses=len(self._collected_responses[request_id]),
+            metadata={"partial": True, "delta": delta}
+        )
+        for queue in subscribers:
+            queue.put_nowait(partial_result)
+    
+    def _close_partial_streams(self, request_id: str, result: AggregationResult) -> None:
+        """Deliver the final result to stream subscribers and drop per-request state"""
+        self._partial_state.pop(request_id, None)
+        self._completion_events.pop(request_id, None)
+        
+        for queue in self._partial_subscribers.pop(request_id, []):
+            queue.put_nowait(result)
+            queue.put_nowait(None)
+    
+    def _release_correlation(self, request_id: str, request: Optional[AggregationRequest]) -> None:
+        """Remove correlation routing for a request that is no longer collecting"""
+        if request and self._correlation_index.get(request.correlation_id) == request_id:
+            del self._correlation_index[request.correlation_id]
+    
+    async def stream_partial_results(self, request_id: str) -> AsyncIterator[AggregationResult]:
+        """Yield incremental results as responses arrive, ending with the final result.
+        
+        ALL_RESPONSES and WEIGHTED_AVERAGE produce a partial result per accepted
+        submission; other strategies only yield the final result.
+        """
+        if request_id in self._completed_results:
+            yield self._completed_results[request_id]
+            return
+        
+        if request_id not in self._active_requests:
+            return
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        self._partial_subscribers[request_id].append(queue)
+        
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            subscribers = self._partial_subscribers.get(request_id)
+            if subscribers and queue in subscribers:
+                subscribers.remove(queue)
     
     async def _aggregate_responses(self, request_id: str) -> AggregationResult:
         """Aggregate collected responses based on strategy"""
@@ -707,13 +827,13 @@ class ProductionResponseAggregator:
                         )
                         
                         self._completed_results[request_id] = timeout_result
-                        
-                        if request_id in self._active_requests:
-                            del self._active_requests[request_id]
+                        self._release_correlation(request_id, self._active_requests.pop(request_id, None))
                         
                         if request_id in self._collected_responses:
                             del self._collected_responses[request_id]
                         
+                        self._close_partial_streams(request_id, timeout_result)
+                        
                         self._statistics["requests_timeout"] += 1
                 
                 if expired_requests:
@@ -772,6 +892,11 @@ class ProductionResponseAggregator:
             if self._processing_tasks:
                 await asyncio.gather(*self._processing_tasks.values(), return_exceptions=True)
             
+            for subscribers in self._partial_subscribers.values():
+                for queue in subscribers:
+                    queue.put_nowait(None)
+            self._partial_subscribers.clear()
+            
             if self._redis_client:
                 await self._redis_client.close()
             
@@ -0,0 +1,291 @@
+"""
+Rule Condition Compiler
+=======================
+Parses optimization rule conditions such as ``"cpu_usage < 20 AND worker_count > 2"``
+once into a restricted expression tree and compiles it to Python closures, so
+evaluating a rule is a handful of function calls instead of an ``eval()`` that
+re-parses the string every time.
+
+Only arithmetic, comparisons, boolean logic (``and``/``or``/``not`` in either
+case), numeric/string/boolean literals, tuples/lists of literals for ``in``
+and the functions ``abs``, ``min``, ``max``, ``sum`` and ``avg`` are accepted;
+attribute access, subscripts, lambdas and every other call are rejected at
+compile time. A rule only binds the variables it references, and it does not
+match while any of them has no value.
+
+Each condition also compiles to a vectorized form that evaluates one rule over
+a whole batch of services at once from numpy columns (NaN = no value).
+"""
+
+import ast
+import functools
+import io
+import operator
+import tokenize
+from typing import Any, Callable, Dict, FrozenSet, Mapping, Optional
+
+import numpy as np
+
+
+class RuleCompileError(ValueError):
+    """Condition is not valid rule syntax or uses a disallowed construct"""
+
+
+_KEYWORDS = {"AND": "and", "OR": "or", "NOT": "not", "TRUE": "True", "FALSE": "False"}
+
+_MAX_EXPONENT = 64
+
+
+def _bounded_pow(base, exponent):
+    # A rule like 9 ** 9 ** 9 would otherwise pin a core
+    if np.any(np.abs(exponent) > _MAX_EXPONENT):
+        raise ValueError(f"Exponent above {_MAX_EXPONENT} in rule condition")
+    return np.power(base, exponent) if isinstance(base, np.ndarray) else base ** exponent
+
+
+_BINARY_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _bounded_pow
+}
+
+_COMPARE_OPS = {
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b
+}
+
+_VECTOR_COMPARE_OPS = {
+    **_COMPARE_OPS,
+    ast.In: lambda a, b: np.isin(a, list(b)),
+    ast.NotIn: lambda a, b: ~np.isin(a, list(b))
+}
+
+_UNARY_OPS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+
+def _avg(*values):
+    return sum(values) / len(values)
+
+
+_FUNCTIONS = {
+    "abs": abs,
+    "min": min,
+    "max": max,
+    "sum": lambda *values: sum(values),
+    "avg": _avg
+}
+
+_VECTOR_FUNCTIONS = {
+    "abs": np.abs,
+    "min": lambda *values: functools.reduce(np.minimum, values),
+    "max": lambda *values: functools.reduce(np.maximum, values),
+    "sum": lambda *values: functools.reduce(np.add, values),
+    "avg": lambda *values: functools.reduce(np.add, values) / len(values)
+}
+
+
+def _normalize(source: str) -> str:
+    """Lower-case SQL-style AND/OR/NOT outside string literals"""
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(source.strip()).readline))
+    except (tokenize.TokenError, IndentationError) as e:
+        raise RuleCompileError(f"Invalid condition {source!r}: {e}") from e
+
+    out = []
+    for tok in tokens:
+        if tok.type == tokenize.NAME and tok.string.upper() in _KEYWORDS:
+            tok = tok._replace(string=_KEYWORDS[tok.string.upper()])
+        out.append(tok)
+    return tokenize.untokenize(out).strip()
+
+
+class _Compiler:
+    """Turns a validated AST into scalar or vectorized closures"""
+
+    def __init__(self, source: str, vector: bool):
+        self.source = source
+        self.vector = vector
+        self.compare_ops = _VECTOR_COMPARE_OPS if vector else _COMPARE_OPS
+        self.functions = _VECTOR_FUNCTIONS if vector else _FUNCTIONS
+
+    def fail(self, node: ast.AST, message: str):
+        raise RuleCompileError(f"{message} in condition {self.source!r}")
+
+    def compile(self, node: ast.AST) -> Callable[[Mapping[str, Any]], Any]:
+        method = getattr(self, f"_{type(node).__name__}", None)
+        if method is None:
+            self.fail(node, f"{type(node).__name__} is not allowed")
+        return method(node)
+
+    def _Constant(self, node: ast.Constant):
+        if not isinstance(node.value, (int, float, str, bool)):
+            self.fail(node, f"Literal {node.value!r} is not allowed")
+        value = node.value
+        return lambda env: value
+
+    def _Name(self, node: ast.Name):
+        name = node.id
+        return lambda env: env[name]
+
+    def _literal_sequence(self, node):
+        if not all(isinstance(elt, ast.Constant) for elt in node.elts):
+            self.fail(node, "Only literals are allowed in a tuple or list")
+        values = tuple(elt.value for elt in node.elts)
+        return lambda env: values
+
+    _Tuple = _literal_sequence
+    _List = _literal_sequence
+
+    def _BoolOp(self, node: ast.BoolOp):
+        operands = [self.compile(value) for value in node.values]
+        is_and = isinstance(node.op, ast.And)
+        if self.vector:
+            combine = np.logical_and if is_and else np.logical_or
+            return lambda env: functools.reduce(combine, (op(env) for op in operands))
+        if is_and:
+            return lambda env: all(op(env) for op in operands)
+        return lambda env: any(op(env) for op in operands)
+
+    def _UnaryOp(self, node: ast.UnaryOp):
+        operand = self.compile(node.operand)
+        if isinstance(node.op, ast.Not):
+            if self.vector:
+                return lambda env: np.logical_not(operand(env))
+            return lambda env: not operand(env)
+        op = _UNARY_OPS.get(type(node.op))
+        if op is None:
+            self.fail(node, f"Operator {type(node.op).__name__} is not allowed")
+        return lambda env: op(operand(env))
+
+    def _BinOp(self, node: ast.BinOp):
+        op = _BINARY_OPS.get(type(node.op))
+        if op is None:
+            self.fail(node, f"Operator {type(node.op).__name__} is not allowed")
+        left, right = self.compile(node.left), self.compile(node.right)
+        return lambda env: op(left(env), right(env))
+
+    def _Compare(self, node: ast.Compare):
+        ops = []
+        for op in node.ops:
+            func = self.compare_ops.get(type(op))
+            if func is None:
+                self.fail(node, f"Comparison {type(op).__name__} is not allowed")
+            ops.append(func)
+        operands = [self.compile(node.left)] + [self.compile(c) for c in node.comparators]
+
+        if len(ops) == 1:
+            op, left, right = ops[0], operands[0], operands[1]
+            return lambda env: op(left(env), right(env))
+
+        def chained(env):
+            values = [operand(env) for operand in operands]
+            results = [op(values[i], values[i + 1]) for i, op in enumerate(ops)]
+            if self.vector:
+                return functools.reduce(np.logical_and, results)
+            return all(results)
+        return chained
+
+    def _Call(self, node: ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in self.functions:
+            self.fail(node, "Only abs, min, max, sum and avg may be called")
+        if node.keywords:
+            self.fail(node, "Keyword arguments are not allowed")
+        args = node.args
+        # avg([a, b]) and avg(a, b) mean the same thing
+        if len(args) == 1 and isinstance(args[0], (ast.Tuple, ast.List)):
+            args = args[0].elts
+        if not args:
+            self.fail(node, f"{node.func.id}() needs at least one argument")
+        func = self.functions[node.func.id]
+        compiled = [self.compile(arg) for arg in args]
+        return lambda env: func(*(arg(env) for arg in compiled))
+
+
+class CompiledCondition:
+    """A rule condition parsed once, evaluable per service or over a batch"""
+
+    __slots__ = ("source", "variables", "_scalar", "_vector")
+
+    def __init__(self, source: str, variables: FrozenSet[str], scalar, vector):
+        self.source = source
+        self.variables = variables
+        self._scalar = scalar
+        self._vector = vector
+
+    def _bind(self, metrics: Mapping[str, Any], defaults: Optional[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+        env = {}
+        for name in self.variables:
+            value = metrics.get(name)
+            if value is None and defaults is not None:
+                value = defaults.get(name)
+            if value is None:
+                return None
+            env[name] = value
+        return env
+
+    def evaluate(self, metrics: Mapping[str, Any], defaults: Optional[Mapping[str, Any]] = None) -> bool:
+        """True if the condition holds; False if a referenced variable has no value"""
+        env = self._bind(metrics, defaults)
+        if env is None:
+            return False
+        return bool(self._scalar(env))
+
+    def evaluate_batch(
+        self,
+        columns: Mapping[str, np.ndarray],
+        size: int,
+        defaults: Optional[Mapping[str, Any]] = None
+    ) -> np.ndarray:
+        """
+        Evaluate over ``size`` rows at once. ``columns`` maps a variable to an
+        array of per-row values (NaN where a row has none); a variable without a
+        column falls back to ``defaults``. Returns a boolean array.
+        """
+        env = {}
+        present = np.ones(size, dtype=bool)
+        for name in self.variables:
+            if name in columns:
+                column = np.asarray(columns[name])
+                if column.dtype.kind == "f":
+                    present &= ~np.isnan(column)
+                env[name] = column
+            elif defaults is not None and defaults.get(name) is not None:
+                env[name] = defaults[name]
+            else:
+                return np.zeros(size, dtype=bool)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = np.broadcast_to(np.asarray(self._vector(env), dtype=bool), (size,))
+        return result & present
+
+    def __repr__(self) -> str:
+        return f"CompiledCondition({self.source!r})"
+
+
+def compile_condition(source: str) -> CompiledCondition:
+    """Parse and compile a rule condition; raises RuleCompileError if it is not allowed"""
+    normalized = _normalize(source)
+    try:
+        tree = ast.parse(normalized, mode="eval")
+    except SyntaxError as e:
+        raise RuleCompileError(f"Invalid condition {source!r}: {e.msg}") from e
+
+    function_names = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    variables = frozenset(
+        node.id for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and id(node) not in function_names
+    )
+
+    scalar = _Compiler(source, vector=False).compile(tree.body)
+    vector = _Compiler(source, vector=True).compile(tree.body)
+    return CompiledCondition(source, variables, scalar, vector)
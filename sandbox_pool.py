@@ -0,0 +1,583 @@
+"""
+Warm Sandbox Interpreter Pool
+=============================
+Pre-started, resource-limited worker interpreters that accept code over a pipe.
+
+Python and Bash workers are fork servers: a long-lived Python process forks a
+fresh child per run, so each run starts from a clean, already-initialized
+interpreter image and applies its own resource limits. JavaScript workers are
+persistent Node.js processes that evaluate each run in a new ``vm`` context.
+
+Workers are recycled after ``max_runs_per_worker`` runs, on any violation
+(timeout, fatal signal, resource limit, protocol error), and when a JavaScript
+run leaves handles (timers, sockets) open behind it. The ``vm`` context gets
+neither ``require`` nor the host timers, and replies as soon as the script
+returns, so code that needs modules, timers, ``process`` or asynchronous
+completion is left to cold execution.
+
+Wire protocol: 4-byte big-endian length prefix followed by a UTF-8 JSON object,
+in both directions over the worker's stdin/stdout.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import resource
+import shutil
+import signal as sig
+import struct
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+VIOLATION_SIGNALS = {sig.SIGKILL, sig.SIGXCPU, sig.SIGSEGV, sig.SIGBUS, sig.SIGABRT}
+
+POOL_LANGUAGES = ("python", "bash", "javascript")
+
+# Modules imported once in the Python fork server so runs do not pay for them
+DEFAULT_PRELOAD_MODULES = [
+    "json", "math", "re", "random", "collections", "itertools",
+    "functools", "datetime", "statistics", "string", "traceback"
+]
+
+# JavaScript the vm context cannot run like plain ``node``: host modules, timers,
+# ``process`` and anything that completes after the script returns
+NODE_COLD_ONLY = re.compile(
+    r"\b(?:require|import|process|exports|__dirname|__filename|fetch|setTimeout|setInterval|"
+    r"setImmediate|queueMicrotask|Promise|async|await)\b|\.then\s*\("
+)
+
+
+def set_resource_limits(max_memory_mb: int, limit_address_space: bool = True):
+    """Set resource limits for a sandboxed process"""
+    try:
+        # Set memory limit
+        if limit_address_space:
+            memory_bytes = max_memory_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+        # Set CPU time limit (soft limit)
+        resource.setrlimit(resource.RLIMIT_CPU, (60, 120))
+
+        # Limit number of processes
+        resource.setrlimit(resource.RLIMIT_NPROC, (10, 10))
+    except Exception:
+        # Resource limits may not work on all platforms
+        pass
+
+
+class SandboxPoolSaturated(Exception):
+    """Raised when the pool's wait queue is full"""
+
+
+@dataclass
+class SandboxPoolConfig:
+    """Warm pool configuration"""
+    enabled: bool = True
+    workers_per_language: int = 2
+    max_runs_per_worker: int = 100
+    max_queue: int = 100
+    default_memory_mb: int = 512
+    spawn_timeout_seconds: float = 10.0
+    languages: List[str] = field(default_factory=lambda: list(POOL_LANGUAGES))
+    preload_modules: List[str] = field(default_factory=lambda: list(DEFAULT_PRELOAD_MODULES))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SandboxPoolConfig':
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+# =============================================================================
+# Worker side (runs inside the sandbox worker process)
+# =============================================================================
+
+def _read_exact(fd: int, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = os.read(fd, size)
+        if not chunk:
+            raise EOFError("worker pipe closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _read_frame_fd(fd: int) -> Dict[str, Any]:
+    (size,) = FRAME_HEADER.unpack(_read_exact(fd, FRAME_HEADER.size))
+    return json.loads(_read_exact(fd, size))
+
+
+def _write_frame_fd(fd: int, message: Dict[str, Any]):
+    payload = json.dumps(message).encode("utf-8")
+    data = FRAME_HEADER.pack(len(payload)) + payload
+    while data:
+        written = os.write(fd, data)
+        data = data[written:]
+
+
+def _run_child(language: str, job: Dict[str, Any], stdin_fd: int, stdout_fd: int, stderr_fd: int):
+    """Executed in the forked child; never returns"""
+    exit_code = 1
+    try:
+        os.setsid()
+        for signum in (sig.SIGINT, sig.SIGTERM, sig.SIGPIPE):
+            sig.signal(signum, sig.SIG_DFL)
+        os.dup2(stdin_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        os.closerange(3, 65536)
+
+        set_resource_limits(job["max_memory_mb"])
+        os.environ.update(job.get("env") or {})
+
+        if language == "bash":
+            os.execvp("bash", ["bash", "-c", job["code"]])
+
+        # Present the run like a fresh `python script.py` invocation
+        worker_dir = os.path.dirname(os.path.abspath(__file__))
+        sys.path[:] = [p for p in sys.path if os.path.abspath(p or ".") != worker_dir]
+        sys.argv = ["<sandbox>"]
+        namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+        try:
+            exec(compile(job["code"], "<sandbox>", "exec"), namespace)
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if e.code is not None and not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+        except BaseException as e:
+            import traceback
+            # Drop the driver's own frame so tracebacks start at the user's code
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            exit_code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except Exception:
+            pass
+        os._exit(exit_code)
+
+
+def _collect_child(pid: int, job: Dict[str, Any], stdin_w: int, stdout_r: int, stderr_r: int) -> Dict[str, Any]:
+    """Feed stdin, drain output under the deadline and reap the child"""
+    import selectors
+
+    max_output = job["max_output_size"]
+    deadline = time.monotonic() + job["timeout"]
+    outputs = {stdout_r: bytearray(), stderr_r: bytearray()}
+    truncated = False
+    timed_out = False
+
+    pending_stdin = (job.get("stdin") or "").encode("utf-8")
+    selector = selectors.DefaultSelector()
+    selector.register(stdout_r, selectors.EVENT_READ)
+    selector.register(stderr_r, selectors.EVENT_READ)
+    if pending_stdin:
+        os.set_blocking(stdin_w, False)
+        selector.register(stdin_w, selectors.EVENT_WRITE)
+    else:
+        os.close(stdin_w)
+
+    open_streams = 2
+    while open_streams:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        for key, _ in selector.select(timeout=remaining):
+            fd = key.fd
+            if fd == stdin_w:
+                try:
+                    written = os.write(fd, pending_stdin[:65536])
+                    pending_stdin = pending_stdin[written:]
+                except (BrokenPipeError, OSError):
+                    pending_stdin = b""
+                if not pending_stdin:
+                    selector.unregister(fd)
+                    os.close(fd)
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                selector.unregister(fd)
+                open_streams -= 1
+                continue
+            buffer = outputs[fd]
+            if len(buffer) < max_output:
+                buffer.extend(chunk[:max_output - len(buffer)])
+            if len(buffer) >= max_output:
+                truncated = True
+    selector.close()
+
+    if timed_out:
+        try:
+            os.killpg(pid, sig.SIGKILL)
+        except ProcessLookupError:
+            pass
+    _, status, usage = os.wait4(pid, 0)
+    for fd in (stdout_r, stderr_r):
+        os.close(fd)
+    if pending_stdin:
+        try:
+            os.close(stdin_w)
+        except OSError:
+            pass
+
+    signal_number = os.WTERMSIG(status) if os.WIFSIGNALED(status) else None
+    return {
+        "stdout": outputs[stdout_r].decode("utf-8", errors="replace"),
+        "stderr": outputs[stderr_r].decode("utf-8", errors="replace"),
+        "exit_code": os.WEXITSTATUS(status) if os.WIFEXITED(status) else -(signal_number or 1),
+        "signal": signal_number,
+        "timed_out": timed_out,
+        "truncated": truncated,
+        "max_rss_kb": usage.ru_maxrss,
+    }
+
+
+def fork_server_main(language: str, preload_modules: List[str]):
+    """Entry point of a Python/Bash fork server worker"""
+    import importlib
+
+    for module in preload_modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+    # Keep the protocol off fds 0/1 so children can take them over
+    protocol_in, protocol_out = os.dup(0), os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    _write_frame_fd(protocol_out, {"ready": True, "pid": os.getpid()})
+    while True:
+        try:
+            job = _read_frame_fd(protocol_in)
+        except EOFError:
+            return
+
+        stdin_r, stdin_w = os.pipe()
+        stdout_r, stdout_w = os.pipe()
+        stderr_r, stderr_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            _run_child(language, job, stdin_r, stdout_w, stderr_w)
+        for fd in (stdin_r, stdout_w, stderr_w):
+            os.close(fd)
+        _write_frame_fd(protocol_out, _collect_child(pid, job, stdin_w, stdout_r, stderr_r))
+
+
+NODE_WORKER_SOURCE = r"""
+'use strict';
+const vm = require('vm');
+const util = require('util');
+let buffered = Buffer.alloc(0);
+
+function send(message) {
+  const payload = Buffer.from(JSON.stringify(message), 'utf8');
+  const header = Buffer.alloc(4);
+  header.writeUInt32BE(payload.length, 0);
+  process.stdout.write(Buffer.concat([header, payload]));
+}
+
+// Timers, sockets and other handles still open once a run returns
+function activeHandles() {
+  if (typeof process.getActiveResourcesInfo === 'function') return process.getActiveResourcesInfo().length;
+  return process._getActiveHandles().length + process._getActiveRequests().length;
+}
+
+function run(job) {
+  const stdout = [], stderr = [];
+  let size = 0, truncated = false;
+  const writer = (sink) => (...args) => {
+    const line = util.format(...args) + '\n';
+    if (size + line.length > job.max_output_size) { truncated = true; return; }
+    size += line.length;
+    sink.push(line);
+  };
+  const sandboxConsole = {
+    log: writer(stdout), info: writer(stdout), debug: writer(stdout),
+    error: writer(stderr), warn: writer(stderr)
+  };
+  // No require and no host timers: nothing a run schedules may outlive it
+  const context = vm.createContext({
+    console: sandboxConsole, Buffer, URL, TextEncoder, TextDecoder,
+    module: { exports: {} }
+  });
+  let exitCode = 0, timedOut = false;
+  const handlesBefore = activeHandles();
+  try {
+    vm.runInContext(job.code, context, { filename: '<sandbox>', timeout: Math.max(1, job.timeout * 1000) });
+  } catch (err) {
+    exitCode = 1;
+    if (err && err.code === 'ERR_SCRIPT_EXECUTION_TIMEOUT') timedOut = true;
+    stderr.push((err && err.stack) ? err.stack + '\n' : String(err) + '\n');
+  }
+  const leakedHandles = Math.max(0, activeHandles() - handlesBefore);
+  send({ stdout: stdout.join(''), stderr: stderr.join(''), exit_code: exitCode,
+         signal: null, timed_out: timedOut, truncated, leaked_handles: leakedHandles,
+         max_rss_kb: Math.round(process.memoryUsage().rss / 1024) });
+}
+
+process.stdin.on('data', (chunk) => {
+  buffered = Buffer.concat([buffered, chunk]);
+  while (buffered.length >= 4) {
+    const size = buffered.readUInt32BE(0);
+    if (buffered.length < 4 + size) break;
+    const job = JSON.parse(buffered.slice(4, 4 + size).toString('utf8'));
+    buffered = buffered.slice(4 + size);
+    run(job);
+  }
+});
+process.stdin.on('end', () => process.exit(0));
+send({ ready: true, pid: process.pid });
+"""
+
+
+# =============================================================================
+# Pool side (runs inside the agent's event loop)
+# =============================================================================
+
+class SandboxWorker:
+    """A single warm interpreter process speaking the frame protocol"""
+
+    def __init__(self, language: str, config: SandboxPoolConfig):
+        self.language = language
+        self.config = config
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.runs = 0
+        self.started_at = 0.0
+
+    def _command(self) -> List[str]:
+        if self.language == "javascript":
+            return ["node", f"--max-old-space-size={self.config.default_memory_mb}", "-e", NODE_WORKER_SOURCE]
+        return [
+            sys.executable, os.path.abspath(__file__), "--worker", self.language,
+            "--preload", ",".join(self.config.preload_modules)
+        ]
+
+    def _preexec(self):
+        # Node runs untrusted code in-process and manages its own heap limit;
+        # fork servers only run trusted driver code and limit each child.
+        if self.language == "javascript":
+            set_resource_limits(self.config.default_memory_mb, limit_address_space=False)
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self._command(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            preexec_fn=self._preexec
+        )
+        ready = await asyncio.wait_for(self._read_frame(), timeout=self.config.spawn_timeout_seconds)
+        if not ready.get("ready"):
+            raise RuntimeError(f"{self.language} sandbox worker failed to start")
+        self.started_at = time.time()
+
+    async def _read_frame(self) -> Dict[str, Any]:
+        header = await self.process.stdout.readexactly(FRAME_HEADER.size)
+        (size,) = FRAME_HEADER.unpack(header)
+        if size > MAX_FRAME_SIZE:
+            raise RuntimeError("sandbox worker frame too large")
+        return json.loads(await self.process.stdout.readexactly(size))
+
+    async def run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        payload = json.dumps(job).encode("utf-8")
+        self.process.stdin.write(FRAME_HEADER.pack(len(payload)) + payload)
+        await self.process.stdin.drain()
+        self.runs += 1
+        # The worker enforces the run deadline itself; this guards against a hung worker
+        return await asyncio.wait_for(self._read_frame(), timeout=job["timeout"] + 5)
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def stop(self):
+        if self.process is None:
+            return
+        if self.process.returncode is None:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+            await self.process.wait()
+        self.process = None
+
+
+class WarmSandboxPool:
+    """Per-language pools of warm sandbox workers with a bounded wait queue"""
+
+    def __init__(self, logger: logging.Logger, config: Optional[SandboxPoolConfig] = None):
+        self.logger = logger
+        self.config = config or SandboxPoolConfig()
+        self._idle: Dict[str, asyncio.Queue] = {}
+        self._waiting: Dict[str, int] = {}
+        self._workers: Dict[str, List[SandboxWorker]] = {}
+        self._respawn_tasks: Set[asyncio.Task] = set()
+        self.stats: Dict[str, int] = {
+            "runs": 0,
+            "recycles": 0,
+            "violations": 0,
+            "queue_rejections": 0,
+            "spawn_failures": 0
+        }
+
+    async def start(self):
+        """Spawn workers for every available language"""
+        for language in self.config.languages:
+            if language == "javascript" and not shutil.which("node"):
+                self.logger.info("Node.js not found; JavaScript runs will use cold execution")
+                continue
+            if language == "bash" and not shutil.which("bash"):
+                continue
+            self._idle[language] = asyncio.Queue()
+            self._waiting[language] = 0
+            self._workers[language] = []
+            for _ in range(self.config.workers_per_language):
+                worker = await self._spawn(language)
+                if worker:
+                    self._idle[language].put_nowait(worker)
+        self.logger.info("Warm sandbox pool started",
+                         extra={"languages": list(self._idle), "workers_per_language": self.config.workers_per_language})
+
+    def supports(self, language: str, stdin_data: Optional[str], environment_vars: Dict[str, str],
+                 max_memory_mb: int, code: str = "") -> bool:
+        """Whether a request can be served by a warm worker"""
+        if language not in self._idle:
+            return False
+        if language == "javascript":
+            # Node workers have a fixed heap, no per-run stdin or environment and no host facilities
+            return (not stdin_data and not environment_vars and max_memory_mb >= self.config.default_memory_mb
+                    and not NODE_COLD_ONLY.search(code))
+        return True
+
+    async def _spawn(self, language: str) -> Optional[SandboxWorker]:
+        worker = SandboxWorker(language, self.config)
+        try:
+            await worker.start()
+        except Exception as e:
+            self.stats["spawn_failures"] += 1
+            self.logger.error(f"Failed to start {language} sandbox worker: {e}")
+            await worker.stop()
+            return None
+        self._workers[language].append(worker)
+        return worker
+
+    async def _recycle(self, worker: SandboxWorker):
+        """Replace a worker and hand the replacement to the idle queue"""
+        self.stats["recycles"] += 1
+        language = worker.language
+        if worker in self._workers[language]:
+            self._workers[language].remove(worker)
+        await worker.stop()
+        replacement = await self._spawn(language)
+        if replacement is None:
+            # Back off briefly so a broken interpreter does not spin
+            await asyncio.sleep(1.0)
+            replacement = await self._spawn(language)
+        if replacement is not None and language in self._idle:
+            self._idle[language].put_nowait(replacement)
+
+    def _recycle_in_background(self, worker: SandboxWorker):
+        task = asyncio.create_task(self._recycle(worker))
+        self._respawn_tasks.add(task)
+        task.add_done_callback(self._respawn_tasks.discard)
+
+    async def execute(self, language: str, code: str, timeout_seconds: int, max_memory_mb: int,
+                      max_output_size: int, stdin_data: Optional[str] = None,
+                      environment_vars: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Run code on a warm worker; raises SandboxPoolSaturated when the queue is full"""
+        if self._waiting[language] >= self.config.max_queue:
+            self.stats["queue_rejections"] += 1
+            raise SandboxPoolSaturated(f"{language} sandbox queue is full")
+
+        self._waiting[language] += 1
+        try:
+            worker = await self._idle[language].get()
+        finally:
+            self._waiting[language] -= 1
+
+        job = {
+            "code": code,
+            "timeout": timeout_seconds,
+            "max_memory_mb": max_memory_mb,
+            "max_output_size": max_output_size,
+            "stdin": stdin_data,
+            "env": environment_vars or {}
+        }
+        recycle = True
+        try:
+            try:
+                if not worker.alive:
+                    raise ConnectionError("worker exited while idle")
+                result = await worker.run(job)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, RuntimeError) as e:
+                self.logger.warning(f"{language} sandbox worker failed, recycling: {e}")
+                result = {"stdout": "", "stderr": "", "exit_code": -1, "signal": None,
+                          "timed_out": isinstance(e, asyncio.TimeoutError), "truncated": False,
+                          "max_rss_kb": 0, "worker_error": str(e)}
+
+            self.stats["runs"] += 1
+            violation = self._is_violation(result)
+            if violation:
+                self.stats["violations"] += 1
+            # A run that escaped the vm context and left timers or sockets behind taints the worker
+            recycle = (violation or not worker.alive or result.get("leaked_handles", 0) > 0
+                       or worker.runs >= self.config.max_runs_per_worker)
+            return result
+        finally:
+            # Cancellation mid-run leaves the worker in an unknown state, so it is recycled too
+            if recycle:
+                self._recycle_in_background(worker)
+            else:
+                self._idle[language].put_nowait(worker)
+
+    @staticmethod
+    def _is_violation(result: Dict[str, Any]) -> bool:
+        return bool(
+            result.get("timed_out")
+            or result.get("worker_error")
+            or result.get("signal") in VIOLATION_SIGNALS
+            or "MemoryError" in result.get("stderr", "")
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "workers": {language: len(workers) for language, workers in self._workers.items()},
+            "idle": {language: queue.qsize() for language, queue in self._idle.items()},
+            "waiting": dict(self._waiting)
+        }
+
+    async def shutdown(self):
+        """Stop all workers"""
+        for task in list(self._respawn_tasks):
+            task.cancel()
+        if self._respawn_tasks:
+            await asyncio.gather(*self._respawn_tasks, return_exceptions=True)
+        for workers in self._workers.values():
+            for worker in list(workers):
+                await worker.stop()
+            workers.clear()
+        self._idle.clear()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sandbox fork server worker")
+    parser.add_argument("--worker", choices=["python", "bash"], required=True)
+    parser.add_argument("--preload", default="")
+    args = parser.parse_args()
+    fork_server_main(args.worker, [m for m in args.preload.split(",") if m])
@@ -1,15 +1,29 @@
 # security/session_manager.py
 """
 Production-ready session management with Redis backend
+
+Activity updates are coalesced in process and flushed in pipelined batches;
+the session body is written once and its TTL slides with EXPIRE. Sessions seen
+recently skip the existence check, but only while this instance is subscribed
+to session deletions from every instance and the session is not in the local
+filter of deleted ids. The subscription starts with the first session call
+(or explicitly with ``start_revocation_sync``); ``revocation_sync=False``
+turns it off, and every update then checks Redis.
 """
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
+from collections import OrderedDict
 from redis import asyncio as aioredis
+import asyncio
+import logging
+import time
 import secrets
 import json
 import hashlib
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 class SessionData(BaseModel):
     user_id: str
     email: str
@@ -26,11 +40,42 @@ class SessionManager:
         self,
         redis_url: str = "redis://localhost:6379",
         session_timeout_minutes: int = 30,
-        max_sessions_per_user: int = 5
+        max_sessions_per_user: int = 5,
+        activity_flush_interval: float = 1.0,
+        max_pending_activity: int = 5000,
+        redis: Optional[aioredis.Redis] = None,
+        revocation_channel: str = "session_revocations",
+        revocation_rebuild_seconds: float = 600.0,
+        revocation_sync: bool = True
     ):
-        self.redis = aioredis.from_url(redis_url, decode_responses=True)
+        self.redis = redis or aioredis.from_url(redis_url, decode_responses=True)
         self.session_timeout = timedelta(minutes=session_timeout_minutes)
         self.max_sessions = max_sessions_per_user
+        
+        # Coalesced activity: session_id -> (user_id, last_activity)
+        self.activity_flush_interval = activity_flush_interval
+        self.max_pending_activity = max_pending_activity
+        self._pending_activity: Dict[str, tuple[str, datetime]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_now = asyncio.Event()
+        
+        # Sessions recently confirmed to exist: session_id -> (user_id, expires_at monotonic)
+        self._known_sessions: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._known_ttl = 30.0
+        self._known_max = 50000
+        
+        # Sessions deleted on any instance, fed over pub/sub; the fast path
+        # above is only trusted while the feed is live
+        self.revocation_channel = revocation_channel
+        self.revocation_rebuild_seconds = revocation_rebuild_seconds
+        self.revocation_sync = revocation_sync
+        self._revoked = RevocationFilter(capacity=50000)
+        self._revocation_synced = False
+        self._revocation_task: Optional[asyncio.Task] = None
+    
+    @property
+    def _ttl_seconds(self) -> int:
+        return int(self.session_timeout.total_seconds())
     
     def _generate_session_id(self) -> str:
         """Generate cryptographically secure session ID"""
@@ -40,10 +85,24 @@ class SessionManager:
         """Get Redis key for session"""
         return f"session:{session_id}"
     
+    def _activity_key(self, session_id: str) -> str:
+        """Get Redis key for a session's last activity timestamp"""
+        return f"session_activity:{session_id}"
+    
     def _user_sessions_key(self, user_id: str) -> str:
         """Get Redis key for user's active sessions"""
         return f"user_sessions:{user_id}"
     
+    def _remember(self, session_id: str, user_id: str):
+        self._known_sessions[session_id] = (user_id, time.monotonic() + self._known_ttl)
+        self._known_sessions.move_to_end(session_id)
+        while len(self._known_sessions) > self._known_max:
+            self._known_sessions.popitem(last=False)
+    
+    def _forget(self, session_id: str):
+        self._known_sessions.pop(session_id, None)
+        self._pending_activity.pop(session_id, None)
+    
     async def create_session(
         self,
         user_id: str,
@@ -53,6 +112,7 @@ class SessionManager:
         metadata: Optional[Dict[str, Any]] = None
     ) -> tuple[str, SessionData]:
         """Create a new session"""
+        self._ensure_revocation_sync()
         
         # Check concurrent session limit
         await self._enforce_session_limit(user_id)
@@ -70,49 +130,125 @@ class SessionManager:
             metadata=metadata or {}
         )
         
-        # Store session
-        session_key = self._session_key(session_id)
-        await self.redis.setex(
-            session_key,
-            int(self.session_timeout.total_seconds()),
-            session_data.model_dump_json()
-        )
-        
-        # Add to user's session list
+        # Store session body, activity timestamp and the user's session index
         user_sessions_key = self._user_sessions_key(user_id)
-        await self.redis.sadd(user_sessions_key, session_id)
-        await self.redis.expire(user_sessions_key, int(self.session_timeout.total_seconds()))
-        
+        pipe = self.redis.pipeline()
+        pipe.setex(self._session_key(session_id), self._ttl_seconds, session_data.model_dump_json())
+        pipe.setex(self._activity_key(session_id), self._ttl_seconds, now.isoformat())
+        pipe.sadd(user_sessions_key, session_id)
+        pipe.expire(user_sessions_key, self._ttl_seconds)
+        await pipe.execute()
+        
+        self._remember(session_id, user_id)
         return session_id, session_data
     
+    def _build_session(self, session_id: str, data: Optional[str], activity: Optional[str]) -> Optional[SessionData]:
+        if not data:
+            return None
+        
+        session = SessionData.model_validate_json(data)
+        if activity:
+            session.last_activity = max(session.last_activity, datetime.fromisoformat(activity))
+        pending = self._pending_activity.get(session_id)
+        if pending:
+            session.last_activity = max(session.last_activity, pending[1])
+        return session
+    
     async def get_session(self, session_id: str) -> Optional[SessionData]:
         """Retrieve session data"""
-        session_key = self._session_key(session_id)
-        data = await self.redis.get(session_key)
+        self._ensure_revocation_sync()
+        data, activity = await self.redis.mget(
+            self._session_key(session_id), self._activity_key(session_id)
+        )
         
-        if not data:
+        session = self._build_session(session_id, data, activity)
+        if session is None:
+            self._forget(session_id)
             return None
         
-        return SessionData.model_validate_json(data)
+        self._remember(session_id, session.user_id)
+        return session
     
     async def update_activity(self, session_id: str) -> bool:
-        """Update last activity timestamp and extend session"""
-        session = await self.get_session(session_id)
-        
-        if not session:
-            return False
-        
-        session.last_activity = datetime.utcnow()
-        
-        session_key = self._session_key(session_id)
-        await self.redis.setex(
-            session_key,
-            int(self.session_timeout.total_seconds()),
-            session.model_dump_json()
-        )
+        """
+        Record activity and extend the session
+        The write is coalesced and flushed in the next batch; only sessions not
+        seen recently cost a round trip here.
+        """
+        self._ensure_revocation_sync()
+        known = self._known_sessions.get(session_id)
+        if (known and known[1] > time.monotonic() and self._revocation_synced
+                and session_id not in self._revoked):
+            user_id = known[0]
+        else:
+            data = await self.redis.get(self._session_key(session_id))
+            if not data:
+                self._forget(session_id)
+                return False
+            user_id = json.loads(data)["user_id"]
+            self._remember(session_id, user_id)
+        
+        self._pending_activity[session_id] = (user_id, datetime.utcnow())
+        self._ensure_flusher()
+        if len(self._pending_activity) >= self.max_pending_activity:
+            self._flush_now.set()
         
         return True
     
+    def _ensure_flusher(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+    
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.activity_flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            try:
+                await self.flush_activity()
+            except Exception as e:
+                logger.error(f"Session activity flush failed: {e}")
+    
+    async def flush_activity(self) -> int:
+        """Write pending activity in one pipeline: timestamp + sliding TTL"""
+        if not self._pending_activity:
+            return 0
+        
+        pending, self._pending_activity = self._pending_activity, {}
+        ttl = self._ttl_seconds
+        pipe = self.redis.pipeline(transaction=False)
+        for session_id, (user_id, last_activity) in pending.items():
+            # XX: a session deleted meanwhile must not be resurrected
+            pipe.set(self._activity_key(session_id), last_activity.isoformat(), ex=ttl, xx=True)
+            pipe.expire(self._session_key(session_id), ttl)
+        for user_id in {user_id for user_id, _ in pending.values()}:
+            pipe.expire(self._user_sessions_key(user_id), ttl)
+        
+        try:
+            await pipe.execute()
+        except Exception:
+            # Keep the newest timestamps for the next attempt
+            for session_id, entry in pending.items():
+                current = self._pending_activity.get(session_id)
+                if current is None or current[1] < entry[1]:
+                    self._pending_activity[session_id] = entry
+            raise
+        return len(pending)
+    
+    async def close(self):
+        """Flush pending activity and stop the background flusher"""
+        await self.stop_revocation_sync()
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush_activity()
+    
     async def delete_session(self, session_id: str) -> bool:
         """Delete a specific session"""
         session = await self.get_session(session_id)
@@ -120,14 +256,14 @@ class SessionManager:
         if not session:
             return False
         
-        # Remove from Redis
-        session_key = self._session_key(session_id)
-        await self.redis.delete(session_key)
-        
-        # Remove from user's session list
-        user_sessions_key = self._user_sessions_key(session.user_id)
-        await self.redis.srem(user_sessions_key, session_id)
+        # Remove from Redis and from the user's session list
+        pipe = self.redis.pipeline()
+        pipe.delete(self._session_key(session_id), self._activity_key(session_id))
+        pipe.srem(self._user_sessions_key(session.user_id), session_id)
+        self._revoke(pipe, session_id)
+        await pipe.execute()
         
+        self._forget(session_id)
         return True
     
     async def delete_all_user_sessions(self, user_id: str):
@@ -139,18 +275,86 @@ class SessionManager:
             # Delete all session keys
             pipe = self.redis.pipeline()
             for session_id in session_ids:
-                pipe.delete(self._session_key(session_id))
+                pipe.delete(self._session_key(session_id), self._activity_key(session_id))
+                self._revoke(pipe, session_id)
+                self._forget(session_id)
             pipe.delete(user_sessions_key)
             await pipe.execute()
     
+    def _revoke(self, pipe, session_id: str):
+        """Mark a session deleted here and tell the other instances"""
+        self._revoked.add(session_id)
+        pipe.publish(self.revocation_channel, session_id)
+    
+    async def start_revocation_sync(self):
+        """Follow session deletions made by other instances"""
+        if self._revocation_task is None:
+            self._revocation_task = asyncio.create_task(self._revocation_listener(self.redis.pubsub()))
+    
+    def _ensure_revocation_sync(self):
+        if self.revocation_sync and self._revocation_task is None:
+            self._revocation_task = asyncio.create_task(self._revocation_listener(self.redis.pubsub()))
+    
+    async def _revocation_listener(self, pubsub):
+        try:
+            while True:
+                try:
+                    await pubsub.subscribe(self.revocation_channel)
+                    # Anything cached as known before the feed was (re)established
+                    # may have been deleted unseen, so it is dropped with the filter
+                    self._revoked = RevocationFilter(capacity=50000)
+                    self._known_sessions.clear()
+                    self._revocation_synced = True
+                    rebuild_at = time.monotonic() + self.revocation_rebuild_seconds
+                    
+                    while time.monotonic() < rebuild_at:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message and message.get("type") == "message":
+                            session_id = message["data"]
+                            if isinstance(session_id, bytes):
+                                session_id = session_id.decode()
+                            self._revoked.add(session_id)
+                            self._forget(session_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Every activity update checks Redis until the feed is back
+                    self._revocation_synced = False
+                    logger.error(f"Session revocation sync failed: {e}")
+                    await asyncio.sleep(1.0)
+        finally:
+            self._revocation_synced = False
+            try:
+                await pubsub.unsubscribe(self.revocation_channel)
+                await pubsub.reset()
+            except Exception:
+                pass
+    
+    async def stop_revocation_sync(self):
+        """Stop following session deletions"""
+        if self._revocation_task:
+            self._revocation_task.cancel()
+            try:
+                await self._revocation_task
+            except asyncio.CancelledError:
+                pass
+            self._revocation_task = None
+    
     async def get_user_sessions(self, user_id: str) -> list[tuple[str, SessionData]]:
         """Get all active sessions for a user"""
         user_sessions_key = self._user_sessions_key(user_id)
-        session_ids = await self.redis.smembers(user_sessions_key)
+        session_ids: List[str] = list(await self.redis.smembers(user_sessions_key))
+        if not session_ids:
+            return []
         
-        sessions = []
+        keys = []
         for session_id in session_ids:
-            session = await self.get_session(session_id)
+            keys.extend((self._session_key(session_id), self._activity_key(session_id)))
+        values = await self.redis.mget(keys)
+        
+        sessions = []
+        for index, session_id in enumerate(session_ids):
+            session = self._build_session(session_id, values[2 * index], values[2 * index + 1])
             if session:
                 sessions.append((session_id, session))
         
@@ -200,13 +404,22 @@ class SessionManager:
 # security/token_manager.py
 """
 JWT token management with httpOnly cookies
+
+Verified tokens are cached by hash until they expire. Revocation is checked
+against a local Bloom filter kept in sync over Redis pub/sub; only filter hits
+(or an unsynced filter) cost a Redis round trip. With Redis configured, the
+subscription starts with the first ``verify_token`` call.
 """
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, Dict, Any
+import logging
+import math
 import jwt
 from fastapi import Response, Request, HTTPException, status
 from pydantic import BaseModel
 
+logger = logging.getLogger(__name__)
+
 class TokenData(BaseModel):
     user_id: str
     email: str
@@ -214,6 +427,29 @@ class TokenData(BaseModel):
     iat: datetime
     jti: str  # JWT ID for token revocation
 
+class RevocationFilter:
+    """Bloom filter over revoked token IDs (no false negatives)"""
+    
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+    
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
 class TokenManager:
     """Secure JWT token management"""
     
@@ -222,15 +458,30 @@ class TokenManager:
         secret_key: str,
         algorithm: str = "HS256",
         access_token_expire_minutes: int = 15,
-        refresh_token_expire_days: int = 7
+        refresh_token_expire_days: int = 7,
+        redis: Optional[Any] = None,
+        verified_cache_size: int = 10000,
+        revocation_channel: str = "token_revocations",
+        revocation_rebuild_seconds: float = 3600.0
     ):
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.access_token_expire = timedelta(minutes=access_token_expire_minutes)
         self.refresh_token_expire = timedelta(days=refresh_token_expire_days)
         
-        # Token blacklist (use Redis in production)
-        self.redis = None  # Initialize with Redis connection
+        # Token blacklist lives in Redis; a local filter screens lookups
+        self.redis = redis
+        self.revocation_channel = revocation_channel
+        self.revocation_rebuild_seconds = revocation_rebuild_seconds
+        self._revoked = RevocationFilter()
+        self._revocation_synced = False
+        self._revocation_task: Optional[asyncio.Task] = None
+        
+        # sha256(token) -> (payload, exp timestamp)
+        self._verified: "OrderedDict[str, tuple[Dict[str, Any], float]]" = OrderedDict()
+        self.verified_cache_size = verified_cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
     
     def create_access_token(
         self,
@@ -268,25 +519,57 @@ class TokenManager:
         
         return jwt.encode(claims, self.secret_key, algorithm=self.algorithm)
     
-    def verify_token(self, token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def _cached_payload(self, token_key: str) -> Optional[Dict[str, Any]]:
+        entry = self._verified.get(token_key)
+        if entry is None:
+            return None
+        payload, exp = entry
+        if exp <= time.time():
+            del self._verified[token_key]
+            return None
+        self._verified.move_to_end(token_key)
+        return payload
+    
+    def _cache_payload(self, token_key: str, payload: Dict[str, Any]):
+        exp = payload.get("exp")
+        if not isinstance(exp, (int, float)):
+            return
+        self._verified[token_key] = (payload, float(exp))
+        while len(self._verified) > self.verified_cache_size:
+            self._verified.popitem(last=False)
+    
+    async def verify_token(self, token: str, token_type: str = "access") -> Optional[Dict[str, Any]]:
         """Verify and decode JWT token"""
-        try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            
-            # Check token type
-            if payload.get("type") != token_type:
+        self._ensure_revocation_sync()
+        token_key = self._token_key(token)
+        payload = self._cached_payload(token_key)
+        
+        if payload is None:
+            self.cache_misses += 1
+            try:
+                payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            except jwt.ExpiredSignatureError:
                 return None
-            
-            # Check if token is blacklisted
-            if self.redis and self._is_blacklisted(payload.get("jti")):
+            except jwt.InvalidTokenError:
                 return None
-            
-            return payload
+            self._cache_payload(token_key, payload)
+        else:
+            self.cache_hits += 1
         
-        except jwt.ExpiredSignatureError:
+        # Check token type
+        if payload.get("type") != token_type:
             return None
-        except jwt.InvalidTokenError:
+        
+        # Check if token is blacklisted
+        if self.redis and await self._is_blacklisted(payload.get("jti")):
+            self._verified.pop(token_key, None)
             return None
+        
+        return payload
     
     def set_auth_cookies(
         self,
@@ -333,12 +616,88 @@ class TokenManager:
         
         ttl = int((exp - datetime.utcnow()).total_seconds())
         if ttl > 0:
-            await self.redis.setex(f"blacklist:{jti}", ttl, "1")
+            self._revoked.add(jti)
+            pipe = self.redis.pipeline()
+            pipe.setex(f"blacklist:{jti}", ttl, "1")
+            pipe.publish(self.revocation_channel, jti)
+            await pipe.execute()
     
-    def _is_blacklisted(self, jti: str) -> bool:
+    async def _is_blacklisted(self, jti: Optional[str]) -> bool:
         """Check if token is blacklisted"""
-        if not self.redis:
+        if not self.redis or not jti:
             return False
         
-        # Synchronous check - implement async version in production
-        return False  # Placeholder
+        # A synced filter has no false negatives, so a miss needs no round trip
+        if self._revocation_synced and jti not in self._revoked:
+            return False
+        
+        return bool(await self.redis.exists(f"blacklist:{jti}"))
+    
+    async def _load_revocations(self) -> RevocationFilter:
+        revoked = RevocationFilter()
+        async for key in self.redis.scan_iter(match="blacklist:*", count=1000):
+            if isinstance(key, bytes):
+                key = key.decode()
+            revoked.add(key[len("blacklist:"):])
+        return revoked
+    
+    async def start_revocation_sync(self):
+        """Subscribe to revocations and load the current blacklist into the local filter"""
+        self._ensure_revocation_sync()
+    
+    def _ensure_revocation_sync(self):
+        if self.redis and self._revocation_task is None:
+            self._revocation_task = asyncio.create_task(self._revocation_listener(self.redis.pubsub()))
+    
+    async def _revocation_listener(self, pubsub):
+        try:
+            while True:
+                try:
+                    # Subscribe before the scan so nothing revoked in between is missed
+                    await pubsub.subscribe(self.revocation_channel)
+                    self._revoked = await self._load_revocations()
+                    self._revocation_synced = True
+                    rebuild_at = time.monotonic() + self.revocation_rebuild_seconds
+                    
+                    # Expired entries cannot be removed from a Bloom filter; rebuild periodically
+                    while time.monotonic() < rebuild_at:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message and message.get("type") == "message":
+                            jti = message["data"]
+                            self._revoked.add(jti.decode() if isinstance(jti, bytes) else jti)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Fall back to Redis lookups until the filter is rebuilt
+                    self._revocation_synced = False
+                    logger.error(f"Token revocation sync failed: {e}")
+                    await asyncio.sleep(1.0)
+        finally:
+            self._revocation_synced = False
+            try:
+                await pubsub.unsubscribe(self.revocation_channel)
+                await pubsub.reset()
+            except Exception:
+                pass
+    
+    async def stop_revocation_sync(self):
+        """Stop the revocation listener"""
+        if self._revocation_task:
+            self._revocation_task.cancel()
+            try:
+                await self._revocation_task
+            except asyncio.CancelledError:
+                pass
+            self._revocation_task = None
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Verified-token cache and revocation filter statistics"""
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "verified_cache_size": len(self._verified),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "revocation_filter_entries": self._revoked.count,
+            "revocation_synced": self._revocation_synced
+        }
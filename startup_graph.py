@@ -0,0 +1,282 @@
+"""
+Startup Graph
+=============
+Starts system components as a dependency graph instead of fixed phases.
+
+Each component declares the components it needs (``depends_on``) and those it
+merely has to come after (``after``). A component starts the moment everything
+it waits for has finished, so independent components start concurrently and
+the cold start is bounded by the longest dependency chain rather than the sum
+of every component.
+
+Failure handling:
+
+* a critical component that fails or exceeds its timeout aborts startup and
+  cancels everything still starting;
+* a non-critical one is marked failed (or ``degraded`` when it was too slow)
+  and startup continues; with ``fail_fast=True`` a slow non-critical component
+  aborts startup as well;
+* components that ``depends_on`` a failed, degraded or skipped component are
+  skipped; ``after`` only orders and never propagates failure.
+
+The run produces a ``StartupReport``: per-component import time (modules
+listed in ``imports`` are imported, timed, before the component starts), init
+time, time spent waiting on dependencies, and the critical path.
+"""
+
+import asyncio
+import importlib
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+
+class StartupGraphError(ValueError):
+    """The component graph is invalid (unknown dependency or cycle)"""
+
+
+class StartupError(RuntimeError):
+    """A component startup could not survive; carries the partial report"""
+
+    def __init__(self, message: str, report: "StartupReport"):
+        super().__init__(message)
+        self.report = report
+
+
+@dataclass
+class ComponentSpec:
+    """A startable component and what it waits for"""
+    name: str
+    start: Callable[[], Awaitable[Any]]
+    depends_on: Sequence[str] = ()
+    after: Sequence[str] = ()
+    critical: bool = True
+    timeout: Optional[float] = None
+    imports: Sequence[str] = ()
+
+
+@dataclass
+class ComponentTiming:
+    """Profile of one component's startup (offsets are seconds from graph start)"""
+    name: str
+    status: str = "pending"  # started | failed | degraded | skipped | cancelled
+    critical: bool = True
+    ready_at: float = 0.0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    import_seconds: float = 0.0
+    init_seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def wait_seconds(self) -> float:
+        return self.ready_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "critical": self.critical,
+            "wait_seconds": round(self.wait_seconds, 4),
+            "import_seconds": round(self.import_seconds, 4),
+            "init_seconds": round(self.init_seconds, 4),
+            "finished_at": round(self.finished_at, 4),
+            "error": self.error
+        }
+
+
+@dataclass
+class StartupReport:
+    """Outcome and timings of a graph run"""
+    components: Dict[str, ComponentTiming] = field(default_factory=dict)
+    total_seconds: float = 0.0
+    critical_path: List[str] = field(default_factory=list)
+
+    def by_status(self, status: str) -> List[str]:
+        return [name for name, timing in self.components.items() if timing.status == status]
+
+    @property
+    def sequential_seconds(self) -> float:
+        """What the same work would have taken one component at a time"""
+        return sum(t.import_seconds + t.init_seconds for t in self.components.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_seconds": round(self.total_seconds, 4),
+            "sequential_seconds": round(self.sequential_seconds, 4),
+            "critical_path": self.critical_path,
+            "components": {name: timing.to_dict() for name, timing in self.components.items()}
+        }
+
+    def format_table(self) -> str:
+        lines = [f"{'component':<32} {'status':<10} {'wait':>8} {'import':>8} {'init':>8} {'done at':>8}"]
+        for timing in sorted(self.components.values(), key=lambda t: t.finished_at):
+            lines.append(
+                f"{timing.name:<32} {timing.status:<10} {timing.wait_seconds:>8.3f} "
+                f"{timing.import_seconds:>8.3f} {timing.init_seconds:>8.3f} {timing.finished_at:>8.3f}"
+            )
+        lines.append(f"total {self.total_seconds:.3f}s (sequential {self.sequential_seconds:.3f}s); "
+                     f"critical path: {' -> '.join(self.critical_path)}")
+        return "\n".join(lines)
+
+
+class StartupGraph:
+    """
+    Dependency-ordered, maximally concurrent component startup
+
+    Usage:
+        graph = StartupGraph(default_timeout=30)
+        graph.add(ComponentSpec("database", init_db))
+        graph.add(ComponentSpec("agent_manager", start_manager, depends_on=["database"]))
+        graph.add(ComponentSpec("llm_agent", start_llm, depends_on=["agent_manager"], critical=False))
+        report = await graph.run()
+    """
+
+    def __init__(
+        self,
+        default_timeout: Optional[float] = None,
+        fail_fast: bool = False,
+        max_concurrency: Optional[int] = None,
+        logger: Optional[Any] = None
+    ):
+        self.default_timeout = default_timeout
+        self.fail_fast = fail_fast
+        self.max_concurrency = max_concurrency
+        self.logger = logger
+        self.specs: Dict[str, ComponentSpec] = {}
+
+    def add(self, spec: ComponentSpec) -> ComponentSpec:
+        if spec.name in self.specs:
+            raise StartupGraphError(f"Component {spec.name} is declared twice")
+        self.specs[spec.name] = spec
+        return spec
+
+    def _waits_for(self, spec: ComponentSpec) -> List[str]:
+        return list(dict.fromkeys([*spec.depends_on, *spec.after]))
+
+    def order(self) -> List[str]:
+        """Topological order; raises StartupGraphError for unknown names or cycles"""
+        for spec in self.specs.values():
+            for name in self._waits_for(spec):
+                if name not in self.specs:
+                    raise StartupGraphError(f"{spec.name} waits for unknown component {name}")
+
+        order: List[str] = []
+        state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                cycle = path[path.index(name):] + [name]
+                raise StartupGraphError(f"Dependency cycle: {' -> '.join(cycle)}")
+            state[name] = 1
+            for dependency in self._waits_for(self.specs[name]):
+                visit(dependency, path + [name])
+            state[name] = 2
+            order.append(name)
+
+        for name in self.specs:
+            visit(name, [])
+        return order
+
+    async def run(self) -> StartupReport:
+        """Start every component; raises StartupError if startup cannot continue"""
+        order = self.order()
+        report = StartupReport(components={
+            name: ComponentTiming(name, critical=self.specs[name].critical) for name in order
+        })
+        done = {name: asyncio.Event() for name in order}
+        slots = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        origin = time.perf_counter()
+        abort: List[str] = []
+
+        async def run_component(name: str):
+            spec = self.specs[name]
+            timing = report.components[name]
+            try:
+                for dependency in self._waits_for(spec):
+                    await done[dependency].wait()
+                timing.ready_at = time.perf_counter() - origin
+
+                failed = [d for d in spec.depends_on if report.components[d].status != "started"]
+                if failed:
+                    timing.status = "skipped"
+                    timing.error = f"dependencies not started: {', '.join(failed)}"
+                    return
+
+                if slots is not None:
+                    await slots.acquire()
+                try:
+                    await self._start_component(spec, timing, origin)
+                finally:
+                    if slots is not None:
+                        slots.release()
+            except asyncio.CancelledError:
+                if timing.status == "pending":
+                    timing.status = "cancelled"
+                raise
+            finally:
+                timing.finished_at = time.perf_counter() - origin
+                done[name].set()
+                if timing.status in ("failed", "degraded") and (
+                    spec.critical or (self.fail_fast and timing.status == "degraded")
+                ):
+                    abort.append(name)
+                    for task in tasks.values():
+                        if not task.done() and task is not asyncio.current_task():
+                            task.cancel()
+
+        tasks = {name: asyncio.create_task(run_component(name)) for name in order}
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        report.total_seconds = time.perf_counter() - origin
+        report.critical_path = self._critical_path(report)
+        if abort:
+            timing = report.components[abort[0]]
+            raise StartupError(f"Startup aborted: {abort[0]} {timing.status} ({timing.error})", report)
+        return report
+
+    async def _start_component(self, spec: ComponentSpec, timing: ComponentTiming, origin: float):
+        timeout = spec.timeout if spec.timeout is not None else self.default_timeout
+        timing.started_at = time.perf_counter() - origin
+        try:
+            if spec.imports:
+                import_start = time.perf_counter()
+                for module in spec.imports:
+                    await asyncio.to_thread(importlib.import_module, module)
+                timing.import_seconds = time.perf_counter() - import_start
+
+            init_start = time.perf_counter()
+            try:
+                await asyncio.wait_for(spec.start(), timeout)
+            finally:
+                timing.init_seconds = time.perf_counter() - init_start
+            timing.status = "started"
+        except asyncio.TimeoutError:
+            timing.status = "degraded"
+            timing.error = f"did not start within {timeout}s"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            timing.status = "failed"
+            timing.error = str(e) or type(e).__name__
+
+        if self.logger is not None:
+            log = self.logger.info if timing.status == "started" else self.logger.warning
+            log(f"{'✓' if timing.status == 'started' else '✗'} {spec.name} {timing.status} "
+                f"in {timing.import_seconds + timing.init_seconds:.3f}s"
+                + (f": {timing.error}" if timing.error else ""))
+
+    def _critical_path(self, report: StartupReport) -> List[str]:
+        """Walk back from the last component to finish through whatever it waited on longest"""
+        if not report.components:
+            return []
+        name = max(report.components, key=lambda n: report.components[n].finished_at)
+        path = [name]
+        while True:
+            waits = self._waits_for(self.specs[name])
+            if not waits:
+                break
+            name = max(waits, key=lambda n: report.components[n].finished_at)
+            path.append(name)
+        return list(reversed(path))
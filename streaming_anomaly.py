@@ -0,0 +1,432 @@
+"""
+Streaming Anomaly Detection
+===========================
+Online anomaly detectors that update incrementally as each sample arrives,
+vectorised over many metric series at once with NumPy.
+
+Each ``StreamingDetectorBank.update`` call takes one value per series (NaN
+or a missing key means "no sample this time") and runs four detectors:
+
+* ``ewma``     - z-score against an exponentially weighted mean and variance
+* ``mad``      - robust z-score against the median/MAD of a rolling window
+* ``seasonal`` - z-score against a per-time-of-period EWMA baseline
+                 (e.g. hour of day), enabled with ``season_period``
+* ``cusum``    - two-sided CUSUM of the deviation from a slow-moving reference
+                 mean, catching gradual drifts that the faster EWMA follows
+                 and that never produce a single large z-score. With a season
+                 configured the reference carries a slow per-slot offset, so a
+                 regular daily swing is not mistaken for drift
+
+The cost of an update is O(series) for the EWMA, seasonal and CUSUM state and
+O(series x mad_window) for the rolling median, independent of history length.
+Samples are scored before they are folded into the state, so a value is
+always compared with a baseline that does not include it.
+
+``ColumnarBuffer`` keeps recent rows column-wise in a NumPy ring so a whole
+metric's history is one array slice, and ``load_trace``/``replay`` feed
+recorded metric traces through a bank for offline tuning.
+"""
+
+import csv
+import json
+import math
+import operator
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+SPIKE = "spike"
+DROP = "drop"
+GRADUAL_INCREASE = "gradual_increase"
+GRADUAL_DECREASE = "gradual_decrease"
+
+_MAD_SCALE = 0.6745  # MAD of a standard normal, so robust z-scores match ordinary ones
+_EPSILON = 1e-12
+
+
+# ============================================================================
+# COLUMNAR STORAGE
+# ============================================================================
+
+class ColumnarBuffer:
+    """Fixed-capacity ring of rows stored column-wise in one NumPy array"""
+
+    def __init__(self, columns: Sequence[str], capacity: int):
+        self.columns = list(columns)
+        self.capacity = capacity
+        self._positions = {name: i for i, name in enumerate(self.columns)}
+        self._getter = operator.attrgetter(*self.columns)
+        self._data = np.full((len(self.columns), capacity), np.nan)
+        self._timestamps = np.zeros(capacity)
+        self._next = 0
+        self._size = 0
+        self.total = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, values: Sequence[float]):
+        """Add a row given in column order"""
+        self._data[:, self._next] = values
+        self._timestamps[self._next] = timestamp
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.total += 1
+
+    def append_record(self, record: Any, timestamp: Optional[float] = None):
+        """Add a row read from the attributes of ``record`` (e.g. a dataclass)"""
+        values = self._getter(record)
+        if len(self.columns) == 1:
+            values = (values,)
+        self.append(record.timestamp if timestamp is None else timestamp, values)
+
+    def _order(self, last: Optional[int]) -> np.ndarray:
+        count = self._size if last is None else min(last, self._size)
+        return np.arange(self._next - count, self._next) % self.capacity
+
+    def column(self, name: str, last: Optional[int] = None) -> np.ndarray:
+        """Oldest-to-newest values of one column"""
+        return self._data[self._positions[name], self._order(last)]
+
+    def timestamps(self, last: Optional[int] = None) -> np.ndarray:
+        return self._timestamps[self._order(last)]
+
+    def window(self, last: Optional[int] = None) -> np.ndarray:
+        """(columns x rows) array of the newest ``last`` rows, oldest first"""
+        return self._data[:, self._order(last)]
+
+    def latest(self) -> Dict[str, float]:
+        if not self._size:
+            return {}
+        position = (self._next - 1) % self.capacity
+        return {name: float(self._data[i, position]) for i, name in enumerate(self.columns)}
+
+
+# ============================================================================
+# DETECTORS
+# ============================================================================
+
+@dataclass
+class StreamingAnomaly:
+    """One detector firing on one series"""
+    series: str
+    detector: str
+    anomaly_type: str
+    value: float
+    expected: float
+    spread: float
+    score: float
+    threshold: float
+    timestamp: float
+
+    @property
+    def severity(self) -> float:
+        """0.0 to 1.0; 0.5 at the threshold, 1.0 at twice the threshold"""
+        return min(1.0, self.score / (2 * self.threshold))
+
+    @property
+    def expected_range(self) -> Tuple[float, float]:
+        return (self.expected - self.threshold * self.spread, self.expected + self.threshold * self.spread)
+
+
+class StreamingDetectorBank:
+    """
+    Online detectors for many metric series, updated one arrival at a time
+
+    Usage:
+        bank = StreamingDetectorBank(["cpu", "memory"], season_period=86400, season_buckets=24)
+        for anomaly in bank.update({"cpu": 93.0, "memory": 41.0}, timestamp=time.time()):
+            alert(anomaly)
+    """
+
+    def __init__(
+        self,
+        series: Iterable[str] = (),
+        alpha: float = 0.05,
+        z_threshold: float = 3.0,
+        mad_window: int = 60,
+        mad_threshold: float = 3.5,
+        season_period: Optional[float] = None,
+        season_buckets: int = 24,
+        seasonal_alpha: float = 0.1,
+        seasonal_threshold: float = 3.5,
+        seasonal_warmup: int = 30,
+        cusum_alpha: float = 0.005,
+        cusum_k: float = 0.5,
+        cusum_h: float = 8.0,
+        warmup: int = 30
+    ):
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.mad_window = mad_window
+        self.mad_threshold = mad_threshold
+        self.season_period = season_period
+        self.season_buckets = season_buckets
+        self.seasonal_alpha = seasonal_alpha
+        self.seasonal_threshold = seasonal_threshold
+        self.seasonal_warmup = seasonal_warmup
+        self.cusum_alpha = cusum_alpha
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.warmup = warmup
+
+        self.series: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._count = np.zeros(0, dtype=np.int64)
+        self._mean = np.zeros(0)
+        self._var = np.zeros(0)
+        self._last = np.zeros(0)
+        self._reference = np.zeros(0)
+        self._cusum_high = np.zeros(0)
+        self._cusum_low = np.zeros(0)
+        self._ring = np.zeros((mad_window, 0))
+        self._ring_position = 0
+        self._seasonal_count = np.zeros((season_buckets, 0), dtype=np.int64)
+        self._seasonal_mean = np.zeros((season_buckets, 0))
+        self._seasonal_var = np.zeros((season_buckets, 0))
+        self._season_offset = np.zeros((season_buckets, 0))
+
+        self.updates = 0
+        self.add_series(series)
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def add_series(self, names: Iterable[str]):
+        """Start tracking more series (they warm up from their first sample)"""
+        names = [name for name in dict.fromkeys(names) if name not in self._positions]
+        if not names:
+            return
+        for name in names:
+            self._positions[name] = len(self.series)
+            self.series.append(name)
+        extra = len(names)
+        self._count = np.concatenate([self._count, np.zeros(extra, dtype=np.int64)])
+        self._mean = np.concatenate([self._mean, np.zeros(extra)])
+        self._var = np.concatenate([self._var, np.zeros(extra)])
+        self._last = np.concatenate([self._last, np.zeros(extra)])
+        self._reference = np.concatenate([self._reference, np.zeros(extra)])
+        self._cusum_high = np.concatenate([self._cusum_high, np.zeros(extra)])
+        self._cusum_low = np.concatenate([self._cusum_low, np.zeros(extra)])
+        self._ring = np.concatenate([self._ring, np.zeros((self.mad_window, extra))], axis=1)
+        self._seasonal_count = np.concatenate(
+            [self._seasonal_count, np.zeros((self.season_buckets, extra), dtype=np.int64)], axis=1
+        )
+        self._seasonal_mean = np.concatenate([self._seasonal_mean, np.zeros((self.season_buckets, extra))], axis=1)
+        self._seasonal_var = np.concatenate([self._seasonal_var, np.zeros((self.season_buckets, extra))], axis=1)
+        self._season_offset = np.concatenate([self._season_offset, np.zeros((self.season_buckets, extra))], axis=1)
+
+    def vector(self, values: Mapping[str, float], add_missing: bool = True) -> np.ndarray:
+        """Series-ordered array for a ``{series: value}`` mapping (NaN where absent)"""
+        if add_missing:
+            self.add_series(name for name in values if name not in self._positions)
+        vector = np.full(len(self.series), np.nan)
+        for name, value in values.items():
+            position = self._positions.get(name)
+            if position is not None and value is not None:
+                vector[position] = value
+        return vector
+
+    def update(
+        self,
+        values: Union[Mapping[str, float], Sequence[float], np.ndarray],
+        timestamp: Optional[float] = None
+    ) -> List[StreamingAnomaly]:
+        """Score one arrival against every detector, then fold it into the state"""
+        timestamp = time.time() if timestamp is None else timestamp
+        x = self.vector(values) if isinstance(values, Mapping) else np.asarray(values, dtype=float)
+        if x.shape != (len(self.series),):
+            raise ValueError(f"Expected {len(self.series)} values, got {x.shape}")
+
+        present = ~np.isnan(x)
+        x_filled = np.where(present, x, self._last)
+        warm = present & (self._count >= self.warmup)
+        findings: List[StreamingAnomaly] = []
+
+        # EWMA / EWMV z-score (scored against the state before this sample)
+        std = np.sqrt(self._var)
+        usable = warm & (std > _EPSILON)
+        z = np.zeros_like(x_filled)
+        np.divide(x_filled - self._mean, std, out=z, where=usable)
+        self._collect(findings, "ewma", usable & (np.abs(z) > self.z_threshold), x_filled, self._mean, std,
+                      np.abs(z), self.z_threshold, timestamp)
+
+        # Rolling median / MAD over the last mad_window samples
+        window = min(int(self._count.max(initial=0)), self.mad_window)
+        if window >= min(self.warmup, self.mad_window) and np.any(warm):
+            history = self._ring if window == self.mad_window else self._ring[:window]
+            median = np.median(history, axis=0)
+            mad = np.median(np.abs(history - median), axis=0)
+            robust_usable = warm & (mad > _EPSILON)
+            robust = np.zeros_like(x_filled)
+            np.divide(_MAD_SCALE * (x_filled - median), mad, out=robust, where=robust_usable)
+            self._collect(findings, "mad", robust_usable & (np.abs(robust) > self.mad_threshold), x_filled,
+                          median, mad / _MAD_SCALE, np.abs(robust), self.mad_threshold, timestamp)
+
+        # Seasonal baseline for this slot of the period
+        bucket = None
+        if self.season_period:
+            bucket = int((timestamp % self.season_period) / self.season_period * self.season_buckets)
+            bucket = min(bucket, self.season_buckets - 1)
+            seasonal_mean = self._seasonal_mean[bucket]
+            seasonal_std = np.sqrt(self._seasonal_var[bucket])
+            seasonal_usable = (
+                present & (self._seasonal_count[bucket] >= self.seasonal_warmup) & (seasonal_std > _EPSILON)
+            )
+            seasonal_z = np.zeros_like(x_filled)
+            np.divide(x_filled - seasonal_mean, seasonal_std, out=seasonal_z, where=seasonal_usable)
+            self._collect(findings, "seasonal", seasonal_usable & (np.abs(seasonal_z) > self.seasonal_threshold),
+                          x_filled, seasonal_mean, seasonal_std, np.abs(seasonal_z), self.seasonal_threshold,
+                          timestamp)
+
+        # CUSUM of the deviation from the slow reference, in units of the EWMA
+        # spread; clipped so that one spike cannot trip it alone. Seasonal
+        # series wait until this slot's offset has been learned
+        reference = self._reference
+        drift_usable = usable
+        if bucket is not None:
+            reference = reference + self._season_offset[bucket]
+            drift_usable = usable & (self._seasonal_count[bucket] >= self.seasonal_warmup)
+        residual = np.zeros_like(x_filled)
+        np.divide(x_filled - reference, std, out=residual, where=drift_usable)
+        residual = np.clip(residual, -self.z_threshold, self.z_threshold)
+        self._cusum_high = np.where(drift_usable, np.maximum(0.0, self._cusum_high + residual - self.cusum_k),
+                                    self._cusum_high)
+        self._cusum_low = np.where(drift_usable, np.maximum(0.0, self._cusum_low - residual - self.cusum_k),
+                                   self._cusum_low)
+        for detected, statistic, anomaly_type in ((self._cusum_high > self.cusum_h, self._cusum_high, GRADUAL_INCREASE),
+                                                  (self._cusum_low > self.cusum_h, self._cusum_low, GRADUAL_DECREASE)):
+            for position in np.flatnonzero(detected):
+                findings.append(StreamingAnomaly(
+                    self.series[position], "cusum", anomaly_type, float(x_filled[position]),
+                    float(reference[position]), float(std[position]), float(statistic[position]),
+                    self.cusum_h, timestamp
+                ))
+            statistic[detected] = 0.0
+
+        # Fold the sample in
+        first = present & (self._count == 0)
+        diff = x_filled - self._mean
+        increment = self.alpha * diff
+        self._mean = np.where(first, x_filled, np.where(present, self._mean + increment, self._mean))
+        self._var = np.where(present & ~first, (1 - self.alpha) * (self._var + diff * increment), self._var)
+        # Plain running mean until 1/n drops below cusum_alpha, so the reference
+        # does not start out biased by the first sample
+        rate = np.maximum(self.cusum_alpha, 1.0 / (self._count + 1))
+        self._reference = np.where(present, self._reference + rate * (x_filled - self._reference), self._reference)
+        self._count += present
+        self._last = x_filled
+        # A new series starts with a window full of its first sample, not zeros
+        self._ring[:, first] = x_filled[first]
+        self._ring[self._ring_position] = x_filled
+        self._ring_position = (self._ring_position + 1) % self.mad_window
+
+        if bucket is not None:
+            count = self._seasonal_count[bucket]
+            offset = self._season_offset[bucket]
+            offset_rate = np.maximum(self.cusum_alpha, 1.0 / (count + 1))
+            self._season_offset[bucket] = np.where(
+                present, offset + offset_rate * (x_filled - self._reference - offset), offset
+            )
+            mean = self._seasonal_mean[bucket]
+            diff = x_filled - mean
+            increment = self.seasonal_alpha * diff
+            seasonal_first = present & (count == 0)
+            self._seasonal_var[bucket] = np.where(
+                present & ~seasonal_first, (1 - self.seasonal_alpha) * (self._seasonal_var[bucket] + diff * increment),
+                self._seasonal_var[bucket]
+            )
+            self._seasonal_mean[bucket] = np.where(seasonal_first, x_filled,
+                                                   np.where(present, mean + increment, mean))
+            self._seasonal_count[bucket] = count + present
+
+        self.updates += 1
+        return findings
+
+    def _collect(self, findings: List[StreamingAnomaly], detector: str, detected: np.ndarray, values: np.ndarray,
+                 expected: np.ndarray, spread: np.ndarray, score: np.ndarray, threshold: float, timestamp: float):
+        for position in np.flatnonzero(detected):
+            value, center = float(values[position]), float(expected[position])
+            findings.append(StreamingAnomaly(
+                self.series[position], detector, SPIKE if value > center else DROP, value, center,
+                float(spread[position]), float(score[position]), threshold, timestamp
+            ))
+
+    def baseline(self, series: str) -> Dict[str, float]:
+        """Current EWMA state of one series"""
+        position = self._positions[series]
+        return {
+            "samples": int(self._count[position]),
+            "mean": float(self._mean[position]),
+            "std": math.sqrt(float(self._var[position])),
+            "reference": float(self._reference[position]),
+            "cusum_high": float(self._cusum_high[position]),
+            "cusum_low": float(self._cusum_low[position])
+        }
+
+
+def strongest_per_series(findings: Iterable[StreamingAnomaly]) -> Dict[str, List[StreamingAnomaly]]:
+    """Group findings by series, strongest (highest severity) first"""
+    grouped: Dict[str, List[StreamingAnomaly]] = {}
+    for finding in findings:
+        grouped.setdefault(finding.series, []).append(finding)
+    for series_findings in grouped.values():
+        series_findings.sort(key=lambda f: f.severity, reverse=True)
+    return grouped
+
+
+# ============================================================================
+# TRACE REPLAY
+# ============================================================================
+
+def load_trace(path: str) -> Iterator[Tuple[float, Dict[str, float]]]:
+    """
+    Read a recorded metric trace as ``(timestamp, {series: value})`` rows.
+
+    JSON lines: ``{"timestamp": 1700000000.0, "metrics": {"cpu": 12.5, ...}}``
+    (a flat object with a ``timestamp`` key also works). CSV: a ``timestamp``
+    column plus one column per series; empty cells are missing samples.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                timestamp = float(row.pop("timestamp"))
+                yield timestamp, {name: float(value) for name, value in row.items() if value not in ("", None)}
+        return
+
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            timestamp = float(record.pop("timestamp"))
+            metrics = record.get("metrics", record)
+            yield timestamp, {name: float(value) for name, value in metrics.items() if value is not None}
+
+
+def replay(bank: StreamingDetectorBank, rows: Iterable[Tuple[float, Mapping[str, float]]]) -> Dict[str, Any]:
+    """Feed trace rows through ``bank``; returns the findings and per-arrival latency"""
+    findings: List[StreamingAnomaly] = []
+    latencies: List[float] = []
+    for timestamp, values in rows:
+        start = time.perf_counter()
+        findings.extend(bank.update(values, timestamp))
+        latencies.append(time.perf_counter() - start)
+
+    latency = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "arrivals": len(latencies),
+        "series": len(bank),
+        "findings": findings,
+        "by_detector": {
+            detector: sum(1 for f in findings if f.detector == detector)
+            for detector in ("ewma", "mad", "seasonal", "cusum")
+        },
+        "latency_ms": {
+            "p50": float(np.percentile(latency, 50) * 1000),
+            "p99": float(np.percentile(latency, 99) * 1000),
+            "max": float(latency.max() * 1000)
+        }
+    }
@@ -0,0 +1,193 @@
+"""
+Subscription Index
+==================
+In-memory matching index for knowledge subscriptions.
+
+A knowledge item matches a subscription when its category is one of the
+subscription's categories, it shares at least one tag with the subscription
+(or the subscription has no tags), and every key in the subscription's filters
+has exactly that value in the item.
+
+Postings are kept per category and tag (category -> tag -> subscription ids,
+plus the untagged subscriptions of each category). Exact-match filters are
+grouped by their set of keys; within a group a subscription is found by
+hashing the item's values for those keys. Matching an item therefore costs one
+lookup per item tag and one per distinct filter key set, independent of the
+number of subscriptions.
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+def category_key(category: Any) -> Any:
+    """Enum categories and their string values index the same way"""
+    return getattr(category, "value", category)
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable form of a filter value (lists and dicts compare by content)"""
+    if isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+class IndexedSubscription:
+    """The parts of a subscription needed for matching and delivery"""
+
+    __slots__ = ("subscription_id", "agent_id", "categories", "tags", "filters",
+                 "filter_keys", "filter_values", "delivery_method")
+
+    def __init__(
+        self,
+        subscription_id: str,
+        agent_id: str,
+        categories: Iterable[Any],
+        tags: Optional[Iterable[str]] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        delivery_method: str = "push"
+    ):
+        self.subscription_id = subscription_id
+        self.agent_id = agent_id
+        self.categories = frozenset(category_key(c) for c in categories)
+        self.tags = frozenset(tags or ())
+        self.filters = dict(filters or {})
+        self.filter_keys: Tuple[str, ...] = tuple(sorted(self.filters))
+        self.filter_values = tuple(_freeze(self.filters[key]) for key in self.filter_keys)
+        self.delivery_method = delivery_method
+
+    @classmethod
+    def from_model(cls, subscription: Any) -> "IndexedSubscription":
+        return cls(
+            subscription_id=subscription.subscription_id,
+            agent_id=subscription.agent_id,
+            categories=subscription.categories or (),
+            tags=subscription.tags,
+            filters=subscription.filters,
+            delivery_method=subscription.delivery_method or "push"
+        )
+
+
+class _CategoryPostings:
+    __slots__ = ("by_tag", "untagged")
+
+    def __init__(self):
+        self.by_tag: Dict[str, Set[str]] = defaultdict(set)
+        self.untagged: Set[str] = set()
+
+
+class SubscriptionIndex:
+    """
+    Category/tag postings plus exact-match filter hashes
+
+    Usage:
+        index = SubscriptionIndex()
+        index.add(IndexedSubscription("s1", "agent-a", ["code_patterns"], ["python"]))
+        for subscription in index.match("code_patterns", {"tags": ["python"]}):
+            ...
+    """
+
+    def __init__(self):
+        self._subscriptions: Dict[str, IndexedSubscription] = {}
+        self._postings: Dict[Any, _CategoryPostings] = {}
+        self._unfiltered: Set[str] = set()
+        # filter key set -> hash of values -> subscription ids
+        self._filters: Dict[Tuple[str, ...], Dict[Tuple, Set[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def __contains__(self, subscription_id: str) -> bool:
+        return subscription_id in self._subscriptions
+
+    def get(self, subscription_id: str) -> Optional[IndexedSubscription]:
+        return self._subscriptions.get(subscription_id)
+
+    def add(self, subscription: IndexedSubscription):
+        """Index a subscription, replacing any previous version with the same id"""
+        self.remove(subscription.subscription_id)
+        sub_id = subscription.subscription_id
+        self._subscriptions[sub_id] = subscription
+
+        for category in subscription.categories:
+            postings = self._postings.get(category)
+            if postings is None:
+                postings = self._postings[category] = _CategoryPostings()
+            if subscription.tags:
+                for tag in subscription.tags:
+                    postings.by_tag[tag].add(sub_id)
+            else:
+                postings.untagged.add(sub_id)
+
+        if subscription.filter_keys:
+            group = self._filters.setdefault(subscription.filter_keys, defaultdict(set))
+            group[subscription.filter_values].add(sub_id)
+        else:
+            self._unfiltered.add(sub_id)
+
+    def remove(self, subscription_id: str) -> Optional[IndexedSubscription]:
+        subscription = self._subscriptions.pop(subscription_id, None)
+        if subscription is None:
+            return None
+
+        for category in subscription.categories:
+            postings = self._postings[category]
+            for tag in subscription.tags:
+                ids = postings.by_tag[tag]
+                ids.discard(subscription_id)
+                if not ids:
+                    del postings.by_tag[tag]
+            postings.untagged.discard(subscription_id)
+            if not postings.by_tag and not postings.untagged:
+                del self._postings[category]
+
+        if subscription.filter_keys:
+            group = self._filters[subscription.filter_keys]
+            ids = group[subscription.filter_values]
+            ids.discard(subscription_id)
+            if not ids:
+                del group[subscription.filter_values]
+            if not group:
+                del self._filters[subscription.filter_keys]
+        else:
+            self._unfiltered.discard(subscription_id)
+        return subscription
+
+    def match(self, category: Any, knowledge_data: Dict[str, Any]) -> List[IndexedSubscription]:
+        """Subscriptions that a knowledge item in ``category`` should be delivered to"""
+        postings = self._postings.get(category_key(category))
+        if postings is None:
+            return []
+
+        candidates = set(postings.untagged)
+        for tag in set(knowledge_data.get("tags") or ()):
+            ids = postings.by_tag.get(tag)
+            if ids:
+                candidates |= ids
+        if not candidates:
+            return []
+
+        passing = candidates & self._unfiltered
+        for keys, group in self._filters.items():
+            try:
+                ids = group.get(tuple(_freeze(knowledge_data.get(key)) for key in keys))
+            except TypeError:
+                continue
+            if ids:
+                passing |= candidates & ids
+        return [self._subscriptions[sub_id] for sub_id in passing]
+
+    def agents(self, category: Any) -> Set[str]:
+        """Agents with at least one subscription to ``category``"""
+        postings = self._postings.get(category_key(category))
+        if postings is None:
+            return set()
+        ids = set(postings.untagged).union(*postings.by_tag.values())
+        return {self._subscriptions[sub_id].agent_id for sub_id in ids}
+
+    def categories(self) -> FrozenSet[Any]:
+        return frozenset(self._postings)
@@ -0,0 +1,294 @@
+"""
+Task Dispatcher
+===============
+Pull-based matching of queued tasks to agents with free capacity.
+
+Agents advertise free slots (``max_load`` minus the tasks they are running).
+Tasks wait in one priority queue per capability. A submitted task is matched
+at once if an agent with that capability has a free slot; otherwise it waits
+until an agent frees one, and that agent pulls the highest-priority task among
+its capabilities. Nothing polls, and nothing scans or sorts the registry per
+task: agents with free slots are kept per capability and handed out
+round-robin, which spreads load like least-loaded selection does.
+
+Load accounting is a plain counter per agent, changed synchronously on the
+event loop, so it needs no lock. Every change is reported to
+``on_load_change(agent_id, load)`` (e.g. ``AgentRegistry.set_load``) or,
+without one, written to the agent record's ``current_load``, so registry
+statistics and rankings stay accurate.
+
+The dispatcher never runs anything itself: ``submit``, ``submit_many``,
+``release`` and ``sync`` return the ``(item, AgentSlots)`` assignments the
+caller should start now.
+"""
+
+import heapq
+import itertools
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+@dataclass
+class AgentSlots:
+    """An agent's advertised capacity"""
+    agent_id: str
+    capabilities: Tuple[str, ...]
+    capacity: int
+    in_use: int = 0
+    record: Any = None
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.in_use
+
+    def eligible(self, min_health_score: float) -> bool:
+        record = self.record
+        return record is None or (record.is_healthy and record.health_score >= min_health_score)
+
+
+Assignment = Tuple[Any, AgentSlots]
+
+
+class TaskDispatcher:
+    """
+    Per-capability priority queues matched against advertised agent slots
+
+    Usage:
+        dispatcher = TaskDispatcher(min_health_score=0.6)
+        dispatcher.sync(await registry.get_all_agents())
+        for item, slots in dispatcher.submit(task_id, request, "code_review", priority=3):
+            start(item, slots.agent_id)
+        ...
+        for item, slots in dispatcher.release(agent_id):  # when a task finishes
+            start(item, slots.agent_id)
+    """
+
+    def __init__(
+        self,
+        min_health_score: float = 0.0,
+        max_in_flight: Optional[int] = None,
+        on_load_change: Optional[Callable[[str, int], Any]] = None
+    ):
+        self.min_health_score = min_health_score
+        self.max_in_flight = max_in_flight
+        self.on_load_change = on_load_change
+        self.in_flight = 0
+
+        self._agents: Dict[str, AgentSlots] = {}
+        self._by_capability: Dict[str, Set[str]] = {}
+        self._free: Dict[str, "OrderedDict[str, AgentSlots]"] = {}
+
+        # capability -> heap of (-priority, sequence, key, item)
+        self._queues: Dict[str, List[Tuple[int, int, str, Any]]] = {}
+        self._queued: Set[str] = set()
+        self._discarded: Set[str] = set()
+        self._sequence = itertools.count()
+        # Capabilities left with work and free agents when max_in_flight was hit
+        self._starved: Set[str] = set()
+
+        self.stats = {"submitted": 0, "dispatched_immediately": 0, "dispatched_on_release": 0}
+
+    # =========================================================================
+    # AGENTS
+    # =========================================================================
+
+    def update_agent(
+        self,
+        agent_id: str,
+        capabilities: Iterable[str],
+        capacity: int,
+        record: Any = None
+    ) -> List[Assignment]:
+        """Register or refresh an agent's capacity; returns the tasks it can take now"""
+        self._update(agent_id, capabilities, capacity, record)
+        return self._drain(self._agents[agent_id].capabilities)
+
+    def _update(self, agent_id: str, capabilities: Iterable[str], capacity: int, record: Any) -> Tuple[str, ...]:
+        capabilities = tuple(capabilities)
+        slots = self._agents.get(agent_id)
+        if slots is None:
+            slots = self._agents[agent_id] = AgentSlots(agent_id, capabilities, capacity, record=record)
+        else:
+            if slots.capabilities != capabilities:
+                self._forget(slots)
+                slots.capabilities = capabilities
+            slots.capacity = capacity
+            slots.record = record
+            self._set_in_use(slots, slots.in_use)
+
+        for capability in capabilities:
+            self._by_capability.setdefault(capability, set()).add(agent_id)
+        self._advertise(slots)
+        return capabilities
+
+    def remove_agent(self, agent_id: str) -> bool:
+        slots = self._agents.pop(agent_id, None)
+        if slots is None:
+            return False
+        self._forget(slots)
+        return True
+
+    def sync(self, records: Iterable[Any]) -> List[Assignment]:
+        """Mirror a registry snapshot (AgentRecords): add, refresh and drop agents"""
+        seen: Set[str] = set()
+        capabilities: Set[str] = set()
+        for record in records:
+            seen.add(record.agent_id)
+            capabilities.update(self._update(record.agent_id, record.capabilities, record.max_load, record))
+        for agent_id in [agent_id for agent_id in self._agents if agent_id not in seen]:
+            self.remove_agent(agent_id)
+        return self._drain(capabilities)
+
+    def has_capability(self, capability: str) -> bool:
+        """True if any known agent offers ``capability`` (busy or not)"""
+        return bool(self._by_capability.get(capability))
+
+    def free_slots(self, capability: str) -> int:
+        return sum(slots.free for slots in self._free.get(capability, {}).values())
+
+    def _set_in_use(self, slots: AgentSlots, in_use: int):
+        slots.in_use = in_use
+        if self.on_load_change is not None:
+            self.on_load_change(slots.agent_id, in_use)
+        elif slots.record is not None:
+            slots.record.current_load = in_use
+
+    def _advertise(self, slots: AgentSlots):
+        available = slots.free > 0 and slots.eligible(self.min_health_score)
+        for capability in slots.capabilities:
+            free = self._free.setdefault(capability, OrderedDict())
+            if available:
+                free.setdefault(slots.agent_id, slots)
+            else:
+                free.pop(slots.agent_id, None)
+
+    def _withdraw(self, slots: AgentSlots):
+        for capability in slots.capabilities:
+            self._free.get(capability, {}).pop(slots.agent_id, None)
+
+    def _forget(self, slots: AgentSlots):
+        self._withdraw(slots)
+        for capability in slots.capabilities:
+            agents = self._by_capability.get(capability)
+            if agents is not None:
+                agents.discard(slots.agent_id)
+                if not agents:
+                    del self._by_capability[capability]
+
+    # =========================================================================
+    # TASKS
+    # =========================================================================
+
+    def submit(self, key: str, item: Any, capability: str, priority: int = 0) -> List[Assignment]:
+        """Queue one task; returns its assignment if an agent can take it now"""
+        self._push(key, item, capability, priority)
+        assignments = self._drain((capability,))
+        self.stats["dispatched_immediately"] += len(assignments)
+        return assignments
+
+    def submit_many(self, entries: Iterable[Tuple[str, Any, str, int]]) -> List[Assignment]:
+        """Queue ``(key, item, capability, priority)`` entries, then match them in priority order"""
+        capabilities: Set[str] = set()
+        for key, item, capability, priority in entries:
+            self._push(key, item, capability, priority)
+            capabilities.add(capability)
+        assignments = self._drain(capabilities)
+        self.stats["dispatched_immediately"] += len(assignments)
+        return assignments
+
+    def release(self, agent_id: str) -> List[Assignment]:
+        """Free one of the agent's slots; returns the queued tasks that can start now"""
+        self.in_flight = max(0, self.in_flight - 1)
+
+        slots = self._agents.get(agent_id)
+        capabilities: List[str] = []
+        if slots is not None:
+            self._set_in_use(slots, max(0, slots.in_use - 1))
+            self._advertise(slots)
+            capabilities.extend(slots.capabilities)
+        if self._starved:
+            # Room opened up globally, not just on this agent
+            capabilities.extend(self._starved)
+            self._starved.clear()
+
+        assignments = self._drain(capabilities)
+        self.stats["dispatched_on_release"] += len(assignments)
+        return assignments
+
+    def discard(self, key: str) -> bool:
+        """Drop a queued task (it is skipped when it reaches the head of its queue)"""
+        if key not in self._queued:
+            return False
+        self._queued.discard(key)
+        self._discarded.add(key)
+        return True
+
+    def take_orphaned(self) -> List[Any]:
+        """Remove and return queued tasks whose capability no known agent offers"""
+        orphaned = []
+        for capability in [c for c in self._queues if not self._by_capability.get(c)]:
+            for _, _, key, item in self._queues.pop(capability):
+                if key in self._discarded:
+                    self._discarded.discard(key)
+                else:
+                    self._queued.discard(key)
+                    orphaned.append(item)
+        return orphaned
+
+    def queued(self) -> int:
+        return len(self._queued)
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {capability: len(queue) for capability, queue in self._queues.items() if queue}
+
+    def _push(self, key: str, item: Any, capability: str, priority: int):
+        self._discarded.discard(key)
+        self._queued.add(key)
+        heapq.heappush(self._queues.setdefault(capability, []), (-priority, next(self._sequence), key, item))
+        self.stats["submitted"] += 1
+
+    def _has_work(self, capability: str) -> bool:
+        """Pop discarded tasks off the head; True if a live task is waiting"""
+        queue = self._queues.get(capability)
+        while queue and queue[0][2] in self._discarded:
+            self._discarded.discard(heapq.heappop(queue)[2])
+        if queue:
+            return True
+        self._queues.pop(capability, None)
+        return False
+
+    def _drain(self, capabilities: Iterable[str]) -> List[Assignment]:
+        # Serve the capability whose head task ranks highest first
+        pending = sorted((c for c in set(capabilities) if self._has_work(c)), key=lambda c: self._queues[c][0][:2])
+        assignments: List[Assignment] = []
+        for position, capability in enumerate(pending):
+            while self._has_work(capability):
+                if self.max_in_flight is not None and self.in_flight >= self.max_in_flight:
+                    self._starved.update(pending[position:])
+                    return assignments
+                slots = self._claim(capability)
+                if slots is None:
+                    break
+                _, _, key, item = heapq.heappop(self._queues[capability])
+                self._queued.discard(key)
+                self.in_flight += 1
+                assignments.append((item, slots))
+        return assignments
+
+    def _claim(self, capability: str) -> Optional[AgentSlots]:
+        """Take a slot on the next agent with room, rotating through them"""
+        free = self._free.get(capability)
+        while free:
+            agent_id, slots = next(iter(free.items()))
+            if not slots.eligible(self.min_health_score):
+                # Re-advertised by the next update_agent/sync once it recovers
+                self._withdraw(slots)
+                continue
+            self._set_in_use(slots, slots.in_use + 1)
+            if slots.free <= 0:
+                self._withdraw(slots)
+            else:
+                free.move_to_end(agent_id)
+            return slots
+        return None
@@ -6,13 +6,19 @@ Manages task distribution, retry logic, and result aggregation
 import asyncio
 import time
 import uuid
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import structlog
 
-from .agent_registry import AgentRegistry
-from .agent_discovery import AgentDiscovery, DiscoveryRequest, DiscoveryStrategy
+try:
+    from .agent_registry import AgentRegistry
+    from .agent_discovery import AgentDiscovery
+    from .task_dispatcher import AgentSlots, TaskDispatcher
+except ImportError:
+    from agent_registry import AgentRegistry
+    from agent_discovery import AgentDiscovery
+    from task_dispatcher import AgentSlots, TaskDispatcher
 
 logger = structlog.get_logger(__name__)
 
@@ -88,7 +94,7 @@ class TaskOrchestrator:
     Task Orchestrator
     
     Features:
-    - Intelligent agent selection
+    - Pull-based dispatch: agents take work as their slots free up
     - Automatic retry with exponential backoff
     - Timeout handling
     - Circuit breaker integration
@@ -101,23 +107,30 @@ class TaskOrchestrator:
         self,
         agent_registry: AgentRegistry,
         agent_discovery: AgentDiscovery,
-        max_concurrent_tasks: int = 100
+        max_concurrent_tasks: int = 100,
+        min_health_score: float = 0.6,
+        agent_refresh_interval: float = 5.0
     ):
         self.registry = agent_registry
         self.discovery = agent_discovery
         self.max_concurrent_tasks = max_concurrent_tasks
+        self.agent_refresh_interval = agent_refresh_interval
         
         # Task tracking
         self._active_tasks: Dict[str, TaskContext] = {}
         self._completed_tasks: Dict[str, TaskResult] = {}
-        self._task_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
         
-        # Locks and semaphores
-        self._semaphore = asyncio.Semaphore(max_concurrent_tasks)
-        self._lock = asyncio.Lock()
+        # Per-capability task queues matched against free agent slots
+        self.dispatcher = TaskDispatcher(
+            min_health_score=min_health_score,
+            max_in_flight=max_concurrent_tasks,
+            on_load_change=agent_registry.set_load
+        )
         
-        # Background workers
-        self._workers: List[asyncio.Task] = []
+        # Running tasks, pending retries and the agent refresh loop
+        self._running: Set[asyncio.Task] = set()
+        self._retry_timers: Dict[str, asyncio.TimerHandle] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
         self._shutdown_event = asyncio.Event()
         
         # Callbacks
@@ -125,26 +138,59 @@ class TaskOrchestrator:
         
         logger.info("Task Orchestrator initialized", max_concurrent=max_concurrent_tasks)
     
-    async def start(self, num_workers: int = 10):
-        """Start task workers"""
-        for i in range(num_workers):
-            worker = asyncio.create_task(self._worker_loop(f"worker-{i}"))
-            self._workers.append(worker)
+    async def start(self, num_workers: Optional[int] = None):
+        """
+        Load agent capacity from the registry and keep it in sync
+        
+        Tasks run as soon as an agent has a free slot, so there is no worker
+        pool to size; ``num_workers`` is accepted for compatibility only.
+        """
+        await self.refresh_agents()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
         
-        logger.info(f"Task Orchestrator started with {num_workers} workers")
+        logger.info("Task Orchestrator started", agents=len(self.dispatcher._agents))
     
     async def stop(self):
         """Stop task orchestrator"""
         self._shutdown_event.set()
         
-        # Cancel all workers
-        for worker in self._workers:
-            worker.cancel()
+        for timer in self._retry_timers.values():
+            timer.cancel()
+        self._retry_timers.clear()
         
-        await asyncio.gather(*self._workers, return_exceptions=True)
+        # Cancel the refresh loop and running tasks
+        tasks = list(self._running)
+        if self._refresh_task:
+            tasks.append(self._refresh_task)
+        for task in tasks:
+            task.cancel()
+        
+        await asyncio.gather(*tasks, return_exceptions=True)
         
         logger.info("Task Orchestrator stopped")
     
+    async def refresh_agents(self):
+        """Re-read agent capacity and health from the registry"""
+        records = await self.registry.get_all_agents()
+        self._start_assignments(self.dispatcher.sync(records))
+        
+        # Tasks waiting for a capability no agent offers any more
+        for request in self.dispatcher.take_orphaned():
+            context = self._active_tasks.get(request.task_id)
+            if context:
+                await self._handle_task_failure(context, "No available agent found for capability")
+    
+    async def _refresh_loop(self):
+        """Pick up registrations, recoveries and capacity changes"""
+        while not self._shutdown_event.is_set():
+            try:
+                await asyncio.sleep(self.agent_refresh_interval)
+                await self.refresh_agents()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Agent refresh error: {e}", exc_info=True)
+    
     # =========================================================================
     # TASK SUBMISSION
     # =========================================================================
@@ -159,16 +205,25 @@ class TaskOrchestrator:
         Returns:
             Task ID
         """
-        async with self._lock:
-            context = TaskContext(
-                request=request,
-                status=TaskStatus.QUEUED
-            )
-            self._active_tasks[request.task_id] = context
+        self._active_tasks[request.task_id] = TaskContext(
+            request=request,
+            status=TaskStatus.QUEUED
+        )
         
-        # Add to priority queue
-        priority = request.priority.value
-        await self._task_queue.put((-priority, time.time(), request))
+        if not self.dispatcher.has_capability(request.capability):
+            # Maybe registered since the last refresh
+            await self.refresh_agents()
+            if not self.dispatcher.has_capability(request.capability):
+                await self._handle_task_failure(
+                    self._active_tasks[request.task_id],
+                    "No available agent found for capability"
+                )
+                return request.task_id
+        
+        # Runs now if an agent has a free slot, otherwise waits for one
+        self._start_assignments(self.dispatcher.submit(
+            request.task_id, request, request.capability, request.priority.value
+        ))
         
         logger.info(
             f"Task submitted",
@@ -181,30 +236,58 @@ class TaskOrchestrator:
         return request.task_id
     
     async def submit_batch(self, requests: List[TaskRequest]) -> List[str]:
-        """Submit multiple tasks"""
-        task_ids = []
+        """Submit multiple tasks, queued in one operation and dispatched by priority"""
+        requests = list(requests)
+        for request in requests:
+            self._active_tasks[request.task_id] = TaskContext(
+                request=request,
+                status=TaskStatus.QUEUED
+            )
+        
+        if any(not self.dispatcher.has_capability(r.capability) for r in requests):
+            await self.refresh_agents()
+        
+        dispatchable = []
         for request in requests:
-            task_id = await self.submit_task(request)
-            task_ids.append(task_id)
-        return task_ids
+            if self.dispatcher.has_capability(request.capability):
+                dispatchable.append(request)
+            else:
+                await self._handle_task_failure(
+                    self._active_tasks[request.task_id],
+                    "No available agent found for capability"
+                )
+        
+        self._start_assignments(self.dispatcher.submit_many(
+            (request.task_id, request, request.capability, request.priority.value)
+            for request in dispatchable
+        ))
+        
+        logger.info(f"Task batch submitted", tasks=len(requests), queued=self.dispatcher.queued())
+        
+        return [request.task_id for request in requests]
     
     async def cancel_task(self, task_id: str) -> bool:
         """Cancel task"""
-        async with self._lock:
-            if task_id in self._active_tasks:
-                context = self._active_tasks[task_id]
-                context.status = TaskStatus.CANCELLED
-                
-                # Create result
-                result = TaskResult(
-                    task_id=task_id,
-                    status=TaskStatus.CANCELLED
-                )
-                self._completed_tasks[task_id] = result
-                del self._active_tasks[task_id]
-                
-                logger.info(f"Task cancelled", task_id=task_id)
-                return True
+        if task_id in self._active_tasks:
+            context = self._active_tasks[task_id]
+            context.status = TaskStatus.CANCELLED
+            
+            # Still queued or waiting to retry: it never reaches an agent
+            self.dispatcher.discard(task_id)
+            timer = self._retry_timers.pop(task_id, None)
+            if timer:
+                timer.cancel()
+            
+            # Create result
+            result = TaskResult(
+                task_id=task_id,
+                status=TaskStatus.CANCELLED
+            )
+            self._completed_tasks[task_id] = result
+            del self._active_tasks[task_id]
+            
+            logger.info(f"Task cancelled", task_id=task_id)
+            return True
         
         return False
     
@@ -212,81 +295,45 @@ class TaskOrchestrator:
     # TASK EXECUTION
     # =========================================================================
     
-    async def _worker_loop(self, worker_id: str):
-        """Worker loop for processing tasks"""
-        logger.info(f"Worker {worker_id} started")
-        
-        while not self._shutdown_event.is_set():
-            try:
-                # Get task from queue with timeout
-                try:
-                    _, _, request = await asyncio.wait_for(
-                        self._task_queue.get(),
-                        timeout=1.0
-                    )
-                except asyncio.TimeoutError:
-                    continue
-                
-                # Execute task
-                async with self._semaphore:
-                    await self._execute_task(request)
-                
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Worker {worker_id} error: {e}", exc_info=True)
-        
-        logger.info(f"Worker {worker_id} stopped")
+    def _start_assignments(self, assignments: List[Tuple[TaskRequest, AgentSlots]]):
+        """Run each task the dispatcher matched to an agent slot"""
+        for request, slots in assignments:
+            task = asyncio.create_task(self._execute_task(request, slots))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
     
-    async def _execute_task(self, request: TaskRequest):
-        """Execute single task with retry logic"""
-        context = self._active_tasks.get(request.task_id)
-        if not context:
-            logger.warning(f"Task context not found: {request.task_id}")
-            return
-        
-        context.status = TaskStatus.ROUTING
-        context.started_at = time.time()
-        
-        # Discover agent
-        discovery_request = DiscoveryRequest(
-            capability=request.capability,
-            strategy=DiscoveryStrategy.LEAST_LOADED,
-            min_health_score=0.6
-        )
-        
-        agent = await self.discovery.discover_agent(discovery_request)
-        
-        if not agent:
-            await self._handle_task_failure(
-                context,
-                "No available agent found for capability"
-            )
-            return
-        
-        context.current_agent_id = agent.agent_id
-        context.status = TaskStatus.EXECUTING
-        
-        # Execute on agent
+    async def _execute_task(self, request: TaskRequest, slots: AgentSlots):
+        """Execute single task on the agent slot it was given"""
+        agent_id = slots.agent_id
         try:
-            # Increment agent load
-            await self.registry.increment_load(agent.agent_id)
-            
-            # Execute task (placeholder - actual execution via API call)
-            result = await self._execute_on_agent(agent, request)
+            context = self._active_tasks.get(request.task_id)
+            if not context:
+                logger.warning(f"Task context not found: {request.task_id}")
+                return
             
-            # Task completed successfully
-            await self._handle_task_success(context, result, agent.agent_id)
+            agent = slots.record or await self.registry.get_agent(agent_id)
+            context.current_agent_id = agent_id
+            context.status = TaskStatus.EXECUTING
+            if context.started_at is None:
+                context.started_at = time.time()
             
-        except asyncio.TimeoutError:
-            await self._handle_task_timeout(context, agent.agent_id)
+            # Execute on agent
+            try:
+                # Execute task (placeholder - actual execution via API call)
+                result = await self._execute_on_agent(agent, request)
+                
+                # Task completed successfully
+                await self._handle_task_success(context, result, agent_id)
             
-        except Exception as e:
-            await self._handle_task_error(context, str(e), agent.agent_id)
+            except asyncio.TimeoutError:
+                await self._handle_task_timeout(context, agent_id)
             
+            except Exception as e:
+                await self._handle_task_error(context, str(e), agent_id)
+        
         finally:
-            # Decrement agent load
-            await self.registry.decrement_load(agent.agent_id)
+            # Free the slot; the agent pulls its next queued task
+            self._start_assignments(self.dispatcher.release(agent_id))
     
     async def _execute_on_agent(
         self,
@@ -332,9 +379,8 @@ class TaskOrchestrator:
             retries=context.retry_count
         )
         
-        async with self._lock:
-            self._completed_tasks[context.request.task_id] = task_result
-            del self._active_tasks[context.request.task_id]
+        self._completed_tasks[context.request.task_id] = task_result
+        self._active_tasks.pop(context.request.task_id, None)
         
         # Execute callbacks
         await self._execute_callbacks(context.request.task_id, task_result)
@@ -375,15 +421,23 @@ class TaskOrchestrator:
                 error=error
             )
             
-            # Re-queue after delay
-            await asyncio.sleep(delay)
-            priority = context.request.priority.value
-            await self._task_queue.put(
-                (-priority, time.time(), context.request)
+            # Re-queue after delay without holding the agent slot
+            self._retry_timers[context.request.task_id] = asyncio.get_running_loop().call_later(
+                delay, self._requeue, context.request
             )
         else:
             await self._handle_task_failure(context, error)
     
+    def _requeue(self, request: TaskRequest):
+        """Put a retried task back in its capability queue"""
+        self._retry_timers.pop(request.task_id, None)
+        if request.task_id not in self._active_tasks:
+            return
+        self._active_tasks[request.task_id].status = TaskStatus.QUEUED
+        self._start_assignments(self.dispatcher.submit(
+            request.task_id, request, request.capability, request.priority.value
+        ))
+    
     async def _handle_task_timeout(self, context: TaskContext, agent_id: str):
         """Handle task timeout"""
         await self.registry.record_failure(agent_id)
@@ -401,9 +455,8 @@ class TaskOrchestrator:
             retries=context.retry_count
         )
         
-        async with self._lock:
-            self._completed_tasks[context.request.task_id] = task_result
-            del self._active_tasks[context.request.task_id]
+        self._completed_tasks[context.request.task_id] = task_result
+        self._active_tasks.pop(context.request.task_id, None)
         
         await self._execute_callbacks(context.request.task_id, task_result)
         
@@ -439,9 +492,13 @@ class TaskOrchestrator:
         return {
             'active_tasks': len(self._active_tasks),
             'completed_tasks': len(self._completed_tasks),
-            'queued_tasks': self._task_queue.qsize(),
-            'workers': len(self._workers),
-            'max_concurrent': self.max_concurrent_tasks
+            'queued_tasks': self.dispatcher.queued(),
+            'queued_by_capability': self.dispatcher.queue_depths(),
+            'running_tasks': self.dispatcher.in_flight,
+            'retrying_tasks': len(self._retry_timers),
+            'agents': len(self.dispatcher._agents),
+            'max_concurrent': self.max_concurrent_tasks,
+            'dispatch': dict(self.dispatcher.stats)
         }
     
     # =========================================================================
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Task Queue Benchmark
+Throughput of the Redis task queue as workers are added, on fakeredis.
+Also replays the previous poll-and-zrem loop with the same workers to count
+tasks executed more than once.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+import fakeredis
+
+from redis_task_queue import QueueWorker, RedisTaskQueue
+
+
+async def benchmark_workers(workers: int, tasks: int, handler_ms: float,
+                            concurrency: int, batch_size: int) -> Dict[str, Any]:
+    """Drain ``tasks`` I/O-bound tasks with ``workers`` workers sharing one queue"""
+    server = fakeredis.FakeServer()
+    producer = RedisTaskQueue(fakeredis.FakeAsyncRedis(server=server), prefix="bench:")
+    executions: Counter = Counter()
+
+    async def handler(payload):
+        executions[payload["n"]] += 1
+        await asyncio.sleep(handler_ms / 1000)
+
+    for offset in range(0, tasks, 500):
+        await producer.enqueue_many([
+            {"type": "work", "payload": {"n": n}} for n in range(offset, min(offset + 500, tasks))
+        ])
+
+    pool = [
+        QueueWorker(
+            RedisTaskQueue(fakeredis.FakeAsyncRedis(server=server), prefix="bench:"),
+            {"work": handler},
+            concurrency={"work": concurrency},
+            batch_size=batch_size
+        )
+        for _ in range(workers)
+    ]
+    start = time.perf_counter()
+    runs = [asyncio.create_task(worker.run()) for worker in pool]
+    while sum(worker.stats["completed"] for worker in pool) < tasks:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    for worker in pool:
+        await worker.stop()
+    await asyncio.gather(*runs)
+
+    return {
+        "mode": "reliable",
+        "workers": workers,
+        "tasks": tasks,
+        "tasks_per_second": tasks / elapsed,
+        "duplicate_executions": sum(count - 1 for count in executions.values()),
+        "missing": tasks - len(executions)
+    }
+
+
+async def benchmark_legacy(workers: int, tasks: int, handler_ms: float) -> Dict[str, Any]:
+    """The previous loop: ZRANGE 0 9, run each task, then ZREM it"""
+    server = fakeredis.FakeServer()
+    redis = fakeredis.FakeAsyncRedis(server=server)
+    key = "bench:legacy"
+    executions: Counter = Counter()
+    await redis.zadd(key, {json.dumps({"n": n}): 5 + n / 10 ** 6 for n in range(tasks)})
+
+    async def worker():
+        client = fakeredis.FakeAsyncRedis(server=server)
+        while True:
+            batch = await client.zrange(key, 0, 9)
+            if not batch:
+                return
+            for task_json in batch:
+                executions[json.loads(task_json)["n"]] += 1
+                await asyncio.sleep(handler_ms / 1000)
+                await client.zrem(key, task_json)
+            await asyncio.sleep(0.1)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(workers)])
+    elapsed = time.perf_counter() - start
+    return {
+        "mode": "legacy",
+        "workers": workers,
+        "tasks": tasks,
+        "tasks_per_second": tasks / elapsed,
+        "duplicate_executions": sum(count - 1 for count in executions.values()),
+        "missing": tasks - len(executions)
+    }
+
+
+async def main():
+    """Run the task queue benchmark"""
+    parser = argparse.ArgumentParser(description="Redis task queue scaling benchmark")
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--handler-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=8, help="Per-worker concurrency for the task type")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print("Starting task queue benchmark...")
+    results: List[Dict[str, Any]] = []
+    for workers in args.workers:
+        result = await benchmark_workers(workers, args.tasks, args.handler_ms, args.concurrency, args.batch_size)
+        results.append(result)
+        print(f"Reliable queue, {workers} workers: {result['tasks_per_second']:.0f} tasks/s, "
+              f"{result['duplicate_executions']} duplicates")
+
+    legacy_tasks = min(args.tasks, 200)
+    for workers in (1, 4):
+        result = await benchmark_legacy(workers, legacy_tasks, args.handler_ms)
+        results.append(result)
+        print(f"Legacy loop, {workers} workers: {result['tasks_per_second']:.0f} tasks/s, "
+              f"{result['duplicate_executions']} duplicates of {legacy_tasks}")
+
+    with open("task_queue_benchmark.json", "w") as f:
+        json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
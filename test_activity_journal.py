@@ -0,0 +1,98 @@
+"""Tests for the append-only activity journal"""
+
+import os
+import pytest
+
+from activity_journal import ActivityJournal
+
+
+class _Sink:
+    def __init__(self):
+        self.rows = []
+        self.fail = False
+
+    async def __call__(self, records):
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.rows.extend(records)
+
+
+def _append(journal, count, start=0):
+    return [journal.append({"n": n}) for n in range(start, start + count)]
+
+
+class TestGroupCommit:
+    """Appends, fsync groups and draining"""
+
+    async def test_commit_and_drain_in_order(self, tmp_path):
+        sink = _Sink()
+        journal = ActivityJournal(str(tmp_path), sink=sink, drain_batch_size=7)
+        seqs = _append(journal, 50)
+        assert seqs == list(range(1, 51))
+
+        await journal.commit()
+        assert journal.durable_seq == 50
+        # Many appends share one fsync
+        assert journal.stats["group_commits"] < 50
+
+        assert await journal.drain() == 50
+        assert [row["n"] for row in sink.rows] == list(range(50))
+        assert journal.get_stats()["backlog"] == 0
+        await journal.close()
+
+    async def test_outage_keeps_memory_bounded_and_replays_from_disk(self, tmp_path):
+        sink = _Sink()
+        journal = ActivityJournal(str(tmp_path), sink=sink, ring_capacity=10, drain_batch_size=8)
+        sink.fail = True
+        _append(journal, 40)
+        await journal.commit()
+        with pytest.raises(ConnectionError):
+            await journal.drain()
+        assert journal.get_stats()["ring_size"] == 10
+
+        sink.fail = False
+        _append(journal, 5, start=40)
+        await journal.flush()
+        assert [row["n"] for row in sink.rows] == list(range(45))
+        assert journal.stats["disk_reads"] > 0
+        await journal.close()
+
+
+class TestRecovery:
+    """Restart, torn tails and segment cleanup"""
+
+    async def test_undrained_records_survive_restart(self, tmp_path):
+        sink = _Sink()
+        journal = ActivityJournal(str(tmp_path), sink=sink, drain_batch_size=4)
+        _append(journal, 6)
+        await journal.flush()
+        _append(journal, 6, start=6)
+        await journal.close()
+
+        # Simulate a crash mid-write
+        segment = sorted(name for name in os.listdir(tmp_path) if name.endswith(".seg"))[-1]
+        with open(tmp_path / segment, "ab") as f:
+            f.write(b'[13,{"n":')
+
+        restarted_sink = _Sink()
+        restarted = ActivityJournal(str(tmp_path), sink=restarted_sink, drain_batch_size=4)
+        assert restarted.last_seq == 12
+        assert restarted.last_record == {"n": 11}
+        await restarted.drain()
+        assert [row["n"] for row in restarted_sink.rows] == list(range(6, 12))
+
+        assert restarted.append({"n": 12}) == 13
+        await restarted.flush()
+        assert restarted_sink.rows[-1] == {"n": 12}
+        await restarted.close()
+
+    async def test_drained_segments_are_deleted(self, tmp_path):
+        journal = ActivityJournal(str(tmp_path), sink=_Sink(), segment_max_bytes=64)
+        for n in range(20):
+            journal.append({"n": n, "pad": "x" * 20})
+            await journal.commit()
+        assert journal.get_stats()["segments"] > 5
+
+        await journal.drain()
+        assert journal.get_stats()["segments"] == 1
+        await journal.close()
@@ -0,0 +1,148 @@
+"""Tests for incremental dashboard aggregates and the versioned result cache"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+
+from analytics_serving import AnalyticsAggregates, AnalyticsEvents, VersionedResultCache, parse_timeframe
+
+
+class TestAnalyticsAggregates:
+    """Delta maintenance and timeframe queries"""
+
+    def test_deltas_follow_completion_reopen_and_delete(self):
+        now = time.time()
+        aggregates = AnalyticsAggregates()
+        aggregates.apply_many([
+            {"type": "project_created", "project_id": "p1", "status": "active", "timestamp": now - 10 * 86400},
+            {"type": "task_created", "task_id": "old", "project_id": "p1", "team_id": "core",
+             "timestamp": now - 10 * 86400},
+            {"type": "task_created", "task_id": "t1", "project_id": "p1", "team_id": "core", "user_id": "u1",
+             "timestamp": now - 3600},
+            {"type": "task_created", "task_id": "t2", "project_id": "p1", "team_id": "web", "user_id": "u2",
+             "timestamp": now - 60},
+            {"type": "task_updated", "task_id": "t1", "status": "completed", "execution_time": 4.0, "timestamp": now},
+        ])
+        assert aggregates.version == 1
+
+        overview = aggregates.overview("7d", now)
+        assert (overview["total_tasks"], overview["completed_tasks"], overview["active_users"]) == (2, 1, 2)
+        assert overview["active_projects"] == 1 and overview["total_teams"] == 2
+        assert overview["avg_execution_time"] == 4.0
+        assert aggregates.overview("30d", now)["total_tasks"] == 3
+
+        # Reopening and deleting take their earlier deltas back out
+        aggregates.apply({"type": "task_updated", "task_id": "t1", "status": "in_progress", "timestamp": now})
+        aggregates.apply({"type": "task_deleted", "task_id": "t2"})
+        overview = aggregates.overview("7d", now)
+        assert (overview["total_tasks"], overview["completed_tasks"], overview["avg_execution_time"]) == (1, 0, 0.0)
+        # "web" lost its only task, so it leaves the comparison rather than lingering at zero
+        assert aggregates.team_analytics("7d", now)["team_performance_comparison"] == {
+            "core": {"tasks": 1, "completed_tasks": 0, "completion_rate": 0.0}
+        }
+        assert aggregates.project_analytics("30d", now)["task_status_distribution"] == {"pending": 1, "in_progress": 1}
+        assert not aggregates.apply({"type": "task_updated", "task_id": "missing", "status": "completed"})
+
+    def test_rebuild_matches_events(self):
+        now = time.time()
+        tasks = [{"id": f"t{n}", "project_id": "p1", "team_id": "core", "status": "completed" if n % 2 else "pending",
+                  "created_at": now - n * 3600, "updated_at": now} for n in range(10)]
+        aggregates = AnalyticsAggregates()
+        aggregates.rebuild(tasks, [{"id": "p1", "status": "active", "created_at": now - 86400}])
+        assert aggregates.bootstrapped
+        assert aggregates.overview("24h", now)["completed_tasks"] == 5
+        assert aggregates.project_analytics("24h", now)["project_completion_rates"] == {"p1": 0.5}
+        assert parse_timeframe("24h").total_seconds() == 86400
+        with pytest.raises(ValueError):
+            parse_timeframe("soon")
+
+    def test_prune_drops_expired_buckets_and_states(self):
+        now = time.time()
+        day = 86400
+        aggregates = AnalyticsAggregates(retention=timedelta(days=30))
+        aggregates.apply_many([
+            {"type": "project_created", "project_id": "old", "status": "completed", "timestamp": now - 40 * day},
+            {"type": "project_created", "project_id": "live", "status": "active", "timestamp": now - 40 * day},
+            {"type": "task_created", "task_id": "stale", "project_id": "old", "team_id": "ops",
+             "timestamp": now - 40 * day},
+            {"type": "task_created", "task_id": "finished", "project_id": "live", "team_id": "core",
+             "timestamp": now - 40 * day},
+            {"type": "task_updated", "task_id": "finished", "status": "completed", "timestamp": now - day},
+            {"type": "task_created", "task_id": "fresh", "project_id": "live", "team_id": "core",
+             "timestamp": now - 60},
+        ])
+        version = aggregates.version
+
+        assert aggregates.prune(now) == 1 and aggregates.version == version + 1
+        assert aggregates.prune(now) == 0 and aggregates.version == version + 1
+        # Only states that still reach into the window survive, and counts follow them
+        assert set(aggregates._tasks) == {"finished", "fresh"} and set(aggregates._projects) == {"live"}
+        assert aggregates.project_analytics("7d", now)["task_status_distribution"] == {"completed": 1, "pending": 1}
+        assert aggregates.project_analytics("7d", now)["project_status_distribution"] == {"active": 1}
+        assert aggregates.overview("7d", now)["total_teams"] == 1
+        assert not aggregates.apply({"type": "task_updated", "task_id": "stale", "status": "completed"})
+
+
+class TestVersionedResultCache:
+    """Version invalidation and request coalescing"""
+
+    async def test_concurrent_requests_share_one_computation(self):
+        aggregates = AnalyticsAggregates()
+        cache = VersionedResultCache(lambda: aggregates.version)
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"version": aggregates.version}
+
+        results = await asyncio.gather(*(cache.get_or_compute("dashboard:7d", compute) for _ in range(20)))
+        assert calls == 1 and all(result == {"version": 0} for result in results)
+        assert cache.stats["coalesced"] == 19
+        assert await cache.get_or_compute("dashboard:7d", compute) == {"version": 0} and calls == 1
+
+        aggregates.apply({"type": "user_activity", "user_id": "u1"})
+        assert cache.peek("dashboard:7d") is None
+        assert await cache.get_or_compute("dashboard:7d", compute) == {"version": 1} and calls == 2
+
+        # Within the grace period a changed version still serves the cached result
+        cache.grace = 60
+        aggregates.apply({"type": "user_activity", "user_id": "u2"})
+        assert cache.peek("dashboard:7d") == {"version": 1}
+
+    async def test_failures_are_not_cached(self):
+        cache = VersionedResultCache(lambda: 0)
+
+        async def fail():
+            raise RuntimeError("db down")
+
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await cache.get_or_compute("dashboard:7d", fail)
+        assert len(cache) == 0 and cache.stats["errors"] == 2
+
+
+class TestAnalyticsEvents:
+    """Write-path fan-out"""
+
+    def test_publish_reaches_subscribers_and_survives_failures(self):
+        events = AnalyticsEvents()
+        aggregates = AnalyticsAggregates()
+        received = []
+
+        def broken(batch):
+            raise RuntimeError("subscriber bug")
+
+        events.subscribe(broken)
+        events.subscribe(aggregates.apply_many)
+        events.subscribe(received.extend)
+        events.publish({"type": "task_created", "task_id": "t1", "team_id": "core"},
+                       {"type": "user_activity", "user_id": "u1"})
+        assert aggregates.version == 1 and len(received) == 2
+
+        events.unsubscribe(aggregates.apply_many)
+        events.publish({"type": "task_deleted", "task_id": "t1"})
+        assert aggregates.version == 1 and len(received) == 3
@@ -0,0 +1,79 @@
+"""Tests for the capability bitset index and ranked agent heaps"""
+
+import random
+
+from agent_registry import AgentRegistry
+from capability_index import CapabilityIndex, IndexedHeap
+
+
+class TestCapabilityIndex:
+    """Bitset queries, heap ordering and registry integration"""
+
+    def test_indexed_heap_keeps_order_through_updates_and_removals(self):
+        rng = random.Random(5)
+        heap, keys = IndexedHeap(), {}
+        for _ in range(3000):
+            item = rng.randrange(200)
+            if rng.random() < 0.25:
+                heap.remove(item)
+                keys.pop(item, None)
+            else:
+                keys[item] = rng.random()
+                heap.set(item, keys[item])
+        assert len(heap) == len(keys)
+        assert list(heap.ordered()) == sorted(keys, key=keys.get)
+        assert heap.peek() == min(keys, key=keys.get)
+
+    def test_queries_agree_with_a_scan(self):
+        rng = random.Random(9)
+        capabilities = [f"c{n}" for n in range(12)]
+        index, agents = CapabilityIndex(), {}
+        for _ in range(2000):
+            agent_id = f"agent-{rng.randrange(300)}"
+            if rng.random() < 0.1:
+                index.remove(agent_id)
+                agents.pop(agent_id, None)
+            elif agent_id in agents and rng.random() < 0.6:
+                rank, eligible = rng.random(), rng.random() < 0.8
+                index.update(agent_id, rank=rank, eligible=eligible)
+                agents[agent_id] = (agents[agent_id][0], rank, eligible)
+            else:
+                caps, rank, eligible = set(rng.sample(capabilities, rng.randint(1, 4))), rng.random(), True
+                index.add(agent_id, caps, rank=rank, eligible=eligible)
+                agents[agent_id] = (caps, rank, eligible)
+
+        for _ in range(200):
+            required = rng.sample(capabilities, rng.randint(1, 3))
+            expected = [a for a, (caps, _, ok) in agents.items() if ok and set(required) <= caps]
+            assert sorted(index.agents_with(required)) == sorted(expected)
+            best = min(expected, key=lambda a: agents[a][1]) if expected else None
+            assert index.best(required[0], required[1:]) == best
+        assert index.agents_with(["missing"]) == []
+
+    def test_capability_whose_last_agent_became_ineligible(self):
+        index = CapabilityIndex()
+        index.add("a", ["x"], eligible=True)
+        index.update("a", eligible=False)
+        assert index.best("x") is None and list(index.ranked("x")) == []
+        index.update("a", eligible=True)
+        assert index.best("x") == "a"
+
+    async def test_registry_ranks_agents_by_load(self):
+        registry = AgentRegistry()
+        for n, capabilities in enumerate([["review", "python"], ["review"], ["review", "python"]]):
+            await registry.register_agent(f"a{n}", f"a{n}", "worker", capabilities, "1.0", "localhost", 9000 + n,
+                                          max_load=2)
+        await registry.increment_load("a0")
+        assert (await registry.find_best_agent("review")).agent_id in ("a1", "a2")
+        assert registry.best_agent(["review", "python"], exclude_agents={"a2"}).agent_id == "a0"
+
+        # Full agents and failed agents leave the heaps; recovery brings them back
+        await registry.increment_load("a0")
+        for _ in range(3):
+            await registry.record_failure("a2")
+        assert registry.best_agent(["review", "python"]) is None
+        assert [a.agent_id for a in await registry.get_agents_by_capability("review")] == ["a1"]
+        assert len(await registry.get_agents_with_capabilities(["review", "python"], only_available=False)) == 2
+
+        await registry.decrement_load("a0")
+        assert registry.best_agent(["python"]).agent_id == "a0"
@@ -0,0 +1,150 @@
+"""Tests for the circuit breaker, sliding window and bulkhead"""
+
+import asyncio
+import pytest
+
+from circuit_breaker import (
+    AIMDLimit,
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitBreakerOpenError,
+    CircuitBreakerRegistry,
+    CircuitState,
+    GradientLimit,
+    SlidingWindow,
+)
+
+
+async def _fail():
+    raise ValueError("boom")
+
+
+async def _ok():
+    return "ok"
+
+
+class TestSlidingWindow:
+    """Time-bucketed failure and slow-call rates"""
+
+    def test_old_buckets_expire(self):
+        window = SlidingWindow(window_seconds=10, buckets=5)
+        window.record(failed=True, slow=False, now=100.0)
+        window.record(failed=False, slow=True, now=104.0)
+        assert window.totals(now=105.0) == (2, 1, 1)
+        # The first bucket has left the window, the second has not
+        assert window.totals(now=111.0) == (1, 0, 1)
+        assert window.totals(now=120.0) == (0, 0, 0)
+
+    async def test_failure_rate_opens_circuit(self):
+        breaker = CircuitBreaker("dep", CircuitBreakerConfig(failure_threshold=100, min_throughput=4))
+        for func in (_ok, _fail, _ok, _fail):
+            try:
+                await breaker.call(func)
+            except ValueError:
+                pass
+        assert breaker.state == CircuitState.OPEN
+        with pytest.raises(CircuitBreakerOpenError):
+            await breaker.call(_ok)
+
+    async def test_slow_calls_open_circuit(self):
+        breaker = CircuitBreaker("dep", CircuitBreakerConfig(
+            min_throughput=3, slow_call_duration_seconds=0.01, slow_call_rate_threshold=0.6
+        ))
+
+        async def slow():
+            await asyncio.sleep(0.02)
+
+        for _ in range(3):
+            await breaker.call(slow)
+        assert breaker.state == CircuitState.OPEN
+
+    async def test_excluded_by_predicate(self):
+        breaker = CircuitBreaker("dep", CircuitBreakerConfig(
+            min_throughput=1, exclude_predicate=lambda e: isinstance(e, ValueError)
+        ))
+        for _ in range(5):
+            with pytest.raises(ValueError):
+                await breaker.call(_fail)
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.total_failures == 0
+
+
+class TestBulkhead:
+    """Concurrency limit, wait queue and load shedding"""
+
+    async def test_queue_then_shed(self):
+        breaker = CircuitBreaker("dep", CircuitBreakerConfig(
+            concurrency_limit=1, max_queue_size=1, queue_timeout_seconds=1.0
+        ))
+        gate = asyncio.Event()
+
+        async def blocked():
+            await gate.wait()
+            return "done"
+
+        first = asyncio.create_task(breaker.call(blocked))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(breaker.call(blocked))
+        await asyncio.sleep(0)
+        assert breaker.in_flight == 1 and breaker.queued == 1
+
+        with pytest.raises(BulkheadFullError):
+            await breaker.call(blocked)
+        assert breaker.total_shed == 1
+
+        gate.set()
+        assert await asyncio.gather(first, queued) == ["done", "done"]
+        assert breaker.in_flight == 0 and breaker.queued == 0
+
+    async def test_queue_timeout_sheds(self):
+        breaker = CircuitBreaker("dep", CircuitBreakerConfig(
+            concurrency_limit=1, max_queue_size=5, queue_timeout_seconds=0.01
+        ))
+        async with breaker.guard():
+            with pytest.raises(BulkheadFullError):
+                await breaker.call(_ok)
+        assert breaker.queued == 0
+        assert await breaker.call(_ok) == "ok"
+
+    async def test_cancelled_guard_releases_slot(self):
+        breaker = CircuitBreaker("dep", CircuitBreakerConfig(concurrency_limit=1))
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(breaker.call(hang))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert breaker.in_flight == 0
+        assert breaker.total_failures == 0
+
+
+class TestAdaptiveLimits:
+    """AIMD and gradient limit updates"""
+
+    def test_aimd_grows_when_used_and_backs_off_on_drop(self):
+        limit = AIMDLimit(10, min_limit=1, max_limit=20)
+        assert limit.on_sample(0.01, in_flight=2, dropped=False) == 10
+        assert limit.on_sample(0.01, in_flight=8, dropped=False) == 11
+        assert limit.on_sample(0.01, in_flight=8, dropped=True) == 9
+
+    def test_gradient_shrinks_as_latency_rises(self):
+        limit = GradientLimit(50, min_limit=1, max_limit=200)
+        for _ in range(50):
+            limit.on_sample(0.01, in_flight=50, dropped=False)
+        grown = limit.limit
+        for _ in range(50):
+            limit.on_sample(0.2, in_flight=grown, dropped=False)
+        assert limit.limit < grown
+
+    def test_registry_exposes_load_metrics(self):
+        registry = CircuitBreakerRegistry()
+        registry.get_or_create("api", CircuitBreakerConfig(concurrency_limit=8, limit_algorithm="aimd"))
+        metrics = registry.get_load_metrics()["api"]
+        assert metrics["state"] == "closed"
+        assert metrics["concurrency_limit"] == 8
+        assert metrics["in_flight"] == 0
+        assert "p99_ms" in metrics["latency"]
@@ -1,5 +1,8 @@
 """Tests for communication_agent module"""
 
+import asyncio
+import sys
+
 import pytest
 from unittest.mock import AsyncMock, Mock, patch
 
@@ -49,3 +52,32 @@ class TestCommunicationAgentMethods:
             assert hasattr(agent, '_execute_task_impl')
             assert hasattr(agent, 'start')
             assert hasattr(agent, 'config')
+
+
+class TestProductionCommunicationAgentShutdown:
+    """Shutdown of the production CommunicationAgent"""
+
+    @pytest.mark.asyncio
+    async def test_shutdown_stops_delivery_and_cancels_retry_backoff(self):
+        """Shutdown completes against the synchronous BaseAgent.shutdown and drops pending retries"""
+        with patch.dict('sys.modules', {'opentelemetry': sys.modules.get('opentelemetry') or Mock()}):
+            from prod_communication_agent import CommunicationAgent, Message, MessagePriority, MessageType
+            from delivery_engine import DeliveryEngine
+            from message_history_writer import MessageHistoryWriter
+            # Only the state shutdown touches; BaseAgent.__init__ needs live infrastructure config
+            agent = CommunicationAgent.__new__(CommunicationAgent)
+            agent._shutdown_event = asyncio.Event()
+            agent._retry_timers = {}
+            agent.delivery_engine = DeliveryEngine(AsyncMock(), lambda recipient: True)
+            agent.history_writer = MessageHistoryWriter(lambda: None)
+
+            message = Message(id="m1", type=MessageType.DIRECT, priority=MessagePriority.NORMAL, sender="a",
+                              recipients=["b"], subject="s", payload={})
+            message.retry_count = 1
+            agent._schedule_retry("b", message)
+            timer = agent._retry_timers[(message.id, "b")]
+
+            await agent.shutdown()
+            assert timer.cancelled() and not agent._retry_timers
+            assert agent.delivery_engine._closing
+            assert agent._shutdown_event.is_set()
@@ -0,0 +1,82 @@
+"""Tests for the tiered conversation store"""
+
+import gc
+import pytest
+
+from conversation_store import ConversationMemory, ConversationStore, MessageRole
+
+
+def _conversation(conversation_id="c1", turns=6, tokens=10):
+    conversation = ConversationMemory(conversation_id=conversation_id)
+    for i in range(turns):
+        role = MessageRole.USER if i % 2 == 0 else MessageRole.ASSISTANT
+        conversation.add_message(role, f"message {i}", token_count=tokens)
+    return conversation
+
+
+class TestConversationMemory:
+    """Token accounting and context packing"""
+
+    def test_token_count_is_incremental(self):
+        conversation = _conversation(turns=6, tokens=10)
+        assert conversation.get_token_count() == 60
+
+        conversation.apply_summary("earlier turns", 5, summarized_count=4)
+        assert conversation.get_token_count() == 20
+        assert len(conversation.messages) == 2
+
+    def test_context_packed_to_budget(self):
+        conversation = _conversation(turns=6, tokens=10)
+        conversation.summary, conversation.summary_tokens = "summary", 6
+
+        context = conversation.build_context(token_budget=40)
+        assert context[0]["role"] == "system"
+        assert [m["content"] for m in context[1:]] == ["message 4", "message 5"]
+
+    def test_latest_message_always_included(self):
+        conversation = _conversation(turns=2, tokens=1000)
+        assert [m["content"] for m in conversation.build_context(10)] == ["message 1"]
+
+    def test_compact_round_trip(self):
+        conversation = _conversation()
+        conversation.summary, conversation.summary_tokens = "summary", 3
+        restored = ConversationMemory.from_compact(conversation.to_compact())
+        assert restored.summary == "summary"
+        assert restored.get_token_count() == conversation.get_token_count()
+        assert [m.to_dict() for m in restored.messages] == [m.to_dict() for m in conversation.messages]
+
+
+class TestConversationStore:
+    """LRU eviction to the spill tier"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return ConversationStore(max_resident=2, spill_dir=str(tmp_path))
+
+    async def test_evicted_conversation_is_rehydrated(self, store):
+        for conversation_id in ("a", "b", "c"):
+            conversation = await store.get_or_create(conversation_id)
+            conversation.add_message(MessageRole.USER, f"hi from {conversation_id}", token_count=3)
+        del conversation
+        gc.collect()
+
+        assert "a" not in store
+        restored = await store.get("a")
+        assert restored.messages[0].content == "hi from a"
+        assert store.stats["rehydrated"] == 1
+
+    async def test_referenced_conversation_is_resurrected(self, store):
+        held = await store.get_or_create("a")
+        await store.get_or_create("b")
+        await store.get_or_create("c")  # Spills "a" while still referenced
+        held.add_message(MessageRole.USER, "written after spill", token_count=3)
+
+        assert await store.get("a") is held
+        assert store.stats["resurrected"] == 1
+
+    async def test_delete_removes_spilled_copy(self, store):
+        for conversation_id in ("a", "b", "c"):
+            await store.get_or_create(conversation_id)
+        gc.collect()
+        assert await store.delete("a") is True
+        assert await store.get("a") is None
@@ -0,0 +1,130 @@
+"""Tests for the priority delivery engine"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from delivery_engine import DeliveryEngine
+
+
+def _message(message_id):
+    return SimpleNamespace(id=message_id)
+
+
+class _Recipients:
+    """Records sends; recipients can be toggled unavailable or made to block"""
+
+    def __init__(self):
+        self.sent = []
+        self.unavailable = set()
+        self.gate = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def is_available(self, recipient):
+        return recipient not in self.unavailable
+
+    async def send(self, recipient, message):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.gate is not None:
+                await self.gate.wait()
+            self.sent.append((recipient, message.id))
+        finally:
+            self.in_flight -= 1
+
+
+async def _settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+class TestDeliveryEngine:
+    """Ordering, wake-up, limits and expiry"""
+
+    async def test_priority_then_expiry_order(self):
+        recipients = _Recipients()
+        recipients.unavailable.add("a")
+        engine = DeliveryEngine(recipients.send, recipients.is_available, max_in_flight=1)
+        later = time.time() + 60
+        engine.enqueue("a", _message("low"), priority=1, expires_at=later)
+        engine.enqueue("a", _message("high-late"), priority=4, expires_at=later + 10)
+        engine.enqueue("a", _message("high-soon"), priority=4, expires_at=later)
+        engine.enqueue("a", _message("expired"), priority=5, expires_at=time.time() - 1)
+
+        # Presence change to available wakes the worker immediately
+        recipients.unavailable.clear()
+        engine.wake("a")
+        await _settle()
+        assert [message_id for _, message_id in recipients.sent] == ["high-soon", "high-late", "low"]
+        assert engine.stats["expired"] == 1
+        assert set(engine.get_metrics()["queue_wait"]) == {"1", "4"}
+        assert engine.total_queued() == 0 and engine.stats["max_total_queued"] == 4
+
+    async def test_recipients_served_concurrently_within_limits(self):
+        recipients = _Recipients()
+        recipients.gate = asyncio.Event()
+        engine = DeliveryEngine(recipients.send, recipients.is_available, max_in_flight=2)
+        expiry = time.time() + 60
+        futures = [engine.enqueue(name, _message(f"{name}{n}"), 2, expiry, wait=True)
+                   for name in ("a", "b") for n in range(4)]
+        await _settle()
+        # Two recipients, two in flight each
+        assert recipients.max_in_flight == 4
+
+        recipients.gate.set()
+        assert await asyncio.gather(*futures) == [True] * 8
+
+    async def test_pacing_and_full_queue(self):
+        recipients = _Recipients()
+        recipients.unavailable.add("a")
+        engine = DeliveryEngine(recipients.send, recipients.is_available,
+                                rate_per_second=200, burst=1, max_queue_size=3)
+        expiry = time.time() + 60
+        dropped = engine.enqueue("a", _message("p1"), 1, expiry, wait=True)
+        for n in range(3):
+            engine.enqueue("a", _message(f"p3-{n}"), 3, expiry)
+        # A full queue evicts its lowest-priority entry for a more urgent one
+        assert await dropped is False
+        assert engine.enqueue("a", _message("p1-late"), 1, expiry, wait=True).result() is False
+        assert engine.total_queued() == engine.stats["max_total_queued"] == 3
+
+        recipients.unavailable.clear()
+        start = time.monotonic()
+        engine.wake("a")
+        while len(recipients.sent) < 3:
+            await asyncio.sleep(0.001)
+        # One token up front, then 200/s
+        assert time.monotonic() - start >= 0.009
+        await engine.stop()
+
+    async def test_cancel_and_purge(self):
+        recipients = _Recipients()
+        recipients.unavailable.add("a")
+        engine = DeliveryEngine(recipients.send, recipients.is_available)
+        engine.enqueue("a", _message("keep"), 2, time.time() + 60)
+        engine.enqueue("a", _message("cancel"), 2, time.time() + 60)
+        engine.enqueue("a", _message("stale"), 2, time.time() + 0.001)
+        assert engine.cancel("cancel") == 1
+        await asyncio.sleep(0.01)
+        assert engine.purge_expired() == 1
+        assert engine.queue_depths() == {"a": 1} and engine.total_queued() == 1
+
+    async def test_stop_cancels_stuck_sends_and_releases_paced_slots(self):
+        recipients = _Recipients()
+        recipients.gate = asyncio.Event()
+        engine = DeliveryEngine(recipients.send, recipients.is_available,
+                                max_in_flight=2, rate_per_second=1, burst=1)
+        expiry = time.time() + 60
+        stuck = engine.enqueue("a", _message("stuck"), 2, expiry, wait=True)
+        paced = engine.enqueue("a", _message("paced"), 2, expiry, wait=True)
+        await _settle()
+        # "stuck" is in flight; the worker holds the second slot while waiting for a token
+        assert engine.queue_depths() == {"a": 1} and len(engine._sends) == 1
+
+        await engine.stop(drain_timeout=0.01)
+        assert await stuck is False and not engine._sends
+        queue = engine._queues["a"]
+        assert queue.in_flight == 0 and queue.slots._value == 2
+        assert not paced.done() and engine.queue_depths() == {"a": 1} and engine.total_queued() == 1
@@ -0,0 +1,94 @@
+"""Tests for the micro-batching embedding service"""
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_service import EmbeddingService, HashingEncoder
+
+
+class _Encoder(HashingEncoder):
+    """Hashing encoder that records batches and can hold the model thread"""
+
+    def __init__(self):
+        super().__init__(dimensions=32)
+        self.batches = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fail = False
+
+    def encode(self, sentences, **kwargs):
+        self.gate.wait(timeout=5)
+        self.batches.append(list(sentences))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return super().encode(sentences)
+
+
+class TestEmbeddingService:
+    """Coalescing, caching and cancellation of encode requests"""
+
+    async def test_concurrent_requests_share_one_batch(self):
+        encoder = _Encoder()
+        service = EmbeddingService(encoder, max_wait_ms=20)
+        texts = [f"document {n % 5}" for n in range(20)]
+
+        vectors = await asyncio.gather(*(service.embed(text) for text in texts))
+
+        assert len(encoder.batches) == 1 and sorted(encoder.batches[0]) == sorted(set(texts))
+        assert service.stats["coalesced"] == 15 and service.stats["encoded"] == 5
+        for text, vector in zip(texts, vectors):
+            assert np.allclose(vector, HashingEncoder(32).encode([text])[0])
+
+        # Served from the cache, including duplicates within one call
+        again = await service.embed_many(["document 1", "document 1"])
+        assert len(encoder.batches) == 1 and service.stats["cache_hits"] == 1
+        assert np.array_equal(again[0], vectors[1])
+        await service.close()
+
+    async def test_cancelled_caller_does_not_fail_other_waiters(self):
+        encoder = _Encoder()
+        service = EmbeddingService(encoder, max_wait_ms=1)
+        encoder.gate.clear()
+
+        first = asyncio.create_task(service.embed("shared text"))
+        second = asyncio.create_task(service.embed("shared text"))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        encoder.gate.set()
+        vector = await asyncio.wait_for(second, timeout=2)
+        assert encoder.batches == [["shared text"]]
+        assert np.allclose(vector, HashingEncoder(32).encode(["shared text"])[0])
+        assert not service._inflight and service.get_stats()["cache_size"] == 1
+        await service.close()
+
+    async def test_failed_batch_fails_its_waiters_and_is_retried(self):
+        encoder = _Encoder()
+        encoder.fail = True
+        service = EmbeddingService(encoder, max_wait_ms=1)
+
+        results = await asyncio.gather(service.embed("a"), service.embed("a"), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not service._inflight and service.get_stats()["cache_size"] == 0
+
+        encoder.fail = False
+        assert (await service.embed("a")).shape == (32,)
+        assert len(encoder.batches) == 2
+        await service.close()
+
+    async def test_close_fails_pending_requests(self):
+        encoder = _Encoder()
+        service = EmbeddingService(encoder, max_wait_ms=1)
+        encoder.gate.clear()
+
+        pending = asyncio.create_task(service.embed("never encoded"))
+        await asyncio.sleep(0.02)
+        await service.close()
+        with pytest.raises(RuntimeError, match="closed"):
+            await pending
+        encoder.gate.set()
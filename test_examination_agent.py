@@ -0,0 +1,176 @@
+"""Tests for the examination pipeline, batch examination and readability scoring"""
+
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from examination_agent import (
+    AnalysisContext, ComprehensiveAnalysis, ExaminationAgent, ExaminationResult, ExaminationType, QualityLevel
+)
+
+SIMPLE = "The cat sat. The dog ran. We had fun. It was a good day."
+COMPLEX = ("Institutional interoperability considerations necessitate comprehensive organizational "
+           "restructuring, particularly regarding administrative responsibilities and accountability.")
+
+
+class _Logger:
+    def __init__(self):
+        self.errors = []
+
+    def info(self, message, **kwargs):
+        pass
+
+    warning = info
+
+    def error(self, message, **kwargs):
+        self.errors.append(message)
+
+
+class _Pool:
+    """asyncpg-like pool that records every executemany call"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.calls = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquired += 1
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def executemany(self, query, rows):
+        self.calls.append((query.split("(")[0].split()[-1], list(rows)))
+
+
+def _agent(db_pool=None):
+    # BaseAgent.__init__ connects to infrastructure; the pipeline only needs these attributes
+    agent = ExaminationAgent.__new__(ExaminationAgent)
+    agent.logger = _Logger()
+    agent.db_pool = db_pool
+    agent.corpus_index = None
+    agent._cpu_executor = None
+    agent.pipeline_config = {"batch_concurrency": 8, "process_pool_workers": 0, "process_pool_min_chars": 20000}
+    agent.examination_stats = {"total_examinations": 0, "examination_types_count": defaultdict(int)}
+    return agent
+
+
+class TestReadability:
+    """Flesch scores come from the shared analysis context"""
+
+    def test_scores_track_sentence_and_word_length(self):
+        simple = AnalysisContext.build(SIMPLE).readability()
+        hard = AnalysisContext.build(COMPLEX).readability()
+        assert simple["flesch_reading_ease"] > 90 > 0 > hard["flesch_reading_ease"]
+        assert simple["flesch_kincaid_grade"] < 2 < 20 < hard["flesch_kincaid_grade"]
+
+    async def test_readability_uses_the_cached_context_scores(self):
+        context = AnalysisContext.build(COMPLEX)
+        assert context.readability() is context.readability()
+        result = await _agent()._analyze_readability("c1", COMPLEX, "e1", {"target_grade_level": 8}, context)
+        assert result.details["flesch_kincaid_grade"] == pytest.approx(context.readability()["flesch_kincaid_grade"])
+        assert result.score == 0.0 and result.issues[0]["type"] == "readability"
+
+
+class TestExaminationPipeline:
+    """Independent examinations run concurrently and every stage is timed"""
+
+    async def test_stages_run_concurrently_and_are_timed(self):
+        agent = _agent()
+        running = peak = 0
+
+        def slow(exam_type):
+            async def examine(content_id, content, examination_id, payload, context=None):
+                nonlocal running, peak
+                assert isinstance(context, AnalysisContext)
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.05)
+                running -= 1
+                return ExaminationResult(examination_id, exam_type, content_id, 0.8, QualityLevel.GOOD, {})
+            return examine
+
+        agent._analyze_sentiment = slow(ExaminationType.SENTIMENT)
+        agent._analyze_readability = slow(ExaminationType.READABILITY)
+        agent._analyze_structure = slow(ExaminationType.STRUCTURE)
+
+        analysis = await agent._run_examination_pipeline("c1", SIMPLE, {"examination_types": [
+            "content_quality", "sentiment", "readability", "structure", "unknown"
+        ]})
+
+        assert peak == 3
+        assert [r.examination_type for r in analysis.examinations] == [
+            ExaminationType.CONTENT_QUALITY, ExaminationType.SENTIMENT,
+            ExaminationType.READABILITY, ExaminationType.STRUCTURE
+        ]
+        timings = analysis.stage_timings_ms
+        assert {"preprocessing", "examinations", "composite", "sentiment", "readability", "structure"} <= set(timings)
+        # Three 50 ms stages overlapped rather than ran back to back
+        assert 50 <= timings["examinations"] < 140
+        assert timings["readability"] >= 50
+        assert agent.examination_stats["total_examinations"] == 4
+
+
+class TestBatchExamination:
+    """Batch items share a concurrency limit and are stored with one bulk insert"""
+
+    async def test_concurrency_limit_and_failed_items(self):
+        agent = _agent()
+        running = peak = 0
+
+        async def pipeline(content_id, content, payload):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            if content_id == "c3":
+                raise RuntimeError("boom")
+            return ComprehensiveAnalysis(content_id, 0.8, QualityLevel.GOOD, [], {}, [], 1.0)
+
+        agent._run_examination_pipeline = pipeline
+        batch = await agent._perform_batch_examination({
+            "batch_items": [{"content_id": f"c{n}", "content": SIMPLE} for n in range(6)],
+            "max_concurrency": 2
+        })
+
+        assert peak == 2
+        assert batch["total_items"] == batch["processed_items"] == 6
+        assert batch["batch_results"][3] == {"content_id": "c3", "error": "boom"}
+        assert [r["content_id"] for r in batch["batch_results"]] == [f"c{n}" for n in range(6)]
+
+    async def test_results_are_stored_with_one_bulk_insert(self):
+        pool = _Pool()
+        agent = _agent(pool)
+        batch = await agent._perform_batch_examination({"batch_items": [
+            {"content_id": f"c{n}", "content": SIMPLE, "examination_types": ["readability", "structure"]}
+            for n in range(3)
+        ]})
+
+        assert pool.acquired == 1
+        assert [(table, len(rows)) for table, rows in pool.calls] == [
+            ("comprehensive_analyses", 3), ("examination_results", 6)
+        ]
+        assert {"examinations", "persistence"} <= set(batch["stage_timings_ms"])
+        assert not agent.logger.errors
+
+
+class TestShutdown:
+    """Shutdown releases the index and process pool, then the base agent"""
+
+    async def test_shutdown_with_the_synchronous_base_shutdown(self):
+        agent = _agent()
+        agent._shutdown_event = asyncio.Event()
+        closed = []
+        agent.corpus_index = SimpleNamespace(close=lambda: closed.append(True))
+
+        await agent.shutdown()
+
+        assert closed == [True] and agent.corpus_index is None
+        assert agent._shutdown_event.is_set()
@@ -0,0 +1,94 @@
+"""Tests for the LLM call scheduler"""
+
+import asyncio
+import time
+import pytest
+
+from llm_call_scheduler import LLMCallScheduler, ModelRateLimits, retry_after_seconds, is_rate_limit_error
+
+
+class _Response:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class _ProviderError(Exception):
+    def __init__(self, status_code, headers):
+        super().__init__(f"HTTP {status_code}")
+        self.response = _Response(status_code, headers)
+
+
+class TestAdmission:
+    """Dispatch order and limits"""
+
+    async def test_higher_priority_dispatched_first(self):
+        scheduler = LLMCallScheduler(max_concurrency=1)
+        order = []
+        blocker = await scheduler.acquire("m", 10, priority=1)
+
+        async def call(name, priority):
+            async with scheduler.reserve("m", 10, priority):
+                order.append(name)
+
+        waiters = [asyncio.create_task(call("low", 1)), asyncio.create_task(call("high", 4))]
+        await asyncio.sleep(0.01)
+        scheduler.release(blocker)
+        await asyncio.gather(*waiters)
+        await scheduler.shutdown()
+        assert order == ["high", "low"]
+
+    async def test_reserved_slots_kept_for_high_priority(self):
+        scheduler = LLMCallScheduler(max_concurrency=2, reserved_slots=1, reserved_min_priority=3)
+        low = await scheduler.acquire("m", 10, priority=1)
+        queued_low = asyncio.create_task(scheduler.acquire("m", 10, priority=1))
+        await asyncio.sleep(0.01)
+        assert not queued_low.done()
+
+        high = await asyncio.wait_for(scheduler.acquire("m", 10, priority=4), timeout=1)
+        for lease in (low, high):
+            scheduler.release(lease)
+        scheduler.release(await queued_low)
+        await scheduler.shutdown()
+
+    async def test_requests_per_minute_limit(self):
+        scheduler = LLMCallScheduler(limits={"m": ModelRateLimits(requests_per_minute=600)})
+        scheduler._request_buckets["m"].tokens = 0  # Start empty: 10 requests/s
+        start = time.monotonic()
+        for _ in range(3):
+            async with scheduler.reserve("m", 1):
+                pass
+        assert time.monotonic() - start >= 0.25
+        await scheduler.shutdown()
+
+    async def test_token_estimate_reconciled_on_release(self):
+        scheduler = LLMCallScheduler(limits={"m": ModelRateLimits(tokens_per_minute=1000)})
+        async with scheduler.reserve("m", 500) as lease:
+            lease.actual_tokens = 100
+        assert scheduler._token_buckets["m"].tokens == pytest.approx(900, abs=5)
+        await scheduler.shutdown()
+
+    async def test_pause_model_delays_dispatch(self):
+        scheduler = LLMCallScheduler()
+        scheduler.pause_model("m", 0.2)
+        start = time.monotonic()
+        async with scheduler.reserve("m", 1):
+            pass
+        assert time.monotonic() - start >= 0.2
+        assert scheduler.stats["rate_limit_pauses"] == 1
+        await scheduler.shutdown()
+
+
+class TestBackoffHints:
+    """Provider Retry-After parsing"""
+
+    def test_retry_after_header_forms(self):
+        assert retry_after_seconds(_ProviderError(429, {"retry-after": "3"})) == 3.0
+        assert retry_after_seconds(_ProviderError(429, {"retry-after-ms": "1500"})) == 1.5
+        assert retry_after_seconds(_ProviderError(429, {"x-ratelimit-reset-requests": "1m30s"})) == 90.0
+        assert retry_after_seconds(_ProviderError(500, {})) is None
+
+    def test_rate_limit_detection(self):
+        assert is_rate_limit_error(_ProviderError(429, {}))
+        assert is_rate_limit_error(_ProviderError(529, {}))
+        assert not is_rate_limit_error(_ProviderError(500, {}))
@@ -0,0 +1,163 @@
+"""Tests for streamed chat completions and conversation summarization in the LLM agent"""
+
+import asyncio
+import json
+import logging
+import time
+from types import SimpleNamespace
+
+from circuit_breaker import CircuitBreakerConfig, CircuitBreakerRegistry
+from conversation_store import ConversationStore, MessageRole
+from enhanced_llm_agent import LLMAgent, LLMConfig, LLMProvider, LLMProviderManager, StubLLMProvider
+from llm_call_scheduler import LLMCallScheduler
+
+REPLY = "one two three four five six seven eight"
+
+
+class _Provider(StubLLMProvider):
+    """Stub provider that counts closed streams"""
+
+    def __init__(self, **kwargs):
+        super().__init__(response_text=REPLY, **kwargs)
+        self.opened = 0
+        self.closed = 0
+
+    async def stream(self, messages, config):
+        self.opened += 1
+        try:
+            async for chunk in super().stream(messages, config):
+                yield chunk
+        finally:
+            self.closed += 1
+
+
+async def _agent(provider):
+    # BaseAgent.__init__ connects to infrastructure; streaming only needs these attributes
+    agent = LLMAgent.__new__(LLMAgent)
+    agent.logger = logging.getLogger("test_llm_streaming")
+    agent.provider_manager = LLMProviderManager()
+    await agent.provider_manager.register_provider(LLMProvider.CUSTOM, provider)
+    agent.llm_configs = {"stub": LLMConfig(provider=LLMProvider.CUSTOM, model="stub", max_tokens=100)}
+    agent.llm_scheduler = LLMCallScheduler(max_concurrency=4)
+    agent.llm_circuit_breakers = CircuitBreakerRegistry()
+    agent.llm_circuit_breakers.get_or_create("stub", CircuitBreakerConfig())
+    agent.model_usage_stats = {"stub": {"requests": 0, "tokens": 0, "errors": 0, "avg_latency_ms": 0,
+                                        "total_cost": 0.0, "streams": 0, "avg_ttft_ms": 0, "rate_limited": 0}}
+    agent.token_usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_cost": 0.0}
+    agent.conversation_store = ConversationStore()
+    agent.tokenizer = None
+    agent.history_token_budget = 3000
+    agent.max_conversation_messages = 50
+    agent.max_conversation_tokens = 100000
+    agent.summarizing = {}
+    agent.background_tasks = set()
+    agent.active_streams = {}
+    agent.streaming_stats = {"started": 0, "completed": 0, "cancelled": 0, "failed": 0}
+
+    agent.frames = []
+
+    async def publish(subject, frame):
+        agent.frames.append((time.monotonic(), frame))
+
+    agent._publish_response = publish
+    return agent
+
+
+def _request(**extra):
+    return {"message": "count to eight", "model_key": "stub", "stream": True, "conversation_id": "c1", **extra}
+
+
+class TestChatStreaming:
+    """Deltas reach the reply subject as they are generated and streams stop early"""
+
+    async def test_deltas_are_published_incrementally(self):
+        provider = _Provider(time_to_first_token_ms=20, tokens_per_second=100)
+        agent = await _agent(provider)
+
+        start = time.monotonic()
+        await agent._start_chat_stream(_request(stream_id="s1"), "inbox.1")
+        await agent.active_streams["s1"]
+
+        frames = [frame for _, frame in agent.frames]
+        assert [f["type"] for f in frames] == ["delta"] * 8 + ["done"]
+        assert [f["seq"] for f in frames] == list(range(9))
+        assert "".join(f["content"] for f in frames[:-1]) == REPLY
+        assert frames[-1]["tokens_used"]["completion"] == 8
+
+        # The first delta went out well before the reply was complete
+        first_at, done_at = agent.frames[0][0], agent.frames[-1][0]
+        assert first_at - start < 0.06 < done_at - start
+        assert frames[-1]["ttft_ms"] < frames[-1]["duration_ms"]
+
+        conversation = await agent.conversation_store.get("c1")
+        assert conversation.messages[-1].role == MessageRole.ASSISTANT
+        assert conversation.messages[-1].content == REPLY
+        assert agent.streaming_stats["completed"] == 1 and not agent.active_streams
+
+    async def test_cancel_stops_the_provider_and_keeps_the_partial_reply(self):
+        provider = _Provider(time_to_first_token_ms=5, tokens_per_second=50)
+        agent = await _agent(provider)
+
+        await agent._start_chat_stream(_request(stream_id="s2"), "inbox.2")
+        task = agent.active_streams["s2"]
+        while len(agent.frames) < 2:
+            await asyncio.sleep(0.005)
+        await agent._handle_chat_cancel(SimpleNamespace(data=json.dumps({"stream_id": "s2"}).encode()))
+        await asyncio.gather(task, return_exceptions=True)
+
+        frames = [frame for _, frame in agent.frames]
+        assert frames[-1]["type"] == "cancelled" and frames[-1]["seq"] == len(frames) - 1
+        assert 2 <= len(frames) - 1 < 8
+        assert (provider.opened, provider.closed) == (1, 1)
+        assert agent.llm_scheduler._in_flight == 0
+        assert agent.llm_circuit_breakers.get("stub").in_flight == 0
+
+        partial = (await agent.conversation_store.get("c1")).messages[-1]
+        assert partial.metadata == {"cancelled": True}
+        assert partial.content == "".join(f["content"] for f in frames[:-1])
+        assert agent.streaming_stats["cancelled"] == 1 and not agent.active_streams
+
+    async def test_consumer_breaking_early_closes_the_stream(self):
+        provider = _Provider(time_to_first_token_ms=0, tokens_per_second=1000)
+        agent = await _agent(provider)
+
+        stream = agent._chat_completion_stream(_request())
+        received = []
+        async for chunk in stream:
+            received.append(chunk.content)
+            if len(received) == 3:
+                break
+        await stream.aclose()
+
+        assert provider.closed == 1 and agent.llm_scheduler._in_flight == 0
+        partial = (await agent.conversation_store.get("c1")).messages[-1]
+        assert partial.content == "one two three " and partial.metadata == {"cancelled": True}
+
+
+class TestSummarization:
+    """Explicit and automatic summaries of one conversation never run twice at once"""
+
+    async def test_summarize_request_joins_the_running_summary(self):
+        agent = await _agent(_Provider())
+        agent.llm_configs["gpt35"] = LLMConfig(provider=LLMProvider.CUSTOM, model="stub")
+        conversation = await agent.conversation_store.get_or_create("c1")
+        for n in range(12):
+            conversation.add_message(MessageRole.USER if n % 2 == 0 else MessageRole.ASSISTANT, f"turn {n}", token_count=5)
+
+        calls = []
+
+        async def call_llm(model_key, config, messages, priority=None):
+            calls.append(messages)
+            await asyncio.sleep(0.02)
+            return {"content": "the gist", "tokens_used": {"completion": 3}}
+
+        agent._call_llm_with_retry = call_llm
+        automatic = agent._schedule_summarization(conversation)
+        await asyncio.sleep(0)
+        request = SimpleNamespace(data=json.dumps({"conversation_id": "c1"}).encode(), reply="inbox.s")
+        await agent._handle_summarize_conversation(request)
+        await automatic
+
+        assert len(calls) == 1 and len(conversation.messages) == 5
+        assert agent.frames[-1][1] == {"status": "success", "conversation_id": "c1", "summary": "the gist"}
+        assert not agent.summarizing
@@ -0,0 +1,91 @@
+"""Tests for the open-loop load engine, arrival profiles and latency histogram"""
+
+import asyncio
+import math
+import random
+
+import pytest
+
+from load_testing_framework import (
+    ConstantRate, LatencyHistogram, OpenLoopLoadEngine, PoissonArrivals, RampRate, build_profile
+)
+
+
+class TestArrivalProfiles:
+    """Arrival schedules yield the expected count, order and spread"""
+
+    def test_constant_rate_is_evenly_spaced(self):
+        offsets = list(ConstantRate(10).arrivals(2.0))
+        assert len(offsets) == 20
+        assert offsets[:3] == pytest.approx([0.0, 0.1, 0.2])
+
+    @pytest.mark.parametrize("start, end", [(0, 100), (100, 0), (50, 50), (10, 200)])
+    def test_ramp_matches_the_integrated_rate(self, start, end):
+        offsets = list(RampRate(start, end).arrivals(4.0))
+        assert len(offsets) == int((start + end) / 2 * 4.0)
+        assert offsets == sorted(offsets)
+        assert all(0 <= offset <= 4.0 for offset in offsets)
+        # The busier half of the run gets more arrivals
+        first_half = sum(offset < 2.0 for offset in offsets)
+        if start < end:
+            assert first_half < len(offsets) / 2
+        elif start > end:
+            assert first_half > len(offsets) / 2
+
+    def test_zero_rates_yield_nothing(self):
+        assert list(RampRate(0, 0).arrivals(10)) == []
+        assert list(RampRate(5, 5).arrivals(0)) == []
+        assert list(ConstantRate(0).arrivals(10)) == []
+        assert list(PoissonArrivals(0).arrivals(10)) == []
+
+    def test_poisson_is_seeded_and_near_its_rate(self):
+        offsets = list(PoissonArrivals(200, seed=7).arrivals(10.0))
+        assert offsets == list(PoissonArrivals(200, seed=7).arrivals(10.0))
+        assert 1800 < len(offsets) < 2200
+        assert build_profile("ramp", 20, start_rate_per_s=0).to_dict()["end_rate_per_s"] == 20
+        with pytest.raises(ValueError):
+            build_profile("burst", 10)
+
+
+class TestLatencyHistogram:
+    """Percentiles stay within the configured precision"""
+
+    def test_percentiles_match_exact_values(self):
+        rng = random.Random(3)
+        values = sorted(int(rng.lognormvariate(8, 1.5)) for _ in range(20000))
+        histogram = LatencyHistogram(significant_figures=3)
+        for value in values:
+            histogram.record(value)
+
+        for percentile in (50, 90, 99, 99.9):
+            exact = values[math.ceil(percentile / 100 * len(values)) - 1]
+            assert histogram.percentile(percentile) == pytest.approx(exact, rel=1e-3, abs=1)
+        assert histogram.percentile(100) == values[-1] and histogram.min_us == values[0]
+
+    def test_merge_round_trip_and_coordinated_omission(self):
+        first, second = LatencyHistogram(), LatencyHistogram()
+        for value in range(1, 1001):
+            (first if value % 2 else second).record(value * 1000)
+        first.merge(LatencyHistogram.from_dict(second.to_dict()))
+        assert first.total_count == 1000 and first.percentile(50) == pytest.approx(500_000, rel=1e-3)
+        with pytest.raises(ValueError):
+            first.merge(LatencyHistogram(significant_figures=2))
+
+        # One 1 s stall at a 100 ms cadence back-fills the nine samples that were never sent
+        corrected = LatencyHistogram()
+        corrected.record_corrected(1_000_000, 100_000)
+        assert corrected.total_count == 10 and corrected.min_us == 100_000
+
+
+class TestOpenLoopLoadEngine:
+    """A slow target does not slow down the offered load"""
+
+    async def test_latency_includes_queueing_behind_the_in_flight_cap(self):
+        async def slow(sequence):
+            await asyncio.sleep(0.05)
+
+        engine = OpenLoopLoadEngine(max_in_flight=1)
+        result = await engine.run("slow", slow, ConstantRate(100), duration_s=0.1)
+        assert result.scheduled == result.completed == 10
+        # Requests queued behind one slot: latency grows, service time does not
+        assert result.latency.percentile(100) > 5 * result.service_time.percentile(50)
@@ -0,0 +1,125 @@
+"""Tests for the COPY batch writer and log manager keyset pagination"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from log_batch_writer import LogBatchWriter
+from log_manager import _add_months, _partition_name, decode_log_cursor, encode_log_cursor
+
+
+class _CopyDatabase:
+    """Records copy_records_to_table calls; can fail or block on demand"""
+
+    def __init__(self):
+        self.copies = []
+        self.fail = False
+        self.gate = None
+
+    @asynccontextmanager
+    async def get_connection(self):
+        yield self
+
+    async def copy_records_to_table(self, table, records, columns):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.copies.append((table, columns, list(records)))
+
+
+def _writer(database, **kwargs):
+    writer = LogBatchWriter(database, **kwargs)
+    writer.register_table("events", ["id", "name", "status"])
+    return writer
+
+
+class TestLogBatchWriter:
+    """Size/time flushing, retries and pending updates"""
+
+    async def test_flushes_when_batch_is_full(self):
+        database = _CopyDatabase()
+        writer = _writer(database, flush_size=3)
+        for n in range(7):
+            await writer.add("events", {"id": n, "name": f"e{n}"})
+
+        assert [len(rows) for _, _, rows in database.copies] == [3, 3]
+        assert database.copies[0][1] == ["id", "name", "status"]
+        assert database.copies[0][2][0] == (0, "e0", None)
+        assert writer.pending() == 1
+
+        await writer.close()
+        assert writer.get_stats()["written"] == 7
+
+    async def test_background_flush_on_interval(self):
+        database = _CopyDatabase()
+        writer = _writer(database, flush_size=1000, flush_interval=0.01)
+        writer.start()
+        await writer.add("events", {"id": 1, "name": "e1"})
+        await asyncio.sleep(0.05)
+        assert len(database.copies) == 1
+        await writer.close()
+
+    async def test_failed_flush_is_retried_in_order(self):
+        database = _CopyDatabase()
+        writer = _writer(database, flush_size=1000, max_pending=4)
+        database.fail = True
+        for n in range(3):
+            await writer.add("events", {"id": n})
+        with pytest.raises(ConnectionError):
+            await writer.flush_table("events")
+
+        # Over the cap the oldest rows go
+        for n in range(3, 5):
+            await writer.add("events", {"id": n})
+        assert writer.pending("events") == 4
+        assert writer.stats["dropped"] == 1
+
+        database.fail = False
+        assert await writer.flush() == 4
+        assert [row[0] for row in database.copies[0][2]] == [1, 2, 3, 4]
+
+    async def test_update_pending_row(self):
+        database = _CopyDatabase()
+        writer = _writer(database)
+        await writer.add("events", {"id": "a", "status": "pending"})
+        assert await writer.update_pending("events", "a", {"status": "approved"})
+        await writer.flush()
+        assert database.copies[0][2] == [("a", None, "approved")]
+        assert not await writer.update_pending("events", "a", {"status": "rejected"})
+
+    async def test_update_waits_for_in_flight_copy(self):
+        database = _CopyDatabase()
+        database.gate = asyncio.Event()
+        writer = _writer(database)
+        await writer.add("events", {"id": "a", "status": "pending"})
+
+        flush = asyncio.create_task(writer.flush_table("events"))
+        await asyncio.sleep(0)
+        update = asyncio.create_task(writer.update_pending("events", "a", {"status": "approved"}))
+        await asyncio.sleep(0)
+        assert not update.done()
+
+        database.gate.set()
+        await flush
+        # Already copied: the caller has to UPDATE the row itself
+        assert await update is False
+
+
+class TestLogPartitionsAndCursors:
+    """Partition naming and keyset cursors"""
+
+    def test_month_arithmetic_and_partition_names(self):
+        assert _add_months(datetime(2025, 11, 1), 2) == datetime(2026, 1, 1)
+        assert _add_months(datetime(2026, 1, 1), -1) == datetime(2025, 12, 1)
+        assert _partition_name("project_event_logs", datetime(2026, 3, 1)) == "project_event_logs_y2026m03"
+
+    def test_cursor_round_trip(self):
+        timestamp = datetime(2026, 10, 19, 12, 30, 5, 123456)
+        log_id = uuid.uuid4()
+        assert decode_log_cursor(encode_log_cursor(timestamp, log_id)) == (timestamp, log_id)
+        with pytest.raises(ValueError):
+            decode_log_cursor("not-a-cursor")
@@ -0,0 +1,94 @@
+"""Tests for the agent message codec"""
+
+import json
+import zlib
+from enum import Enum
+
+import pytest
+
+from message_codec import (
+    ACCEPT_HEADER, CBOR, CONTENT_ENCODING_HEADER, CONTENT_TYPE_HEADER, DICTIONARY_HEADER, JSON,
+    MSGPACK, ZLIB, ZSTD, CodecError, MessageCodec, dictionary_id, serialize, train_dictionary
+)
+
+pytest.importorskip("msgpack")
+pytest.importorskip("cbor2")
+pytest.importorskip("zstandard")
+
+
+class _Kind(Enum):
+    DIRECT = "direct"
+
+
+def _message(n: int):
+    return {
+        "id": f"msg-{n}",
+        "type": _Kind.DIRECT,
+        "sender": "coding_agent",
+        "recipients": ["testing_agent", "review_agent"],
+        "subject": "project.analysis.completed",
+        "payload": {"issues": [{"line": n * 7 % 800, "rule": f"R{n % 40}", "severity": "high"}] * 8},
+        "blob": bytes(range(n % 50))
+    }
+
+
+class TestEncodeDecode:
+    """Round trips and headers"""
+
+    @pytest.mark.parametrize("content_type", [MSGPACK, CBOR])
+    def test_binary_round_trip_keeps_raw_bytes(self, content_type):
+        codec = MessageCodec(content_type, compression=ZSTD, compress_threshold=0)
+        data, headers = codec.encode(_message(9))
+        assert headers == {CONTENT_TYPE_HEADER: content_type, CONTENT_ENCODING_HEADER: ZSTD}
+        decoded = MessageCodec().decode(data, headers)
+        assert decoded["blob"] == bytes(range(9))
+        assert decoded["type"] == "direct"
+
+    def test_plain_json_is_legacy_compatible(self):
+        data, headers = MessageCodec().encode({"task_id": "t1", "blob": b"\x01\xff"})
+        # No headers, and an old agent's json.loads reads it
+        assert headers == {}
+        assert json.loads(data) == {"task_id": "t1", "blob": "01ff"}
+        assert MessageCodec(MSGPACK).decode(b'{"task_id": "t1"}', None) == {"task_id": "t1"}
+
+    def test_dictionary_shrinks_small_messages(self):
+        samples = [serialize(_message(n), MSGPACK) for n in range(400)]
+        dictionary = train_dictionary(samples, size=4096)
+        plain = MessageCodec(MSGPACK, compression=ZSTD, compress_threshold=0)
+        with_dict = MessageCodec(MSGPACK, compression=ZSTD, compress_threshold=0,
+                                 dictionaries=[dictionary], dictionary_id=dictionary_id(dictionary))
+
+        data, headers = with_dict.encode(_message(1000))
+        assert headers[DICTIONARY_HEADER] == str(dictionary_id(dictionary))
+        assert len(data) < len(plain.encode(_message(1000))[0])
+        assert with_dict.decode(data, headers)["id"] == "msg-1000"
+        # A receiver without the dictionary cannot decode it
+        with pytest.raises(CodecError):
+            plain.decode(data, headers)
+
+    def test_rejects_oversized_and_malformed(self):
+        codec = MessageCodec(max_decoded_size=1024)
+        bomb = zlib.compress(b"[" + b"0," * 10000 + b"0]")
+        with pytest.raises(CodecError):
+            codec.decode(bomb, {CONTENT_ENCODING_HEADER: ZLIB})
+        with pytest.raises(CodecError):
+            codec.decode(b"\x00garbage", {CONTENT_TYPE_HEADER: MSGPACK, CONTENT_ENCODING_HEADER: ZSTD})
+
+
+class TestNegotiation:
+    """Replies follow what the requester advertised"""
+
+    def test_legacy_peer_gets_plain_json(self):
+        codec = MessageCodec(MSGPACK, compression=ZSTD)
+        assert codec.for_peer(None).encode({"ok": True}) == (b'{"ok":true}', {})
+
+    def test_peer_capabilities_are_respected(self):
+        dictionary = train_dictionary([serialize(_message(n), MSGPACK) for n in range(400)], size=4096)
+        server = MessageCodec(MSGPACK, compression=ZSTD, dictionaries=[dictionary],
+                              dictionary_id=dictionary_id(dictionary))
+        same = MessageCodec(dictionaries=[dictionary])
+        assert server.for_peer(same.accept_headers()) is server
+
+        # A peer without the dictionary and that only speaks CBOR/JSON + zlib
+        reply = server.for_peer({ACCEPT_HEADER: f"{CBOR}, {JSON}", "Accept-Encoding": ZLIB})
+        assert (reply.content_type, reply.compression, reply.dictionary_id) == (CBOR, ZLIB, None)
@@ -0,0 +1,99 @@
+"""Tests for the bounded message history writer"""
+
+import asyncio
+import os
+import tempfile
+from contextlib import asynccontextmanager
+
+from message_history_writer import MessageHistoryWriter, history_record
+
+
+class _Pool:
+    """asyncpg-like pool that records COPY batches; can fail or stall on demand"""
+
+    def __init__(self):
+        self.rows = {}
+        self.batches = []
+        self.fail = False
+        self.gate = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def execute(self, query, *args):
+        pass
+
+    async def copy_records_to_table(self, table, records, columns):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise ConnectionError("database unavailable")
+        self.batches.append(len(records))
+        for record in records:
+            self.rows.setdefault(record[0], record)
+
+
+def _record(n):
+    return history_record({"id": f"m{n}", "type": "direct", "sender": "a", "recipients": ["b"],
+                           "subject": "s", "payload": {"n": n}, "status": "sent", "created_at": 1700000000.0 + n})
+
+
+class TestMessageHistoryWriter:
+    """Size/time draining, spilling and back-pressure"""
+
+    async def test_drains_on_size_and_interval(self):
+        pool = _Pool()
+        writer = MessageHistoryWriter(lambda: pool, flush_size=10, flush_interval=0.02)
+        writer.start()
+        for n in range(25):
+            await writer.add(_record(n))
+        await asyncio.sleep(0.1)
+
+        assert len(pool.rows) == 25 and max(pool.batches) == 10
+        metrics = writer.get_metrics()
+        assert metrics["pending"] == 0 and metrics["lag_seconds"] == 0.0
+        assert metrics["written"] == 25 and metrics["max_batch_size"] == 10
+        await writer.close()
+
+    async def test_spills_when_database_is_down_and_replays(self):
+        pool = _Pool()
+        pool.fail = True
+        with tempfile.TemporaryDirectory() as spill_dir:
+            writer = MessageHistoryWriter(lambda: pool, flush_size=5, flush_interval=0.01, max_pending=20,
+                                          spill_dir=spill_dir, max_backoff=0.01)
+            writer.start()
+            for n in range(100):
+                await writer.add(_record(n))
+            assert writer.pending() <= 20 + 5
+            assert writer.stats["spilled_rows"] >= 75 and os.listdir(spill_dir)
+
+            pool.fail = False
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if len(pool.rows) == 100:
+                    break
+            await writer.close()
+
+            assert sorted(pool.rows) == sorted(f"m{n}" for n in range(100))
+            assert writer.stats["dropped"] == 0 and os.listdir(spill_dir) == []
+
+    async def test_back_pressure_without_spill_then_drop(self):
+        pool = _Pool()
+        pool.gate = asyncio.Event()
+        writer = MessageHistoryWriter(lambda: pool, flush_size=2, flush_interval=0.01, max_pending=4,
+                                      block_timeout=0.05)
+        writer.start()
+        for n in range(10):
+            await writer.add(_record(n))
+        # The first batch is stuck in COPY: senders waited, then the oldest buffered rows were dropped
+        assert writer.pending() == 4 and writer.stats["blocked_adds"] == 5 and writer.stats["dropped"] == 4
+
+        pool.gate.set()
+        await writer.close()
+        assert writer.pending() == 0
+        assert sorted(pool.rows) == ["m0", "m1", "m6", "m7", "m8", "m9"]
@@ -0,0 +1,111 @@
+"""Tests for concurrent notification dispatch, batching and digests"""
+
+import asyncio
+
+from notification_manager import ChannelWorkerPool, NotificationManager
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.ops.append((name, args, kwargs))
+
+    async def execute(self):
+        self.redis.pipelines.append(self.ops)
+        return []
+
+
+class _Redis:
+    def __init__(self):
+        self.pipelines = []
+        self.queued = {}
+
+    def pipeline(self, transaction=False):
+        return _Pipeline(self)
+
+    async def lpush(self, queue, *payloads):
+        self.queued[queue] = self.queued.get(queue, 0) + len(payloads)
+
+
+class TestNotificationManager:
+    """Per-channel pools, pipelined storage and low-priority digests"""
+
+    async def test_send_many_batches_storage_and_delivery(self):
+        redis = _Redis()
+        manager = NotificationManager(redis, {"email": {"enabled": True}})
+        result = await manager.send_many([f"u{n}" for n in range(1200)], {"title": "Deploy done"})
+        await manager.close()
+
+        assert result["results"]["email"] == {"sent": 1200, "failed": 0}
+        assert result["results"]["websocket"] == {"sent": 1200, "failed": 0}
+        assert redis.queued["email_queue"] == 1200
+        # Stored in three pipelined chunks, each list capped and the stream bounded
+        stores = [ops for ops in redis.pipelines if ops[0][0] == "lpush"]
+        assert len(stores) == 3
+        assert {name for name, _, _ in stores[0]} == {"lpush", "ltrim", "expire", "xadd"}
+        assert stores[0][3][2]["maxlen"] == manager.stream_max_length
+
+    async def test_slow_channel_times_out_without_blocking_others(self):
+        manager = NotificationManager(_Redis(), {"webhook": {"enabled": True},
+                                                 "dispatch": {"webhook": {"timeout": 0.05}}})
+
+        async def hang(items):
+            await asyncio.sleep(10)
+
+        manager.pools["webhook"].send_batch = hang
+        result = await manager.send_notification("u1", {"title": "Outage", "priority": "critical"})
+        await manager.close()
+        assert result["results"] == {"websocket": True, "webhook": False}
+        assert manager.get_dispatch_stats()["channels"]["webhook"]["timeouts"] == 1
+
+    async def test_low_priority_is_coalesced_into_a_digest(self):
+        manager = NotificationManager(_Redis(), {"digest": {"window_seconds": 60, "max_items": 3}})
+        sent = []
+
+        async def capture(items):
+            sent.extend(items)
+            return [True] * len(items)
+
+        manager.pools["websocket"].send_batch = capture
+        for n in range(3):
+            result = await manager.send_notification("u1", {"title": f"tip {n}", "priority": "low"})
+            assert result["digested"]
+        await asyncio.sleep(0.01)
+        await manager.close()
+
+        assert len(sent) == 1
+        recipient, digest = sent[0]
+        assert recipient == "u1" and digest["type"] == "digest"
+        assert len(digest["data"]["notifications"]) == 3
+
+
+class TestChannelWorkerPool:
+    """Every submitted future resolves, whatever the batch handler does"""
+
+    async def test_short_result_list_fails_the_rest(self):
+        async def short(items):
+            return [True] * (len(items) - 1)
+
+        pool = ChannelWorkerPool("email", short, workers=1, batch_size=3)
+        futures = [await pool.submit(f"u{n}", {}) for n in range(3)]
+        assert await asyncio.gather(*futures) == [True, True, False]
+        await asyncio.wait_for(pool.queue.join(), 1)
+        assert pool.stats["sent"] == 2 and pool.stats["failed"] == 1
+        await pool.close()
+
+    async def test_close_resolves_in_flight_and_queued_deliveries(self):
+        async def hang(items):
+            await asyncio.sleep(10)
+            return [True] * len(items)
+
+        pool = ChannelWorkerPool("webhook", hang, workers=1, batch_size=2, timeout=30)
+        futures = [await pool.submit(f"u{n}", {}) for n in range(5)]
+        await asyncio.sleep(0.01)
+        await pool.close(timeout=0.05)
+
+        assert await asyncio.gather(*futures) == [False] * 5
+        assert pool.queue_depth() == 0 and pool.stats["failed"] == 5
+        await asyncio.wait_for(pool.queue.join(), 1)
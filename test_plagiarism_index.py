@@ -0,0 +1,97 @@
+"""Tests for the MinHash/LSH plagiarism corpus index"""
+
+import os
+import random
+import pytest
+
+from plagiarism_index import (
+    CorpusIndexConfig,
+    PlagiarismCorpusIndex,
+    MinHasher,
+    SHINGLES_FILE,
+    shingle_hashes,
+    tokenize,
+)
+
+
+def _text(seed, words=200):
+    rng = random.Random(seed)
+    return " ".join(f"word{rng.randrange(5000)}" for _ in range(words))
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = PlagiarismCorpusIndex(CorpusIndexConfig(index_dir=str(tmp_path), memtable_limit=2000)).open()
+    for doc_id in range(50):
+        idx.add_document(f"doc-{doc_id}", _text(doc_id), {"title": f"Document {doc_id}"})
+    yield idx
+    idx.close()
+
+
+class TestShingling:
+    """Tokenization and MinHash primitives"""
+
+    def test_tokenize_tracks_offsets(self):
+        tokens, offsets = tokenize("Hello, World!")
+        assert tokens == ["hello", "world"]
+        assert offsets == [(0, 5), (7, 12)]
+
+    def test_shingle_count(self):
+        assert len(shingle_hashes(["a", "b", "c", "d", "e", "f"], 5)) == 2
+
+    def test_identical_sets_have_identical_signatures(self):
+        hasher = MinHasher(64)
+        hashes = shingle_hashes(tokenize(_text(1))[0], 5)
+        assert hasher.signature(hashes) == hasher.signature(list(reversed(hashes)))
+
+
+class TestCorpusIndex:
+    """Candidate generation, exact verification and persistence"""
+
+    def test_copied_passage_is_found_with_spans(self, index):
+        source_words = _text(7).split()
+        query = "An original opening sentence. " + " ".join(source_words[60:120])
+
+        matches = index.query(query)
+
+        assert matches[0].source_id == "doc-7"
+        assert matches[0].containment > 0.8
+        span = matches[0].spans[0]
+        assert span["source_start_word"] == 60
+        assert query[span["start_char"]:span["end_char"]].split()[0] == source_words[60]
+
+    def test_unrelated_text_has_no_matches(self, index):
+        assert index.query(_text(999)) == []
+
+    def test_incremental_additions_survive_reopen(self, index, tmp_path):
+        index.add_document("late", _text(500))
+        assert index.query(_text(500))[0].source_id == "late"
+        index.close()
+
+        reopened = PlagiarismCorpusIndex(CorpusIndexConfig(index_dir=str(tmp_path))).open()
+        try:
+            assert len(reopened) == 51
+            assert reopened.query(_text(500))[0].jaccard == pytest.approx(1.0)
+        finally:
+            reopened.close()
+
+    def test_torn_shingle_append_is_truncated_on_reopen(self, index, tmp_path):
+        index.close()
+        shingles_path = os.path.join(str(tmp_path), SHINGLES_FILE)
+        durable = os.path.getsize(shingles_path)
+        with open(shingles_path, "ab") as f:
+            f.write(b"\x01\x02\x03\x04\x05\x06")
+
+        reopened = PlagiarismCorpusIndex(CorpusIndexConfig(index_dir=str(tmp_path))).open()
+        try:
+            assert os.path.getsize(shingles_path) == durable
+            reopened.add_document("late", _text(500))
+            assert reopened.query(_text(500))[0].source_id == "late"
+            assert reopened.query(_text(7))[0].source_id == "doc-7"
+        finally:
+            reopened.close()
+
+    def test_mismatched_configuration_is_rejected(self, index, tmp_path):
+        index.flush()
+        with pytest.raises(ValueError):
+            PlagiarismCorpusIndex(CorpusIndexConfig(index_dir=str(tmp_path), shingle_k=3)).open()
@@ -0,0 +1,156 @@
+"""Tests for the reliable Redis task queue"""
+
+import asyncio
+import json
+
+import fakeredis
+import pytest
+
+from redis_task_queue import QueueWorker, RedisTaskQueue
+
+
+def _queue(**kwargs):
+    return RedisTaskQueue(fakeredis.FakeAsyncRedis(), prefix="test:", **kwargs)
+
+
+class TestRedisTaskQueue:
+    """Claims, acks, failures and lease fencing"""
+
+    async def test_claim_orders_by_priority_within_capacity(self):
+        queue = _queue()
+        await queue.enqueue("email", {"n": 1}, priority=5)
+        await queue.enqueue("email", {"n": 2}, priority=1)
+        await queue.enqueue("report", {"n": 3}, priority=3)
+        await queue.enqueue("email", {"n": 4}, priority=1, delay_seconds=60)
+
+        claimed = await queue.claim({"email": 1, "report": 5}, batch_size=10)
+        assert [task.payload["n"] for task in claimed] == [2, 3]
+        assert all(task.attempts == 1 for task in claimed)
+
+        stats = await queue.get_stats()
+        assert (stats["ready"], stats["delayed"], stats["in_flight"]) == (1, 1, 2)
+
+        assert await queue.ack(claimed[0])
+        assert not await queue.ack(claimed[0])
+        assert (await queue.get_stats())["completed"] == 1
+
+    async def test_fail_retries_then_dead_letters(self):
+        queue = _queue(max_attempts=2)
+        await queue.enqueue("email", {})
+
+        task, = await queue.claim({"email": 1})
+        assert await queue.fail(task, "smtp down", retry_delay=0) == "retrying"
+        task, = await queue.claim({"email": 1})
+        assert task.attempts == 2
+        assert await queue.fail(task, "smtp down") == "dead_letter"
+
+        stats = await queue.get_stats()
+        assert (stats["ready"], stats["delayed"], stats["in_flight"], stats["dead_letter"]) == (0, 0, 0, 1)
+        record = json.loads((await queue.redis.zrange(queue.dead_letter_key, 0, -1))[0])
+        assert record["error"] == "smtp down" and record["attempts"] == 2
+
+    async def test_reclaim_requeues_expired_leases(self):
+        queue = _queue(visibility_timeout=0.01, max_attempts=2)
+        await queue.enqueue("email", {})
+
+        await queue.claim({"email": 1})
+        await asyncio.sleep(0.02)
+        assert await queue.reclaim_expired() == {"reclaimed": 1, "dead_letter": 0}
+
+        await queue.claim({"email": 1})
+        await asyncio.sleep(0.02)
+        assert await queue.reclaim_expired() == {"reclaimed": 0, "dead_letter": 1}
+
+    async def test_stale_lease_cannot_ack_fail_or_extend(self):
+        queue = _queue(visibility_timeout=0.01)
+        await queue.enqueue("email", {})
+
+        stale, = await queue.claim({"email": 1})
+        await asyncio.sleep(0.02)
+        await queue.reclaim_expired()
+        queue.visibility_timeout = 30
+        current, = await queue.claim({"email": 1})
+        assert current.id == stale.id and current.attempts == 2
+
+        # The first worker wakes up after the task was handed to another one
+        assert await queue.extend([stale, current]) == [stale]
+        assert not await queue.ack(stale)
+        assert await queue.fail(stale, "late") == "lease_lost"
+        assert (await queue.get_stats())["in_flight"] == 1
+
+        assert await queue.ack(current)
+        assert (await queue.get_stats())["in_flight"] == 0
+
+    async def test_import_sorted_set_moves_members_once(self):
+        queue = _queue()
+        legacy = "legacy:tasks"
+        await queue.redis.zadd(legacy, {json.dumps({"type": "email", "n": n}): n for n in range(5)})
+
+        def convert(member):
+            task = json.loads(member)
+            return {"type": task["type"], "payload": {"n": task["n"]}}
+
+        moved = await asyncio.gather(*(queue.import_sorted_set(legacy, convert, batch_size=2) for _ in range(3)))
+        assert sum(moved) == 5
+        assert await queue.redis.zcard(legacy) == 0
+        claimed = await queue.claim({"email": 10})
+        assert sorted(task.payload["n"] for task in claimed) == [0, 1, 2, 3, 4]
+
+    async def test_import_sorted_set_keeps_members_when_conversion_fails(self):
+        queue = _queue()
+        await queue.redis.zadd("legacy:tasks", {"not json": 1})
+        with pytest.raises(ValueError):
+            await queue.import_sorted_set("legacy:tasks", json.loads)
+        assert await queue.redis.zcard("legacy:tasks") == 1
+        assert (await queue.get_stats())["ready"] == 0
+
+
+class TestQueueWorker:
+    """Handlers run with per-type concurrency and results are recorded"""
+
+    async def test_worker_runs_handlers_and_records_outcomes(self):
+        queue = _queue(max_attempts=1)
+        running = 0
+        peak = 0
+
+        async def send(payload):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            if payload.get("fail"):
+                raise RuntimeError("boom")
+
+        worker = QueueWorker(queue, {"email": send}, concurrency={"email": 2}, poll_interval=0.01)
+        for n in range(5):
+            await queue.enqueue("email", {"fail": n == 4})
+
+        run = asyncio.create_task(worker.run())
+        while worker.stats["completed"] + worker.stats["failed"] < 5:
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        await run
+
+        assert peak == 2
+        assert worker.stats["completed"] == 4 and worker.stats["dead_letter"] == 1
+
+    async def test_unhandled_types_are_dead_lettered_or_counted(self):
+        queue = _queue()
+        await queue.enqueue("email", {})
+        await queue.enqueue("fax", {"n": 1})
+        await queue.enqueue("fax", {"n": 2})
+
+        counting = QueueWorker(queue, {"email": None}, dead_letter_unhandled=False)
+        await counting._handle_unhandled()
+        assert counting.stats["unhandled_waiting"] == 2
+        assert (await queue.get_stats())["ready_by_type"]["fax"] == 2
+
+        worker = QueueWorker(queue, {"email": None})
+        await worker._handle_unhandled()
+        assert worker.stats["unhandled"] == 2
+        stats = await queue.get_stats()
+        assert stats["ready_by_type"] == {"email": 1, "fax": 0} and stats["dead_letter"] == 2
+        record = json.loads((await queue.redis.zrange(queue.dead_letter_key, 0, -1))[0])
+        assert record["type"] == "fax" and record["error"] == "No handler for task type: fax"
+        assert not await queue.redis.exists(queue.task_prefix + record["id"])
@@ -0,0 +1,102 @@
+"""Tests for event-driven completion and partial streaming in the response aggregator"""
+
+import asyncio
+import pytest
+
+from response_aggregator_fixed import (
+    ProductionResponseAggregator,
+    AggregationRequest,
+    AggregatedResponse,
+    AggregationStrategy,
+    AggregationStatus,
+    ResponseMetrics,
+)
+
+
+def _response(index, correlation_id, data):
+    return AggregatedResponse(
+        response_id=f"resp_{index}",
+        agent_id=f"agent_{index}",
+        correlation_id=correlation_id,
+        data=data,
+        metrics=ResponseMetrics(quality_score=1.0, confidence=1.0),
+    )
+
+
+@pytest.fixture
+async def aggregator():
+    agg = ProductionResponseAggregator()
+    agg.config.enable_agent_reputation = False
+    yield agg
+    await agg.shutdown()
+
+
+class TestEventDrivenCompletion:
+    """Submissions should wake the waiting aggregation immediately"""
+
+    async def test_first_response_completes_without_polling(self, aggregator):
+        request_id = await aggregator.create_aggregation_request(
+            AggregationRequest("", "corr-first", AggregationStrategy.FIRST_RESPONSE, timeout=30)
+        )
+        task = aggregator._processing_tasks[request_id]
+
+        await aggregator.submit_response(_response(0, "corr-first", "answer"))
+        await asyncio.wait_for(task, timeout=0.05)
+
+        result = await aggregator.get_aggregation_result(request_id)
+        assert result.status == AggregationStatus.COMPLETED
+        assert result.aggregated_data == "answer"
+
+    async def test_expected_responses_trigger_completion(self, aggregator):
+        request_id = await aggregator.create_aggregation_request(
+            AggregationRequest("", "corr-all", AggregationStrategy.ALL_RESPONSES,
+                               timeout=30, expected_responses=2)
+        )
+        task = aggregator._processing_tasks[request_id]
+
+        await aggregator.submit_response(_response(0, "corr-all", 1))
+        assert not task.done()
+        await aggregator.submit_response(_response(1, "corr-all", 2))
+        await asyncio.wait_for(task, timeout=0.05)
+
+        result = await aggregator.get_aggregation_result(request_id)
+        assert result.total_responses == 2
+
+    async def test_unknown_correlation_is_rejected(self, aggregator):
+        assert await aggregator.submit_response(_response(0, "missing", 1)) is False
+
+
+class TestPartialStreaming:
+    """Partial results for incremental strategies"""
+
+    async def test_weighted_average_streams_running_value(self, aggregator):
+        request_id = await aggregator.create_aggregation_request(
+            AggregationRequest("", "corr-avg", AggregationStrategy.WEIGHTED_AVERAGE,
+                               timeout=30, expected_responses=3)
+        )
+        received = []
+
+        async def consume():
+            async for partial in aggregator.stream_partial_results(request_id):
+                received.append(partial)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        for index, value in enumerate([1, 2, 3]):
+            await aggregator.submit_response(_response(index, "corr-avg", value))
+        await asyncio.wait_for(consumer, timeout=1)
+
+        assert [p.aggregated_data for p in received[:-1]] == [1.0, 1.5, 2.0]
+        assert received[-1].status == AggregationStatus.COMPLETED
+        assert received[-1].aggregated_data == 2.0
+
+    async def test_stream_after_completion_yields_final_result(self, aggregator):
+        request_id = await aggregator.create_aggregation_request(
+            AggregationRequest("", "corr-done", AggregationStrategy.FIRST_RESPONSE, timeout=30)
+        )
+        await aggregator.submit_response(_response(0, "corr-done", "x"))
+        await aggregator._processing_tasks[request_id]
+
+        results = [r async for r in aggregator.stream_partial_results(request_id)]
+        assert len(results) == 1
+        assert results[0].status == AggregationStatus.COMPLETED
@@ -0,0 +1,68 @@
+"""Tests for the compiled optimization rule conditions"""
+
+import numpy as np
+import pytest
+
+from rule_compiler import RuleCompileError, compile_condition
+
+
+class TestCompileCondition:
+    """Parsing, sandboxing and variable binding"""
+
+    def test_sql_style_keywords_and_defaults(self):
+        condition = compile_condition("cpu_usage < 20 AND worker_count > 2")
+        assert condition.variables == {"cpu_usage", "worker_count"}
+        assert condition.evaluate({"cpu_usage": 10.0}, {"worker_count": 4})
+        assert not condition.evaluate({"cpu_usage": 10.0, "worker_count": 1})
+
+    def test_missing_variable_does_not_match(self):
+        condition = compile_condition("NOT memory_usage > 85")
+        assert not condition.evaluate({})
+        assert condition.evaluate({"memory_usage": 50.0})
+
+    def test_functions_and_chained_comparisons(self):
+        condition = compile_condition("10 < avg([a, b]) <= 20 or abs(a - b) > max(a, b)")
+        assert condition.variables == {"a", "b"}
+        assert condition.evaluate({"a": 10, "b": 20})
+        assert not condition.evaluate({"a": 1, "b": 2})
+
+    @pytest.mark.parametrize("source", [
+        "__import__('os').system('id')",
+        "cpu_usage.__class__ > 1",
+        "metrics['cpu'] > 1",
+        "(lambda: 1)()",
+        "open('x')",
+        "cpu_usage > ",
+        "2 ** 1000 > cpu_usage"
+    ])
+    def test_rejects_unsafe_or_invalid(self, source):
+        try:
+            condition = compile_condition(source)
+        except RuleCompileError:
+            return
+        # Only the runaway exponent gets past compilation, and fails when evaluated
+        with pytest.raises(ValueError):
+            condition.evaluate({"cpu_usage": 1.0})
+
+
+class TestEvaluateBatch:
+    """Vectorized evaluation across services"""
+
+    def test_matches_scalar_evaluation(self):
+        condition = compile_condition("cpu_usage > 80 or (memory_usage > 70 and not cache_hit_rate >= 50)")
+        rows = [
+            {"cpu_usage": 90.0, "memory_usage": 10.0, "cache_hit_rate": 90.0},
+            {"cpu_usage": 10.0, "memory_usage": 75.0, "cache_hit_rate": 40.0},
+            {"cpu_usage": 10.0, "memory_usage": 75.0, "cache_hit_rate": 60.0},
+            {"cpu_usage": 10.0, "memory_usage": 10.0, "cache_hit_rate": 10.0}
+        ]
+        columns = {name: np.array([row[name] for row in rows]) for name in rows[0]}
+        batch = condition.evaluate_batch(columns, len(rows))
+        assert batch.tolist() == [condition.evaluate(row) for row in rows] == [True, True, False, False]
+
+    def test_nan_and_defaults(self):
+        condition = compile_condition("cpu_usage < 20 AND worker_count > 2")
+        columns = {"cpu_usage": np.array([10.0, np.nan, 50.0])}
+        assert condition.evaluate_batch(columns, 3, {"worker_count": 4}).tolist() == [True, False, False]
+        # Without a column or a default nothing matches
+        assert not condition.evaluate_batch(columns, 3).any()
@@ -0,0 +1,119 @@
+"""Tests for the warm sandbox interpreter pool"""
+
+import asyncio
+import logging
+import shutil
+
+import pytest
+
+from sandbox_pool import WarmSandboxPool, SandboxPoolConfig, SandboxPoolSaturated
+
+
+@pytest.fixture
+async def pool():
+    config = SandboxPoolConfig(workers_per_language=1, max_runs_per_worker=3, max_queue=2,
+                               languages=["python", "bash"])
+    warm_pool = WarmSandboxPool(logging.getLogger("test_sandbox_pool"), config)
+    await warm_pool.start()
+    yield warm_pool
+    await warm_pool.shutdown()
+
+
+async def _run(pool, code, language="python", timeout=5, **kwargs):
+    return await pool.execute(language, code, timeout_seconds=timeout, max_memory_mb=256,
+                              max_output_size=kwargs.pop("max_output_size", 4096), **kwargs)
+
+
+class TestWarmExecution:
+    """Runs behave like fresh interpreter invocations"""
+
+    async def test_stdout_stdin_and_exit_code(self, pool):
+        result = await _run(pool, "import sys\nprint(input().upper())\nsys.exit(3)", stdin_data="hi\n")
+        assert result["stdout"] == "HI\n"
+        assert result["exit_code"] == 3
+
+    async def test_runs_are_isolated(self, pool):
+        await _run(pool, "import json\njson.leaked = True\nLEAKED = 1")
+        result = await _run(pool, "import json\nprint(hasattr(json, 'leaked'), 'LEAKED' in globals())")
+        assert result["stdout"] == "False False\n"
+
+    async def test_environment_is_per_run(self, pool):
+        first = await _run(pool, "echo ${SANDBOX_VAR:-unset}", language="bash",
+                           environment_vars={"SANDBOX_VAR": "set"})
+        second = await _run(pool, "echo ${SANDBOX_VAR:-unset}", language="bash")
+        assert first["stdout"] == "set\n"
+        assert second["stdout"] == "unset\n"
+
+    async def test_output_is_truncated(self, pool):
+        result = await _run(pool, "print('x' * 10000)", max_output_size=100)
+        assert len(result["stdout"]) == 100
+        assert result["truncated"] is True
+
+
+class TestRecycling:
+    """Workers are replaced after violations and run limits"""
+
+    async def test_timeout_kills_run_and_recycles_worker(self, pool):
+        result = await _run(pool, "while True: pass", timeout=1)
+        assert result["timed_out"] is True
+        assert pool.stats["violations"] == 1
+
+        follow_up = await _run(pool, "print('ok')")
+        assert follow_up["stdout"] == "ok\n"
+        assert pool.stats["recycles"] >= 1
+
+    async def test_recycled_after_max_runs(self, pool):
+        for _ in range(3):
+            await _run(pool, "pass")
+        await _run(pool, "pass")
+        assert pool.stats["recycles"] == 1
+
+    async def test_queue_limit_rejects_excess_requests(self, pool):
+        slow = [asyncio.create_task(_run(pool, "import time; time.sleep(0.5)")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(SandboxPoolSaturated):
+            await _run(pool, "pass")
+        await asyncio.gather(*slow)
+        assert pool.stats["queue_rejections"] == 1
+
+
+@pytest.mark.skipif(not shutil.which("node"), reason="Node.js not installed")
+class TestJavaScriptWorker:
+    """The vm context exposes no host capabilities and tainted workers are replaced"""
+
+    @pytest.fixture
+    async def js_pool(self):
+        config = SandboxPoolConfig(workers_per_language=1, languages=["javascript"])
+        warm_pool = WarmSandboxPool(logging.getLogger("test_sandbox_pool"), config)
+        await warm_pool.start()
+        yield warm_pool
+        await warm_pool.shutdown()
+
+    async def test_no_require_or_timers_in_context(self, js_pool):
+        result = await _run(js_pool, "console.log(typeof require, typeof setTimeout, typeof setInterval)",
+                            language="javascript")
+        assert result["stdout"] == "undefined undefined undefined\n"
+        assert result["leaked_handles"] == 0
+        assert js_pool.stats["recycles"] == 0
+
+    async def test_worker_with_pending_handles_is_recycled(self, js_pool):
+        escape = "const host = this.constructor.constructor('return globalThis')(); host.setInterval(() => {}, 60000);"
+        result = await _run(js_pool, escape, language="javascript")
+        assert result["leaked_handles"] >= 1
+
+        # Served by the replacement worker
+        follow_up = await _run(js_pool, "console.log('ok')", language="javascript")
+        assert follow_up["stdout"] == "ok\n" and follow_up["leaked_handles"] == 0
+        assert js_pool.stats["recycles"] == 1
+
+    async def test_code_needing_host_facilities_is_left_to_cold_execution(self, js_pool):
+        def warm(code):
+            return js_pool.supports("javascript", None, {}, js_pool.config.default_memory_mb, code)
+
+        assert warm("const xs = [1, 2, 3]; console.log(xs.map((x) => x * 2).join(','))")
+        for code in ("const fs = require('fs'); console.log(fs.existsSync('/'))",
+                     "setTimeout(() => console.log('later'), 10)",
+                     "Promise.resolve().then(() => console.log('async'))",
+                     "(async () => { console.log(await 1) })()",
+                     "console.log(process.version)"):
+            assert not warm(code), code
@@ -0,0 +1,134 @@
+"""Tests for session activity coalescing, token caching and revocation feeds"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import fakeredis
+
+from session_management import RevocationFilter, SessionManager, TokenManager
+
+
+def _redis(server):
+    return fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+
+
+async def _until(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+class TestRevocationFilter:
+    """Bloom filter used for revoked tokens and deleted sessions"""
+
+    def test_no_false_negatives(self):
+        revoked = RevocationFilter(capacity=1000, error_rate=0.01)
+        for n in range(1000):
+            revoked.add(f"jti-{n}")
+        assert all(f"jti-{n}" in revoked for n in range(1000))
+        false_positives = sum(f"other-{n}" in revoked for n in range(10000))
+        assert false_positives < 300 and revoked.count == 1000
+
+
+class TestSessionActivity:
+    """Coalesced activity writes and the known-session fast path"""
+
+    async def test_activity_is_coalesced_into_one_flush(self):
+        redis = _redis(fakeredis.FakeServer())
+        sessions = SessionManager(redis=redis, activity_flush_interval=60)
+        session_id, _ = await sessions.create_session("u1", "u1@example.com", "10.0.0.1", "agent")
+        await redis.expire(f"session:{session_id}", 5)
+
+        for _ in range(10):
+            assert await sessions.update_activity(session_id)
+        assert len(sessions._pending_activity) == 1
+
+        assert await sessions.flush_activity() == 1
+        assert await redis.ttl(f"session:{session_id}") > 5
+        assert await redis.get(f"session_activity:{session_id}") is not None
+        assert not await sessions.update_activity("missing")
+        await sessions.close()
+
+    async def test_revoke_on_another_instance(self):
+        server = fakeredis.FakeServer()
+        first = SessionManager(redis=_redis(server), activity_flush_interval=60)
+        second = SessionManager(redis=_redis(server), activity_flush_interval=60)
+        for manager in (first, second):
+            await manager.start_revocation_sync()
+        await _until(lambda: first._revocation_synced and second._revocation_synced)
+
+        session_id, _ = await first.create_session("u1", "u1@example.com", "10.0.0.1", "agent")
+        assert await second.update_activity(session_id)
+        assert session_id in second._known_sessions
+
+        assert await first.delete_session(session_id)
+        await _until(lambda: session_id in second._revoked)
+        assert not await second.update_activity(session_id)
+
+        await first.close()
+        await second.close()
+
+    async def test_known_session_in_filter_is_rechecked(self):
+        sessions = SessionManager(redis=_redis(fakeredis.FakeServer()), activity_flush_interval=60)
+        await sessions.start_revocation_sync()
+        await _until(lambda: sessions._revocation_synced)
+        session_id, _ = await sessions.create_session("u1", "u1@example.com", "10.0.0.1", "agent")
+
+        # Deleted elsewhere, and re-remembered by a lookup that raced the revocation
+        await sessions.redis.delete(f"session:{session_id}")
+        sessions._revoked.add(session_id)
+        sessions._remember(session_id, "u1")
+        assert not await sessions.update_activity(session_id)
+        await sessions.close()
+
+    async def test_fast_path_needs_a_live_feed(self):
+        redis = _redis(fakeredis.FakeServer())
+        sessions = SessionManager(redis=redis, activity_flush_interval=60, revocation_sync=False)
+        session_id, _ = await sessions.create_session("u1", "u1@example.com", "10.0.0.1", "agent")
+        await redis.delete(f"session:{session_id}")
+        # Without the deletion feed a remembered session is still looked up
+        assert not await sessions.update_activity(session_id)
+        await sessions.close()
+        assert sessions._revocation_task is None
+
+    async def test_revocation_sync_starts_with_the_first_call(self):
+        server = fakeredis.FakeServer()
+        first = SessionManager(redis=_redis(server), activity_flush_interval=60)
+        second = SessionManager(redis=_redis(server), activity_flush_interval=60)
+        session_id, _ = await first.create_session("u1", "u1@example.com", "10.0.0.1", "agent")
+        assert await second.update_activity(session_id)
+        await _until(lambda: first._revocation_synced and second._revocation_synced)
+
+        assert await first.delete_session(session_id)
+        await _until(lambda: session_id in second._revoked)
+        assert not await second.update_activity(session_id)
+        await first.close()
+        await second.close()
+
+
+class TestTokenManager:
+    """Verified-token cache and revocation across instances"""
+
+    async def test_cached_tokens_are_revoked_everywhere(self):
+        server = fakeredis.FakeServer()
+        first = TokenManager("secret", redis=_redis(server))
+        second = TokenManager("secret", redis=_redis(server))
+        for manager in (first, second):
+            await manager.start_revocation_sync()
+        await _until(lambda: first._revocation_synced and second._revocation_synced)
+
+        token = first.create_access_token("u1", "u1@example.com")
+        payload = await second.verify_token(token)
+        assert payload["user_id"] == "u1"
+        assert await second.verify_token(token) == payload
+        assert (second.cache_hits, second.cache_misses) == (1, 1)
+        assert await second.verify_token(token, token_type="refresh") is None
+
+        await first.blacklist_token(payload["jti"], datetime.utcnow() + timedelta(minutes=5))
+        await _until(lambda: payload["jti"] in second._revoked)
+        assert await second.verify_token(token) is None
+        assert second.get_cache_stats()["verified_cache_size"] == 0
+
+        for manager in (first, second):
+            await manager.stop_revocation_sync()
@@ -0,0 +1,85 @@
+"""Tests for dependency-graph startup and the startup profiler"""
+
+import asyncio
+import time
+
+import pytest
+
+from startup_graph import ComponentSpec, StartupError, StartupGraph, StartupGraphError
+
+
+def _component(started, name, delay=0.0, fail=False):
+    async def start():
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{name} broke")
+        started.append(name)
+    return start
+
+
+class TestStartupGraph:
+    """Ordering, concurrency, failure policies and profiling"""
+
+    async def test_independent_components_start_concurrently(self):
+        started = []
+        graph = StartupGraph()
+        graph.add(ComponentSpec("db", _component(started, "db", 0.05)))
+        for n in range(5):
+            graph.add(ComponentSpec(f"agent{n}", _component(started, f"agent{n}", 0.05), depends_on=["db"]))
+        graph.add(ComponentSpec("monitoring", _component(started, "monitoring"), after=[f"agent{n}" for n in range(5)]))
+
+        start = time.perf_counter()
+        report = await graph.run()
+        # Two levels of 50 ms, not six components in a row
+        assert time.perf_counter() - start < 0.2
+        assert started[0] == "db" and started[-1] == "monitoring"
+        assert report.critical_path[0] == "db" and report.critical_path[-1] == "monitoring"
+        assert report.sequential_seconds > report.total_seconds
+
+    async def test_optional_failure_skips_dependents_only(self):
+        started = []
+        graph = StartupGraph()
+        graph.add(ComponentSpec("db", _component(started, "db")))
+        graph.add(ComponentSpec("engine", _component(started, "engine", fail=True), depends_on=["db"], critical=False))
+        graph.add(ComponentSpec("engine_ui", _component(started, "engine_ui"), depends_on=["engine"], critical=False))
+        graph.add(ComponentSpec("wiring", _component(started, "wiring"), depends_on=["db"], after=["engine_ui"]))
+
+        report = await graph.run()
+        assert report.by_status("failed") == ["engine"]
+        assert report.by_status("skipped") == ["engine_ui"]
+        assert started == ["db", "wiring"]
+
+    async def test_slow_optional_component_degrades_or_fails_fast(self):
+        for fail_fast in (False, True):
+            started = []
+            graph = StartupGraph(fail_fast=fail_fast)
+            graph.add(ComponentSpec("slow", _component(started, "slow", 1.0), critical=False, timeout=0.02))
+            graph.add(ComponentSpec("fast", _component(started, "fast")))
+            if fail_fast:
+                with pytest.raises(StartupError) as info:
+                    await graph.run()
+                assert info.value.report.components["slow"].status == "degraded"
+            else:
+                report = await graph.run()
+                assert report.by_status("degraded") == ["slow"] and started == ["fast"]
+
+    async def test_critical_failure_aborts_and_cancels(self):
+        started = []
+        graph = StartupGraph()
+        graph.add(ComponentSpec("db", _component(started, "db", fail=True)))
+        graph.add(ComponentSpec("cache", _component(started, "cache", 1.0)))
+        with pytest.raises(StartupError, match="db failed"):
+            await graph.run()
+        assert started == []
+
+    def test_rejects_cycles_and_unknown_dependencies(self):
+        graph = StartupGraph()
+        graph.add(ComponentSpec("a", _component([], "a"), depends_on=["b"]))
+        graph.add(ComponentSpec("b", _component([], "b"), after=["a"]))
+        with pytest.raises(StartupGraphError, match="cycle"):
+            graph.order()
+
+        graph = StartupGraph()
+        graph.add(ComponentSpec("a", _component([], "a"), depends_on=["missing"]))
+        with pytest.raises(StartupGraphError, match="unknown"):
+            graph.order()
@@ -0,0 +1,62 @@
+"""Tests for the streaming anomaly detectors"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from streaming_anomaly import (
+    GRADUAL_INCREASE, SPIKE, ColumnarBuffer, StreamingDetectorBank, replay
+)
+
+
+@dataclass
+class _Snapshot:
+    timestamp: float
+    cpu: float
+    memory: float
+
+
+class TestStreamingAnomaly:
+    """Columnar storage, per-arrival detection and replay"""
+
+    def test_columnar_buffer_wraps_oldest_first(self):
+        buffer = ColumnarBuffer(["cpu", "memory"], capacity=4)
+        for n in range(6):
+            buffer.append_record(_Snapshot(float(n), n * 10.0, n + 0.5))
+        assert len(buffer) == 4 and buffer.total == 6
+        assert buffer.column("cpu").tolist() == [20.0, 30.0, 40.0, 50.0]
+        assert buffer.timestamps(last=2).tolist() == [4.0, 5.0]
+        assert buffer.window(last=1)[:, 0].tolist() == [50.0, 5.5]
+        assert buffer.latest() == {"cpu": 50.0, "memory": 5.5}
+
+    def test_spike_and_drift_are_detected_on_arrival(self):
+        rng = np.random.default_rng(1)
+        bank = StreamingDetectorBank(["steady", "spiky", "drifting"])
+        fired = {}
+        for n in range(600):
+            values = 100 + rng.normal(0, 2, 3)
+            if n == 300:
+                values[1] += 30
+            if n >= 300:
+                values[2] += (n - 300) * 0.05
+            for finding in bank.update(values, timestamp=float(n)):
+                fired.setdefault((finding.series, finding.detector, finding.anomaly_type), []).append(n)
+
+        assert 300 in fired[("spiky", "ewma", SPIKE)]
+        assert 300 in fired[("spiky", "mad", SPIKE)]
+        assert 300 < fired[("drifting", "cusum", GRADUAL_INCREASE)][0] < 500
+        assert not any(series == "steady" and detector == "cusum" for series, detector, _ in fired)
+
+    def test_missing_samples_and_late_series(self):
+        bank = StreamingDetectorBank(warmup=10)
+        rows = [(float(n), {"a": 10.0 + n % 2}) for n in range(20)]
+        rows += [(float(n), {"b": 5.0 + n % 2} if n % 3 else {"a": 10.0, "b": 5.0}) for n in range(20, 40)]
+        result = replay(bank, rows)
+
+        assert bank.series == ["a", "b"] and result["arrivals"] == 40
+        # "a" only counts arrivals where it was present; "b" joined at arrival 20
+        assert bank.baseline("a")["samples"] == 27
+        assert bank.baseline("b")["samples"] == 20
+        # Absent series are carried forward, never scored
+        present = {timestamp: set(values) for timestamp, values in rows}
+        assert all(f.series in present[f.timestamp] for f in result["findings"])
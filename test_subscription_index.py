@@ -0,0 +1,78 @@
+"""Tests for the knowledge subscription index"""
+
+import random
+from enum import Enum
+
+from subscription_index import IndexedSubscription, SubscriptionIndex
+
+
+class _Category(Enum):
+    CODE_PATTERNS = "code_patterns"
+    BUG_FIXES = "bug_fixes"
+
+
+def _brute_force(subscriptions, category, knowledge):
+    """The per-row check notify_subscribers used to run"""
+    matched = set()
+    for sub in subscriptions:
+        if getattr(category, "value", category) not in sub.categories:
+            continue
+        if sub.tags and not any(tag in knowledge.get("tags", []) for tag in sub.tags):
+            continue
+        if any(knowledge.get(key) != value for key, value in sub.filters.items()):
+            continue
+        matched.add(sub.subscription_id)
+    return matched
+
+
+class TestSubscriptionIndex:
+    """Matching and keeping postings in sync"""
+
+    def test_tags_filters_and_enum_categories(self):
+        index = SubscriptionIndex()
+        index.add(IndexedSubscription("any", "a", [_Category.CODE_PATTERNS]))
+        index.add(IndexedSubscription("py", "b", ["code_patterns"], tags=["python", "rust"]))
+        index.add(IndexedSubscription("py-high", "c", ["code_patterns"], tags=["python"],
+                                      filters={"severity": "high", "langs": ["py"]}))
+        index.add(IndexedSubscription("bugs", "d", [_Category.BUG_FIXES], delivery_method="digest"))
+
+        knowledge = {"tags": ["python"], "severity": "high", "langs": ["py"]}
+        matched = {s.subscription_id for s in index.match(_Category.CODE_PATTERNS, knowledge)}
+        assert matched == {"any", "py", "py-high"}
+        matched = {s.subscription_id for s in index.match("code_patterns", {"tags": ["go"], "severity": "high"})}
+        assert matched == {"any"}
+        assert index.agents("bug_fixes") == {"d"}
+
+    def test_update_and_remove_keep_postings_in_sync(self):
+        index = SubscriptionIndex()
+        index.add(IndexedSubscription("s1", "a", ["code_patterns"], tags=["python"]))
+        index.add(IndexedSubscription("s1", "a", ["bug_fixes"], filters={"team": "core"}))
+        assert index.match("code_patterns", {"tags": ["python"]}) == []
+        assert [s.subscription_id for s in index.match("bug_fixes", {"team": "core"})] == ["s1"]
+
+        assert index.remove("s1").agent_id == "a"
+        assert len(index) == 0 and not index.categories()
+        assert index.remove("s1") is None
+
+    def test_agrees_with_per_subscription_check(self):
+        rng = random.Random(3)
+        categories, tags = ["c1", "c2", "c3"], [f"t{n}" for n in range(8)]
+        subscriptions = [
+            IndexedSubscription(
+                f"s{n}", f"agent-{n % 17}", rng.sample(categories, rng.randint(1, 2)),
+                tags=rng.sample(tags, rng.randint(0, 3)),
+                filters=rng.choice([{}, {"lang": rng.choice(["py", "go"])},
+                                    {"lang": "py", "level": rng.randint(1, 2)}])
+            )
+            for n in range(300)
+        ]
+        index = SubscriptionIndex()
+        for sub in subscriptions:
+            index.add(sub)
+
+        for _ in range(200):
+            category = rng.choice(categories)
+            knowledge = {"tags": rng.sample(tags, rng.randint(0, 3)), "lang": rng.choice(["py", "go", None]),
+                         "level": rng.randint(1, 2)}
+            matched = {s.subscription_id for s in index.match(category, knowledge)}
+            assert matched == _brute_force(subscriptions, category, knowledge)
@@ -0,0 +1,80 @@
+"""Tests for pull-based task dispatch"""
+
+import asyncio
+
+from agent_discovery import AgentDiscovery
+from agent_registry import AgentRegistry
+from task_dispatcher import TaskDispatcher
+from task_orchestrator import TaskOrchestrator, TaskPriority, TaskRequest, TaskStatus
+
+
+class TestTaskDispatcher:
+    """Slot accounting, priority order and queue maintenance"""
+
+    def test_tasks_wait_for_free_slots_and_run_by_priority(self):
+        dispatcher = TaskDispatcher()
+        dispatcher.update_agent("a", ["review"], capacity=1)
+        assert [item for item, _ in dispatcher.submit("t0", "first", "review", 1)] == ["first"]
+
+        assert dispatcher.submit_many([("t1", "low", "review", 1), ("t2", "high", "review", 5),
+                                       ("t3", "gone", "review", 9)]) == []
+        assert dispatcher.discard("t3")
+        assert dispatcher.queued() == 2
+
+        assert [(item, slots.agent_id) for item, slots in dispatcher.release("a")] == [("high", "a")]
+        assert [item for item, _ in dispatcher.release("a")] == ["low"]
+        assert dispatcher.release("a") == [] and dispatcher._agents["a"].in_use == 0
+
+    def test_released_agent_pulls_best_task_across_its_capabilities(self):
+        dispatcher = TaskDispatcher()
+        dispatcher.update_agent("a", ["review", "test"], capacity=1)
+        dispatcher.submit("t0", "busy", "review")
+        dispatcher.submit("t1", "review-normal", "review", 2)
+        dispatcher.submit("t2", "test-critical", "test", 4)
+        assert [item for item, _ in dispatcher.release("a")] == ["test-critical"]
+
+        # A new agent takes queued work as soon as it advertises a slot
+        assert [item for item, _ in dispatcher.update_agent("b", ["review"], capacity=2)] == ["review-normal"]
+
+    def test_global_limit_and_orphaned_capabilities(self):
+        dispatcher = TaskDispatcher(max_in_flight=1)
+        dispatcher.update_agent("a", ["review"], capacity=5)
+        dispatcher.update_agent("b", ["test"], capacity=5)
+        assert len(dispatcher.submit("t0", "r0", "review")) == 1
+        assert dispatcher.submit("t1", "t1", "test") == []
+        # Freeing a slot on "a" lets the task waiting for "b" start
+        assert [(item, slots.agent_id) for item, slots in dispatcher.release("a")] == [("t1", "b")]
+
+        dispatcher.submit("t2", "t2", "test")
+        dispatcher.remove_agent("b")
+        assert dispatcher.take_orphaned() == ["t2"] and dispatcher.queued() == 0
+
+
+class TestOrchestratorDispatch:
+    """TaskOrchestrator on top of the dispatcher"""
+
+    async def test_batch_completes_within_agent_capacity(self):
+        registry = AgentRegistry()
+        await registry.register_agent("a", "a", "worker", ["review"], "1.0", "localhost", 9000, max_load=2)
+        orchestrator = TaskOrchestrator(registry, AgentDiscovery(registry))
+        peak = 0
+
+        async def execute(agent, request):
+            nonlocal peak
+            peak = max(peak, agent.current_load)
+            await asyncio.sleep(0.01)
+            return request.payload
+
+        orchestrator._execute_on_agent = execute
+        await orchestrator.start()
+        ids = await orchestrator.submit_batch(
+            [TaskRequest(capability="review", payload={"n": n}, priority=TaskPriority.HIGH) for n in range(6)]
+            + [TaskRequest(capability="missing")]
+        )
+        while orchestrator._active_tasks:
+            await asyncio.sleep(0.01)
+        await orchestrator.stop()
+
+        statuses = [await orchestrator.get_task_status(task_id) for task_id in ids]
+        assert statuses == [TaskStatus.COMPLETED] * 6 + [TaskStatus.FAILED]
+        assert peak == 2 and (await registry.get_agent("a")).current_load == 0
@@ -9,17 +9,22 @@ into a cohesive, production-ready software development and management platform.
 """
 
 import asyncio
+import functools
+import inspect
 import logging
 import signal
 import sys
+import time
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Set
 from pathlib import Path
 
 import structlog
 from prometheus_client import Counter, Gauge, Info
 
 from base_agent import BaseAgent, AgentConfig, TaskRequest, TaskResult, AgentState, TaskStatus, Priority
+from lazy_imports import import_timings
+from startup_graph import ComponentSpec, StartupError, StartupGraph
 
 
 # ============================================================================
@@ -82,6 +87,10 @@ class UnifiedAgentSystem:
         # Background tasks
         self.background_tasks: Set[asyncio.Task] = set()
         
+        # Startup profile; optional components that did not come up
+        self.startup_report = None
+        self.degraded_components: Set[str] = set()
+        
         # System metrics
         system_info.info({
             'version': '4.0.0',
@@ -116,53 +125,23 @@ class UnifiedAgentSystem:
             
             self.state = "starting"
             
-            # Phase 1: Initialize core infrastructure
-            self.logger.info("Phase 1: Initializing infrastructure...")
-            await self._initialize_infrastructure()
-            self.logger.info("✓ Infrastructure ready")
-            
-            # Phase 2: Start Agent Manager (central controller)
-            self.logger.info("Phase 2: Starting Agent Manager...")
-            await self._start_agent_manager()
-            self.logger.info("✓ Agent Manager active")
-            
-            # Phase 3: Start Learning Agent (knowledge base)
-            self.logger.info("Phase 3: Starting Learning Agent...")
-            await self._start_learning_agent()
-            self.logger.info("✓ Learning Agent active")
-            
-            # Phase 4: Start Project Agent (quality control)
-            self.logger.info("Phase 4: Starting Project Agent...")
-            await self._start_project_agent()
-            self.logger.info("✓ Project Agent active")
-            
-            # Phase 5: Start specialized agents
-            self.logger.info("Phase 5: Starting specialized agents...")
-            await self._start_specialized_agents()
-            self.logger.info("✓ All specialized agents active")
-            
-            # Phase 6: Start engines
-            self.logger.info("Phase 6: Starting engines...")
-            await self._start_engines()
-            self.logger.info("✓ All engines active")
-            
-            # Phase 7: Start services
-            self.logger.info("Phase 7: Starting services...")
-            await self._start_services()
-            self.logger.info("✓ All services active")
-            
-            # Phase 8: Setup inter-agent communication
-            self.logger.info("Phase 8: Establishing inter-agent communication...")
-            await self._setup_agent_communication()
-            self.logger.info("✓ Communication channels established")
-            
-            # Phase 9: Start monitoring and reporting
-            self.logger.info("Phase 9: Starting monitoring...")
-            await self._start_monitoring()
-            self.logger.info("✓ Monitoring active")
-            
-            # Phase 10: Run health checks
-            self.logger.info("Phase 10: Running health checks...")
+            # Components start as soon as their dependencies are up
+            graph = self._build_startup_graph()
+            try:
+                self.startup_report = await graph.run()
+            except StartupError as e:
+                self.startup_report = e.report
+                self.logger.error("Startup profile:\n" + e.report.format_table())
+                raise
+            self.degraded_components = set(
+                self.startup_report.by_status("failed")
+                + self.startup_report.by_status("degraded")
+                + self.startup_report.by_status("skipped")
+            )
+            self.logger.info("Startup profile:\n" + self.startup_report.format_table())
+            
+            # Run health checks
+            self.logger.info("Running health checks...")
             health_status = await self._run_health_checks()
             if not health_status['healthy']:
                 raise Exception(f"System health check failed: {health_status}")
@@ -175,9 +154,12 @@ class UnifiedAgentSystem:
             self.logger.info("UNIFIED AGENT SYSTEM IS OPERATIONAL")
             self.logger.info("=" * 80)
             self.logger.info(f"System started at: {self.start_time}")
+            self.logger.info(f"Startup took: {self.startup_report.total_seconds:.2f}s")
             self.logger.info(f"Agents active: {len(self.agents)}")
             self.logger.info(f"Engines active: {len(self.engines)}")
             self.logger.info(f"Services active: {len(self.services)}")
+            if self.degraded_components:
+                self.logger.warning(f"Degraded components: {sorted(self.degraded_components)}")
             self.logger.info("=" * 80)
             
             # Update metrics
@@ -188,6 +170,73 @@ class UnifiedAgentSystem:
             self.state = "error"
             raise
     
+    def _build_startup_graph(self) -> StartupGraph:
+        """Declare every component with the components it needs"""
+        graph = StartupGraph(
+            default_timeout=self.config.get('startup_timeout', 30),
+            fail_fast=self.config.get('startup_fail_fast', False),
+            max_concurrency=self.config.get('startup_max_concurrency'),
+            logger=self.logger
+        )
+        
+        # Infrastructure
+        infrastructure = {
+            'database': (self._initialize_database, []),
+            'cache': (self._initialize_cache, []),
+            'message_broker': (self._initialize_message_broker, []),
+            'service_discovery': (self._initialize_service_discovery, []),
+            'security': (self._initialize_security, ['database', 'cache']),
+            'api_gateway': (self._initialize_api_gateway, ['security', 'service_discovery'])
+        }
+        for name, (initialize, depends_on) in infrastructure.items():
+            graph.add(ComponentSpec(name, self._service_starter(name, initialize), depends_on=depends_on))
+        
+        # Core agents
+        graph.add(ComponentSpec('agent_manager', self._start_agent_manager,
+                                depends_on=['database', 'cache', 'message_broker', 'security']))
+        graph.add(ComponentSpec('learning_agent', self._start_learning_agent, depends_on=['agent_manager']))
+        graph.add(ComponentSpec('project_agent', self._start_project_agent, depends_on=['learning_agent']))
+        
+        # Specialized agents and engines are optional: a failure degrades the system
+        optional = []
+        for spec in self._specialized_agent_specs():
+            graph.add(ComponentSpec(
+                spec['name'], functools.partial(self._start_generic_agent, spec),
+                depends_on=['agent_manager', 'message_broker'], critical=False
+            ))
+            optional.append(spec['name'])
+        for spec in self._engine_specs():
+            graph.add(ComponentSpec(
+                spec['name'], functools.partial(self._start_generic_engine, spec),
+                depends_on=['message_broker', *spec.get('depends_on', [])], critical=False
+            ))
+            optional.append(spec['name'])
+        
+        # Services
+        services = {
+            'workflow_manager': (self._initialize_workflow_manager, ['database', 'message_broker']),
+            'file_manager': (self._initialize_file_manager, ['database']),
+            'chat_manager': (self._initialize_chat_manager, ['message_broker']),
+            'notification_manager': (self._initialize_notification_manager, ['message_broker']),
+            'config_manager': (self._initialize_config_manager, ['database'])
+        }
+        for name, (initialize, depends_on) in services.items():
+            graph.add(ComponentSpec(name, self._service_starter(name, initialize), depends_on=depends_on))
+        
+        # Wiring and monitoring once everything that is going to start has
+        graph.add(ComponentSpec(
+            'agent_communication', self._setup_agent_communication,
+            depends_on=['message_broker', 'agent_manager', 'project_agent'],
+            after=optional + list(services)
+        ))
+        graph.add(ComponentSpec('monitoring', self._start_monitoring, depends_on=['agent_communication']))
+        return graph
+    
+    def _service_starter(self, name: str, initialize: Callable[[], Awaitable[Any]]):
+        async def start():
+            self.services[name] = await initialize()
+        return start
+    
     async def shutdown(self):
         """Gracefully shutdown the entire system"""
         if self.shutdown_event.is_set():
@@ -255,33 +304,6 @@ class UnifiedAgentSystem:
     # INITIALIZATION PHASES
     # ========================================================================
     
-    async def _initialize_infrastructure(self):
-        """Initialize core infrastructure components"""
-        try:
-            # Database connection pool
-            self.services['database'] = await self._initialize_database()
-            
-            # Redis cache
-            self.services['cache'] = await self._initialize_cache()
-            
-            # Message broker (NATS)
-            self.services['message_broker'] = await self._initialize_message_broker()
-            
-            # Service discovery (Consul)
-            self.services['service_discovery'] = await self._initialize_service_discovery()
-            
-            # Security manager
-            self.services['security'] = await self._initialize_security()
-            
-            # API gateway
-            self.services['api_gateway'] = await self._initialize_api_gateway()
-            
-            self.logger.info(f"Infrastructure initialized: {len(self.services)} services")
-            
-        except Exception as e:
-            self.logger.error(f"Infrastructure initialization failed: {e}")
-            raise
-    
     async def _start_agent_manager(self):
         """Start the Agent Manager (central controller)"""
         try:
@@ -398,9 +420,9 @@ class UnifiedAgentSystem:
             self.logger.error(f"Project Agent start failed: {e}")
             raise
     
-    async def _start_specialized_agents(self):
-        """Start all specialized agents"""
-        specialized_agents = [
+    def _specialized_agent_specs(self) -> List[Dict[str, Any]]:
+        """Specialized agents started after the Agent Manager"""
+        return [
             # Workflow and Coordination
             {
                 'name': 'orchestrator_agent',
@@ -491,20 +513,10 @@ class UnifiedAgentSystem:
                 'capabilities': ['language_model_integration', 'natural_language_processing', 'ai_assistance']
             }
         ]
-        
-        for agent_spec in specialized_agents:
-            try:
-                await self._start_generic_agent(agent_spec)
-                self.logger.info(f"✓ {agent_spec['name']} started")
-            except Exception as e:
-                self.logger.error(f"✗ {agent_spec['name']} failed: {e}")
-                # Continue with other agents
-        
-        self.logger.info(f"Started {len([a for a in specialized_agents if a['name'] in self.agents])} specialized agents")
     
-    async def _start_engines(self):
-        """Start all processing engines"""
-        engines = [
+    def _engine_specs(self) -> List[Dict[str, Any]]:
+        """Processing engines"""
+        return [
             {
                 'name': 'intelligence_engine',
                 'capabilities': ['ai_decision_making', 'pattern_recognition', 'predictive_analysis']
@@ -531,53 +543,20 @@ class UnifiedAgentSystem:
             },
             {
                 'name': 'learning_engine',
+                'depends_on': ['learning_agent'],
                 'capabilities': ['machine_learning', 'model_training', 'prediction']
             },
             {
                 'name': 'multi_agent_learning_engine',
+                'depends_on': ['learning_agent'],
                 'capabilities': ['collaborative_learning', 'knowledge_aggregation', 'federated_learning']
             }
         ]
-        
-        for engine_spec in engines:
-            try:
-                await self._start_generic_engine(engine_spec)
-                self.logger.info(f"✓ {engine_spec['name']} started")
-            except Exception as e:
-                self.logger.error(f"✗ {engine_spec['name']} failed: {e}")
-        
-        self.logger.info(f"Started {len(self.engines)} engines")
-    
-    async def _start_services(self):
-        """Start additional services"""
-        try:
-            # Workflow Manager
-            self.services['workflow_manager'] = await self._initialize_workflow_manager()
-            
-            # File Manager
-            self.services['file_manager'] = await self._initialize_file_manager()
-            
-            # Chat Manager
-            self.services['chat_manager'] = await self._initialize_chat_manager()
-            
-            # Notification Manager
-            self.services['notification_manager'] = await self._initialize_notification_manager()
-            
-            # Configuration Manager
-            self.services['config_manager'] = await self._initialize_config_manager()
-            
-            self.logger.info(f"All services started: {len(self.services)}")
-            
-        except Exception as e:
-            self.logger.error(f"Service startup failed: {e}")
-            raise
-    
-    # ========================================================================
-    # HELPER METHODS
-    # ========================================================================
     
     async def _start_generic_agent(self, spec: Dict[str, Any]):
         """Start a generic agent based on specification"""
+        agent = None
+        start_task = None
         try:
             config = AgentConfig(
                 agent_id=spec['name'],
@@ -605,16 +584,37 @@ class UnifiedAgentSystem:
             await self._register_agent_with_manager(spec['name'])
             
             # Start agent
-            task = asyncio.create_task(agent.start())
-            self.background_tasks.add(task)
-            task.add_done_callback(self.background_tasks.discard)
+            start_task = asyncio.create_task(agent.start())
+            self.background_tasks.add(start_task)
+            start_task.add_done_callback(self.background_tasks.discard)
             
-            await asyncio.sleep(1)  # Give it time to initialize
+            await self._wait_for_agent_ready(spec['name'], timeout=spec.get('timeout', 30))
             
+        except asyncio.CancelledError:
+            # Startup timeout or abort: the startup graph cancelled us
+            await self._discard_agent(spec['name'], agent, start_task)
+            raise
         except Exception as e:
             self.logger.error(f"Failed to start {spec['name']}: {e}")
+            await self._discard_agent(spec['name'], agent, start_task)
             raise
     
+    async def _discard_agent(self, agent_name: str, agent: Optional[BaseAgent], start_task: Optional[asyncio.Task]):
+        """Forget an agent that did not come up and stop whatever part of it did"""
+        if agent is None:
+            return
+        if self.agents.get(agent_name) is agent:
+            del self.agents[agent_name]
+        if start_task is not None and not start_task.done():
+            start_task.cancel()
+            await asyncio.gather(start_task, return_exceptions=True)
+        try:
+            result = agent.shutdown()
+            if inspect.isawaitable(result):
+                await asyncio.wait_for(result, timeout=5)
+        except Exception as e:
+            self.logger.warning(f"Cleanup of {agent_name} after failed start: {e}")
+    
     async def _start_generic_engine(self, spec: Dict[str, Any]):
         """Start a generic engine"""
         try:
@@ -664,7 +664,7 @@ class UnifiedAgentSystem:
                 agent = self.agents[agent_name]
                 if agent.state in [AgentState.READY, AgentState.ACTIVE]:
                     return True
-            await asyncio.sleep(0.5)
+            await asyncio.sleep(0.1)
         
         raise TimeoutError(f"Agent {agent_name} did not reach ready state within {timeout}s")
     
@@ -719,6 +719,9 @@ class UnifiedAgentSystem:
         try:
             # Check agents
             for agent_name, agent in self.agents.items():
+                if agent_name in self.degraded_components:
+                    health['components'][agent_name] = {'healthy': False, 'degraded': True}
+                    continue
                 try:
                     if hasattr(agent, 'get_health_status'):
                         agent_health = await agent.get_health_status()
@@ -888,7 +891,10 @@ class UnifiedAgentSystem:
             },
             'services': {
                 'total': len(self.services)
-            }
+            },
+            'degraded_components': sorted(self.degraded_components),
+            'startup': self.startup_report.to_dict() if self.startup_report else None,
+            'lazy_import_seconds': import_timings()
         }
     
     async def submit_task(self, agent_name: str, task_request: TaskRequest) -> str:
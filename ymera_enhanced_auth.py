@@ -30,6 +30,8 @@ from sqlalchemy.orm import selectinload
 import redis.asyncio as aioredis
 from jinja2 import Template
 
+from redis_task_queue import QueueWorker, RedisTaskQueue
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -84,6 +86,10 @@ class AuthConfig:
     TASK_PRIORITY_NORMAL: int = 5
     TASK_PRIORITY_LOW: int = 10
     DEAD_LETTER_QUEUE_TTL_DAYS: int = 7
+    TASK_MAX_ATTEMPTS: int = 3
+    TASK_VISIBILITY_TIMEOUT_SECONDS: int = 60  # Lease before a crashed worker's task is retried
+    TASK_CLAIM_BATCH_SIZE: int = 10
+    TASK_DEFAULT_CONCURRENCY: int = 10  # Per task type, per worker
     
     # Kibana Integration
     KIBANA_URL: str = "http://localhost:5601"
@@ -626,10 +632,23 @@ class TaskQueue:
     def __init__(self, redis: aioredis.Redis):
         self.redis = redis
         self.handlers: Dict[str, Callable] = {}
+        self.concurrency: Dict[str, int] = {}
+        self.workers: List[QueueWorker] = []
+        self.engine = RedisTaskQueue(
+            redis,
+            prefix=f"{AuthConfig.REDIS_KEY_PREFIX}tq:",
+            visibility_timeout=AuthConfig.TASK_VISIBILITY_TIMEOUT_SECONDS,
+            max_attempts=AuthConfig.TASK_MAX_ATTEMPTS,
+            dead_letter_key=f"{AuthConfig.REDIS_KEY_PREFIX}task_dlq",
+            dead_letter_ttl=AuthConfig.DEAD_LETTER_QUEUE_TTL_DAYS * 86400,
+            completed_key=f"{AuthConfig.REDIS_KEY_PREFIX}completed_tasks"
+        )
     
-    def register_handler(self, task_type: str, handler: Callable):
-        """Register task handler"""
+    def register_handler(self, task_type: str, handler: Callable, max_concurrency: Optional[int] = None):
+        """Register task handler, optionally limiting how many run at once per worker"""
         self.handlers[task_type] = handler
+        if max_concurrency is not None:
+            self.concurrency[task_type] = max_concurrency
     
     async def enqueue(
         self,
@@ -639,147 +658,56 @@ class TaskQueue:
         delay_seconds: int = 0
     ) -> str:
         """Enqueue task with priority"""
+        return await self.engine.enqueue(task_type, payload, priority.value, delay_seconds)
+    
+    async def process_tasks(self, workers: int = 1):
+        """Process task queue with ``workers`` concurrent claim loops"""
+        await self._migrate_legacy_queue()
+        
+        self.workers = [
+            QueueWorker(
+                self.engine,
+                self.handlers,
+                concurrency=self.concurrency,
+                default_concurrency=AuthConfig.TASK_DEFAULT_CONCURRENCY,
+                batch_size=AuthConfig.TASK_CLAIM_BATCH_SIZE
+            )
+            for _ in range(workers)
+        ]
+        await asyncio.gather(*(worker.run() for worker in self.workers))
+    
+    async def stop(self):
+        """Stop claiming new tasks; running ones finish"""
+        for worker in self.workers:
+            await worker.stop()
+    
+    async def _migrate_legacy_queue(self):
+        """Move tasks left in the old single sorted set into the new layout"""
+        def convert(task_json) -> Dict[str, Any]:
+            task = json.loads(task_json)
+            delay = (datetime.fromisoformat(task['scheduled_at']) - datetime.utcnow()).total_seconds()
+            return {
+                "type": task['type'],
+                "payload": task['payload'],
+                "priority": task['priority'],
+                "delay_seconds": max(delay, 0)
+            }
         
-        task_id = secrets.token_urlsafe(16)
-        task_data = {
-            'id': task_id,
-            'type': task_type,
-            'payload': payload,
-            'priority': priority.value,
-            'status': TaskStatus.PENDING.value,
-            'attempts': 0,
-            'created_at': datetime.utcnow().isoformat(),
-            'scheduled_at': (datetime.utcnow() + timedelta(seconds=delay_seconds)).isoformat()
-        }
-        
-        queue_key = f"{AuthConfig.REDIS_KEY_PREFIX}task_queue"
-        
-        # Use priority as score for sorted set
-        score = priority.value + (datetime.utcnow().timestamp() / 1000000)
-        
-        await self.redis.zadd(
-            queue_key,
-            {json.dumps(task_data): score}
-        )
-        
-        return task_id
-    
-    async def process_tasks(self):
-        """Process task queue"""
-        queue_key = f"{AuthConfig.REDIS_KEY_PREFIX}task_queue"
-        
-        while True:
-            try:
-                # Get highest priority tasks
-                tasks = await self.redis.zrange(queue_key, 0, 9)
-                
-                if not tasks:
-                    await asyncio.sleep(0.5)
-                    continue
-                
-                for task_json in tasks:
-                    try:
-                        task = json.loads(task_json)
-                        
-                        # Check if scheduled time reached
-                        scheduled_at = datetime.fromisoformat(task['scheduled_at'])
-                        if scheduled_at > datetime.utcnow():
-                            continue
-                        
-                        # Get handler
-                        handler = self.handlers.get(task['type'])
-                        if not handler:
-                            print(f"No handler for task type: {task['type']}")
-                            await self.redis.zrem(queue_key, task_json)
-                            continue
-                        
-                        # Update status
-                        task['status'] = TaskStatus.RUNNING.value
-                        task['started_at'] = datetime.utcnow().isoformat()
-                        
-                        # Execute task
-                        try:
-                            await handler(task['payload'])
-                            task['status'] = TaskStatus.COMPLETED.value
-                            task['completed_at'] = datetime.utcnow().isoformat()
-                            
-                            # Remove from queue
-                            await self.redis.zrem(queue_key, task_json)
-                            
-                            # Store in completed tasks (optional)
-                            await self._store_completed_task(task)
-                            
-                        except Exception as e:
-                            task['status'] = TaskStatus.FAILED.value
-                            task['error'] = str(e)
-                            task['attempts'] += 1
-                            
-                            if task['attempts'] >= 3:
-                                # Move to dead letter queue
-                                await self._move_to_dead_letter(task)
-                                await self.redis.zrem(queue_key, task_json)
-                            else:
-                                # Retry with exponential backoff
-                                delay = 2 ** task['attempts']
-                                task['scheduled_at'] = (
-                                    datetime.utcnow() + timedelta(seconds=delay)
-                                ).isoformat()
-                                
-                                await self.redis.zrem(queue_key, task_json)
-                                score = task['priority'] + (datetime.utcnow().timestamp() / 1000000)
-                                await self.redis.zadd(
-                                    queue_key,
-                                    {json.dumps(task): score}
-                                )
-                    
-                    except Exception as e:
-                        print(f"Task processing error: {e}")
-                
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                print(f"Queue processing error: {e}")
-                await asyncio.sleep(1)
-    
-    async def _store_completed_task(self, task: Dict[str, Any]):
-        """Store completed task for auditing"""
-        completed_key = f"{AuthConfig.REDIS_KEY_PREFIX}completed_tasks"
-        await self.redis.zadd(
-            completed_key,
-            {json.dumps(task): datetime.utcnow().timestamp()}
-        )
-        # Keep last 1000 completed tasks
-        await self.redis.zremrangebyrank(completed_key, 0, -1001)
-    
-    async def _move_to_dead_letter(self, task: Dict[str, Any]):
-        """Move failed task to dead letter queue"""
-        dlq_key = f"{AuthConfig.REDIS_KEY_PREFIX}task_dlq"
-        task['moved_to_dlq_at'] = datetime.utcnow().isoformat()
-        task['status'] = TaskStatus.DEAD_LETTER.value
-        
-        await self.redis.zadd(
-            dlq_key,
-            {json.dumps(task): datetime.utcnow().timestamp()}
-        )
-        
-        # Set TTL
-        ttl = AuthConfig.DEAD_LETTER_QUEUE_TTL_DAYS * 86400
-        await self.redis.expire(dlq_key, ttl)
+        # Each batch leaves the legacy set in the transaction that enqueues it
+        await self.engine.import_sorted_set(f"{AuthConfig.REDIS_KEY_PREFIX}task_queue", convert)
     
     async def get_queue_stats(self) -> Dict[str, Any]:
         """Get queue statistics"""
-        queue_key = f"{AuthConfig.REDIS_KEY_PREFIX}task_queue"
-        dlq_key = f"{AuthConfig.REDIS_KEY_PREFIX}task_dlq"
-        completed_key = f"{AuthConfig.REDIS_KEY_PREFIX}completed_tasks"
-        
-        pending = await self.redis.zcard(queue_key)
-        dead_letter = await self.redis.zcard(dlq_key)
-        completed = await self.redis.zcard(completed_key)
+        stats = await self.engine.get_stats()
         
         return {
-            'pending': pending,
-            'dead_letter': dead_letter,
-            'completed': completed,
+            'pending': stats['ready'] + stats['delayed'],
+            'ready': stats['ready'],
+            'delayed': stats['delayed'],
+            'running': stats['in_flight'],
+            'dead_letter': stats['dead_letter'],
+            'completed': stats['completed'],
+            'by_type': stats['ready_by_type'],
             'timestamp': datetime.utcnow().isoformat()
         }
 